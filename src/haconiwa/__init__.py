@@ -1,24 +1,21 @@
-from importlib.metadata import version
+from importlib import import_module
 from typing import Dict, Any
 
-from .core.config import Config
-from .core.logging import setup_logging
-from .core.state import StateManager
-from .world.provider.local import LocalProvider
-
-try:
-    from .world.provider.docker import DockerProvider
-except ImportError:
-    DockerProvider = None
-
-from .agent.base import BaseAgent
-from .agent.boss import BossAgent
-from .agent.worker import WorkerAgent
-from .agent.manager import AgentManager
-from .task.worktree import WorktreeManager
-from .watch.monitor import Monitor
-
-__version__ = version("haconiwa")
+# Public names are imported on first access so `import haconiwa` (and the CLI)
+# does not pull in docker, GitPython, psutil or matplotlib up front
+_LAZY_ATTRIBUTES = {
+    "Config": ".core.config",
+    "setup_logging": ".core.logging",
+    "StateManager": ".core.state",
+    "LocalProvider": ".world.provider.local",
+    "DockerProvider": ".world.provider.docker",
+    "BaseAgent": ".agent.base",
+    "BossAgent": ".agent.boss",
+    "WorkerAgent": ".agent.worker",
+    "AgentManager": ".agent.manager",
+    "WorktreeManager": ".task.worktree",
+    "Monitor": ".watch.monitor",
+}
 
 DEFAULT_CONFIG: Dict[str, Any] = {
     "log_level": "INFO",
@@ -39,26 +36,41 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     }
 }
 
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        from importlib.metadata import version
+        value = version("haconiwa")
+    elif name in _LAZY_ATTRIBUTES:
+        try:
+            value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        except ImportError:
+            if name != "DockerProvider":
+                raise
+            value = None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {"__version__"})
+
 def initialize() -> None:
     """Initialize haconiwa with default configuration."""
+    from .core.logging import setup_logging
     setup_logging("INFO")
 
 __all__ = [
     "Config",
     "StateManager",
     "LocalProvider",
-]
-
-if DockerProvider:
-    __all__.append("DockerProvider")
-
-__all__.extend([
+    "DockerProvider",
     "BaseAgent",
-    "BossAgent", 
+    "BossAgent",
     "WorkerAgent",
     "AgentManager",
     "WorktreeManager",
     "Monitor",
     "initialize",
     "__version__"
-])
\ No newline at end of file
+]
@@ -8,7 +8,7 @@ from haconiwa.agent.base import BaseAgent
 from haconiwa.agent.boss import BossAgent
 from haconiwa.agent.worker import WorkerAgent, WorkerSpecialty
 from haconiwa.agent.manager import AgentManager
-from haconiwa.core.config import Config
+from haconiwa.core.config import get_config
 
 console = Console()
 agent_app = typer.Typer(help="エージェント管理コマンド (開発中)")
@@ -21,7 +21,7 @@ def spawn(
 ):
     """Spawn a new agent"""
     try:
-        config = Config(config_file or "config.yaml")
+        config = get_config(config_file or "config.yaml")
         
         if agent_type == "boss":
             agent = BossAgent(agent_id, config)
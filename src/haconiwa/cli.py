@@ -1,36 +1,92 @@
 import typer
+from collections.abc import MutableMapping
+from importlib import import_module
 from typing import Optional, List
 from pathlib import Path
 import logging
 import sys
-import yaml
-
-from haconiwa.core.cli import core_app
-from haconiwa.world.cli import world_app
-from haconiwa.space.cli import company_app as original_company_app
-from haconiwa.resource.cli import resource_app as original_resource_app
-from haconiwa.agent.cli import agent_app
-from haconiwa.task.cli import task_app
-from haconiwa.watch.cli import watch_app
-
-# Import new v1.0 components
-from haconiwa.core.crd.parser import CRDParser, CRDValidationError
-from haconiwa.core.applier import CRDApplier
-from haconiwa.core.policy.engine import PolicyEngine
-from haconiwa.space.manager import SpaceManager
+
+from typer.core import TyperGroup
+
+# Sub-apps defined in other modules, imported only when their command is invoked (or help is listed):
+# name -> ("module:attribute", deprecated)
+LAZY_SUB_APPS = {
+    # 既存コマンド（一部deprecated）
+    "core": ("haconiwa.core.cli:core_app", False),
+    "world": ("haconiwa.world.cli:world_app", False),
+    "agent": ("haconiwa.agent.cli:agent_app", False),
+    "task": ("haconiwa.task.cli:task_app", False),
+    "watch": ("haconiwa.watch.cli:watch_app", False),
+    "daemon": ("haconiwa.daemon.cli:daemon_app", False),
+    # 後方互換性のため残す（deprecation warning付き）
+    "company": ("haconiwa.space.cli:company_app", True),
+    "resource": ("haconiwa.resource.cli:resource_app", True),
+}
+
+
+def _load_sub_app(name: str, target: str, deprecated: bool):
+    """Import a sub-app and build its click group exactly as add_typer would"""
+    module_name, attribute = target.split(":")
+    parent = typer.Typer()
+    parent.add_typer(getattr(import_module(module_name), attribute), name=name, deprecated=deprecated)
+    return typer.main.get_group(parent).commands[name]
+
+
+class _LazyCommands(MutableMapping):
+    """Command mapping that loads lazily registered sub-apps on first lookup"""
+
+    def __init__(self, commands, loaders):
+        self._commands = dict(commands)
+        self._loaders = dict(loaders)
+
+    def __getitem__(self, name):
+        if name not in self._commands and name in self._loaders:
+            self._commands[name] = self._loaders.pop(name)()
+        return self._commands[name]
+
+    def __setitem__(self, name, command):
+        self._loaders.pop(name, None)
+        self._commands[name] = command
+
+    def __delitem__(self, name):
+        self._loaders.pop(name, None)
+        self._commands.pop(name, None)
+
+    def __iter__(self):
+        yield from list(self._commands)
+        yield from [name for name in self._loaders if name not in self._commands]
+
+    def __len__(self):
+        return len(set(self._commands) | set(self._loaders))
+
+
+class LazyTyperGroup(TyperGroup):
+    """Root command group whose LAZY_SUB_APPS are imported on demand"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = _LazyCommands(self.commands, {
+            name: (lambda name=name, spec=spec: _load_sub_app(name, *spec))
+            for name, spec in LAZY_SUB_APPS.items()
+        })
+
+    def parse_args(self, ctx, args):
+        # Raw arguments, forwarded as-is when the command runs in the daemon
+        ctx.meta["haconiwa.argv"] = list(args)
+        return super().parse_args(ctx, args)
+
 
 app = typer.Typer(
     name="haconiwa",
     help="AI協調開発支援Python CLIツール v1.0 - 宣言型YAML + tmux + Git worktree",
-    no_args_is_help=True
+    no_args_is_help=True,
+    cls=LazyTyperGroup
 )
 
 def setup_logging(verbose: bool):
-    level = logging.DEBUG if verbose else logging.INFO
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    # HACONIWA_LOG_FORMAT=json / HACONIWA_LOG_QUEUE=1 / HACONIWA_LOG_DEBUG_RATE select the structured pipeline
+    from haconiwa.core.logging import setup_logging as configure_logging
+    configure_logging("DEBUG" if verbose else "INFO")
 
 def version_callback(value: bool):
     if value:
@@ -40,9 +96,11 @@ def version_callback(value: bool):
 
 @app.callback()
 def main(
+    ctx: typer.Context,
     verbose: bool = typer.Option(False, "--verbose", "-v", help="詳細なログ出力を有効化"),
     config: Optional[Path] = typer.Option(None, "--config", "-c", help="設定ファイルのパス"),
     version: bool = typer.Option(False, "--version", callback=version_callback, help="バージョン情報を表示"),
+    use_daemon: bool = typer.Option(False, "--use-daemon", help="起動中のデーモンでコマンドを実行 (HACONIWA_USE_DAEMON=1)"),
 ):
     """箱庭 (haconiwa) v1.0 - 宣言型YAML + tmux + Git worktreeフレームワーク"""
     setup_logging(verbose)
@@ -54,6 +112,29 @@ def main(
             typer.echo(f"設定ファイルの読み込みに失敗: {e}", err=True)
             sys.exit(1)
 
+    from haconiwa.daemon.client import daemon_enabled
+    if use_daemon or daemon_enabled():
+        _forward_to_daemon(ctx)
+
+def _forward_to_daemon(ctx: typer.Context):
+    """Run the invoked command in the daemon and exit with its result; returns to run it locally"""
+    from haconiwa.daemon.client import DaemonClient, DaemonError, forwardable
+
+    argv = [arg for arg in ctx.meta.get("haconiwa.argv", []) if arg != "--use-daemon"]
+    if not forwardable(argv):
+        return
+    try:
+        response = DaemonClient().run(argv)
+    except DaemonError as e:
+        logging.getLogger(__name__).warning(f"haconiwa daemon unavailable, running locally: {e}")
+        return
+
+    if response.stdout:
+        typer.echo(response.stdout, nl=False)
+    if response.stderr:
+        typer.echo(response.stderr, nl=False, err=True)
+    raise typer.Exit(response.exit_code)
+
 # =====================================================================
 # v1.0 新コマンド
 # =====================================================================
@@ -88,6 +169,7 @@ def init(
         }
     }
     
+    import yaml
     with open(config_file, 'w') as f:
         yaml.dump(default_config, f, default_flow_style=False)
     
@@ -101,6 +183,8 @@ def apply(
     attach: bool = typer.Option(False, "--attach", help="適用後に自動でセッションにアタッチ"),
     no_attach: bool = typer.Option(False, "--no-attach", help="適用後にセッションにアタッチしない（明示的指定）"),
     room: str = typer.Option("room-01", "-r", "--room", help="アタッチするルーム（--attachと併用）"),
+    worktree_workers: Optional[int] = typer.Option(None, "--worktree-workers", min=1, help="タスクworktreeを並列作成するワーカー数"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="CRDパースキャッシュを使わずに再パース"),
 ):
     """CRD定義ファイルを適用"""
     file_path = Path(file)
@@ -117,11 +201,16 @@ def apply(
     # Set final attach behavior
     should_attach = attach and not no_attach
     
-    parser = CRDParser()
+    from haconiwa.core.crd.parser import CRDParser, CRDValidationError
+    from haconiwa.core.crd.cache import CRDCache
+    from haconiwa.core.applier import CRDApplier
+    
+    parser = CRDParser(cache=None if no_cache else CRDCache())
     applier = CRDApplier()
     
     # Set force_clone flag in applier
     applier.force_clone = force_clone
+    applier.worktree_workers = worktree_workers
     
     if dry_run:
         typer.echo("🔍 Dry run mode - no changes will be applied")
@@ -156,6 +245,7 @@ def apply(
                     if crd.kind == "Space":
                         session_name = crd.spec.nations[0].cities[0].villages[0].companies[0].name
                         created_sessions.append(session_name)
+                        _echo_space_plan(crd)
         else:
             # Single document
             crd = parser.parse_file(file_path)
@@ -177,6 +267,7 @@ def apply(
                 if crd.kind == "Space":
                     session_name = crd.spec.nations[0].cities[0].villages[0].companies[0].name
                     created_sessions.append(session_name)
+                    _echo_space_plan(crd)
         
         # Auto-attach to session if requested
         if should_attach and created_sessions and not dry_run:
@@ -196,6 +287,7 @@ def apply(
                     raise typer.Exit(1)
                 
                 # Switch to specific room first
+                from haconiwa.space.manager import SpaceManager
                 space_manager = SpaceManager()
                 space_manager.switch_to_room(session_name, room)
                 
@@ -223,6 +315,23 @@ def apply(
         typer.echo(f"❌ Error: {e}", err=True)
         raise typer.Exit(1)
 
+def _echo_space_plan(crd):
+    """Print the reconcile plan of a Space CRD whose session is already running"""
+    try:
+        from haconiwa.space.reconcile import SpaceReconciler
+        from haconiwa.space.manager import SpaceManager
+        space_manager = SpaceManager()
+        config = space_manager.convert_crd_to_config(crd)
+        if not space_manager.session_exists(config["name"]):
+            typer.echo(f"    → would create session {config['name']}")
+            return
+        ops = SpaceReconciler(space_manager).plan(config)
+        typer.echo(f"    → {len(ops)} changes to running session {config['name']}")
+        for op in ops:
+            typer.echo(f"      {op}")
+    except Exception as e:
+        typer.echo(f"    → could not compute plan: {e}")
+
 # =====================================================================
 # Space コマンド（company のリネーム・拡張）
 # =====================================================================
@@ -232,6 +341,7 @@ space_app = typer.Typer(name="space", help="World/Company/Room/Desk 管理")
 @space_app.command("ls")
 def space_list():
     """Space一覧を表示"""
+    from haconiwa.space.manager import SpaceManager
     space_manager = SpaceManager()
     spaces = space_manager.list_spaces()
     
@@ -253,6 +363,7 @@ def space_start(
     company: str = typer.Option(..., "-c", "--company", help="Company name")
 ):
     """Company セッションを開始"""
+    from haconiwa.space.manager import SpaceManager
     space_manager = SpaceManager()
     success = space_manager.start_company(company)
     
@@ -267,6 +378,7 @@ def space_stop(
     company: str = typer.Option(..., "-c", "--company", help="Company name")
 ):
     """Company セッションを停止"""
+    from haconiwa.space.manager import SpaceManager
     space_manager = SpaceManager()
     success = space_manager.cleanup_session(company)
     
@@ -282,6 +394,7 @@ def space_attach(
     room: str = typer.Option("room-01", "-r", "--room", help="Room ID")
 ):
     """特定のRoom に接続"""
+    from haconiwa.space.manager import SpaceManager
     space_manager = SpaceManager()
     success = space_manager.attach_to_room(company, room)
     
@@ -296,6 +409,7 @@ def space_clone(
     company: str = typer.Option(..., "-c", "--company", help="Company name")
 ):
     """Git リポジトリをclone"""
+    from haconiwa.space.manager import SpaceManager
     space_manager = SpaceManager()
     success = space_manager.clone_repository(company)
     
@@ -305,6 +419,23 @@ def space_clone(
         typer.echo(f"❌ Failed to clone repository for: {company}", err=True)
         raise typer.Exit(1)
 
+@space_app.command("reindex")
+def space_reindex(
+    company: str = typer.Option(..., "-c", "--company", help="Company name"),
+    path: Optional[str] = typer.Option(None, "--path", help="Space base path (default: detected from company name)")
+):
+    """エージェント割り当てインデックスを再構築"""
+    from haconiwa.task.assignments import AssignmentIndex
+    from haconiwa.task.manager import TaskManager
+
+    base_path = Path(path) if path else TaskManager()._find_space_base_path(company)
+    if not base_path or not (base_path / "tasks").exists():
+        typer.echo(f"❌ Could not find tasks directory for: {company}", err=True)
+        raise typer.Exit(1)
+
+    count = AssignmentIndex(base_path).rebuild()
+    typer.echo(f"✅ Rebuilt assignment index for {company}: {count} active assignments")
+
 @space_app.command("run")
 def space_run(
     company: str = typer.Option(..., "-c", "--company", help="Company name"),
@@ -325,13 +456,12 @@ def space_run(
         typer.echo("❌ Either --cmd or --claude-code must be specified", err=True)
         raise typer.Exit(1)
     
-    # Import subprocess for tmux interaction
-    import subprocess
+    from haconiwa.space.batch import TmuxCommandBatch
+    from haconiwa.space.control import run_tmux
     
     # Check if session exists
     try:
-        result = subprocess.run(['tmux', 'has-session', '-t', company], 
-                               capture_output=True, text=True)
+        result = run_tmux(['has-session', '-t', company])
         if result.returncode != 0:
             typer.echo(f"❌ Company session '{company}' not found", err=True)
             raise typer.Exit(1)
@@ -343,17 +473,16 @@ def space_run(
     try:
         if room:
             # Get panes for specific room (window)
+            from haconiwa.space.manager import SpaceManager
             space_manager = SpaceManager()
             window_id = space_manager._get_window_id_for_room(room)
-            result = subprocess.run(['tmux', 'list-panes', '-t', f'{company}:{window_id}', '-F', 
-                                   '#{window_index}:#{pane_index}'], 
-                                   capture_output=True, text=True)
+            result = run_tmux(['list-panes', '-t', f'{company}:{window_id}', '-F', 
+                               '#{window_index}:#{pane_index}'])
             target_desc = f"room {room} (window {window_id})"
         else:
             # Get all panes in session
-            result = subprocess.run(['tmux', 'list-panes', '-t', company, '-F', 
-                                   '#{window_index}:#{pane_index}', '-a'], 
-                                   capture_output=True, text=True)
+            result = run_tmux(['list-panes', '-t', company, '-F', 
+                               '#{window_index}:#{pane_index}', '-a'])
             target_desc = "all rooms"
         
         if result.returncode != 0:
@@ -388,25 +517,16 @@ def space_run(
         # Execute command in all panes
         typer.echo(f"\n🚀 Executing '{actual_command}' in {len(panes)} panes...")
         
+        # Send command to all panes in one tmux invocation
+        batch = TmuxCommandBatch()
+        for pane in panes:
+            batch.send_keys(f'{company}:{pane}', actual_command, step=pane,
+                            on_success=lambda pane=pane: typer.echo(f"  ✅ Pane {pane}: Command sent"))
+        
         failed_panes = []
-        for i, pane in enumerate(panes):
-            try:
-                # Send command to pane
-                cmd = ['tmux', 'send-keys', '-t', f'{company}:{pane}', actual_command, 'Enter']
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-                
-                if result.returncode == 0:
-                    typer.echo(f"  ✅ Pane {pane}: Command sent")
-                else:
-                    typer.echo(f"  ❌ Pane {pane}: Failed - {result.stderr}")
-                    failed_panes.append(pane)
-                    
-            except subprocess.TimeoutExpired:
-                typer.echo(f"  ⏱️ Pane {pane}: Timeout")
-                failed_panes.append(pane)
-            except Exception as e:
-                typer.echo(f"  ❌ Pane {pane}: Error - {e}")
-                failed_panes.append(pane)
+        for failure in batch.flush().failures:
+            typer.echo(f"  ❌ Pane {failure.step}: Failed - {failure.error}")
+            failed_panes.append(failure.step)
         
         # Summary
         success_count = len(panes) - len(failed_panes)
@@ -430,14 +550,12 @@ def space_delete(
 ):
     """Company セッションとリソースを削除"""
     
-    # Import subprocess for tmux interaction
-    import subprocess
     import shutil
+    from haconiwa.space.control import run_tmux
     
     # Check if session exists
     try:
-        result = subprocess.run(['tmux', 'has-session', '-t', company], 
-                               capture_output=True, text=True)
+        result = run_tmux(['has-session', '-t', company])
         session_exists = result.returncode == 0
     except FileNotFoundError:
         typer.echo("❌ tmux is not installed or not found in PATH", err=True)
@@ -469,8 +587,7 @@ def space_delete(
     try:
         # Kill tmux session
         if session_exists:
-            result = subprocess.run(['tmux', 'kill-session', '-t', company], 
-                                   capture_output=True, text=True)
+            result = run_tmux(['kill-session', '-t', company])
             if result.returncode == 0:
                 typer.echo(f"✅ Killed tmux session: {company}")
             else:
@@ -501,6 +618,7 @@ def space_delete(
                 typer.echo("ℹ️ No directories found to clean")
         
         # Remove from SpaceManager tracking
+        from haconiwa.space.manager import SpaceManager
         space_manager = SpaceManager()
         if hasattr(space_manager, 'active_sessions') and company in space_manager.active_sessions:
             del space_manager.active_sessions[company]
@@ -521,52 +639,114 @@ tool_app = typer.Typer(name="tool", help="ファイルスキャン・DB スキ
 @tool_app.command()
 def scan_filepath(
     pathscan: str = typer.Option(..., "--scan-filepath", help="PathScan CRD名"),
+    file: Optional[str] = typer.Option(None, "-f", "--file", help="PathScan CRD を含む YAML ファイル"),
+    path: str = typer.Option(".", "--path", help="スキャンするルートディレクトリ"),
+    changes: bool = typer.Option(False, "--changes", help="前回スキャンからの変更のみ表示"),
     yaml_output: bool = typer.Option(False, "--yaml", help="YAML形式で出力"),
     json_output: bool = typer.Option(False, "--json", help="JSON形式で出力")
 ):
     """ファイルパススキャンを実行"""
-    # Mock implementation - would integrate with actual PathScanner
+    from haconiwa.resource.path_scanner import PathScanner
+
+    if file:
+        _apply_crd_file(file, "PathScan")
+
+    if not PathScanner.has_config(pathscan):
+        typer.echo(f"❌ PathScan not found: {pathscan} (apply it or pass -f)", err=True)
+        raise typer.Exit(1)
+
+    if changes:
+        _echo_path_changes(PathScanner().iter_changes(path, pathscan), yaml_output, json_output)
+        return
+
     typer.echo(f"🔍 Scanning files with PathScan: {pathscan}")
-    
-    # Simulate file scan results
-    files = ["src/main.py", "src/utils.py", "src/config.py"]
+    files = PathScanner().scan(pathscan, path)
     
     if yaml_output:
         typer.echo("files:")
-        for file in files:
-            typer.echo(f"  - {file}")
+        for file_path in files:
+            typer.echo(f"  - {file_path}")
     elif json_output:
         import json
-        typer.echo(json.dumps({"files": files}, indent=2))
+        typer.echo(json.dumps({"files": sorted(files)}, indent=2))
     else:
         typer.echo("📁 Found files:")
-        for file in files:
-            typer.echo(f"  📄 {file}")
+        for file_path in files:
+            typer.echo(f"  📄 {file_path}")
+
+def _echo_path_changes(changes, yaml_output: bool, json_output: bool):
+    """Print file changes as they are found"""
+    if json_output:
+        import json
+        grouped = {"added": [], "modified": [], "removed": []}
+        for change in changes:
+            grouped[change.kind].append(change.path)
+        typer.echo(json.dumps({kind: sorted(paths) for kind, paths in grouped.items()}, indent=2))
+        return
+
+    marks = {"added": "+", "modified": "~", "removed": "-"}
+    if yaml_output:
+        typer.echo("changes:")
+    for change in changes:
+        if yaml_output:
+            typer.echo(f"  - {{kind: {change.kind}, path: {change.path}}}")
+        else:
+            typer.echo(f"{marks[change.kind]} {change.path}")
+
+def _apply_crd_file(file: str, kind: str):
+    """Apply the CRDs of one kind from a YAML file"""
+    from haconiwa.core.crd.parser import CRDParser, CRDValidationError
+    from haconiwa.core.applier import CRDApplier
+    try:
+        crds = CRDParser().parse_multi_yaml(Path(file).read_text())
+    except (OSError, CRDValidationError) as e:
+        typer.echo(f"❌ Failed to load {file}: {e}", err=True)
+        raise typer.Exit(1)
+    applier = CRDApplier()
+    for crd in crds:
+        if crd.kind == kind:
+            applier.apply(crd)
 
 @tool_app.command()
 def scan_db(
     database: str = typer.Option(..., "--scan-db", help="Database CRD名"),
+    file: Optional[str] = typer.Option(None, "-f", "--file", help="Database CRD を含む YAML ファイル"),
+    refresh: bool = typer.Option(False, "--refresh", help="キャッシュの有効期間内でもカタログを再確認"),
     yaml_output: bool = typer.Option(False, "--yaml", help="YAML形式で出力"),
     json_output: bool = typer.Option(False, "--json", help="JSON形式で出力")
 ):
     """データベーススキャンを実行"""
-    # Mock implementation - would integrate with actual DatabaseScanner
+    from haconiwa.resource.db_fetcher import DatabaseManager
+    from haconiwa.resource.schema_cache import SchemaCache, SchemaCacheError
+
+    if file:
+        _apply_crd_file(file, "Database")
+
+    if not DatabaseManager.has_config(database):
+        typer.echo(f"❌ Database not found: {database} (apply it or pass -f)", err=True)
+        raise typer.Exit(1)
+
     typer.echo(f"🔍 Scanning database: {database}")
-    
-    # Simulate database scan results
-    tables = ["users", "posts", "comments"]
+    try:
+        snapshot = SchemaCache().get(database, refresh=refresh)
+    except SchemaCacheError as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
     
     if yaml_output:
-        typer.echo("tables:")
-        for table in tables:
-            typer.echo(f"  - {table}")
+        import yaml
+        typer.echo(yaml.safe_dump(snapshot.summary(), default_flow_style=False, sort_keys=False).rstrip())
     elif json_output:
         import json
-        typer.echo(json.dumps({"tables": tables}, indent=2))
+        typer.echo(json.dumps(snapshot.summary(), indent=2))
     else:
         typer.echo("🗄️ Found tables:")
-        for table in tables:
-            typer.echo(f"  📋 {table}")
+        for table in snapshot.tables():
+            typer.echo(f"  📋 {table} ({len(snapshot.objects[table]['columns'])} columns)")
+        for view in snapshot.views():
+            typer.echo(f"  👁️ {view} (view)")
+        if snapshot.refreshed:
+            typer.echo(f"♻️ Introspected {len(snapshot.refreshed)} of {len(snapshot.objects)} objects")
 
 # =====================================================================
 # Policy コマンド（新規）
@@ -577,7 +757,8 @@ policy_app = typer.Typer(name="policy", help="CommandPolicy 管理")
 @policy_app.command("ls")
 def policy_list():
     """Policy一覧を表示"""
-    policy_engine = PolicyEngine()
+    from haconiwa.core.policy.engine import get_policy_engine
+    policy_engine = get_policy_engine()
     policies = policy_engine.list_policies()
     
     if not policies:
@@ -600,7 +781,8 @@ def policy_test(
         typer.echo("❌ Only 'agent' target is supported", err=True)
         raise typer.Exit(1)
     
-    policy_engine = PolicyEngine()
+    from haconiwa.core.policy.engine import get_policy_engine
+    policy_engine = get_policy_engine()
     allowed = policy_engine.test_command(agent_id, cmd)
     
     if allowed:
@@ -613,7 +795,8 @@ def policy_delete(
     name: str = typer.Argument(..., help="Policy name to delete")
 ):
     """Policy を削除"""
-    policy_engine = PolicyEngine()
+    from haconiwa.core.policy.engine import get_policy_engine
+    policy_engine = get_policy_engine()
     success = policy_engine.delete_policy(name)
     
     if success:
@@ -631,16 +814,7 @@ app.add_typer(space_app, name="space")
 app.add_typer(tool_app, name="tool")
 app.add_typer(policy_app, name="policy")
 
-# 既存コマンド（一部deprecated）
-app.add_typer(core_app, name="core")
-app.add_typer(world_app, name="world")
-app.add_typer(agent_app, name="agent")
-app.add_typer(task_app, name="task")
-app.add_typer(watch_app, name="watch")
-
-# 後方互換性のため残す（deprecation warning付き）
-app.add_typer(original_company_app, name="company", deprecated=True)
-app.add_typer(original_resource_app, name="resource", deprecated=True)
+# 既存コマンドと後方互換コマンドは LAZY_SUB_APPS で遅延登録
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
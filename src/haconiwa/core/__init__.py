@@ -4,19 +4,36 @@
 Haconiwa Core Module
 """
 
-from .config import Config
-from .state import StateManager
-
-# v1.0 新機能
-try:
-    from .crd import *
-    from .applier import CRDApplier
-    from .policy import *
-except ImportError:
-    # v1.0機能がない場合はスキップ
-    pass
+from importlib import import_module
+
+# Submodules are imported on first attribute access; the CLI only loads what a command uses
+_LAZY_ATTRIBUTES = {
+    'Config': '.config',
+    'StateManager': '.state',
+    'StateStore': '.state_store', 'SQLiteStateStore': '.state_store', 'StateStoreError': '.state_store',
+    # v1.0 新機能
+    'SpaceCRD': '.crd', 'AgentCRD': '.crd', 'TaskCRD': '.crd', 'PathScanCRD': '.crd',
+    'DatabaseCRD': '.crd', 'CommandPolicyCRD': '.crd',
+    'CRDParser': '.crd', 'CRDValidationError': '.crd', 'CRDCache': '.crd',
+    'CRDApplier': '.applier',
+    'PolicyEngine': '.policy', 'PolicyViolationError': '.policy',
+    'CommandValidator': '.policy', 'ValidationResult': '.policy',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 __all__ = [
     'Config',
     'StateManager'
-]
\ No newline at end of file
+]
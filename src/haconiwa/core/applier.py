@@ -2,7 +2,8 @@
 CRD Applier for Haconiwa v1.0
 """
 
-from typing import Union, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Union, List, Dict
 from pathlib import Path
 import logging
 
@@ -24,6 +25,8 @@ class CRDApplier:
     def __init__(self):
         self.applied_resources = {}
         self.force_clone = False  # Default to False
+        self.worktree_workers = None  # Worktree provisioning pool size (None: provisioner default)
+        self.max_workers = None  # Concurrent apply branches (None: one per branch)
     
     def apply(self, crd: Union[SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD]) -> bool:
         """Apply CRD to the system"""
@@ -47,39 +50,99 @@ class CRDApplier:
             raise CRDApplierError(f"Failed to apply CRD {crd.metadata.name}: {e}")
     
     def apply_multiple(self, crds: List[Union[SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD]]) -> List[bool]:
-        """Apply multiple CRDs to the system"""
-        results = []
-        space_sessions = []  # Track space sessions for post-processing
+        """Apply multiple CRDs to the system
         
-        for crd in crds:
-            try:
-                result = self.apply(crd)
-                results.append(result)
-                
-                # Track Space CRDs for later pane updates
-                if isinstance(crd, SpaceCRD) and result:
-                    # Extract session name from Space CRD
-                    company = crd.spec.nations[0].cities[0].villages[0].companies[0]
-                    space_sessions.append({
-                        "session_name": company.name,
-                        "space_ref": company.name
+        CRDs are grouped by the Space they depend on (Tasks and Agents via ``spaceRef``); each
+        group is applied Space → Agents → Tasks → pane updates. Spaces and pane updates go through
+        the shared SpaceManager and may prompt, so they run on the calling thread; the Agents and
+        Tasks of different groups, and CRDs that depend on nothing, are applied concurrently.
+        """
+        results = [False] * len(crds)
+        branches = self._plan_branches(crds)
+        if not branches:
+            return results
+        
+        space_sessions = []  # Track space sessions of each branch for post-processing
+        for branch in branches:
+            sessions = []
+            for index, crd in branch["spaces"]:
+                results[index] = self._apply_logged(crd)
+                if results[index]:
+                    session_name = self._space_session_name(crd)
+                    sessions.append({
+                        "session_name": session_name,
+                        "space_ref": session_name
                     })
-                    
-            except Exception as e:
-                logger.error(f"Failed to apply CRD {crd.metadata.name}: {e}")
-                results.append(False)
+            space_sessions.append(sessions)
         
-        # IMPORTANT: Re-update task assignments for all spaces after all CRDs are applied
-        # This fixes the timing issue where SpaceCRD is applied before TaskCRDs
-        if space_sessions:
-            logger.info("Re-updating task assignments after all CRDs are applied...")
-            self._update_all_space_task_assignments(space_sessions)
+        pending = [branch for branch in branches if branch["agents"] or branch["tasks"]]
+        if pending:
+            workers = min(self.max_workers or len(pending), len(pending))
+            logger.info(f"Applying {len(crds)} CRDs in {len(pending)} independent branches ({workers} workers)")
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._apply_branch, branch) for branch in pending]
+                for future in futures:
+                    for index, result in future.result():
+                        results[index] = result
         
-        # Update agent pane directories for all spaces after all CRDs are applied
-        self._update_all_agent_pane_directories(space_sessions)
+        # Space is applied before its Tasks, so re-update its assignments and panes once they exist
+        for branch, sessions in zip(branches, space_sessions):
+            if sessions:
+                logger.info(f"Re-updating task assignments for space {branch['space_ref']}...")
+                self._update_all_space_task_assignments(sessions)
+                self._update_all_agent_pane_directories(sessions)
         
         return results
     
+    def _plan_branches(self, crds: List) -> List[Dict[str, Any]]:
+        """Split CRDs into independent branches of the dependency graph"""
+        spaces = {}
+        branches = []
+        for index, crd in enumerate(crds):
+            if isinstance(crd, SpaceCRD):
+                name = self._space_session_name(crd)
+                if name not in spaces:
+                    spaces[name] = {"space_ref": name, "spaces": [], "agents": [], "tasks": []}
+                    branches.append(spaces[name])
+                spaces[name]["spaces"].append((index, crd))
+        
+        for index, crd in enumerate(crds):
+            if isinstance(crd, (AgentCRD, TaskCRD)):
+                space_ref = crd.spec.spaceRef
+                if space_ref not in spaces:
+                    # Space applied earlier or not at all: the group still keeps its Tasks together
+                    spaces[space_ref] = {"space_ref": space_ref, "spaces": [], "agents": [], "tasks": []}
+                    branches.append(spaces[space_ref])
+                key = "agents" if isinstance(crd, AgentCRD) else "tasks"
+                spaces[space_ref][key].append((index, crd))
+            elif not isinstance(crd, SpaceCRD):
+                branches.append({"space_ref": None, "spaces": [], "agents": [(index, crd)], "tasks": []})
+        return branches
+    
+    def _apply_branch(self, branch: Dict[str, Any]) -> List[tuple]:
+        """Apply the Agents and Tasks of one branch; returns (index, result) pairs"""
+        results = [(index, self._apply_logged(crd)) for index, crd in branch["agents"]]
+        
+        if branch["tasks"]:
+            indexes = [index for index, _ in branch["tasks"]]
+            results.extend(zip(indexes, self._apply_task_crds([crd for _, crd in branch["tasks"]])))
+        
+        return results
+    
+    def _apply_logged(self, crd) -> bool:
+        """Apply one CRD, logging a failure instead of raising it"""
+        try:
+            return self.apply(crd)
+        except Exception as e:
+            logger.error(f"Failed to apply CRD {crd.metadata.name}: {e}")
+            return False
+    
+    @staticmethod
+    def _space_session_name(crd: SpaceCRD) -> str:
+        """Session name of a Space CRD (its first company)"""
+        return crd.spec.nations[0].cities[0].villages[0].companies[0].name
+    
     def _update_all_agent_pane_directories(self, space_sessions: List[Dict[str, str]]):
         """Update agent pane directories for all space sessions"""
         if not space_sessions:
@@ -128,7 +191,7 @@ class CRDApplier:
                 
                 # Get all task assignments for this space
                 task_assignments = {}
-                for task_name, task_data in task_manager.tasks.items():
+                for task_name, task_data in task_manager.list_tasks().items():
                     assignee = task_data["config"].get("assignee")
                     task_space_ref = task_data["config"].get("space_ref")
                     if assignee and task_space_ref == space_ref:
@@ -182,7 +245,7 @@ class CRDApplier:
             
             # Pass task assignments to SpaceManager
             task_assignments = {}
-            for task_name, task_data in task_manager.tasks.items():
+            for task_name, task_data in task_manager.list_tasks().items():
                 assignee = task_data["config"].get("assignee")
                 space_ref = task_data["config"].get("space_ref")
                 if assignee and space_ref == config['name']:
@@ -205,7 +268,13 @@ class CRDApplier:
             # Pass force_clone flag to SpaceManager
             space_manager._force_clone = self.force_clone
             
-            result = space_manager.create_multiroom_session(config)
+            if space_manager.session_exists(config['name']):
+                # Re-apply: only change what differs from the running session
+                from ..space.reconcile import SpaceReconciler
+                logger.info(f"Session {config['name']} is running, reconciling instead of rebuilding")
+                result = SpaceReconciler(space_manager).reconcile(config)
+            else:
+                result = space_manager.create_multiroom_session(config)
             
             if result:
                 logger.info(f"✅ Space CRD {crd.metadata.name} applied successfully")
@@ -261,8 +330,38 @@ class CRDApplier:
         from ..task.manager import TaskManager
         task_manager = TaskManager()  # This will get the singleton instance
         
-        # Create task configuration
-        task_config = {
+        task_config = self._task_config(crd)
+        
+        # Apply task configuration
+        result = task_manager.create_task(task_config)
+        
+        logger.info(f"Task CRD {crd.metadata.name} applied successfully: {result}")
+        return result
+    
+    def _apply_task_crds(self, crds: List[TaskCRD]) -> List[bool]:
+        """Apply several Task CRDs, creating their worktrees in parallel"""
+        logger.info(f"Applying {len(crds)} Task CRDs")
+        
+        from ..task.manager import TaskManager
+        task_manager = TaskManager()
+        
+        for crd in crds:
+            self.applied_resources[f"Task/{crd.metadata.name}"] = crd
+        
+        try:
+            results = task_manager.create_tasks([self._task_config(crd) for crd in crds],
+                                                max_workers=self.worktree_workers)
+        except Exception as e:
+            logger.error(f"Failed to apply Task CRDs: {e}")
+            return [False] * len(crds)
+        
+        logger.info(f"Task CRDs applied: {sum(results)}/{len(crds)}")
+        return results
+    
+    @staticmethod
+    def _task_config(crd: TaskCRD) -> dict:
+        """Create task configuration from a Task CRD"""
+        return {
             "name": crd.metadata.name,
             "branch": crd.spec.branch,
             "worktree": crd.spec.worktree,
@@ -270,12 +369,6 @@ class CRDApplier:
             "space_ref": crd.spec.spaceRef,
             "description": crd.spec.description
         }
-        
-        # Apply task configuration
-        result = task_manager.create_task(task_config)
-        
-        logger.info(f"Task CRD {crd.metadata.name} applied successfully: {result}")
-        return result
     
     def _apply_pathscan_crd(self, crd: PathScanCRD) -> bool:
         """Apply PathScan CRD"""
@@ -291,7 +384,8 @@ class CRDApplier:
         scanner_config = {
             "name": crd.metadata.name,
             "include": crd.spec.include,
-            "exclude": crd.spec.exclude
+            "exclude": crd.spec.exclude,
+            "gitignore": crd.spec.gitignore
         }
         
         # Register scanner configuration
@@ -331,8 +425,8 @@ class CRDApplier:
         self.applied_resources[f"CommandPolicy/{crd.metadata.name}"] = crd
         
         # Import policy engine here to avoid circular import
-        from .policy.engine import PolicyEngine
-        policy_engine = PolicyEngine()
+        from .policy.engine import get_policy_engine
+        policy_engine = get_policy_engine()
         
         # Load policy from CRD
         policy = policy_engine.load_policy(crd)
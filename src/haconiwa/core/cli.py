@@ -5,7 +5,7 @@ from rich.console import Console
 from rich.table import Table
 from rich import print as rprint
 
-from haconiwa.core.config import Config
+from haconiwa.core.config import get_config
 from haconiwa.core.state import StateManager
 from haconiwa.core.upgrade import Upgrader
 
@@ -27,13 +27,14 @@ def init(
 ):
     """Initialize a new haconiwa project"""
     try:
-        config = Config(str(path / "config.yaml"))
+        config = get_config(str(path / "config.yaml"))
         if not force and any(path.iterdir()):
             raise typer.BadParameter("Directory is not empty. Use --force to override")
         
         with console.status("Initializing project..."):
             # config.init_project() - method doesn't exist, commenting out
-            StateManager(str(path / "config.yaml")).load_state(str(path / "state.pkl"))
+            # Legacy state.pkl snapshots are imported into the state store
+            StateManager.open(str(path / "config.yaml")).load_state(str(path / "state.pkl"))
             
         rprint("[green]✓[/green] Project initialized successfully")
         
@@ -45,7 +46,7 @@ def init(
 def status():
     """Show current haconiwa status"""
     try:
-        config = Config("config.yaml")
+        config = get_config("config.yaml")
         state = StateManager("config.yaml")
         
         table = Table(title="haconiwa Status")
@@ -1,11 +1,31 @@
+"""
+Configuration for Haconiwa v1.0
+
+Configs are shared per file through ``get_config``. One watchdog observer per
+process watches every config directory; bursts of events for a file are
+debounced into a single reload, reloads of unchanged content are skipped
+before parsing or decrypting, and subscribers receive the keys that changed.
+"""
+
+import hashlib
 import os
+import threading
 import yaml
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 from pydantic import BaseModel, Field, validator
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from cryptography.fernet import Fernet
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Editors write a file in several steps; events within this window are coalesced
+RELOAD_DEBOUNCE = 0.2
+
+_MISSING = object()
 
 class SecuritySettings(BaseModel):
     encryption_key: Optional[str] = None
@@ -22,49 +42,221 @@ class OrganizationSettings(BaseModel):
     worker_models: Dict[str, str] = Field(default_factory=dict)
     task_rules: Dict[str, Any] = Field(default_factory=dict)
 
+@dataclass(frozen=True)
+class ConfigChange:
+    """One changed key, as a dotted path into the config file"""
+    key: str
+    old: Any = None
+    new: Any = None
+
+    @property
+    def kind(self) -> str:
+        if self.old is _MISSING:
+            return "added"
+        if self.new is _MISSING:
+            return "removed"
+        return "modified"
+
+
+def diff_config(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> List[ConfigChange]:
+    """Changed leaves between two parsed config documents"""
+    changes = []
+    for key in list(old) + [key for key in new if key not in old]:
+        dotted = f"{prefix}{key}"
+        old_value, new_value = old.get(key, _MISSING), new.get(key, _MISSING)
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            changes.extend(diff_config(old_value, new_value, dotted + "."))
+        elif old_value != new_value:
+            changes.append(ConfigChange(dotted, old_value, new_value))
+    return changes
+
+
+ConfigSubscriber = Callable[["Config", List[ConfigChange]], None]
+
+
+class _ConfigWatcher:
+    """Single observer for every watched config file of the process"""
+
+    def __init__(self, debounce: float = RELOAD_DEBOUNCE):
+        self.debounce = debounce
+        self._observer: Optional[Observer] = None
+        self._watches: Dict[str, Any] = {}
+        self._configs: Dict[str, "Config"] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        # Guards _configs and _timers and is never held across observer calls: the observer's dispatch
+        # thread holds its own lock while notify() takes this one
+        self._lock = threading.Lock()
+        # Serializes schedule()/unschedule(); notify() never takes it
+        self._watch_lock = threading.Lock()
+
+    def add(self, config: "Config") -> None:
+        path = str(config.config_path.resolve())
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            logger.debug(f"Not watching {path}: {directory} does not exist")
+            return
+        with self._watch_lock:
+            with self._lock:
+                self._configs[path] = config
+            if self._observer is None:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            if directory not in self._watches:
+                self._watches[directory] = self._observer.schedule(_ConfigEventHandler(self), directory, recursive=False)
+
+    def remove(self, config: "Config") -> None:
+        path = str(config.config_path.resolve())
+        directory = os.path.dirname(path)
+        with self._watch_lock:
+            with self._lock:
+                if self._configs.get(path) is not config:
+                    return
+                del self._configs[path]
+                timer = self._timers.pop(path, None)
+                if timer is not None:
+                    timer.cancel()
+                unwatch = directory in self._watches and not any(
+                    os.path.dirname(other) == directory for other in self._configs)
+            if unwatch:
+                self._observer.unschedule(self._watches.pop(directory))
+
+    def notify(self, path: str) -> None:
+        """Restart the debounce timer of a changed file"""
+        with self._lock:
+            if path not in self._configs:
+                return
+            timer = self._timers.pop(path, None)
+            if timer is not None:
+                timer.cancel()
+            timer = self._timers[path] = threading.Timer(self.debounce, self._fire, args=(path,))
+            timer.daemon = True
+            timer.start()
+
+    def _fire(self, path: str) -> None:
+        with self._lock:
+            self._timers.pop(path, None)
+            config = self._configs.get(path)
+        if config is not None:
+            try:
+                config.reload()
+            except Exception as e:
+                logger.error(f"Failed to reload {path}: {e}")
+
+    @property
+    def watched_directories(self) -> List[str]:
+        return sorted(self._watches)
+
+
+class _ConfigEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: _ConfigWatcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        # Editors often save by renaming a temporary file over the config
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path:
+                self.watcher.notify(os.path.abspath(path))
+
+
+_watcher = _ConfigWatcher()
+
+
 class Config:
-    def __init__(self, config_path: str):
-        self.config_path = Path(config_path)
+    def __init__(self, config_path: str = "config.yaml", watch: bool = True):
+        self.config_path = Path(config_path).expanduser()
         self.global_config = GlobalSettings()
         self.org_configs: Dict[str, OrganizationSettings] = {}
+        self.data: Dict[str, Any] = {}
         self._fernet = None
-        self._observer = None
+        self._digest: Optional[str] = None
+        self._subscribers: List[tuple] = []
+        self._lock = threading.RLock()
         self._load_config()
-        self._setup_hot_reload()
+        if watch:
+            _watcher.add(self)
 
-    def _load_config(self) -> None:
-        if not self.config_path.exists():
-            return
+    def _load_config(self) -> List[ConfigChange]:
+        try:
+            raw = self.config_path.read_bytes()
+        except FileNotFoundError:
+            return []
 
-        with open(self.config_path) as f:
-            config_data = yaml.safe_load(f)
+        digest = hashlib.sha1(raw).hexdigest()
+        with self._lock:
+            # Saves that do not change the content skip parsing and decryption
+            if digest == self._digest:
+                return []
+            config_data = yaml.safe_load(raw) or {}
+            if self._fernet and config_data.get("encrypted"):
+                config_data = yaml.safe_load(
+                    self._fernet.decrypt(config_data["data"].encode()).decode()
+                )
 
-        if self._fernet and config_data.get("encrypted"):
-            config_data = yaml.safe_load(
-                self._fernet.decrypt(config_data["data"].encode()).decode()
-            )
+            changes = diff_config(self.data, config_data)
+            changed_sections = {change.key.split(".", 1)[0] for change in changes}
+            if "global" in changed_sections or not self.data:
+                self.global_config = GlobalSettings(**config_data.get("global", {}))
+            if "organizations" in changed_sections or not self.data:
+                self.org_configs = {
+                    org_id: OrganizationSettings(**{**org_data, "org_id": org_id})
+                    for org_id, org_data in config_data.get("organizations", {}).items()
+                }
+            self.data = config_data
+            self._digest = digest
+        return changes
 
-        self.global_config = GlobalSettings(**config_data.get("global", {}))
-        
-        for org_id, org_data in config_data.get("organizations", {}).items():
-            self.org_configs[org_id] = OrganizationSettings(
-                org_id=org_id, **org_data
-            )
-
-    def _setup_hot_reload(self) -> None:
-        config_path = self.config_path
-        load_config = self._load_config
-        
-        class ConfigFileHandler(FileSystemEventHandler):
-            def on_modified(self, event):
-                if event.src_path == str(config_path):
-                    load_config()
+    def reload(self) -> List[ConfigChange]:
+        """Re-read the file and notify subscribers of the keys that changed"""
+        changes = self._load_config()
+        if changes:
+            logger.info(f"🔄 Reloaded {self.config_path}: {len(changes)} change(s)")
+            self._notify(changes)
+        return changes
+
+    def subscribe(self, callback: ConfigSubscriber, prefix: Optional[str] = None) -> Callable[[], None]:
+        """Call ``callback(config, changes)`` after reloads touching ``prefix``; returns an unsubscribe function"""
+        entry = (callback, prefix)
+        with self._lock:
+            self._subscribers.append(entry)
 
-        self._observer = Observer()
-        self._observer.schedule(
-            ConfigFileHandler(), str(self.config_path.parent), recursive=False
-        )
-        self._observer.start()
+        def unsubscribe() -> None:
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def _notify(self, changes: List[ConfigChange]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, prefix in subscribers:
+            selected = changes if prefix is None else [
+                change for change in changes if change.key == prefix or change.key.startswith(prefix + ".")
+            ]
+            if selected:
+                try:
+                    callback(self, selected)
+                except Exception as e:
+                    logger.error(f"Config subscriber {callback!r} failed: {e}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Value of a dotted key such as ``git.repo_path``"""
+        value: Any = self.data
+        for part in key.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return default
+            value = value[part]
+        return value
+
+    def close(self) -> None:
+        """Stop watching the file"""
+        _watcher.remove(self)
+        with _registry_lock:
+            key = self.config_path.resolve()
+            if _registry.get(key) is self:
+                del _registry[key]
 
     def get_org_config(self, org_id: str) -> Optional[OrganizationSettings]:
         return self.org_configs.get(org_id)
@@ -86,27 +278,50 @@ class Config:
         self._save_config()
 
     def _save_config(self) -> None:
-        config_data = {
-            "global": self.global_config.dict(),
-            "organizations": {
+        with self._lock:
+            # Other sections (logging, watch, ...) are only read through get(); keep them as loaded
+            config_data = dict(self.data)
+            config_data["global"] = self.global_config.dict()
+            config_data["organizations"] = {
                 org_id: config.dict() 
                 for org_id, config in self.org_configs.items()
             }
-        }
-
-        if self._fernet:
-            encrypted_data = self._fernet.encrypt(
-                yaml.dump(config_data).encode()
-            ).decode()
-            config_data = {
-                "encrypted": True,
-                "data": encrypted_data
-            }
+            plain_data = config_data
+
+            if self._fernet:
+                encrypted_data = self._fernet.encrypt(
+                    yaml.dump(config_data).encode()
+                ).decode()
+                config_data = {
+                    "encrypted": True,
+                    "data": encrypted_data
+                }
+
+            raw = yaml.dump(config_data).encode()
+            with open(self.config_path, "wb") as f:
+                f.write(raw)
+            # The watcher will see our own write; it must not count as a change
+            self.data = plain_data
+            self._digest = hashlib.sha1(raw).hexdigest()
+
+
+_registry: Dict[Path, Config] = {}
+_registry_lock = threading.Lock()
+
+
+def get_config(config_path: str = "config.yaml") -> Config:
+    """Shared, watched Config of a file; one instance per resolved path"""
+    key = Path(config_path).expanduser().resolve()
+    with _registry_lock:
+        config = _registry.get(key)
+        if config is None:
+            config = _registry[key] = Config(str(key))
+        return config
 
-        with open(self.config_path, "w") as f:
-            yaml.dump(config_data, f)
 
-    def __del__(self):
-        if self._observer:
-            self._observer.stop()
-            self._observer.join();
\ No newline at end of file
+def load_config(config_path) -> Config:
+    """Load the config given on the command line; it is watched for the rest of the run"""
+    path = Path(config_path).expanduser()
+    if not path.is_file():
+        raise FileNotFoundError(f"Config file not found: {path}")
+    return get_config(str(path))
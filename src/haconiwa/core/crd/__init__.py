@@ -6,8 +6,9 @@ from .models import (
     SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD
 )
 from .parser import CRDParser, CRDValidationError
+from .cache import CRDCache
 
 __all__ = [
     'SpaceCRD', 'AgentCRD', 'TaskCRD', 'PathScanCRD', 'DatabaseCRD', 'CommandPolicyCRD',
-    'CRDParser', 'CRDValidationError'
+    'CRDParser', 'CRDValidationError', 'CRDCache'
 ] 
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+CRD Cache for Haconiwa v1.0
+
+Stores validated CRD objects on disk keyed by a hash of the manifest content,
+the haconiwa version, the pydantic version and the CRD model source, so
+unchanged manifests are loaded without re-running YAML parsing and model
+validation.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Union
+import logging
+
+import pydantic
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "HACONIWA_CRD_CACHE_DIR"
+CACHE_FORMAT = 1
+
+
+def _haconiwa_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("haconiwa")
+    except Exception:
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def _models_digest() -> str:
+    """Hash of models.py; edited models invalidate entries even without a version bump"""
+    from . import models
+    try:
+        return hashlib.sha256(Path(models.__file__).read_bytes()).hexdigest()[:16]
+    except (OSError, TypeError):
+        return "unknown"
+
+
+class CRDCache:
+    """On-disk cache of parsed and validated CRD manifests"""
+
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None, max_entries: int = 64):
+        self.cache_dir = Path(cache_dir or os.environ.get(CACHE_DIR_ENV) or Path.home() / ".haconiwa" / "cache" / "crd")
+        self.max_entries = max_entries
+        self.version = f"{CACHE_FORMAT}:{_haconiwa_version()}:{pydantic.VERSION}:{_models_digest()}"
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, content: str, kind: str) -> str:
+        """Cache key of a manifest parsed as ``kind`` ("single" or "multi")"""
+        digest = hashlib.sha256()
+        for part in (self.version, kind, content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_or_parse(self, content: str, kind: str, parse: Callable[[str], Any]) -> Any:
+        """Return the cached result for ``content`` or parse it and store the result"""
+        key = self.key(content, kind)
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = parse(content)
+        self.put(key, result)
+        return result
+
+    def get(self, key: str) -> Optional[Any]:
+        """Load a cached result; any unreadable or mismatched entry counts as a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable CRD cache entry {path}: {e}")
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key or entry.get("version") != self.version:
+            return None
+        logger.debug(f"CRD cache hit: {key[:12]}")
+        return entry.get("crds")
+
+    def put(self, key: str, crds: Union[Any, List[Any]]) -> None:
+        """Store a parse result; failures only cost the next run a full parse"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".crd.")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"key": key, "version": self.version, "crds": crds}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except Exception as e:
+            logger.debug(f"Could not write CRD cache entry: {e}")
+
+    def clear(self) -> int:
+        """Remove all cache entries; returns the number removed"""
+        removed = 0
+        for path in self.cache_dir.glob("*.pickle"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def _evict(self) -> None:
+        entries = sorted(self.cache_dir.glob("*.pickle"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for path in entries[self.max_entries:]:
+            path.unlink(missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pickle"
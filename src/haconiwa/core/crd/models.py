@@ -171,6 +171,7 @@ class PathScanSpec(BaseModel):
     """PathScan CRD specification"""
     include: List[str] = Field(..., description="Include patterns")
     exclude: List[str] = Field(default_factory=list, description="Exclude patterns")
+    gitignore: bool = Field(True, description="Honor .gitignore files")
 
 
 class PathScanCRD(BaseModel):
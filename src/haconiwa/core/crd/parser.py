@@ -4,9 +4,10 @@ CRD Parser for Haconiwa v1.0
 
 import yaml
 from pathlib import Path
-from typing import Union, List, Dict, Any
+from typing import Union, List, Dict, Any, Optional
 from pydantic import ValidationError
 
+from .cache import CRDCache
 from .models import (
     SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD
 )
@@ -20,7 +21,8 @@ class CRDValidationError(Exception):
 class CRDParser:
     """CRD Parser for YAML to CRD objects"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CRDCache] = None):
+        self.cache = cache  # Validated CRDs keyed by manifest content (None: always parse)
         self.crd_classes = {
             "Space": SpaceCRD,
             "Agent": AgentCRD,
@@ -33,6 +35,11 @@ class CRDParser:
     
     def parse_yaml(self, yaml_content: str) -> Union[SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD]:
         """Parse single YAML document to CRD object"""
+        if self.cache is not None:
+            return self.cache.get_or_parse(yaml_content, "single", self._parse_yaml)
+        return self._parse_yaml(yaml_content)
+    
+    def _parse_yaml(self, yaml_content: str) -> Union[SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD]:
         try:
             data = yaml.safe_load(yaml_content)
             return self._parse_crd_data(data)
@@ -43,6 +50,11 @@ class CRDParser:
     
     def parse_multi_yaml(self, yaml_content: str) -> List[Union[SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD]]:
         """Parse multi-document YAML to list of CRD objects"""
+        if self.cache is not None:
+            return self.cache.get_or_parse(yaml_content, "multi", self._parse_multi_yaml)
+        return self._parse_multi_yaml(yaml_content)
+    
+    def _parse_multi_yaml(self, yaml_content: str) -> List[Union[SpaceCRD, AgentCRD, TaskCRD, PathScanCRD, DatabaseCRD, CommandPolicyCRD]]:
         try:
             documents = yaml.safe_load_all(yaml_content)
             crds = []
@@ -1,18 +1,241 @@
+"""
+Logging for Haconiwa v1.0
+
+Structured logging with an optional non-blocking pipeline: callers hand
+records to a ``QueueHandler`` and a background ``QueueListener`` formats and
+writes them. Process CPU and memory figures come from a sampler thread rather
+than being measured for every record, debug records can be rate limited per
+call site, and ``JsonFormatter`` writes one compact JSON object per line.
+"""
+
+import atexit
+import copy
 import json
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from ..core.config import Config
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_METRICS_INTERVAL = 5.0
+# Debug records per second (and burst) allowed from one call site
+DEFAULT_DEBUG_RATE = 20.0
+DEFAULT_DEBUG_BURST = 100
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record, with ``extra`` fields nested"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        extra = {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES}
+        if extra:
+            data["extra"] = extra
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site for records at or below ``level``
+
+    With ``sample_every`` > 1 only every n-th record of a call site is
+    considered at all. The next record let through carries the number of
+    records dropped before it as ``suppressed``.
+    """
+
+    def __init__(self, rate: float = DEFAULT_DEBUG_RATE, burst: int = DEFAULT_DEBUG_BURST,
+                 level: int = logging.DEBUG, sample_every: int = 1):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.level = level
+        self.sample_every = max(1, sample_every)
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+        self._seen: Dict[Tuple[str, int], int] = {}
+        self._suppressed: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen[key] = self._seen.get(key, 0) + 1
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+            else:
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if (seen - 1) % self.sample_every or bucket[0] < 1.0:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            bucket[0] -= 1.0
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    @property
+    def suppressed(self) -> int:
+        """Records dropped and not yet reported"""
+        with self._lock:
+            return sum(self._suppressed.values())
+
+
+class MetricsSampler:
+    """CPU and memory of this process, refreshed every ``interval`` seconds by a daemon thread"""
+
+    def __init__(self, interval: float = DEFAULT_METRICS_INTERVAL):
+        self.interval = interval
+        self.latest: Dict[str, Any] = {"cpu_percent": 0.0, "memory_usage": {"rss": 0, "vms": 0}}
+        self._process = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> "MetricsSampler":
+        with self._lock:
+            if self._thread is not None:
+                return self
+            try:
+                import psutil
+            except ImportError:
+                return self
+            self._process = psutil.Process()
+            self.sample()
+            self._thread = threading.Thread(target=self._run, name="haconiwa-log-metrics", daemon=True)
+            self._thread.start()
+        return self
+
+    def sample(self) -> Dict[str, Any]:
+        if self._process is not None:
+            memory = self._process.memory_info()
+            # Replaced as a whole, so readers never see a half-updated sample
+            self.latest = {
+                "cpu_percent": self._process.cpu_percent(),
+                "memory_usage": {"rss": memory.rss, "vms": memory.vms},
+            }
+        return self.latest
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                # The process is going away; keep the last sample
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+
+_sampler: Optional[MetricsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_metrics_sampler(interval: float = DEFAULT_METRICS_INTERVAL) -> MetricsSampler:
+    """Shared, running MetricsSampler of this process"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = MetricsSampler(interval).start()
+    return _sampler
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without formatting them; the listener thread formats"""
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments may be mutated after the call returns, so the message is fixed now
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Logging must never block the caller
+            self.dropped += 1
+
+
+class QueueLogging:
+    """A QueueHandler in front of ``handlers``, drained by a background QueueListener"""
+
+    def __init__(self, handlers: Iterable[logging.Handler], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 rate_limit: Optional[RateLimitFilter] = None):
+        self.handlers = list(handlers)
+        self.queue: "queue.Queue" = queue.Queue(queue_size)
+        self.handler = _LocalQueueHandler(self.queue)
+        if rate_limit is not None:
+            self.handler.addFilter(rate_limit)
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self._started = False
+
+    def start(self) -> "QueueLogging":
+        if not self._started:
+            self.listener.start()
+            self._started = True
+            atexit.register(self.stop)
+        return self
+
+    def stop(self) -> None:
+        """Write out queued records and stop the listener thread"""
+        if self._started:
+            self._started = False
+            self.listener.stop()
+            atexit.unregister(self.stop)
+
+    def flush(self) -> None:
+        """Block until queued records are written"""
+        if self._started:
+            self.stop()
+            self.start()
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
 
-from ..core.config import Config
 
 class haconiwaLogger:
-    def __init__(self, name: str, config: Config):
+    def __init__(self, name: str, config: "Config", queued: Optional[bool] = None):
         self.name = name
         self.config = config
+        self.queued = config.get("logging.queue", True) if queued is None else queued
+        self.pipeline: Optional[QueueLogging] = None
+        self.handlers: List[logging.Handler] = []
+        self.sampler = get_metrics_sampler(config.get("logging.metrics_interval", DEFAULT_METRICS_INTERVAL))
         self.logger = self._setup_logger()
         self._setup_handlers()
         self._setup_formatters()
@@ -31,38 +254,42 @@ class haconiwaLogger:
             maxBytes=self.config.get("logging.max_bytes", 10_000_000),
             backupCount=self.config.get("logging.backup_count", 5)
         )
-        self.logger.addHandler(file_handler)
+        self.handlers.append(file_handler)
 
         if self.config.get("logging.console_output", True):
             console_handler = logging.StreamHandler()
-            self.logger.addHandler(console_handler)
+            self.handlers.append(console_handler)
 
-    def _setup_formatters(self):
-        json_formatter = logging.Formatter(
-            lambda x: json.dumps({
-                'timestamp': datetime.fromtimestamp(x.created).isoformat(),
-                'name': x.name,
-                'level': x.levelname,
-                'message': x.getMessage(),
-                'extra': x.__dict__.get('extra', {}),
-                'exception': x.exc_info[1].__str__() if x.exc_info else None
-            }, default=str)
+        rate_limit = RateLimitFilter(
+            rate=self.config.get("logging.debug_rate", DEFAULT_DEBUG_RATE),
+            burst=self.config.get("logging.debug_burst", DEFAULT_DEBUG_BURST),
+            sample_every=self.config.get("logging.debug_sample_every", 1),
         )
+        if self.queued:
+            self.pipeline = QueueLogging(
+                self.handlers, self.config.get("logging.queue_size", DEFAULT_QUEUE_SIZE), rate_limit
+            ).start()
+            self.logger.addHandler(self.pipeline.handler)
+        else:
+            for handler in self.handlers:
+                handler.addFilter(rate_limit)
+                self.logger.addHandler(handler)
 
-        for handler in self.logger.handlers:
+    def _setup_formatters(self):
+        json_formatter = JsonFormatter()
+        for handler in self.handlers:
             handler.setFormatter(json_formatter)
 
     def _log(self, level: int, msg: str, extra: Optional[Dict[str, Any]] = None):
-        extra = extra or {}
+        if not self.logger.isEnabledFor(level):
+            return
+        extra = dict(extra or {})
         extra.update({
             'process_id': os.getpid(),
-            'thread_id': time.thread_time_ns(),
-            'performance': {
-                'cpu_percent': self.get_cpu_usage(),
-                'memory_usage': self.get_memory_usage()
-            }
+            'thread_id': threading.get_ident(),
+            'performance': self.sampler.latest
         })
-        self.logger.log(level, msg, extra=extra)
+        self.logger.log(level, msg, extra=extra, stacklevel=3)
 
     def debug(self, msg: str, extra: Optional[Dict[str, Any]] = None):
         self._log(logging.DEBUG, msg, extra)
@@ -80,27 +307,26 @@ class haconiwaLogger:
         self._log(logging.CRITICAL, msg, extra)
 
     def get_cpu_usage(self) -> float:
-        try:
-            import psutil
-            return psutil.Process().cpu_percent()
-        except ImportError:
-            return 0.0
+        return self.sampler.latest["cpu_percent"]
 
     def get_memory_usage(self) -> Dict[str, int]:
-        try:
-            import psutil
-            process = psutil.Process()
-            return {
-                'rss': process.memory_info().rss,
-                'vms': process.memory_info().vms
-            }
-        except ImportError:
-            return {'rss': 0, 'vms': 0}
+        return self.sampler.latest["memory_usage"]
+
+    def flush(self):
+        if self.pipeline is not None:
+            self.pipeline.flush()
+        for handler in self.handlers:
+            handler.flush()
 
     def rotate_logs(self):
-        for handler in self.logger.handlers:
+        for handler in self.handlers:
             if isinstance(handler, logging.handlers.RotatingFileHandler):
-                handler.doRollover()
+                # The listener thread may be writing to it
+                handler.acquire()
+                try:
+                    handler.doRollover()
+                finally:
+                    handler.release()
 
     def archive_logs(self, archive_dir: Optional[str] = None):
         if not archive_dir:
@@ -109,32 +335,85 @@ class haconiwaLogger:
         archive_path = Path(archive_dir)
         archive_path.mkdir(parents=True, exist_ok=True)
 
+        self.flush()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        for handler in self.logger.handlers:
+        for handler in self.handlers:
             if isinstance(handler, logging.handlers.RotatingFileHandler):
                 log_path = Path(handler.baseFilename)
                 if log_path.exists():
                     archive_file = archive_path / f"{log_path.stem}_{timestamp}{log_path.suffix}"
                     log_path.rename(archive_file)
 
+    def close(self):
+        if self.pipeline is not None:
+            self.logger.removeHandler(self.pipeline.handler)
+            self.pipeline.stop()
+        for handler in self.handlers:
+            handler.close()
+            self.logger.removeHandler(handler)
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if exc_type:
             self.error(f"Exception occurred: {exc_val}", {'exception_type': exc_type.__name__})
-        for handler in self.logger.handlers:
-            handler.close()
-            self.logger.removeHandler(handler)
+        self.close()
+
+
+LOG_FORMAT_ENV = "HACONIWA_LOG_FORMAT"
+LOG_QUEUE_ENV = "HACONIWA_LOG_QUEUE"
+LOG_DEBUG_RATE_ENV = "HACONIWA_LOG_DEBUG_RATE"
+
+# Handler installed on the root logger by setup_logging, and its pipeline
+_root_handler: Optional[logging.Handler] = None
+_pipeline: Optional[QueueLogging] = None
+
+
+def setup_logging(log_level: str = "INFO", json_lines: Optional[bool] = None, queued: Optional[bool] = None,
+                  debug_rate: Optional[float] = None) -> None:
+    """Set up root logging
+
+    ``json_lines`` writes JSON objects instead of text, ``queued`` moves
+    formatting and writing to a background thread, and ``debug_rate`` limits
+    debug records per second from each call site. Unset options are read from
+    ``HACONIWA_LOG_FORMAT=json``, ``HACONIWA_LOG_QUEUE=1`` and
+    ``HACONIWA_LOG_DEBUG_RATE``.
+    """
+    global _root_handler, _pipeline
+    if json_lines is None:
+        json_lines = os.environ.get(LOG_FORMAT_ENV, "").lower() == "json"
+    if queued is None:
+        queued = os.environ.get(LOG_QUEUE_ENV, "").lower() in ("1", "true", "yes")
+    if debug_rate is None and os.environ.get(LOG_DEBUG_RATE_ENV):
+        debug_rate = float(os.environ[LOG_DEBUG_RATE_ENV])
 
-def setup_logging(log_level: str = "INFO") -> None:
-    """Set up basic logging configuration."""
     level = getattr(logging, log_level.upper(), logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    if not (json_lines or queued or debug_rate) and _root_handler is None:
+        logging.basicConfig(level=level, format=TEXT_FORMAT)
+        return
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    if _root_handler is not None:
+        root_logger.removeHandler(_root_handler)
+        if _pipeline is not None:
+            _pipeline.stop()
+        _root_handler = _pipeline = None
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+    rate_limit = RateLimitFilter(rate=debug_rate, burst=max(1, int(debug_rate))) if debug_rate else None
+    if queued:
+        _pipeline = QueueLogging([handler], rate_limit=rate_limit).start()
+        _root_handler = _pipeline.handler
+    else:
+        if rate_limit is not None:
+            handler.addFilter(rate_limit)
+        _root_handler = handler
+    root_logger.addHandler(_root_handler)
+
 
 def get_logger(name: str) -> logging.Logger:
     """Get a logger with the specified name."""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -2,10 +2,10 @@
 Haconiwa Policy Module
 """
 
-from .engine import PolicyEngine, PolicyViolationError
+from .engine import PolicyEngine, PolicyViolationError, get_policy_engine
 from .validator import CommandValidator, ValidationResult
 
 __all__ = [
-    'PolicyEngine', 'PolicyViolationError',
+    'PolicyEngine', 'PolicyViolationError', 'get_policy_engine',
     'CommandValidator', 'ValidationResult'
 ] 
\ No newline at end of file
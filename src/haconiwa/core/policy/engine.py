@@ -51,7 +51,9 @@ class PolicyEngine:
         """Set active policy"""
         self.active_policy = policy
         self.validator.set_policy(policy)
-        logger.info(f"Set active policy: {policy.get('name', 'unknown')}")
+        compiled = self.validator.compiled_policy
+        rule_count = len(compiled.rules) + len(compiled.global_rules) if compiled else 0
+        logger.info(f"Set active policy: {policy.get('name', 'unknown')} ({rule_count} compiled rules)")
     
     def get_active_policy(self) -> Optional[Dict[str, Any]]:
         """Get active policy"""
@@ -66,7 +68,8 @@ class PolicyEngine:
         result = self.validator.validate_command(command, role)
         
         # Log validation result
-        logger.info(f"Command validation - Agent: {agent_id}, Role: {role}, Command: {command}, Allowed: {result.allowed}, Reason: {result.reason}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Command validation - Agent: {agent_id}, Role: {role}, Command: {command}, Allowed: {result.allowed}, Reason: {result.reason}")
         
         return result.allowed
     
@@ -88,7 +91,8 @@ class PolicyEngine:
         result = self.validator.validate_command(command, role)
         
         # Log validation result
-        logger.info(f"Command validation - Agent: {agent_id}, Role: {role}, Command: {command}, Allowed: {result.allowed}, Reason: {result.reason}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Command validation - Agent: {agent_id}, Role: {role}, Command: {command}, Allowed: {result.allowed}, Reason: {result.reason}")
         
         return result
     
@@ -174,4 +178,15 @@ class PolicyEngine:
             "commands_allowed": 0,
             "commands_denied": 0,
             "malicious_commands_blocked": 0
-        } 
\ No newline at end of file
+        }
+
+
+_shared_engine: Optional[PolicyEngine] = None
+
+
+def get_policy_engine() -> PolicyEngine:
+    """Policy engine shared by the CLI and the applier within one process (e.g. the daemon)"""
+    global _shared_engine
+    if _shared_engine is None:
+        _shared_engine = PolicyEngine()
+    return _shared_engine
@@ -4,13 +4,41 @@ Command Validator for Haconiwa v1.0
 
 import re
 import shlex
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Patterns of commands that are rejected regardless of policy
+MALICIOUS_PATTERNS = [
+    r'rm\s+-rf\s+/',
+    r'sudo\s+rm\s+-rf\s+/',
+    r'\|\s*bash',
+    r'\|\s*sh',
+    r';\s*rm\s+-rf',
+    r'&&\s*rm\s+-rf',
+    r'curl.*\|\s*bash',
+    r'wget.*\|\s*sh',
+    r'--privileged.*chroot'
+]
+
+# Every pattern above contains one of these literals; commands without any of them skip the regex
+MALICIOUS_LITERALS = ("|", "rm", "chroot")
+
+MALICIOUS_REGEX = re.compile("|".join(f"(?:{pattern})" for pattern in MALICIOUS_PATTERNS), re.IGNORECASE)
+
+# Characters that make shlex tokenization differ from str.split() on ASCII input:
+# quoting, escaping and whitespace that str.split() treats as separators but shlex does not
+SHLEX_SPECIAL = frozenset("'\"\\\x0b\x0c\x1c\x1d\x1e\x1f")
+
+ROLE_DENY = (False, "role-specific deny")
+ROLE_ALLOW = (True, "role-specific allow")
+GLOBAL_ALLOW = (True, "global allow")
+DEFAULT_DENY = (False, "not in global whitelist")
+
+
 @dataclass
 class ValidationResult:
     """Command validation result"""
@@ -20,19 +48,66 @@ class ValidationResult:
     role: str
 
 
+@dataclass
+class CompiledPolicy:
+    """Policy flattened into verdict tables keyed by (role, base, subcommand) and (base, subcommand)"""
+    name: str
+    rules: Dict[Tuple[str, str, str], Tuple[bool, str]]
+    global_rules: Dict[Tuple[str, str], Tuple[bool, str]]
+
+    @classmethod
+    def compile(cls, policy: Dict[str, Any]) -> "CompiledPolicy":
+        """Fold role deny > role allow > global allow precedence into lookup tables"""
+        rules = {}
+        for role, role_policy in (policy.get("roles") or {}).items():
+            role_policy = role_policy or {}
+            for base, subcommands in (role_policy.get("allow") or {}).items():
+                for subcommand in _as_list(subcommands):
+                    rules[(role, base, subcommand)] = ROLE_ALLOW
+            # Deny is written last so it wins over an allow of the same command
+            for base, subcommands in (role_policy.get("deny") or {}).items():
+                for subcommand in _as_list(subcommands):
+                    rules[(role, base, subcommand)] = ROLE_DENY
+
+        global_rules = {}
+        for base, subcommands in (policy.get("global") or {}).items():
+            # A bare base command is allowed once the command is listed at all
+            global_rules[(base, "")] = GLOBAL_ALLOW
+            for subcommand in _as_list(subcommands):
+                global_rules[(base, subcommand)] = GLOBAL_ALLOW
+
+        return cls(policy.get("name", "unknown"), rules, global_rules)
+
+    def decide(self, role: str, base_command: str, subcommand: str) -> Tuple[bool, str]:
+        """Verdict and reason for a parsed command"""
+        return (self.rules.get((role, base_command, subcommand))
+                or self.global_rules.get((base_command, subcommand), DEFAULT_DENY))
+
+
+def _as_list(subcommands) -> List[str]:
+    if subcommands is None:
+        return []
+    if isinstance(subcommands, str):
+        return [subcommands]
+    return list(subcommands)
+
+
 class CommandValidator:
     """Command validator with policy enforcement"""
     
     def __init__(self):
         self.active_policy = None
+        self.compiled_policy: Optional[CompiledPolicy] = None
     
     def set_policy(self, policy: Dict[str, Any]):
-        """Set active policy"""
+        """Set active policy and compile its decision tables"""
         self.active_policy = policy
+        self.compiled_policy = CompiledPolicy.compile(policy) if policy else None
     
     def validate_command(self, command: str, role: str) -> ValidationResult:
         """Validate command against policy"""
-        if not self.active_policy:
+        compiled = self.compiled_policy
+        if compiled is None:
             return ValidationResult(
                 allowed=False,
                 reason="No active policy",
@@ -41,45 +116,25 @@ class CommandValidator:
             )
         
         # Parse command components
-        components = self.parse_command(command)
-        base_command = components["base"]
-        subcommand = components["subcommand"]
-        
-        # Check role-specific deny first (highest priority)
-        if self._is_role_denied(base_command, subcommand, role):
-            return ValidationResult(
-                allowed=False,
-                reason="role-specific deny",
-                command=command,
-                role=role
-            )
-        
-        # Check role-specific allow (second priority)
-        if self._is_role_allowed(base_command, subcommand, role):
-            return ValidationResult(
-                allowed=True,
-                reason="role-specific allow",
-                command=command,
-                role=role
-            )
+        base_command, subcommand = self._split_command(command)
         
-        # Check global allow (third priority)
-        if self._is_global_allowed(base_command, subcommand):
-            return ValidationResult(
-                allowed=True,
-                reason="global allow",
-                command=command,
-                role=role
-            )
-        
-        # Default deny
+        # Role deny > role allow > global allow > default deny, precomputed at set_policy
+        allowed, reason = compiled.decide(role, base_command, subcommand)
         return ValidationResult(
-            allowed=False,
-            reason="not in global whitelist",
+            allowed=allowed,
+            reason=reason,
             command=command,
             role=role
         )
     
+    def _split_command(self, command: str) -> Tuple[str, str]:
+        """Base command and subcommand, skipping shlex for commands without quoting"""
+        if command.isascii() and SHLEX_SPECIAL.isdisjoint(command):
+            tokens = command.split(None, 2)
+            return (tokens[0] if tokens else "", tokens[1] if len(tokens) > 1 else "")
+        components = self.parse_command(command)
+        return components["base"], components["subcommand"]
+    
     def parse_command(self, command: str) -> Dict[str, Any]:
         """Parse command into components"""
         try:
@@ -108,69 +163,12 @@ class CommandValidator:
             logger.warning(f"Failed to parse command '{command}': {e}")
             return {"base": "", "subcommand": "", "args": [], "original": command}
     
-    def _is_role_denied(self, base_command: str, subcommand: str, role: str) -> bool:
-        """Check if command is explicitly denied for role"""
-        if not self.active_policy or "roles" not in self.active_policy:
-            return False
-        
-        role_policy = self.active_policy["roles"].get(role, {})
-        deny_policy = role_policy.get("deny", {})
-        
-        if base_command in deny_policy:
-            denied_subcommands = deny_policy[base_command]
-            # If subcommand is in deny list, it's denied
-            return subcommand in denied_subcommands
-        
-        return False
-    
-    def _is_role_allowed(self, base_command: str, subcommand: str, role: str) -> bool:
-        """Check if command is explicitly allowed for role"""
-        if not self.active_policy or "roles" not in self.active_policy:
-            return False
-        
-        role_policy = self.active_policy["roles"].get(role, {})
-        allow_policy = role_policy.get("allow", {})
-        
-        if base_command in allow_policy:
-            allowed_subcommands = allow_policy[base_command]
-            # If subcommand is in allow list, it's allowed
-            return subcommand in allowed_subcommands
-        
-        return False
-    
-    def _is_global_allowed(self, base_command: str, subcommand: str) -> bool:
-        """Check if command is globally allowed"""
-        if not self.active_policy or "global" not in self.active_policy:
-            return False
-        
-        global_policy = self.active_policy["global"]
-        
-        if base_command in global_policy:
-            allowed_subcommands = global_policy[base_command]
-            # If no subcommand specified or subcommand is in allow list
-            return not subcommand or subcommand in allowed_subcommands
-        
-        return False
-    
     def is_malicious_command(self, command: str) -> bool:
         """Detect potentially malicious commands"""
-        malicious_patterns = [
-            r'rm\s+-rf\s+/',
-            r'sudo\s+rm\s+-rf\s+/',
-            r'\|\s*bash',
-            r'\|\s*sh',
-            r';\s*rm\s+-rf',
-            r'&&\s*rm\s+-rf',
-            r'curl.*\|\s*bash',
-            r'wget.*\|\s*sh',
-            r'--privileged.*chroot'
-        ]
-        
-        for pattern in malicious_patterns:
-            if re.search(pattern, command, re.IGNORECASE):
-                return True
-        
-        return False
+        lowered = command.lower()
+        if not any(literal in lowered for literal in MALICIOUS_LITERALS):
+            return False
+        return MALICIOUS_REGEX.search(command) is not None
     
     def validate_role(self, role: str) -> bool:
         """Validate if role exists in policy"""
@@ -1,36 +1,132 @@
 import os
 import json
 import pickle
+import tempfile
 import threading
 import asyncio
-from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+
+from .state_store import SQLiteStateStore, StateRevision, StateStore, StateStoreError
+
+logger = logging.getLogger(__name__)
+
+STATE_DB_NAME = "state.db"
+DEFAULT_HISTORY_REVISIONS = 1000
 
 class StateManager:
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, store: Optional[StateStore] = None):
         self.config_path = config_path
-        self.state = {}
+        self.store = store
+        self.state = store.items() if store else {}
         self.lock = threading.Lock()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._pending_deletes: Optional[set] = None
+
+    @classmethod
+    def open(cls, config_path: str, db_path: Optional[str] = None) -> "StateManager":
+        """State manager backed by a SQLite store next to the config file"""
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.abspath(config_path)), STATE_DB_NAME)
+        return cls(config_path, store=SQLiteStateStore(db_path))
 
     def load_state(self, file_path: str) -> None:
+        """Import a pickled state snapshot (the pre-store format), replacing the current state"""
         if os.path.exists(file_path):
             with open(file_path, 'rb') as f:
-                self.state = pickle.load(f)
+                state = pickle.load(f)
+            with self.lock:
+                if self.store:
+                    self.store.commit(state, [key for key in self.state if key not in state])
+                self.state = state
 
-    def save_state(self, file_path: str) -> None:
-        with open(file_path, 'wb') as f:
-            pickle.dump(self.state, f)
+    def save_state(self, file_path: Optional[str] = None) -> None:
+        """Export a full pickled snapshot; updates are already committed when a store is attached"""
+        if file_path is None:
+            return
+        with self.lock:
+            state = dict(self.state)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), prefix=".state.")
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, file_path)
 
     def update_state(self, key: str, value: Any) -> None:
         with self.lock:
+            if self._pending is not None:
+                self._pending[key] = value
+                self._pending_deletes.discard(key)
+            elif self.store:
+                self.store.put(key, value)
             self.state[key] = value
 
+    def delete_state(self, key: str) -> None:
+        with self.lock:
+            if self._pending is not None:
+                self._pending.pop(key, None)
+                self._pending_deletes.add(key)
+            elif self.store:
+                self.store.delete(key)
+            self.state.pop(key, None)
+
     def get_state(self, key: str) -> Optional[Any]:
+        if self.store and self._pending is None:
+            # Read through so values written by other processes are seen
+            value = self.store.get(key)
+            with self.lock:
+                if value is None:
+                    self.state.pop(key, None)
+                else:
+                    self.state[key] = value
+            return value
         return self.state.get(key)
 
-    def rollback_state(self, history_file: str) -> None:
-        if os.path.exists(history_file):
-            with open(history_file, 'rb') as f:
-                self.state = pickle.load(f)
+    @contextmanager
+    def transaction(self) -> Iterator["StateManager"]:
+        """Group updates into one atomic commit; on error none of them are applied"""
+        with self.lock:
+            if self._pending is not None:
+                raise StateStoreError("State transactions cannot be nested")
+            self._pending, self._pending_deletes = {}, set()
+            before = dict(self.state)
+        try:
+            yield self
+        except BaseException:
+            with self.lock:
+                self.state = before
+                self._pending = self._pending_deletes = None
+            raise
+        with self.lock:
+            pending, deletes = self._pending, self._pending_deletes
+            self._pending = self._pending_deletes = None
+            try:
+                if self.store and (pending or deletes):
+                    self.store.commit(pending, deletes)
+            except Exception:
+                self.state = before
+                raise
+
+    def refresh(self) -> None:
+        """Reload the whole state from the store"""
+        if self.store:
+            state = self.store.items()
+            with self.lock:
+                self.state = state
+
+    def history(self, key: Optional[str] = None, limit: int = 50) -> List[StateRevision]:
+        return self._require_store().history(key, limit)
+
+    def rollback_state(self, revision: Optional[int] = None, timestamp: Optional[float] = None) -> int:
+        """Restore the state of a revision, or of a point in time; returns the new revision"""
+        store = self._require_store()
+        if revision is None:
+            if timestamp is None:
+                raise ValueError("rollback_state needs a revision or a timestamp")
+            revision = store.revision_at(timestamp)
+        new_revision = store.rollback(revision)
+        self.refresh()
+        return new_revision
 
     async def sync_state(self, remote_path: str) -> None:
         await asyncio.sleep(1)  # Simulate network delay
@@ -38,19 +134,18 @@ class StateManager:
             json.dump(self.state, f)
 
     def check_and_repair(self) -> None:
-        # Implement consistency check and repair logic
-        pass
+        if self.store and not self.store.check():
+            raise StateStoreError("State store failed its integrity check")
 
     def optimize_memory(self) -> None:
         # Implement memory optimization logic
         pass
 
-    def optimize_disk(self) -> None:
-        # Implement disk optimization logic
-        pass
+    def optimize_disk(self, keep_revisions: int = DEFAULT_HISTORY_REVISIONS) -> None:
+        if self.store:
+            self.store.compact(keep_revisions)
 
-# Example usage
-state_manager = StateManager(config_path='config.yaml')
-state_manager.load_state('state.pkl')
-state_manager.update_state('world', {'status': 'active'})
-state_manager.save_state('state.pkl')
\ No newline at end of file
+    def _require_store(self) -> StateStore:
+        if self.store is None:
+            raise StateStoreError("State history needs a state store (see StateManager.open)")
+        return self.store
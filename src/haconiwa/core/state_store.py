@@ -0,0 +1,291 @@
+"""
+State storage backends for Haconiwa v1.0
+
+StateManager writes each key update to a store instead of pickling the whole
+state. The SQLite store keeps the current value of every key plus a history
+of commits, so writes cost O(change), several processes can write at once
+(WAL mode, one writer at a time) and state can be rolled back to any
+revision or point in time that has not been compacted away.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    revision INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    revision INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (key, revision)
+);
+CREATE INDEX IF NOT EXISTS history_revision ON history (revision);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    revision INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class StateStoreError(Exception):
+    """State store error"""
+    pass
+
+
+@dataclass
+class StateRevision:
+    """One key change of a commit; ``value`` is None when the key was deleted"""
+    revision: int
+    key: str
+    value: Optional[Any]
+    created_at: Optional[float]
+
+    @property
+    def deleted(self) -> bool:
+        return self.value is None
+
+
+class StateStore(ABC):
+    """Storage backend of StateManager"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def items(self) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def commit(self, updates: Dict[str, Any], deletes: Iterable[str] = ()) -> int:
+        """Apply updates and deletes atomically; returns the new revision"""
+        pass
+
+    @abstractmethod
+    def snapshot(self, revision: int) -> Dict[str, Any]:
+        """State as it was after ``revision``"""
+        pass
+
+    @abstractmethod
+    def rollback(self, revision: int) -> int:
+        """Restore the state of ``revision`` as a new commit; returns the new revision"""
+        pass
+
+    @abstractmethod
+    def revision_at(self, timestamp: float) -> int:
+        """Last revision committed at or before ``timestamp``"""
+        pass
+
+    @abstractmethod
+    def history(self, key: Optional[str] = None, limit: int = 50) -> List[StateRevision]:
+        pass
+
+    @abstractmethod
+    def compact(self, keep_revisions: int) -> int:
+        """Drop history older than the last ``keep_revisions`` commits; returns rows removed"""
+        pass
+
+    def check(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def put(self, key: str, value: Any) -> int:
+        return self.commit({key: value})
+
+    def delete(self, key: str) -> int:
+        return self.commit({}, [key])
+
+
+class SQLiteStateStore(StateStore):
+    """SQLite store in WAL mode; safe for concurrent use by threads and processes"""
+
+    def __init__(self, path: Union[str, Path], busy_timeout: float = 30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        try:
+            self._conn = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._transaction() as conn:
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+        except sqlite3.Error as e:
+            raise StateStoreError(f"Cannot open state store {self.path}: {e}")
+
+    @property
+    def revision(self) -> int:
+        """Latest committed revision (0 for an empty store)"""
+        row = self._query("SELECT MAX(revision) FROM commits")
+        return row[0][0] or 0
+
+    @property
+    def compacted_through(self) -> int:
+        """Oldest revision that can still be restored"""
+        with self._lock:
+            return self._compacted_through(self._conn)
+
+    def get(self, key: str) -> Optional[Any]:
+        rows = self._query("SELECT value FROM state WHERE key = ?", (key,))
+        return self._decode(rows[0][0]) if rows else None
+
+    def items(self) -> Dict[str, Any]:
+        return {key: self._decode(value) for key, value in self._query("SELECT key, value FROM state")}
+
+    def commit(self, updates: Dict[str, Any], deletes: Iterable[str] = ()) -> int:
+        encoded = {key: self._encode(value) for key, value in updates.items()}
+        with self._transaction() as conn:
+            return self._write(conn, encoded, [key for key in deletes if key not in encoded])
+
+    def snapshot(self, revision: int) -> Dict[str, Any]:
+        with self._lock:
+            self._check_revision(self._conn, revision)
+            return {key: self._decode(value) for key, value in self._snapshot_rows(self._conn, revision)}
+
+    def rollback(self, revision: int) -> int:
+        with self._transaction() as conn:
+            self._check_revision(conn, revision)
+            target = dict(self._snapshot_rows(conn, revision))
+            current = dict(conn.execute("SELECT key, value FROM state"))
+            updates = {key: value for key, value in target.items() if current.get(key) != value}
+            deletes = [key for key in current if key not in target]
+            if not updates and not deletes:
+                return self._latest(conn)
+            new_revision = self._write(conn, updates, deletes)
+        logger.info(f"⏪ Rolled state back to revision {revision} as revision {new_revision} "
+                    f"({len(updates)} restored, {len(deletes)} removed)")
+        return new_revision
+
+    def revision_at(self, timestamp: float) -> int:
+        rows = self._query("SELECT MAX(revision) FROM commits WHERE created_at <= ?", (timestamp,))
+        return rows[0][0] or 0
+
+    def history(self, key: Optional[str] = None, limit: int = 50) -> List[StateRevision]:
+        sql = ("SELECT h.revision, h.key, h.value, c.created_at FROM history h "
+               "LEFT JOIN commits c ON c.revision = h.revision")
+        params: tuple = ()
+        if key is not None:
+            sql += " WHERE h.key = ?"
+            params = (key,)
+        sql += " ORDER BY h.revision DESC, h.key LIMIT ?"
+        return [StateRevision(revision, key, self._decode(value) if value is not None else None, created_at)
+                for revision, key, value, created_at in self._query(sql, params + (limit,))]
+
+    def compact(self, keep_revisions: int) -> int:
+        with self._transaction() as conn:
+            floor = self._latest(conn) - keep_revisions
+            if floor <= self._compacted_through(conn):
+                return 0
+            # Keep each key's last change at or before the floor, so later snapshots stay complete
+            removed = conn.execute(
+                "DELETE FROM history WHERE revision < ? AND (key, revision) NOT IN "
+                "(SELECT key, MAX(revision) FROM history WHERE revision <= ? GROUP BY key)",
+                (floor, floor)).rowcount
+            removed += conn.execute("DELETE FROM history WHERE revision <= ? AND value IS NULL", (floor,)).rowcount
+            conn.execute("DELETE FROM commits WHERE revision < ?", (floor,))
+            conn.execute("INSERT INTO meta (name, value) VALUES ('compacted_through', ?) "
+                         "ON CONFLICT(name) DO UPDATE SET value = excluded.value", (floor,))
+        logger.info(f"🧹 Compacted state history through revision {floor} ({removed} rows removed)")
+        return removed
+
+    def check(self) -> bool:
+        result = self._query("PRAGMA integrity_check")
+        if result[0][0] != "ok":
+            logger.error(f"State store {self.path} failed integrity check: {result[0][0]}")
+            return False
+        return True
+
+    def vacuum(self) -> None:
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE serializes writers across processes"""
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.Error as e:
+                raise StateStoreError(f"Cannot lock state store {self.path}: {e}")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, conn: sqlite3.Connection, updates: Dict[str, str], deletes: List[str]) -> int:
+        revision = conn.execute("INSERT INTO commits (created_at) VALUES (?)", (time.time(),)).lastrowid
+        conn.executemany("INSERT INTO history (revision, key, value) VALUES (?, ?, ?)",
+                         [(revision, key, value) for key, value in updates.items()] +
+                         [(revision, key, None) for key in deletes])
+        conn.executemany("INSERT INTO state (key, value, revision) VALUES (?, ?, ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = excluded.value, revision = excluded.revision",
+                         [(key, value, revision) for key, value in updates.items()])
+        conn.executemany("DELETE FROM state WHERE key = ?", [(key,) for key in deletes])
+        return revision
+
+    def _check_revision(self, conn: sqlite3.Connection, revision: int) -> None:
+        if revision < self._compacted_through(conn):
+            raise StateStoreError(f"Revision {revision} has been compacted away")
+        if revision > self._latest(conn):
+            raise StateStoreError(f"Revision {revision} does not exist")
+
+    @staticmethod
+    def _compacted_through(conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE name = 'compacted_through'").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _latest(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT MAX(revision) FROM commits").fetchone()[0] or 0
+
+    @staticmethod
+    def _snapshot_rows(conn: sqlite3.Connection, revision: int) -> List[tuple]:
+        return conn.execute(
+            "SELECT h.key, h.value FROM history h JOIN "
+            "(SELECT key, MAX(revision) AS revision FROM history WHERE revision <= ? GROUP BY key) last "
+            "ON h.key = last.key AND h.revision = last.revision WHERE h.value IS NOT NULL",
+            (revision,)).fetchall()
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        try:
+            return json.dumps(value, sort_keys=True)
+        except (TypeError, ValueError) as e:
+            raise StateStoreError(f"State values must be JSON serializable: {e}")
+
+    @staticmethod
+    def _decode(value: str) -> Any:
+        return json.loads(value)
@@ -2,12 +2,12 @@ import os
 import shutil
 import subprocess
 from packaging import version
-from haconiwa.core.config import Config
+from haconiwa.core.config import get_config
 from haconiwa.core.state import StateManager
 
 class Upgrader:
     def __init__(self, config_path="config.yaml"):
-        self.config = Config(config_path)
+        self.config = get_config(config_path)
         self.state = StateManager(config_path)
 
     def get_current_version(self):
@@ -0,0 +1,7 @@
+"""
+Haconiwa Daemon Module
+"""
+
+from .client import DaemonClient, DaemonError, DaemonResponse
+
+__all__ = ['DaemonClient', 'DaemonError', 'DaemonResponse']
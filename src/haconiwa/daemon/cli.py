@@ -0,0 +1,94 @@
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import typer
+
+from haconiwa.daemon.client import DaemonClient, DaemonError
+
+daemon_app = typer.Typer(help="常駐デーモン管理 (Unix socket)")
+
+
+@daemon_app.command()
+def start(
+    foreground: bool = typer.Option(False, "--foreground", help="フォアグラウンドで実行"),
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Unix socket のパス"),
+    control_mode: bool = typer.Option(True, "--control-mode/--no-control-mode", help="tmux control mode 接続を保持"),
+):
+    """デーモンを起動"""
+    client = DaemonClient(socket_path)
+    if client.is_running():
+        typer.echo(f"ℹ️ Daemon already running at {client.socket_path}")
+        return
+
+    if foreground:
+        from haconiwa.daemon.server import HaconiwaDaemon
+        try:
+            daemon = HaconiwaDaemon(client.socket_path, control_mode=control_mode).start()
+        except (DaemonError, OSError) as e:
+            typer.echo(f"❌ Failed to start daemon: {e}", err=True)
+            raise typer.Exit(1)
+        signal.signal(signal.SIGTERM, lambda *_: daemon.shutdown())
+        typer.echo(f"🛰️ Daemon listening on {client.socket_path}")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    log_path = client.socket_path.with_suffix(".log")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    command = [sys.executable, "-m", "haconiwa.cli", "daemon", "start", "--foreground",
+               "--socket", str(client.socket_path)]
+    if not control_mode:
+        command.append("--no-control-mode")
+    with open(log_path, "ab") as log:
+        subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                         start_new_session=True)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if client.is_running():
+            typer.echo(f"✅ Daemon started (pid {client.ping()['pid']}) at {client.socket_path}")
+            return
+        time.sleep(0.1)
+    typer.echo(f"❌ Daemon did not start, see {log_path}", err=True)
+    raise typer.Exit(1)
+
+
+@daemon_app.command()
+def stop(
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Unix socket のパス"),
+):
+    """デーモンを停止"""
+    try:
+        DaemonClient(socket_path).stop()
+    except DaemonError as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
+    typer.echo("✅ Daemon stopped")
+
+
+@daemon_app.command()
+def status(
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Unix socket のパス"),
+):
+    """デーモンの状態を表示"""
+    try:
+        info = DaemonClient(socket_path).status()
+    except DaemonError as e:
+        typer.echo(f"⚪ Daemon not running: {e}")
+        raise typer.Exit(1)
+
+    typer.echo(f"🟢 Daemon running (pid {info['pid']}) at {info['socket']}")
+    typer.echo(f"   Uptime: {info['uptime']:.0f}s, requests: {info['requests']}, "
+               f"control mode: {'on' if info['control_mode'] else 'off'}")
+    typer.echo(f"   Sessions: {', '.join(info['sessions']) or '-'}")
+    typer.echo(f"   Tasks: {len(info['tasks'])}")
+    typer.echo(f"   Active policy: {info['active_policy'] or '-'}")
+
+
+if __name__ == "__main__":
+    daemon_app()
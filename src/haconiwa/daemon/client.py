@@ -0,0 +1,127 @@
+"""
+Daemon client for Haconiwa v1.0
+
+Forwards CLI invocations to a running ``haconiwa daemon`` over its Unix socket.
+Kept free of heavy imports since the CLI loads it before every forwarded command.
+"""
+
+import json
+import os
+import socket
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAEMON_ENV = "HACONIWA_USE_DAEMON"
+SOCKET_ENV = "HACONIWA_DAEMON_SOCKET"
+
+# Commands the daemon runs; everything else (prompts, attach, the daemon itself) stays local
+DAEMON_COMMANDS = {
+    ("apply",),
+    ("space", "ls"), ("space", "list"), ("space", "start"), ("space", "stop"),
+    ("space", "clone"), ("space", "reindex"), ("space", "run"),
+    ("policy", "ls"), ("policy", "test"), ("policy", "delete"),
+    ("tool", "scan-filepath"), ("tool", "scan-db"),
+}
+
+# Root options that take a value, skipped when looking for the command path
+_VALUE_OPTIONS = {"-c", "--config"}
+
+
+class DaemonError(Exception):
+    """Daemon connection or protocol error"""
+    pass
+
+
+@dataclass
+class DaemonResponse:
+    """Result of a command run by the daemon"""
+    exit_code: int
+    stdout: str = ""
+    stderr: str = ""
+
+
+def default_socket_path() -> Path:
+    return Path(os.environ.get(SOCKET_ENV) or Path.home() / ".haconiwa" / "daemon.sock")
+
+
+def daemon_enabled() -> bool:
+    return os.environ.get(DAEMON_ENV, "").lower() in ("1", "true", "yes")
+
+
+def command_path(argv: Sequence[str]) -> Tuple[str, ...]:
+    """Command and sub-command names of a CLI invocation"""
+    words = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg.startswith("-"):
+            skip = not words and arg in _VALUE_OPTIONS
+        else:
+            words.append(arg)
+            if len(words) == 2 or words[0] == "apply":
+                break
+    return tuple(words)
+
+
+def forwardable(argv: Sequence[str]) -> bool:
+    """Whether the daemon can run ``argv`` without the caller's terminal"""
+    path = command_path(argv)
+    if path not in DAEMON_COMMANDS or "--attach" in argv:
+        return False
+    if path == ("space", "run"):
+        return "--no-confirm" in argv or "--dry-run" in argv
+    return True
+
+
+class DaemonClient:
+    """Sends requests to the daemon, one connection per request"""
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None, timeout: Optional[float] = None):
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.timeout = timeout
+
+    def is_running(self) -> bool:
+        try:
+            self.ping()
+            return True
+        except DaemonError:
+            return False
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request({"op": "ping"}, timeout=2.0)
+
+    def status(self) -> Dict[str, Any]:
+        return self.request({"op": "status"}, timeout=5.0)
+
+    def stop(self) -> Dict[str, Any]:
+        return self.request({"op": "stop"}, timeout=5.0)
+
+    def run(self, argv: Sequence[str], cwd: Optional[str] = None) -> DaemonResponse:
+        """Run a CLI invocation in the daemon"""
+        reply = self.request({"op": "run", "argv": list(argv), "cwd": cwd or os.getcwd()})
+        return DaemonResponse(reply.get("exit_code", 1), reply.get("stdout", ""), reply.get("stderr", ""))
+
+    def request(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send one JSON request line and read the JSON reply"""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout or self.timeout)
+                sock.connect(str(self.socket_path))
+                sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+                sock.shutdown(socket.SHUT_WR)
+                data = b"".join(iter(lambda: sock.recv(65536), b""))
+        except OSError as e:
+            raise DaemonError(f"Cannot reach haconiwa daemon at {self.socket_path}: {e}")
+
+        try:
+            reply = json.loads(data)
+        except ValueError:
+            raise DaemonError(f"Invalid reply from haconiwa daemon: {data[:200]!r}")
+        if "error" in reply:
+            raise DaemonError(reply["error"])
+        return reply
@@ -0,0 +1,186 @@
+"""
+Haconiwa Daemon for Haconiwa v1.0
+
+Runs CLI commands inside one long-lived process, so SpaceManager, TaskManager
+and the policy engine keep their in-memory state between calls and tmux
+commands share one control-mode connection.
+"""
+
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from .client import DAEMON_ENV, DaemonClient, DaemonError, default_socket_path, forwardable
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            reply = self.server.haconiwa_daemon.handle(json.loads(self.rfile.readline()))
+        except Exception as e:
+            reply = {"error": str(e)}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class HaconiwaDaemon:
+    """Unix-socket server owning the managers used by forwarded CLI commands"""
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None, control_mode: bool = True):
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.control_mode = control_mode
+        self.started_at: Optional[float] = None
+        self.requests_served = 0
+        self._server: Optional[_Server] = None
+        self._run_lock = threading.Lock()
+        self._command = None
+
+    def start(self) -> "HaconiwaDaemon":
+        """Bind the socket; a stale socket file from a dead daemon is replaced"""
+        if DaemonClient(self.socket_path).is_running():
+            raise DaemonError(f"haconiwa daemon is already running at {self.socket_path}")
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        umask = os.umask(0o077)
+        try:
+            self._server = _Server(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+        self._server.haconiwa_daemon = self
+
+        # Commands run here must not forward back to ourselves
+        os.environ.pop(DAEMON_ENV, None)
+        if self.control_mode:
+            from haconiwa.space.control import TmuxControlError, enable_control_mode, get_control_client
+            enable_control_mode(True)
+            try:
+                get_control_client()
+            except TmuxControlError as e:
+                logger.warning(f"tmux control mode unavailable, commands will use subprocesses: {e}")
+
+        self.started_at = time.time()
+        logger.info(f"🛰️ haconiwa daemon listening on {self.socket_path}")
+        return self
+
+    def serve_forever(self) -> None:
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self) -> None:
+        """Stop serving; safe to call from a request or signal handler"""
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+        self.socket_path.unlink(missing_ok=True)
+        if self.control_mode:
+            from haconiwa.space.control import close_control_client
+            close_control_client()
+        logger.info("🛑 haconiwa daemon stopped")
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch one request"""
+        op = request.get("op")
+        if op == "ping":
+            return {"pid": os.getpid()}
+        if op == "status":
+            return self.status()
+        if op == "stop":
+            self.shutdown()
+            return {"stopping": True}
+        if op == "run":
+            return self.run(request.get("argv", []), request.get("cwd"))
+        raise DaemonError(f"Unknown daemon operation: {op}")
+
+    def status(self) -> Dict[str, Any]:
+        from haconiwa.core.policy.engine import get_policy_engine
+        from haconiwa.space.control import control_mode_enabled
+        from haconiwa.space.manager import SpaceManager
+        from haconiwa.task.manager import TaskManager
+
+        active_policy = get_policy_engine().get_active_policy() or {}
+        return {
+            "pid": os.getpid(),
+            "socket": str(self.socket_path),
+            "uptime": time.time() - self.started_at if self.started_at else 0.0,
+            "requests": self.requests_served,
+            "control_mode": control_mode_enabled(),
+            "sessions": sorted(SpaceManager().active_sessions),
+            "tasks": sorted(TaskManager().tasks),
+            "active_policy": active_policy.get("name"),
+        }
+
+    def run(self, argv: List[str], cwd: Optional[str] = None) -> Dict[str, Any]:
+        """Run a CLI invocation with its output and log records captured for the caller"""
+        if not forwardable(argv):
+            raise DaemonError(f"Command must run locally: haconiwa {' '.join(argv)}")
+
+        # Commands share process state (cwd, stdio), so they run one at a time
+        with self._run_lock:
+            self.requests_served += 1
+            stdout, stderr = io.StringIO(), io.StringIO()
+            handler = logging.StreamHandler(stderr)
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            root_logger = logging.getLogger()
+            root_logger.addHandler(handler)
+            previous_cwd, previous_stdin = os.getcwd(), sys.stdin
+            try:
+                if cwd:
+                    os.chdir(cwd)
+                # Prompts abort instead of waiting on the daemon's stdin
+                sys.stdin = io.StringIO("")
+                with redirect_stdout(stdout), redirect_stderr(stderr):
+                    exit_code = self._invoke(argv)
+            finally:
+                sys.stdin = previous_stdin
+                os.chdir(previous_cwd)
+                root_logger.removeHandler(handler)
+
+        return {"exit_code": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    def _invoke(self, argv: List[str]) -> int:
+        import click
+        import typer
+
+        if self._command is None:
+            from haconiwa.cli import app
+            self._command = typer.main.get_command(app)
+
+        try:
+            result = self._command.main(args=argv, prog_name="haconiwa", standalone_mode=False)
+        except click.exceptions.Exit as e:
+            return e.exit_code
+        except click.ClickException as e:
+            e.show()
+            return e.exit_code
+        except click.Abort:
+            click.echo("Aborted!", err=True)
+            return 1
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            logger.exception(f"Daemon command failed: {' '.join(argv)}")
+            click.echo(f"❌ Error: {e}", err=True)
+            return 1
+        return result if isinstance(result, int) else 0
@@ -1,22 +1,40 @@
+import sys
+from typing import Optional
+
 import typer
-from haconiwa.resource.path_scanner import PathScanner
-from haconiwa.resource.db_fetcher import DBFetcher
+from haconiwa.resource.path_scanner import DEFAULT_CONFIG, PathScanner
+from haconiwa.resource.db_fetcher import DEFAULT_BATCH_SIZE, DBFetcher
 
 resource_app = typer.Typer(help="リソース管理 (開発中)")
 
 @resource_app.command()
 def scan(directory: str, extension: str = ""):
     """ファイルパススキャンと拡張子フィルタ"""
-    scanner = PathScanner(directory, extension)
-    results = scanner.scan()
+    PathScanner.register_config("resource-scan", {
+        "include": [f"*{extension}"] if extension else ["**"],
+        "exclude": DEFAULT_CONFIG["exclude"],
+    })
+    results = sorted(PathScanner().scan("resource-scan", directory))
     typer.echo(f"スキャン結果: {results}")
 
 @resource_app.command()
-def pull(query: str):
+def pull(
+    query: str,
+    output: Optional[str] = typer.Option(None, "-o", "--output", help="結果を書き出すファイル (形式は拡張子から推定)"),
+    fmt: Optional[str] = typer.Option(None, "--format", help="出力形式 (csv, json, jsonl, yaml)"),
+    batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, "--batch-size", help="1回に取得する行数"),
+    database: Optional[str] = typer.Option(None, "-d", "--database", help="接続先の Database CRD名"),
+):
     """データベースクエリ実行とデータ取得"""
-    fetcher = DBFetcher()
-    results = fetcher.execute_query(query)
-    typer.echo(f"クエリ結果: {results}")
+    fetcher = DBFetcher(database=database)
+    if output:
+        rows = fetcher.export(query, output, fmt, batch_size=batch_size)
+        typer.echo(f"{rows} 行を {output} に書き出しました")
+    elif fmt:
+        fetcher.write(query, sys.stdout, fmt, batch_size=batch_size)
+    else:
+        results = fetcher.execute_query(query)
+        typer.echo(f"クエリ結果: {results}")
 
 @resource_app.command()
 def sync(remote: str):
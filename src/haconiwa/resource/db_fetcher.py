@@ -1,27 +1,160 @@
-import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import pandas as pd
+"""
+DB Fetcher for Haconiwa v1.0
+
+Query results are streamed in batches from a server-side cursor
+(``stream_results`` + ``yield_per``) and written row by row by the CSV, JSON,
+JSON Lines and YAML writers, so exporting a table holds one batch in memory
+regardless of its size.
+"""
+
+import csv
+import io
 import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import date, datetime, time
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
+
 import yaml
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
-from haconiwa.core.config import Config
 import logging
-from typing import Dict, Any, List
+
+from .engine_pool import EnginePool, get_engine_pool, redact
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_DSN = "sqlite:///haconiwa.db"
+
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class DBFetcherError(Exception):
+    """DB fetcher error"""
+    pass
+
+
+def _statement(query):
+    return text(query) if isinstance(query, str) else query
+
+
+def _plain(value: Any) -> Any:
+    """Value as a type every writer can serialize"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+class RowWriter(ABC):
+    """Writes query rows to a text stream as they arrive"""
+
+    def __init__(self, out: TextIO, columns: List[str]):
+        self.out = out
+        self.columns = columns
+        self.rows = 0
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+        self.rows += len(rows)
+
+    @abstractmethod
+    def write_row(self, row: Dict[str, Any]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class CsvRowWriter(RowWriter):
+    def __init__(self, out: TextIO, columns: List[str]):
+        super().__init__(out, columns)
+        self.writer = csv.writer(out, lineterminator="\n")
+        self.writer.writerow(columns)
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self.writer.writerow([_plain(row[column]) for column in self.columns])
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        self.writer.writerows([_plain(row[column]) for column in self.columns] for row in rows)
+        self.rows += len(rows)
+
+
+class JsonLinesRowWriter(RowWriter):
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self.out.write(json.dumps(row, default=_plain, ensure_ascii=False))
+        self.out.write("\n")
+
+
+class JsonRowWriter(RowWriter):
+    """JSON array of records, written one record at a time"""
+
+    def __init__(self, out: TextIO, columns: List[str]):
+        super().__init__(out, columns)
+        self.out.write("[")
+        self._separator = "\n"
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self.out.write(self._separator)
+        self.out.write(json.dumps(row, default=_plain, ensure_ascii=False))
+        self._separator = ",\n"
+
+    def close(self) -> None:
+        self.out.write("\n]\n" if self.rows else "]\n")
+
+
+class YamlRowWriter(RowWriter):
+    """YAML sequence of records; each batch is dumped as a block sequence and appended"""
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        yaml.dump([{column: _plain(value) for column, value in row.items()}], self.out, Dumper=_YamlDumper,
+                  default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        if rows:
+            plain = [{column: _plain(value) for column, value in row.items()} for row in rows]
+            yaml.dump(plain, self.out, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False,
+                      allow_unicode=True)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if not self.rows:
+            self.out.write("[]\n")
+
+
+ROW_WRITERS = {
+    "csv": CsvRowWriter,
+    "json": JsonRowWriter,
+    "jsonl": JsonLinesRowWriter,
+    "yaml": YamlRowWriter,
+}
+_SUFFIX_FORMATS = {".csv": "csv", ".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl", ".yaml": "yaml", ".yml": "yaml"}
+
+
 class DBFetcher:
-    def __init__(self):
-        self.config = Config("config.yaml")
-        # Default SQLite database for now
-        self.engine = create_engine("sqlite:///haconiwa.db", pool_size=10, max_overflow=20)
+    def __init__(self, engine: Optional[Engine] = None, database: Optional[str] = None):
+        if engine is None:
+            # A Database CRD by name, or the default SQLite database; both come from the shared pool
+            engine = DatabaseManager().engine(database) if database else get_engine_pool().get(DEFAULT_DSN)
+        self.engine = engine
         self.Session = sessionmaker(bind=self.engine)
 
     def execute_query(self, query, params=None):
         session = self.Session()
         try:
-            result = session.execute(query, params)
+            result = session.execute(_statement(query), params)
             return result.fetchall()
         except SQLAlchemyError as e:
             session.rollback()
@@ -29,31 +162,79 @@ class DBFetcher:
         finally:
             session.close()
 
+    def iter_batches(self, query, params=None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Stream result rows as dicts, at most ``batch_size`` at a time"""
+        with self.engine.connect() as conn:
+            result = self._stream(conn, query, params, batch_size)
+            for batch in result.mappings().partitions(batch_size):
+                yield [dict(row) for row in batch]
+
+    def iter_rows(self, query, params=None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        for batch in self.iter_batches(query, params, batch_size):
+            yield from batch
+
+    @staticmethod
+    def _stream(conn, query, params, batch_size: int):
+        # stream_results asks the driver for a server-side cursor; yield_per bounds each fetch
+        return conn.execution_options(stream_results=True, yield_per=batch_size).execute(_statement(query), params)
+
+    def write(self, query, out: TextIO, fmt: str = "jsonl", params=None, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Write the result of a query to a text stream; returns the number of rows"""
+        if fmt not in ROW_WRITERS:
+            raise DBFetcherError(f"Unsupported export format: {fmt} (expected one of {', '.join(ROW_WRITERS)})")
+        with self.engine.connect() as conn:
+            result = self._stream(conn, query, params, batch_size)
+            writer = ROW_WRITERS[fmt](out, list(result.keys()))
+            for batch in result.mappings().partitions(batch_size):
+                writer.write_batch([dict(row) for row in batch])
+            writer.close()
+        return writer.rows
+
+    def export(self, query, path: Union[str, Path], fmt: Optional[str] = None, params=None,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Snapshot a query into a file, replaced atomically once complete; the format defaults to the suffix"""
+        path = Path(path)
+        fmt = fmt or _SUFFIX_FORMATS.get(path.suffix.lower())
+        if fmt is None:
+            raise DBFetcherError(f"Cannot infer export format from {path.name}; pass fmt")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                rows = self.write(query, f, fmt, params, batch_size)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        logger.info(f"Exported {rows} rows to {path}")
+        return rows
+
     def fetch_as_dataframe(self, query, params=None):
+        import pandas as pd
         try:
-            result = self.execute_query(query, params)
-            return pd.DataFrame(result)
+            frames = [pd.DataFrame.from_records(batch) for batch in self.iter_batches(query, params)]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
         except Exception as e:
-            print(f"Error fetching data: {e}")
+            logger.error(f"Error fetching data: {e}")
             return None
 
+    def _fetch_as(self, fmt: str, query, params=None) -> Optional[str]:
+        buffer = io.StringIO()
+        try:
+            self.write(query, buffer, fmt, params)
+        except Exception as e:
+            logger.error(f"Error fetching data: {e}")
+            return None
+        return buffer.getvalue()
+
     def fetch_as_json(self, query, params=None):
-        df = self.fetch_as_dataframe(query, params)
-        if df is not None:
-            return df.to_json(orient='records')
-        return None
+        return self._fetch_as("json", query, params)
 
     def fetch_as_yaml(self, query, params=None):
-        df = self.fetch_as_dataframe(query, params)
-        if df is not None:
-            return yaml.dump(df.to_dict(orient='records'))
-        return None
+        return self._fetch_as("yaml", query, params)
 
     def fetch_as_csv(self, query, params=None):
-        df = self.fetch_as_dataframe(query, params)
-        if df is not None:
-            return df.to_csv(index=False)
-        return None
+        return self._fetch_as("csv", query, params)
 
     def retry_query(self, query, params=None, retries=3):
         for attempt in range(retries):
@@ -66,40 +247,58 @@ class DBFetcher:
                     raise e
 
 class DatabaseManager:
-    """Database scanner and connection manager"""
-    
+    """Database scanner and connection manager
+
+    Engines come from the shared EnginePool, so every scan and fetcher for the
+    same DSN reuses one connection pool.
+    """
+
     _configs = {}
-    
-    def __init__(self):
-        pass
-    
+
+    def __init__(self, pool: Optional[EnginePool] = None):
+        self.pool = pool or get_engine_pool()
+
     @classmethod
     def register_config(cls, name: str, config: Dict[str, Any]):
         """Register Database configuration"""
         cls._configs[name] = config
         logger.info(f"Registered Database config: {name}")
-    
-    def scan(self, config_name: str) -> Dict[str, Any]:
-        """Scan database using configuration"""
+
+    @classmethod
+    def has_config(cls, name: str) -> bool:
+        return name in cls._configs
+
+    def engine(self, config_name: str) -> Engine:
+        """Pooled engine of a Database configuration"""
+        config = self._configs.get(config_name)
+        if not config:
+            raise DBFetcherError(f"Database config not found: {config_name}")
+        return self.pool.get(config["dsn"], config.get("use_ssl", False))
+
+    def check(self, config_name: str) -> bool:
+        """Health check of a Database configuration"""
+        config = self._configs.get(config_name)
+        return bool(config) and self.pool.check(config["dsn"], config.get("use_ssl", False))
+
+    def fetcher(self, config_name: str) -> "DBFetcher":
+        return DBFetcher(engine=self.engine(config_name))
+
+    def scan(self, config_name: str, refresh: bool = False) -> Dict[str, Any]:
+        """Scan database using configuration
+
+        Answered from the schema cache, which re-introspects only objects whose
+        catalog fingerprint changed.
+        """
+        from .schema_cache import SchemaCache, SchemaCacheError
+
         config = self._configs.get(config_name)
         if not config:
             logger.error(f"Database config not found: {config_name}")
             return {}
-        
-        # Mock implementation - would use actual database connection
-        dsn = config.get("dsn")
-        use_ssl = config.get("use_ssl", False)
-        
-        logger.info(f"Scanning database with DSN: {dsn}, SSL: {use_ssl}")
-        
-        # Return mock results
-        return {
-            "tables": ["users", "posts", "comments", "tags"],
-            "views": ["user_posts", "comment_counts"],
-            "indexes": ["idx_users_email", "idx_posts_created_at"]
-        }
-
-# Example usage:
-# db_fetcher = DBFetcher()
-# result = db_fetcher.fetch_as_json("SELECT * FROM users")
-# print(result)
\ No newline at end of file
+
+        logger.info(f"Scanning database: {redact(config['dsn'])}, SSL: {config.get('use_ssl', False)}")
+        try:
+            return SchemaCache(self).get(config_name, refresh).summary()
+        except SchemaCacheError as e:
+            logger.error(f"Failed to scan database {config_name}: {e}")
+            return {}
@@ -0,0 +1,159 @@
+"""
+Engine Pool for Haconiwa v1.0
+
+Process-wide registry of SQLAlchemy engines keyed by DSN and connection
+options. Engines (and their connection pools) are created on first use, shared
+by every Database CRD and DBFetcher pointing at the same database, checked with
+``pool_pre_ping`` on checkout, and disposed once idle for ``max_idle`` seconds.
+"""
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IDLE = 600.0
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+# Connections older than this are replaced on checkout, before servers drop them
+DEFAULT_POOL_RECYCLE = 1800
+
+_EVICT_INTERVAL = 30.0
+
+
+class EnginePoolError(Exception):
+    """Engine pool error"""
+    pass
+
+
+@dataclass
+class PooledEngine:
+    """An engine in the pool and its usage"""
+    engine: Engine
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    checkouts: int = 0
+
+
+def redact(dsn: str) -> str:
+    """DSN with the password hidden, for logs"""
+    try:
+        return make_url(dsn).render_as_string()
+    except SQLAlchemyError:
+        return "<invalid dsn>"
+
+
+def _engine_options(dsn: str, use_ssl: bool) -> Dict[str, Any]:
+    url = make_url(dsn)
+    options: Dict[str, Any] = {"pool_pre_ping": True}
+    if url.get_backend_name() == "sqlite":
+        # SQLite picks its own pool class (memory databases are per connection)
+        return options
+
+    options.update(pool_size=DEFAULT_POOL_SIZE, max_overflow=DEFAULT_MAX_OVERFLOW, pool_recycle=DEFAULT_POOL_RECYCLE)
+    if use_ssl:
+        if url.get_backend_name() == "postgresql":
+            options["connect_args"] = {"sslmode": "require"}
+        elif url.get_backend_name() in ("mysql", "mariadb"):
+            options["connect_args"] = {"ssl": {"check_hostname": True}}
+        else:
+            logger.warning(f"useSSL is not supported for {url.get_backend_name()} databases; connecting without it")
+    return options
+
+
+class EnginePool:
+    """Lazily created, shared engines with idle eviction"""
+
+    def __init__(self, max_idle: float = DEFAULT_MAX_IDLE):
+        self.max_idle = max_idle
+        self._engines: Dict[Tuple[str, bool], PooledEngine] = {}
+        self._lock = threading.Lock()
+        self._last_evict = time.monotonic()
+
+    def get(self, dsn: str, use_ssl: bool = False) -> Engine:
+        """Engine for a DSN, created on first use"""
+        key = (dsn, use_ssl)
+        self._maybe_evict()
+        with self._lock:
+            pooled = self._engines.get(key)
+            if pooled is None:
+                try:
+                    engine = create_engine(dsn, **_engine_options(dsn, use_ssl))
+                except (SQLAlchemyError, ImportError, ValueError) as e:
+                    raise EnginePoolError(f"Cannot create engine for {redact(dsn)}: {e}")
+                pooled = self._engines[key] = PooledEngine(engine)
+                logger.info(f"🔌 Created engine for {engine.url.render_as_string()}")
+            pooled.last_used = time.monotonic()
+            pooled.checkouts += 1
+            return pooled.engine
+
+    def check(self, dsn: str, use_ssl: bool = False) -> bool:
+        """Whether the database answers a trivial query"""
+        try:
+            with self.get(dsn, use_ssl).connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except (EnginePoolError, SQLAlchemyError) as e:
+            logger.warning(f"Health check failed for {redact(dsn)}: {e}")
+            return False
+
+    def evict_idle(self, max_idle: Optional[float] = None) -> int:
+        """Dispose engines unused for ``max_idle`` seconds; returns the number disposed"""
+        max_idle = self.max_idle if max_idle is None else max_idle
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, pooled in self._engines.items() if now - pooled.last_used >= max_idle]
+            evicted = [self._engines.pop(key) for key in idle]
+            self._last_evict = now
+        for pooled in evicted:
+            pooled.engine.dispose()
+            logger.info(f"🔌 Disposed idle engine for {pooled.engine.url.render_as_string()}")
+        return len(evicted)
+
+    def _maybe_evict(self) -> None:
+        if time.monotonic() - self._last_evict >= _EVICT_INTERVAL:
+            self.evict_idle()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "url": pooled.engine.url.render_as_string(),
+                "ssl": use_ssl,
+                "checkouts": pooled.checkouts,
+                "idle_seconds": round(now - pooled.last_used, 1),
+                "pool": pooled.engine.pool.status(),
+            } for (dsn, use_ssl), pooled in self._engines.items()]
+
+    def dispose_all(self) -> None:
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for pooled in engines:
+            pooled.engine.dispose()
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+
+_pool: Optional[EnginePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_engine_pool() -> EnginePool:
+    """Shared EnginePool of this process"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = EnginePool()
+                atexit.register(_pool.dispose_all)
+    return _pool
@@ -0,0 +1,258 @@
+"""
+File Index for Haconiwa v1.0
+
+Persistent per-PathScan index of ``path -> (size, mtime_ns, inode)``, grouped
+by directory. A refresh re-lists only directories whose mtime changed since
+the last scan; other directories reuse their stored listing, and their files
+are re-stat'ed (or trusted with ``check_files=False``). With ``gitignore``
+a changed ``.gitignore`` re-lists its whole subtree. Changes are streamed
+while the tree is walked.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import logging
+
+from .gitignore import IGNORE_FILE, IgnoreStack, file_signature
+from .path_scanner import PathMatcher
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR_ENV = "HACONIWA_INDEX_DIR"
+INDEX_FORMAT = 2
+
+# A directory modified this close to the scan may change again within the same
+# mtime tick; it is re-listed on the next refresh instead of being trusted
+RACY_WINDOW_NS = 2_000_000_000
+
+_STAT_DIR_FD = os.stat in os.supports_dir_fd
+
+
+class IndexEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+@dataclass
+class FileChange:
+    """Change of one file since the previous refresh"""
+    kind: str  # "added", "modified" or "removed"
+    path: str
+    entry: IndexEntry
+
+
+class _DirState(NamedTuple):
+    mtime_ns: Optional[int]
+    files: Dict[str, Tuple[int, int, int]]
+    subdirs: Tuple[str, ...]
+    ignore: Optional[Tuple[int, int]]  # Signature of the directory's .gitignore
+
+
+def default_index_dir() -> Path:
+    return Path(os.environ.get(INDEX_DIR_ENV) or Path.home() / ".haconiwa" / "cache" / "index")
+
+
+def _entry(stat: os.stat_result) -> Tuple[int, int, int]:
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+class FileIndex:
+    """Incrementally refreshed index of the files a PathScan selects under one root"""
+
+    def __init__(self, root: Union[str, Path], name: str, include: Iterable[str] = (), exclude: Iterable[str] = (),
+                 index_dir: Optional[Union[str, Path]] = None, check_files: bool = True, gitignore: bool = False):
+        self.root = os.path.abspath(root)
+        self.name = name
+        self.gitignore = gitignore
+        self.patterns = (tuple(include), tuple(exclude), gitignore)
+        self.matcher = PathMatcher(include, exclude)
+        self.check_files = check_files
+        self.index_dir = Path(index_dir or default_index_dir())
+        self.dirs: Dict[str, _DirState] = {}
+        self.loaded = self.load()
+
+    @property
+    def path(self) -> Path:
+        root_hash = hashlib.sha256(self.root.encode("utf-8")).hexdigest()[:16]
+        return self.index_dir / f"{self.safe_name(self.name)}-{root_hash}.idx"
+
+    @staticmethod
+    def safe_name(name: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+    def __len__(self) -> int:
+        return sum(len(state.files) for state in self.dirs.values())
+
+    def entries(self) -> Iterator[Tuple[str, IndexEntry]]:
+        """Indexed files as of the last refresh"""
+        for rel_dir, state in self.dirs.items():
+            for name, entry in state.files.items():
+                yield self._join(rel_dir, name), IndexEntry(*entry)
+
+    def load(self) -> bool:
+        """Load the stored index; a missing, unreadable or outdated index starts empty"""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable file index {self.path}: {e}")
+            return False
+        if data.get("format") != INDEX_FORMAT or data.get("root") != self.root or data.get("patterns") != self.patterns:
+            logger.info(f"File index for {self.name} is outdated, rebuilding")
+            return False
+        self.dirs = {rel_dir: _DirState(*state) for rel_dir, state in data["dirs"].items()}
+        return True
+
+    def save(self) -> None:
+        data = {"format": INDEX_FORMAT, "root": self.root, "patterns": self.patterns,
+                "dirs": {rel_dir: tuple(state) for rel_dir, state in self.dirs.items()}}
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, prefix=".index.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def changes(self) -> Iterator[FileChange]:
+        """Stream changes since the last refresh; the index is saved once the stream is exhausted"""
+        scan_start = time.time_ns()
+        new_dirs: Dict[str, _DirState] = {}
+        dirty = False
+        # Directory, ignore files in effect there, and whether its stored listing must be ignored
+        stack: List[Tuple[str, Optional[IgnoreStack], bool]] = [
+            ("", IgnoreStack.for_root(self.root) if self.gitignore else None, False)]
+        while stack:
+            rel_dir, ignore, relist = stack.pop()
+            try:
+                dir_mtime = os.stat(self._abs(rel_dir)).st_mtime_ns
+            except OSError:
+                continue
+            old = self.dirs.get(rel_dir)
+            reusable = old is not None and old.mtime_ns == dir_mtime and not relist
+
+            signature = None
+            if ignore is not None:
+                if reusable and not self.check_files:
+                    signature = old.ignore
+                else:
+                    signature = file_signature(os.path.join(self._abs(rel_dir), IGNORE_FILE))
+                if old is not None and signature != old.ignore:
+                    # New rules may select or drop anything below
+                    reusable, relist = False, True
+                if signature is not None:
+                    ignore = ignore.child(rel_dir, os.path.join(self._abs(rel_dir), IGNORE_FILE), signature)
+
+            if reusable:
+                files, subdirs, changes = self._reuse_listing(rel_dir, old, ignore)
+            else:
+                files, subdirs, changes = self._list(rel_dir, old, ignore)
+            trusted = dir_mtime if dir_mtime < scan_start - RACY_WINDOW_NS else None
+            new_dirs[rel_dir] = _DirState(trusted, files, subdirs, signature)
+            dirty = dirty or bool(changes) or old is None or old.mtime_ns != trusted or old.ignore != signature
+            yield from changes
+            stack.extend((subdir, ignore, relist) for subdir in subdirs)
+
+        # Directories that vanished or are no longer walked
+        for rel_dir, state in self.dirs.items():
+            if rel_dir not in new_dirs:
+                dirty = True
+                for name, entry in state.files.items():
+                    yield FileChange("removed", self._join(rel_dir, name), IndexEntry(*entry))
+
+        self.dirs = new_dirs
+        if dirty or not self.loaded:
+            self.save()
+            self.loaded = True
+
+    def refresh(self) -> Dict[str, int]:
+        """Bring the index up to date; returns the number of changes of each kind"""
+        counts = {"added": 0, "modified": 0, "removed": 0}
+        for change in self.changes():
+            counts[change.kind] += 1
+        return counts
+
+    def _reuse_listing(self, rel_dir: str, old: _DirState, ignore: Optional[IgnoreStack] = None):
+        """Directory listing is unchanged: only the known files can have changed"""
+        if not self.check_files:
+            return old.files, old.subdirs, []
+        if not _STAT_DIR_FD:
+            return self._list(rel_dir, old, ignore)
+        try:
+            dir_fd = os.open(self._abs(rel_dir), os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        except OSError:
+            return self._list(rel_dir, old, ignore)
+
+        files, changes = {}, []
+        try:
+            # Stat relative to the directory instead of resolving every full path
+            for name, entry in old.files.items():
+                try:
+                    current = _entry(os.stat(name, dir_fd=dir_fd, follow_symlinks=False))
+                except OSError:
+                    changes.append(FileChange("removed", self._join(rel_dir, name), IndexEntry(*entry)))
+                    continue
+                if current != entry:
+                    changes.append(FileChange("modified", self._join(rel_dir, name), IndexEntry(*current)))
+                files[name] = current
+        finally:
+            os.close(dir_fd)
+        return files, old.subdirs, changes
+
+    def _list(self, rel_dir: str, old: Optional[_DirState], ignore: Optional[IgnoreStack] = None):
+        old_files = old.files if old is not None else {}
+        files, subdirs, changes = {}, [], []
+        try:
+            with os.scandir(self._abs(rel_dir)) as entries:
+                for dir_entry in entries:
+                    rel_path = self._join(rel_dir, dir_entry.name)
+                    try:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            if self.matcher.descend(rel_path) and not (ignore is not None and ignore.ignored(rel_path, True)):
+                                subdirs.append(rel_path)
+                        elif self.matcher.matches(rel_path) and not (ignore is not None and ignore.ignored(rel_path)):
+                            files[dir_entry.name] = _entry(dir_entry.stat(follow_symlinks=False))
+                    except OSError as e:
+                        logger.debug(f"Skipping {dir_entry.path}: {e}")
+        except OSError as e:
+            logger.debug(f"Cannot scan {self._abs(rel_dir)}: {e}")
+
+        for name, entry in files.items():
+            previous = old_files.get(name)
+            if previous is None:
+                changes.append(FileChange("added", self._join(rel_dir, name), IndexEntry(*entry)))
+            elif previous != entry:
+                changes.append(FileChange("modified", self._join(rel_dir, name), IndexEntry(*entry)))
+        for name, entry in old_files.items():
+            if name not in files:
+                changes.append(FileChange("removed", self._join(rel_dir, name), IndexEntry(*entry)))
+        return files, tuple(subdirs), changes
+
+    def _abs(self, rel_path: str) -> str:
+        return os.path.join(self.root, rel_path) if rel_path else self.root
+
+    @staticmethod
+    def _join(rel_dir: str, name: str) -> str:
+        return f"{rel_dir}/{name}" if rel_dir else name
+
+    @classmethod
+    def clear(cls, name: str, index_dir: Optional[Union[str, Path]] = None) -> int:
+        """Remove the stored indexes of a PathScan; returns the number removed"""
+        removed = 0
+        for path in Path(index_dir or default_index_dir()).glob(f"{cls.safe_name(name)}-{'?' * 16}.idx"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
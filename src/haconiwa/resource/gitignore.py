@@ -0,0 +1,209 @@
+"""
+Gitignore Matcher for Haconiwa v1.0
+
+Gitignore semantics (negation, anchoring, directory-only patterns, nested
+ignore files) for the path scanner. Each ignore file is compiled once into a
+single regex per entry type; its rules are grouped into runs of the same sign
+and the alternation is ordered last run first, so one match both finds and
+decides the winning rule. Nested files are chained into an ``IgnoreStack``
+that is inherited down the walk.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+IGNORE_FILE = ".gitignore"
+EXCLUDE_FILE = os.path.join(".git", "info", "exclude")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a glob into a regex over ``/``-separated relative paths
+
+    ``**`` spans directories, ``*`` and ``?`` stay within one segment, ``\\``
+    escapes the next character, and a pattern without a ``/`` matches at any
+    depth (like .gitignore).
+    """
+    anchored = pattern.startswith("/") or "/" in pattern.strip("/")
+    pattern = pattern.strip("/")
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    regex = "".join(out)
+    return regex if anchored else "(?:.*/)?" + regex
+
+
+class IgnoreRule(NamedTuple):
+    pattern: str
+    negate: bool
+    dir_only: bool
+
+
+def parse_rules(lines: Iterable[str]) -> List[IgnoreRule]:
+    """Parse the lines of an ignore file"""
+    rules = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        # Trailing spaces are dropped unless escaped
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+        dir_only = line.endswith("/") and not line.endswith("\\/")
+        line = line.rstrip("/") if dir_only else line
+        if line:
+            rules.append(IgnoreRule(line, negate, dir_only))
+    return rules
+
+
+class GitIgnore:
+    """Rules of one ignore file, matched against paths relative to its directory"""
+
+    def __init__(self, rules: Iterable[IgnoreRule]):
+        self.rules = list(rules)
+        self._files, self._file_groups = self._compile([rule for rule in self.rules if not rule.dir_only])
+        self._dirs, self._dir_groups = self._compile(self.rules)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "GitIgnore":
+        return cls(parse_rules(lines))
+
+    @staticmethod
+    def _compile(rules: List[IgnoreRule]) -> Tuple[Optional["re.Pattern"], Dict[str, bool]]:
+        """One regex whose alternatives are same-sign runs of rules, last run first"""
+        runs: List[Tuple[bool, List[str]]] = []
+        for rule in rules:
+            regex = glob_to_regex(rule.pattern)
+            if runs and runs[-1][0] == rule.negate:
+                runs[-1][1].append(regex)
+            else:
+                runs.append((rule.negate, [regex]))
+        if not runs:
+            return None, {}
+
+        groups, alternatives = {}, []
+        for index in range(len(runs) - 1, -1, -1):
+            negate, regexes = runs[index]
+            groups[f"r{index}"] = not negate
+            alternatives.append(f"(?P<r{index}>(?:{'|'.join(regexes)})\\Z)")
+        return re.compile("|".join(alternatives), re.DOTALL), groups
+
+    def match(self, rel_path: str, is_dir: bool = False) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no rule matches"""
+        regex, groups = (self._dirs, self._dir_groups) if is_dir else (self._files, self._file_groups)
+        if regex is None:
+            return None
+        match = regex.match(rel_path)
+        return groups[match.lastgroup] if match else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], GitIgnore]] = {}
+_cache_lock = threading.Lock()
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def load_ignore_file(path: str, signature: Optional[Tuple[int, int]] = None) -> Optional[GitIgnore]:
+    """Compiled rules of an ignore file, cached until the file changes; None if missing or empty"""
+    signature = signature or file_signature(path)
+    if signature is None:
+        return None
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1] or None
+
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            ignore = GitIgnore.from_lines(f)
+    except OSError as e:
+        logger.debug(f"Cannot read {path}: {e}")
+        return None
+    with _cache_lock:
+        _cache[path] = (signature, ignore)
+    return ignore or None
+
+
+class IgnoreStack:
+    """Ignore files in effect for one directory, deepest first
+
+    Rules of deeper files take precedence over their parents. As in git, a
+    file under an ignored directory cannot be re-included, because the walker
+    never descends into it, and ``.git`` itself is always ignored.
+    """
+
+    __slots__ = ("base", "ignore", "parent", "_prefix")
+
+    def __init__(self, base: str = "", ignore: Optional[GitIgnore] = None, parent: Optional["IgnoreStack"] = None):
+        self.base = base
+        self.ignore = ignore
+        self.parent = parent
+        self._prefix = base + "/" if base else ""
+
+    @classmethod
+    def for_root(cls, root: str) -> "IgnoreStack":
+        """Stack for the walk root, holding ``.git/info/exclude``; ignore files are added per directory"""
+        return cls("", load_ignore_file(os.path.join(root, EXCLUDE_FILE)))
+
+    def child(self, rel_dir: str, ignore_path: str, signature: Optional[Tuple[int, int]] = None) -> "IgnoreStack":
+        """Stack for ``rel_dir`` given the path of its ignore file"""
+        ignore = load_ignore_file(ignore_path, signature)
+        return IgnoreStack(rel_dir, ignore, self) if ignore is not None else self
+
+    def ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Whether a path relative to the walk root is ignored"""
+        if is_dir and (rel_path == ".git" or rel_path.endswith("/.git")):
+            return True
+        level = self
+        while level is not None:
+            if level.ignore is not None and rel_path.startswith(level._prefix):
+                decision = level.ignore.match(rel_path[len(level._prefix):], is_dir)
+                if decision is not None:
+                    return decision
+            level = level.parent
+        return False
@@ -1,20 +1,42 @@
 """
 Path Scanner for Haconiwa v1.0
+
+Walks directory trees with ``os.scandir`` so file type and stat data come from
+the directory entries. Include/exclude globs are compiled once into a single
+matcher that also prunes directories nothing can match under, and subtrees are
+spread across a work-stealing thread pool. Configurations with ``gitignore``
+also honor ``.gitignore`` files found along the walk. Results are streamed as
+they are found.
 """
 
 import os
-import pathlib
-from concurrent.futures import ThreadPoolExecutor
+import queue
+import re
+import threading
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
-from fnmatch import fnmatch
-from typing import Dict, List, Optional, Set, Any
+from fnmatch import translate
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 
-from ..core.config import Config
+from .gitignore import IGNORE_FILE, IgnoreStack, glob_to_regex
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+DEFAULT_CONFIG_NAME = "default-scan"
+DEFAULT_CONFIG = {
+    "name": DEFAULT_CONFIG_NAME,
+    "include": ["**"],
+    "exclude": [".git/", ".hg/", ".svn/", "node_modules/", "__pycache__/", ".venv/", ".tox/"],
+    "gitignore": True,
+}
+
+# Files found in one directory are handed to the consumer together
+_RESULT_QUEUE_SIZE = 256
+_DONE = object()
+
 
 @dataclass
 class FileMetadata:
@@ -25,120 +47,270 @@ class FileMetadata:
     is_dir: bool
 
 
+def _literal_prefix(pattern: str) -> Optional[str]:
+    """Leading directories of an anchored pattern that contain no wildcard; None when unanchored"""
+    if not (pattern.startswith("/") or "/" in pattern.strip("/")):
+        return None
+    parts = []
+    for part in pattern.strip("/").split("/")[:-1]:
+        if any(char in part for char in "*?["):
+            break
+        parts.append(part)
+    return "/".join(parts)
+
+
+# Directory path, path relative to the walk root, and the ignore files in effect there
+_WorkItem = Tuple[str, str, Optional[IgnoreStack]]
+
+
+def _compile(patterns: Iterable[str]) -> Optional["re.Pattern"]:
+    regexes = [glob_to_regex(pattern) for pattern in patterns]
+    return re.compile("(?:" + "|".join(regexes) + r")\Z", re.DOTALL) if regexes else None
+
+
+class PathMatcher:
+    """Include/exclude globs compiled into one regex per set"""
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        include = [pattern for pattern in include if pattern]
+        exclude = [pattern for pattern in exclude if pattern]
+        self._include = _compile(include)
+        self._exclude = _compile(pattern for pattern in exclude if not pattern.endswith("/"))
+        self._exclude_dirs = _compile(exclude)
+        prefixes = [_literal_prefix(pattern) for pattern in include]
+        # Directories outside every anchored include prefix can be skipped entirely
+        self._prefixes = None if not include or None in prefixes or "" in prefixes else prefixes
+
+    def matches(self, rel_path: str) -> bool:
+        """Whether a file (relative, ``/``-separated path) is selected"""
+        if self._exclude is not None and self._exclude.match(rel_path):
+            return False
+        return self._include is None or bool(self._include.match(rel_path))
+
+    def descend(self, rel_dir: str) -> bool:
+        """Whether a directory may contain selected files"""
+        # "build/" and "build/**" both prune the build directory itself
+        if self._exclude_dirs is not None and (self._exclude_dirs.match(rel_dir) or self._exclude_dirs.match(rel_dir + "/")):
+            return False
+        if self._prefixes is None:
+            return True
+        return any(prefix == rel_dir or prefix.startswith(rel_dir + "/") or rel_dir.startswith(prefix + "/")
+                   for prefix in self._prefixes)
+
+
+def _scan_dir(path: str, rel_dir: str, matcher: PathMatcher,
+              ignore: Optional[IgnoreStack] = None) -> Tuple[List[FileMetadata], List[_WorkItem]]:
+    """Selected files and subdirectories to walk of one directory"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as iterator:
+            entries = list(iterator)
+    except OSError as e:
+        logger.debug(f"Cannot scan {path}: {e}")
+        return files, subdirs
+
+    if ignore is not None and any(entry.name == IGNORE_FILE for entry in entries):
+        ignore = ignore.child(rel_dir, os.path.join(path, IGNORE_FILE))
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if matcher.descend(rel_path) and not (ignore is not None and ignore.ignored(rel_path, True)):
+                    subdirs.append((entry.path, rel_path, ignore))
+            elif matcher.matches(rel_path) and not (ignore is not None and ignore.ignored(rel_path)):
+                stat = entry.stat(follow_symlinks=False)
+                files.append(FileMetadata(entry.path, stat.st_size, datetime.fromtimestamp(stat.st_mtime),
+                                          stat.st_mode, False))
+        except OSError as e:
+            logger.debug(f"Skipping {entry.path}: {e}")
+    return files, subdirs
+
+
+class _WorkStealingWalker:
+    """Walks a tree with per-worker deques; idle workers steal the oldest subtree of another worker"""
+
+    def __init__(self, matcher: PathMatcher, workers: int):
+        self.matcher = matcher
+        self.deques: List[Deque[_WorkItem]] = [deque() for _ in range(workers)]
+        self.results: "queue.Queue" = queue.Queue(maxsize=_RESULT_QUEUE_SIZE)
+        self.closed = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._pending = 0
+        self._running = workers
+        self._cond = threading.Condition()
+
+    def walk(self, root: str, ignore: Optional[IgnoreStack] = None) -> Iterator[FileMetadata]:
+        self._pending = 1
+        self.deques[0].append((root, "", ignore))
+        threads = [threading.Thread(target=self._work, args=(index,), name=f"path-scan-{index}", daemon=True)
+                   for index in range(len(self.deques))]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                batch = self.results.get()
+                if batch is _DONE:
+                    break
+                yield from batch
+        finally:
+            self.closed.set()
+            for thread in threads:
+                thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _work(self, index: int) -> None:
+        own = self.deques[index]
+        try:
+            while not self.closed.is_set() and self.error is None:
+                item = self._take(own, index)
+                if item is None:
+                    with self._cond:
+                        if self._pending == 0:
+                            break
+                        self._cond.wait(0.05)
+                    continue
+
+                files, subdirs = _scan_dir(*item[:2], self.matcher, item[2])
+                if subdirs:
+                    # Count children before they become stealable, so pending never drops to 0 early
+                    with self._cond:
+                        self._pending += len(subdirs)
+                        self._cond.notify_all()
+                    own.extend(subdirs)
+                if files:
+                    self._put(files)
+                with self._cond:
+                    self._pending -= 1
+                    if self._pending == 0:
+                        self._cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self._running -= 1
+                last = self._running == 0
+                self._cond.notify_all()
+            if last:
+                self._put(_DONE)
+
+    def _take(self, own: Deque[_WorkItem], index: int) -> Optional[_WorkItem]:
+        try:
+            return own.pop()
+        except IndexError:
+            pass
+        count = len(self.deques)
+        for offset in range(1, count):
+            try:
+                return self.deques[(index + offset) % count].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _put(self, item: Any) -> None:
+        while not self.closed.is_set():
+            try:
+                self.results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
 class PathScanner:
     """File path scanner with include/exclude patterns"""
-    
-    _configs = {}
-    
-    def __init__(self):
-        pass
-    
+
+    _configs = {DEFAULT_CONFIG_NAME: dict(DEFAULT_CONFIG)}
+    _matchers: Dict[str, PathMatcher] = {}
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or DEFAULT_WORKERS
+
     @classmethod
     def register_config(cls, name: str, config: Dict[str, Any]):
         """Register PathScan configuration"""
         cls._configs[name] = config
+        cls._matchers[name] = PathMatcher(config.get("include", []), config.get("exclude", []))
         logger.info(f"Registered PathScan config: {name}")
-    
-    def scan(self, config_name: str) -> List[str]:
-        """Scan files using configuration"""
-        config = self._configs.get(config_name)
-        if not config:
-            logger.error(f"PathScan config not found: {config_name}")
-            return []
-        
-        # Mock implementation - would use actual file scanning
-        include_patterns = config.get("include", [])
-        exclude_patterns = config.get("exclude", [])
-        
-        logger.info(f"Scanning with patterns - include: {include_patterns}, exclude: {exclude_patterns}")
-        
-        # Return mock results
-        return ["src/main.py", "src/utils.py", "src/config.py"]
-
-    def _load_gitignore(self, config: Config):
-        gitignore_path = pathlib.Path(".gitignore")
-        if gitignore_path.exists():
-            with open(gitignore_path) as f:
-                config.ignore_patterns = {line.strip() for line in f if line.strip() and not line.startswith("#")}
-
-    def _should_ignore(self, path: str, config: Config) -> bool:
-        path_parts = pathlib.Path(path).parts
-        return any(
-            any(fnmatch(part, pattern) for part in path_parts)
-            for pattern in config.ignore_patterns
-        )
-
-    def _get_metadata(self, path: pathlib.Path) -> FileMetadata:
-        stat = path.stat()
-        return FileMetadata(
-            path=str(path),
-            size=stat.st_size,
-            modified=datetime.fromtimestamp(stat.st_mtime),
-            mode=stat.st_mode,
-            is_dir=path.is_dir()
-        )
-
-    def _scan_directory(self, directory: pathlib.Path, config: Config) -> List[FileMetadata]:
-        results = []
-        try:
-            for entry in directory.iterdir():
-                if self._should_ignore(str(entry), config):
-                    continue
-                metadata = self._get_metadata(entry)
-                results.append(metadata)
-                if metadata.is_dir:
-                    results.extend(self._scan_directory(entry, config))
-        except PermissionError:
-            pass
-        return results
 
-    def scan_with_config(self, root_path: str, config_name: str, pattern: Optional[str] = None, parallel: bool = True) -> List[FileMetadata]:
-        config = self._configs.get(config_name)
-        if not config:
+    @classmethod
+    def has_config(cls, name: str) -> bool:
+        return name in cls._configs
+
+    @classmethod
+    def _matcher(cls, name: str) -> PathMatcher:
+        if name not in cls._matchers:
+            config = cls._configs[name]
+            cls._matchers[name] = PathMatcher(config.get("include", []), config.get("exclude", []))
+        return cls._matchers[name]
+
+    def scan(self, config_name: str, root_path: str = ".") -> Iterator[str]:
+        """Stream the relative paths of files selected by a configuration"""
+        root = os.path.join(root_path, "")
+        for metadata in self.iter_scan(root_path, config_name):
+            yield metadata.path[len(root):].replace(os.sep, "/")
+
+    def iter_scan(self, root_path: str, config_name: str, pattern: Optional[str] = None,
+                  parallel: bool = True) -> Iterator[FileMetadata]:
+        """Stream metadata of files selected by a configuration, in no particular order"""
+        if config_name not in self._configs:
             logger.error(f"PathScan config not found: {config_name}")
-            return []
-        
-        root = pathlib.Path(root_path)
-        if not root.exists():
-            return []
-
-        if not parallel:
-            results = self._scan_directory(root, config)
+            return
+        if not os.path.isdir(root_path):
+            return
+
+        matcher = self._matcher(config_name)
+        config = self._configs[config_name]
+        ignore = IgnoreStack.for_root(root_path) if config.get("gitignore") else None
+        logger.info(f"Scanning {root_path} - include: {config.get('include', [])}, exclude: {config.get('exclude', [])}")
+        if parallel and self.max_workers > 1:
+            results = _WorkStealingWalker(matcher, self.max_workers).walk(root_path, ignore)
         else:
-            with ThreadPoolExecutor() as executor:
-                first_level = [d for d in root.iterdir() if d.is_dir() and not self._should_ignore(str(d), config)]
-                results = []
-                for subdir_results in executor.map(self._scan_directory, first_level, [config] * len(first_level)):
-                    results.extend(subdir_results)
+            results = self._walk(root_path, matcher, ignore)
 
         if pattern:
-            results = [r for r in results if fnmatch(r.path, pattern)]
+            path_filter = re.compile(translate(pattern))
+            results = (metadata for metadata in results if path_filter.match(metadata.path))
+        yield from results
+
+    def scan_with_config(self, root_path: str, config_name: str, pattern: Optional[str] = None, parallel: bool = True) -> List[FileMetadata]:
+        return list(self.iter_scan(root_path, config_name, pattern, parallel))
 
-        return results
+    @staticmethod
+    def _walk(root_path: str, matcher: PathMatcher, ignore: Optional[IgnoreStack] = None) -> Iterator[FileMetadata]:
+        stack = [(root_path, "", ignore)]
+        while stack:
+            path, rel_dir, dir_ignore = stack.pop()
+            files, subdirs = _scan_dir(path, rel_dir, matcher, dir_ignore)
+            yield from files
+            stack.extend(reversed(subdirs))
+
+    def file_index(self, root_path: str, config_name: str, check_files: bool = True):
+        """Persistent index of the files a configuration selects under ``root_path``"""
+        from .file_index import FileIndex
+        config = self._configs[config_name]
+        return FileIndex(root_path, config_name, config.get("include", []), config.get("exclude", []),
+                         check_files=check_files, gitignore=bool(config.get("gitignore")))
+
+    def iter_changes(self, root_path: str, config_name: str, check_files: bool = True):
+        """Stream files added, modified or removed since the previous call for this root"""
+        if config_name not in self._configs:
+            logger.error(f"PathScan config not found: {config_name}")
+            return
+        yield from self.file_index(root_path, config_name, check_files).changes()
 
     def get_changes(self, root_path: str, config_name: str) -> Dict[str, List[FileMetadata]]:
-        current_files = {m.path: m for m in self.scan_with_config(root_path, config_name, parallel=False)}
-        
-        added = []
-        modified = []
-        removed = []
-
-        for path, metadata in current_files.items():
-            if path not in self._configs[config_name]["cache"]:
-                added.append(metadata)
-            elif self._configs[config_name]["cache"][path].modified != metadata.modified:
-                modified.append(metadata)
-
-        removed = [
-            self._configs[config_name]["cache"][path] for path in self._configs[config_name]["cache"]
-            if path.startswith(root_path) and path not in current_files
-        ]
-
-        return {
-            "added": added,
-            "modified": modified,
-            "removed": removed
-        }
+        changes = {"added": [], "modified": [], "removed": []}
+        for change in self.iter_changes(root_path, config_name):
+            entry = change.entry
+            changes[change.kind].append(FileMetadata(
+                path=os.path.join(root_path, *change.path.split("/")),
+                size=entry.size,
+                modified=datetime.fromtimestamp(entry.mtime_ns / 1e9),
+                mode=0,
+                is_dir=False
+            ))
+        return changes
 
     def clear_cache(self, config_name: str):
-        self._configs[config_name]["cache"].clear()
\ No newline at end of file
+        from .file_index import FileIndex
+        FileIndex.clear(config_name)
@@ -0,0 +1,266 @@
+"""
+Schema Cache for Haconiwa v1.0
+
+Snapshots of the tables, views, columns and indexes of each Database CRD,
+kept in memory and under ``~/.haconiwa/cache/schema``. A refresh runs one
+catalog query that returns a fingerprint per object; only objects whose
+fingerprint changed are introspected again, and snapshots checked within
+``max_age`` seconds are served without touching the database.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+from .db_fetcher import DatabaseManager, DBFetcherError
+from .engine_pool import EnginePoolError
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "HACONIWA_SCHEMA_CACHE_DIR"
+CACHE_FORMAT = 1
+# Concurrent scans within this window share one catalog check
+DEFAULT_MAX_AGE = 5.0
+
+
+class SchemaCacheError(Exception):
+    """Schema cache error"""
+    pass
+
+
+@dataclass
+class SchemaSnapshot:
+    """Schema of one database as of ``checked_at``"""
+    name: str
+    objects: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    checked_at: float = 0.0
+    fingerprinted: bool = True
+    # Objects introspected by the refresh that produced this snapshot
+    refreshed: List[str] = field(default_factory=list)
+
+    def tables(self) -> List[str]:
+        return sorted(name for name, obj in self.objects.items() if obj["type"] == "table")
+
+    def views(self) -> List[str]:
+        return sorted(name for name, obj in self.objects.items() if obj["type"] == "view")
+
+    def indexes(self) -> List[str]:
+        return sorted(index["name"] for obj in self.objects.values() for index in obj["indexes"] if index["name"])
+
+    def summary(self) -> Dict[str, List[str]]:
+        return {"tables": self.tables(), "views": self.views(), "indexes": self.indexes()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "checked_at": self.checked_at, "fingerprinted": self.fingerprinted,
+                "objects": self.objects}
+
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get(CACHE_DIR_ENV) or Path.home() / ".haconiwa" / "cache" / "schema")
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+# Fingerprint queries return (name, type, fingerprint) rows for every table and view
+def _sqlite_fingerprints(conn: Connection) -> Dict[str, Tuple[str, str]]:
+    rows = conn.execute(text(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+    )).fetchall()
+    objects = {name: kind for kind, name, _, _ in rows if kind in ("table", "view")}
+    parts: Dict[str, List[str]] = {name: [] for name in objects}
+    for kind, name, table, sql in rows:
+        if table in parts:
+            parts[table].append(f"{kind}:{name}:{sql}")
+    return {name: (kind, _digest(*parts[name])) for name, kind in objects.items()}
+
+
+_POSTGRES_FINGERPRINTS = """
+SELECT c.relname,
+       CASE WHEN c.relkind IN ('v', 'm') THEN 'view' ELSE 'table' END,
+       md5(coalesce((SELECT string_agg(a.attname || ':' || a.atttypid || ':' || a.atttypmod || ':' || a.attnotnull,
+                                       ',' ORDER BY a.attnum)
+                     FROM pg_attribute a WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped), '')
+           || '|' || coalesce((SELECT string_agg(i.indexrelid::regclass::text || ':' || i.indkey::text || ':' || i.indisunique,
+                                                 ',' ORDER BY i.indexrelid)
+                               FROM pg_index i WHERE i.indrelid = c.oid), ''))
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p', 'v', 'm')
+"""
+
+_MYSQL_FINGERPRINTS = """
+SELECT t.TABLE_NAME,
+       CASE WHEN t.TABLE_TYPE = 'VIEW' THEN 'view' ELSE 'table' END,
+       MD5(CONCAT_WS('|', t.CREATE_TIME,
+           (SELECT MD5(GROUP_CONCAT(MD5(CONCAT_WS(':', c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE, c.COLUMN_DEFAULT))
+                                    ORDER BY c.ORDINAL_POSITION))
+            FROM information_schema.COLUMNS c WHERE c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME),
+           (SELECT MD5(GROUP_CONCAT(MD5(CONCAT_WS(':', s.INDEX_NAME, s.SEQ_IN_INDEX, s.COLUMN_NAME, s.NON_UNIQUE))
+                                    ORDER BY s.INDEX_NAME, s.SEQ_IN_INDEX))
+            FROM information_schema.STATISTICS s WHERE s.TABLE_SCHEMA = t.TABLE_SCHEMA AND s.TABLE_NAME = t.TABLE_NAME)))
+FROM information_schema.TABLES t
+WHERE t.TABLE_SCHEMA = DATABASE()
+"""
+
+
+def _query_fingerprints(query: str) -> Callable[[Connection], Dict[str, Tuple[str, str]]]:
+    def fingerprints(conn: Connection) -> Dict[str, Tuple[str, str]]:
+        return {name: (kind, fingerprint) for name, kind, fingerprint in conn.execute(text(query))}
+    return fingerprints
+
+
+def _mysql_fingerprints(conn: Connection) -> Dict[str, Tuple[str, str]]:
+    # GROUP_CONCAT silently truncates at group_concat_max_len (1024 bytes by default); with one
+    # 33-byte MD5 per column this fits the 4096 columns a MySQL table can have
+    conn.execute(text("SET SESSION group_concat_max_len = 1048576"))
+    return _query_fingerprints(_MYSQL_FINGERPRINTS)(conn)
+
+
+FINGERPRINTERS: Dict[str, Callable[[Connection], Dict[str, Tuple[str, str]]]] = {
+    "sqlite": _sqlite_fingerprints,
+    "postgresql": _query_fingerprints(_POSTGRES_FINGERPRINTS),
+    "mysql": _mysql_fingerprints,
+    "mariadb": _mysql_fingerprints,
+}
+
+
+def _type_name(column_type: Any) -> str:
+    try:
+        return str(column_type)
+    except Exception:
+        return type(column_type).__name__
+
+
+def _introspect(inspector, name: str, kind: str, fingerprint: Optional[str]) -> Dict[str, Any]:
+    primary_key = set(inspector.get_pk_constraint(name).get("constrained_columns") or []) if kind == "table" else set()
+    columns = [{
+        "name": column["name"],
+        "type": _type_name(column["type"]),
+        "nullable": bool(column.get("nullable", True)),
+        "default": None if column.get("default") is None else str(column["default"]),
+        "primary_key": column["name"] in primary_key,
+    } for column in inspector.get_columns(name)]
+    indexes = [{
+        "name": index.get("name"),
+        "columns": [column for column in index.get("column_names", []) if column],
+        "unique": bool(index.get("unique")),
+    } for index in inspector.get_indexes(name)] if kind == "table" else []
+    return {"type": kind, "fingerprint": fingerprint, "columns": columns, "indexes": indexes}
+
+
+class SchemaCache:
+    """Fingerprint-checked schema snapshots of Database CRDs"""
+
+    _snapshots: Dict[Tuple[str, str], SchemaSnapshot] = {}
+    _locks: Dict[Tuple[str, str], threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, manager: Optional[DatabaseManager] = None, cache_dir: Optional[Union[str, Path]] = None,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.manager = manager or DatabaseManager()
+        self.cache_dir = Path(cache_dir or default_cache_dir())
+        self.max_age = max_age
+
+    def get(self, name: str, refresh: bool = False) -> SchemaSnapshot:
+        """Snapshot of a Database CRD, re-checked against the catalog once older than ``max_age``"""
+        key = self._key(name)
+        with self._lock(key):
+            snapshot = self._snapshots.get(key) or self._load(name, key)
+            if snapshot is not None and not refresh and time.time() - snapshot.checked_at < self.max_age:
+                return snapshot
+            previous, snapshot = snapshot, self._refresh(name, snapshot)
+            self._snapshots[key] = snapshot
+            # An unchanged schema only moves checked_at, which other processes can re-check cheaply
+            if previous is None or snapshot.refreshed or snapshot.objects.keys() != previous.objects.keys():
+                self._save(key, snapshot)
+            return snapshot
+
+    def invalidate(self, name: str) -> None:
+        key = self._key(name)
+        with self._lock(key):
+            self._snapshots.pop(key, None)
+            self._path(key).unlink(missing_ok=True)
+
+    def _refresh(self, name: str, previous: Optional[SchemaSnapshot]) -> SchemaSnapshot:
+        try:
+            engine = self.manager.engine(name)
+            fingerprinter = FINGERPRINTERS.get(engine.dialect.name)
+            with engine.connect() as conn:
+                inspector = inspect(conn)
+                if fingerprinter is not None:
+                    current = fingerprinter(conn)
+                else:
+                    current = {table: ("table", None) for table in inspector.get_table_names()}
+                    current.update({view: ("view", None) for view in inspector.get_view_names()})
+
+                old_objects = previous.objects if previous is not None else {}
+                objects, refreshed = {}, []
+                for object_name, (kind, fingerprint) in current.items():
+                    old = old_objects.get(object_name)
+                    if old is not None and fingerprint is not None and old["type"] == kind and old["fingerprint"] == fingerprint:
+                        objects[object_name] = old
+                    else:
+                        objects[object_name] = _introspect(inspector, object_name, kind, fingerprint)
+                        refreshed.append(object_name)
+        except (EnginePoolError, SQLAlchemyError) as e:
+            raise SchemaCacheError(f"Failed to read schema of {name}: {e}")
+
+        if refreshed or len(objects) != len(old_objects):
+            logger.info(f"Schema of {name}: {len(refreshed)} of {len(objects)} objects introspected")
+        return SchemaSnapshot(name, objects, time.time(), fingerprinter is not None, sorted(refreshed))
+
+    def _key(self, name: str) -> Tuple[str, str]:
+        config = self.manager._configs.get(name)
+        if not config:
+            raise DBFetcherError(f"Database config not found: {name}")
+        return name, config["dsn"]
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, key: Tuple[str, str]) -> Path:
+        name, dsn = key
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        return self.cache_dir / f"{safe_name}-{hashlib.sha256(dsn.encode('utf-8')).hexdigest()[:16]}.json"
+
+    def _load(self, name: str, key: Tuple[str, str]) -> Optional[SchemaSnapshot]:
+        try:
+            data = json.loads(self._path(key).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable schema cache for {name}: {e}")
+            return None
+        if data.get("format") != CACHE_FORMAT:
+            return None
+        return SchemaSnapshot(name, data["objects"], data["checked_at"], data["fingerprinted"])
+
+    def _save(self, key: Tuple[str, str], snapshot: SchemaSnapshot) -> None:
+        data = dict(snapshot.to_dict(), format=CACHE_FORMAT)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".schema.")
+        except OSError as e:
+            logger.warning(f"Cannot write schema cache for {snapshot.name}: {e}")
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            Path(tmp_path).unlink(missing_ok=True)
+            logger.warning(f"Cannot write schema cache for {snapshot.name}: {e}")
@@ -0,0 +1,205 @@
+"""
+Tmux command batching for Haconiwa v1.0
+
+Queues tmux commands and runs them as a single ``tmux cmd1 \\; cmd2 \\; ...``
+invocation instead of forking one tmux process per command. When control mode
+is enabled the queue is pipelined over the shared ``tmux -C`` connection instead.
+"""
+
+import subprocess
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+import logging
+
+from .control import TmuxControlError, control_mode_enabled, get_control_client, with_client_cwd
+
+logger = logging.getLogger(__name__)
+
+# Printed by tmux after every queued command so a failure can be mapped back to its step
+STEP_MARKER = "haconiwa-batch-step"
+
+
+class TmuxBatchError(Exception):
+    """Tmux batch execution error"""
+    pass
+
+
+@dataclass
+class TmuxBatchCommand:
+    """Single queued tmux command"""
+    args: List[str]
+    step: str
+    on_success: Optional[Callable[[], Any]] = None
+
+
+@dataclass
+class TmuxBatchFailure:
+    """Failed command of a batch, mapped back to its step"""
+    index: int
+    step: str
+    args: List[str]
+    error: str
+    returncode: int
+
+
+@dataclass
+class TmuxBatchResult:
+    """Result of flushing a tmux command batch"""
+    total: int
+    executed: int = 0
+    invocations: int = 0
+    failures: List[TmuxBatchFailure] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+class TmuxCommandBatch:
+    """Accumulates tmux commands and flushes them as one tmux invocation"""
+
+    def __init__(self, max_commands: int = 200):
+        self.commands: List[TmuxBatchCommand] = []
+        self.max_commands = max_commands
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def add(self, args: List[str], step: Optional[str] = None,
+            on_success: Optional[Callable[[], Any]] = None) -> int:
+        """Queue a tmux command (without the leading 'tmux') and return its index"""
+        index = len(self.commands)
+        self.commands.append(TmuxBatchCommand(
+            args=[str(arg) for arg in args],
+            step=step or " ".join(str(arg) for arg in args),
+            on_success=on_success
+        ))
+        return index
+
+    def split_window(self, target: str, vertical: bool = True, size: Optional[str] = None,
+                     step: Optional[str] = None) -> int:
+        """Queue split-window on target pane"""
+        args = ["split-window", "-v" if vertical else "-h", "-t", target]
+        if size:
+            args.extend(["-l", size])
+        return self.add(args, step)
+
+    def select_layout(self, target: str, layout: str, step: Optional[str] = None) -> int:
+        """Queue select-layout on target window"""
+        return self.add(["select-layout", "-t", target, layout], step)
+
+    def set_pane_title(self, target: str, title: str, step: Optional[str] = None,
+                       on_success: Optional[Callable[[], Any]] = None) -> int:
+        """Queue select-pane -T on target pane"""
+        return self.add(["select-pane", "-t", target, "-T", title], step, on_success)
+
+    def send_keys(self, target: str, keys: str, enter: bool = True, step: Optional[str] = None,
+                  on_success: Optional[Callable[[], Any]] = None) -> int:
+        """Queue send-keys on target pane"""
+        args = ["send-keys", "-t", target, keys]
+        if enter:
+            args.append("Enter")
+        return self.add(args, step, on_success)
+
+    def build_argv(self, commands: List[TmuxBatchCommand], start: int = 0) -> List[str]:
+        """Build tmux argv chaining commands with ';' and a step marker after each one"""
+        argv = ["tmux"]
+        for offset, command in enumerate(commands):
+            if offset:
+                argv.append(";")
+            argv.extend(self._escape(arg) for arg in command.args)
+            argv.extend([";", "display-message", "-p", f"{STEP_MARKER} {start + offset}"])
+        return argv
+
+    def flush(self, stop_on_error: bool = False) -> TmuxBatchResult:
+        """Run all queued commands and report failures per step
+
+        tmux stops a command chain at the first failing command. By default the
+        remaining commands are re-run in a new invocation so one bad pane does
+        not block the rest of the batch, matching one-process-per-command behaviour.
+        """
+        commands = self.commands
+        self.commands = []
+        result = TmuxBatchResult(total=len(commands))
+
+        if commands and control_mode_enabled():
+            try:
+                return self._flush_control(commands, result, stop_on_error)
+            except TmuxControlError as e:
+                logger.warning(f"tmux control mode unavailable, falling back to subprocess: {e}")
+
+        index = 0
+        while index < len(commands):
+            chunk = commands[index:index + self.max_commands]
+            proc = subprocess.run(self.build_argv(chunk, index), capture_output=True, text=True)
+            result.invocations += 1
+
+            completed = len(chunk) if proc.returncode == 0 else min(self._count_markers(proc.stdout), len(chunk))
+            for command in chunk[:completed]:
+                if command.on_success:
+                    command.on_success()
+            result.executed += completed
+            index += completed
+
+            if proc.returncode == 0 or completed == len(chunk):
+                continue
+
+            failed = commands[index]
+            error = proc.stderr.strip() if isinstance(proc.stderr, str) else ""
+            result.failures.append(TmuxBatchFailure(
+                index=index,
+                step=failed.step,
+                args=failed.args,
+                error=error,
+                returncode=proc.returncode
+            ))
+            logger.warning(f"tmux batch step {index + 1}/{len(commands)} failed ({failed.step}): {error}")
+            index += 1
+
+            if stop_on_error:
+                break
+
+        return result
+
+    def _flush_control(self, commands: List[TmuxBatchCommand], result: TmuxBatchResult,
+                       stop_on_error: bool) -> TmuxBatchResult:
+        """Pipeline commands over the shared control-mode client, one reply per command"""
+        client = get_control_client()
+        result.invocations = 1
+        if stop_on_error:
+            replies = []
+            for command in commands:
+                replies.append(client.command(*with_client_cwd(command.args)))
+                if replies[-1].returncode != 0:
+                    break
+        else:
+            replies = client.pipeline([with_client_cwd(command.args) for command in commands])
+
+        for index, (command, reply) in enumerate(zip(commands, replies)):
+            if reply.returncode == 0:
+                result.executed += 1
+                if command.on_success:
+                    command.on_success()
+                continue
+            result.failures.append(TmuxBatchFailure(
+                index=index,
+                step=command.step,
+                args=command.args,
+                error=reply.stderr.strip(),
+                returncode=reply.returncode
+            ))
+            logger.warning(f"tmux batch step {index + 1}/{len(commands)} failed ({command.step}): {reply.stderr.strip()}")
+        return result
+
+    @staticmethod
+    def _escape(arg: str) -> str:
+        """Escape a trailing ';' so tmux does not treat it as a command separator"""
+        if arg.endswith(";"):
+            return arg[:-1] + "\\;"
+        return arg
+
+    @staticmethod
+    def _count_markers(stdout: Any) -> int:
+        if not isinstance(stdout, str):
+            return 0
+        return sum(1 for line in stdout.splitlines() if line.startswith(STEP_MARKER))
@@ -4,7 +4,7 @@ from pathlib import Path
 import subprocess
 
 from ..space.tmux import TmuxSession
-from ..core.config import Config
+from ..core.config import get_config
 from ..core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -60,7 +60,7 @@ def build(
         else:
             typer.echo("\n🔨 --rebuild flag is set, continuing with rebuild...")
     
-    config = Config("config.yaml")
+    config = get_config("config.yaml")
     tmux = TmuxSession(config)
     
     # Check if tmux session already exists
@@ -189,7 +189,7 @@ def resize(
     size: Optional[int] = typer.Option(None, help="New size (percentage)"),
 ):
     """📐 Resize panes or change layout of a tmux company"""
-    config = Config("config.yaml")
+    config = get_config("config.yaml")
     tmux = TmuxSession(config)
     try:
         if pane_id and size:
@@ -220,7 +220,7 @@ def kill(
         if not confirm:
             raise typer.Exit()
 
-    config = Config("config.yaml")
+    config = get_config("config.yaml")
     tmux = TmuxSession(config)
     try:
         # Kill tmux session first
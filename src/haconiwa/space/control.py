@@ -0,0 +1,317 @@
+"""
+Tmux control-mode client for Haconiwa v1.0
+
+Keeps one ``tmux -C`` connection open and sends commands over its stdin,
+matching the ``%begin``/``%end``/``%error`` reply blocks back to callers.
+"""
+
+import asyncio
+import os
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Deque, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTROL_SESSION = "haconiwa-control"
+CONTROL_ENV = "HACONIWA_TMUX_CONTROL"
+
+
+class TmuxControlError(Exception):
+    """Tmux control-mode connection error"""
+    pass
+
+
+@dataclass
+class TmuxControlNotification:
+    """Asynchronous ``%`` notification sent by tmux outside of a reply block"""
+    name: str
+    args: str
+
+
+@dataclass
+class _Reply:
+    solicited: bool
+    lines: List[str] = field(default_factory=list)
+
+
+class TmuxControlClient:
+    """Long-lived tmux control-mode connection shared by space operations"""
+
+    def __init__(self, session_name: str = CONTROL_SESSION, tmux_bin: str = "tmux",
+                 receive_output: bool = False):
+        self.session_name = session_name
+        self.tmux_bin = tmux_bin
+        self.receive_output = receive_output
+        self.process: Optional[subprocess.Popen] = None
+        self._pending: Deque[Tuple[Future, List[str]]] = deque()
+        self._write_lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._subscribers: List[Callable[[TmuxControlNotification], None]] = []
+        self._closed = threading.Event()
+        self._ready = Future()
+        self._created_session = False
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None and not self._closed.is_set()
+
+    def start(self, timeout: float = 5.0) -> "TmuxControlClient":
+        """Start the control-mode client, creating its session if needed"""
+        if self.is_alive:
+            return self
+
+        self._closed.clear()
+        self._ready = Future()
+        try:
+            # new-session -A attaches to an existing session; one it creates is killed again by close()
+            self._created_session = subprocess.run(
+                [self.tmux_bin, "has-session", "-t", f"={self.session_name}"], capture_output=True
+            ).returncode != 0
+            self.process = subprocess.Popen(
+                [self.tmux_bin, "-C", "new-session", "-A", "-s", self.session_name, "-x", "80", "-y", "24"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            raise TmuxControlError(f"Failed to start tmux control client: {e}")
+
+        self._reader = threading.Thread(target=self._read_loop, name="tmux-control-reader", daemon=True)
+        self._reader.start()
+
+        try:
+            # The attach itself is answered with an unsolicited reply block
+            self._ready.result(timeout=timeout)
+        except Exception as e:
+            self.close()
+            raise TmuxControlError(f"tmux control client did not become ready: {e}")
+
+        flags = "ignore-size" if self.receive_output else "no-output,ignore-size"
+        self.command("refresh-client", "-f", flags)
+        logger.debug(f"tmux control client attached to {self.session_name}")
+        return self
+
+    def close(self) -> None:
+        """Detach the control client, killing its session if the client created it"""
+        process = self.process
+        if process is None:
+            return
+        try:
+            if process.poll() is None and process.stdin:
+                process.stdin.close()
+            process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+        finally:
+            self._fail_pending(TmuxControlError("tmux control client closed"))
+            self._closed.set()
+            self.process = None
+        if self._created_session:
+            self._created_session = False
+            self._kill_session()
+
+    def _kill_session(self) -> None:
+        """Kill the session created by start() unless another client is still attached to it"""
+        target = f"={self.session_name}"
+        try:
+            clients = subprocess.run([self.tmux_bin, "list-clients", "-t", target, "-F", "#{client_name}"],
+                                     capture_output=True, text=True, timeout=5)
+            if clients.returncode == 0 and not clients.stdout.strip():
+                subprocess.run([self.tmux_bin, "kill-session", "-t", target], capture_output=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug(f"Could not kill tmux session {self.session_name}: {e}")
+
+    def __enter__(self) -> "TmuxControlClient":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def subscribe(self, callback: Callable[[TmuxControlNotification], None]) -> Callable[[], None]:
+        """Register a notification callback and return a function that removes it"""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    def submit(self, *args: str) -> Future:
+        """Send a command without waiting; the future resolves to a CompletedProcess"""
+        if not self.is_alive:
+            raise TmuxControlError("tmux control client is not running")
+
+        future: Future = Future()
+        entry = (future, ["tmux", *args])
+        line = (self.quote_command(args) + "\n").encode("utf-8")
+        with self._write_lock:
+            # Replies arrive in send order, so queueing and writing must be atomic
+            self._pending.append(entry)
+            try:
+                self.process.stdin.write(line)
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                self._pending.remove(entry)
+                raise TmuxControlError(f"Failed to send tmux command: {e}")
+        return future
+
+    def command(self, *args: str, timeout: Optional[float] = 30.0) -> subprocess.CompletedProcess:
+        """Run a tmux command and wait for its reply"""
+        return self.submit(*args).result(timeout=timeout)
+
+    async def acommand(self, *args: str) -> subprocess.CompletedProcess:
+        """Run a tmux command from asyncio code"""
+        return await asyncio.wrap_future(self.submit(*args))
+
+    def pipeline(self, commands: Sequence[Sequence[str]],
+                 timeout: Optional[float] = 30.0) -> List[subprocess.CompletedProcess]:
+        """Send several commands back-to-back, then collect all replies"""
+        futures = [self.submit(*command) for command in commands]
+        return [future.result(timeout=timeout) for future in futures]
+
+    @staticmethod
+    def quote_command(args: Sequence[str]) -> str:
+        """Quote arguments for the tmux command parser"""
+        return " ".join(TmuxControlClient._quote(str(arg)) for arg in args)
+
+    @staticmethod
+    def _quote(arg: str) -> str:
+        if arg and all(c.isalnum() or c in "-_.:/@%=,+" for c in arg):
+            return arg
+        escaped = (arg.replace("\\", "\\\\").replace('"', '\\"').replace("$", "\\$")
+                   .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+        return f'"{escaped}"'
+
+    def _read_loop(self) -> None:
+        reply: Optional[_Reply] = None
+        try:
+            for raw in self.process.stdout:
+                # tmux may split a multibyte character across two %output lines; surrogateescape
+                # keeps the raw bytes so decode_output() can restore them
+                line = raw.decode("utf-8", errors="surrogateescape").rstrip("\n")
+
+                if reply is not None:
+                    if line.startswith(("%end ", "%error ")):
+                        self._finish(reply, line)
+                        reply = None
+                    else:
+                        reply.lines.append(raw.decode("utf-8", errors="replace").rstrip("\n"))
+                    continue
+
+                if line.startswith("%begin "):
+                    # flags == 0 marks replies to commands we did not send (the initial attach)
+                    reply = _Reply(solicited=line.rsplit(" ", 1)[-1] != "0")
+                elif line.startswith("%"):
+                    self._notify(line)
+        finally:
+            self._closed.set()
+            if not self._ready.done():
+                self._ready.set_exception(TmuxControlError("tmux control client exited"))
+            self._fail_pending(TmuxControlError("tmux control client exited"))
+
+    def _finish(self, reply: _Reply, line: str) -> None:
+        if not reply.solicited:
+            if not self._ready.done():
+                self._ready.set_result(True)
+            return
+
+        with self._write_lock:
+            entry = self._pending.popleft() if self._pending else None
+        if entry is None:
+            return
+        future, args = entry
+
+        output = "\n".join(reply.lines)
+        failed = line.startswith("%error ")
+        result = subprocess.CompletedProcess(
+            args=args,
+            returncode=1 if failed else 0,
+            stdout="" if failed else (output + "\n" if output else ""),
+            stderr=output if failed else ""
+        )
+        future.set_result(result)
+
+    def _notify(self, line: str) -> None:
+        name, _, args = line[1:].partition(" ")
+        if name == "exit":
+            return
+        notification = TmuxControlNotification(name=name, args=args)
+        for callback in list(self._subscribers):
+            try:
+                callback(notification)
+            except Exception as e:
+                logger.warning(f"tmux notification callback failed: {e}")
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self._write_lock:
+            pending, self._pending = self._pending, deque()
+        for future, _ in pending:
+            if not future.done():
+                future.set_exception(error)
+
+
+_client: Optional[TmuxControlClient] = None
+_client_lock = threading.Lock()
+_enabled: Optional[bool] = None
+
+
+def enable_control_mode(enabled: bool = True) -> None:
+    """Route run_tmux through the shared control-mode client"""
+    global _enabled
+    _enabled = enabled
+    if not enabled:
+        close_control_client()
+
+
+def control_mode_enabled() -> bool:
+    if _enabled is not None:
+        return _enabled
+    return os.environ.get(CONTROL_ENV, "").lower() in ("1", "true", "yes")
+
+
+def get_control_client() -> TmuxControlClient:
+    """Get the shared control-mode client, starting it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None or not _client.is_alive:
+            _client = TmuxControlClient().start()
+        return _client
+
+
+def close_control_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def with_client_cwd(args: Sequence[str]) -> List[str]:
+    """Pin the start directory of new panes to our cwd, as a tmux subprocess would"""
+    args = [str(arg) for arg in args]
+    if args and args[0] in ("new-session", "new-window", "split-window") and "-c" not in args:
+        return [args[0], "-c", os.getcwd(), *args[1:]]
+    return args
+
+
+def run_tmux(args: Sequence[str], check: bool = False, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    """Run a tmux command over the shared control client, or as a subprocess when control mode is off"""
+    if control_mode_enabled():
+        try:
+            result = get_control_client().command(*with_client_cwd(args), timeout=timeout or 30.0)
+        except TmuxControlError as e:
+            logger.warning(f"tmux control mode unavailable, falling back to subprocess: {e}")
+        except FutureTimeoutError:
+            raise subprocess.TimeoutExpired(["tmux", *args], timeout)
+        else:
+            if check and result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+            return result
+
+    kwargs = {}
+    if check:
+        kwargs["check"] = True
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return subprocess.run(["tmux", *args], capture_output=True, text=True, **kwargs)
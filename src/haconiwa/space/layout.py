@@ -0,0 +1,132 @@
+"""
+Grid layout engine for Haconiwa v1.0
+
+Computes the splits needed for a ``COLUMNSxROWS`` pane grid and the matching
+tmux custom layout string, so a window of any size is built with the minimal
+number of splits and a single ``select-layout`` call.
+"""
+
+import math
+import shutil
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Smallest pane tmux can split into, including the border line/column
+MIN_PANE_WIDTH = 2
+MIN_PANE_HEIGHT = 2
+
+
+class LayoutError(Exception):
+    """Invalid grid layout"""
+    pass
+
+
+@dataclass(frozen=True)
+class PaneSplit:
+    """One split-window step: split pane ``pane`` and give the new pane ``percent`` of it"""
+    pane: int
+    vertical: bool
+    percent: int
+
+
+@dataclass(frozen=True)
+class GridLayout:
+    """Pane grid of ``columns`` x ``rows`` panes, numbered row-major"""
+    columns: int
+    rows: int
+
+    def __post_init__(self):
+        if self.columns < 1 or self.rows < 1:
+            raise LayoutError(f"Grid must have at least one column and row: {self.columns}x{self.rows}")
+
+    @classmethod
+    def parse(cls, grid: str) -> "GridLayout":
+        """Parse a ``COLUMNSxROWS`` grid string such as "8x4" """
+        try:
+            columns, rows = (int(part) for part in grid.lower().split("x"))
+        except (AttributeError, ValueError):
+            raise LayoutError(f"Invalid grid '{grid}', expected COLUMNSxROWS (e.g. 8x4)")
+        return cls(columns, rows)
+
+    @classmethod
+    def for_pane_count(cls, pane_count: int) -> "GridLayout":
+        """Smallest near-square grid holding ``pane_count`` panes"""
+        columns = max(1, math.ceil(math.sqrt(pane_count)))
+        rows = max(1, math.ceil(pane_count / columns))
+        return cls(columns, rows)
+
+    @property
+    def pane_count(self) -> int:
+        return self.columns * self.rows
+
+    def __str__(self) -> str:
+        return f"{self.columns}x{self.rows}"
+
+    def splits(self) -> List[PaneSplit]:
+        """Minimal split sequence (pane_count - 1 splits) leaving panes in row-major order
+
+        Rows are cut first by repeatedly splitting the bottom pane, then each row
+        is cut into columns from the last row up so earlier pane indexes never shift.
+        """
+        steps = []
+        for row in range(self.rows - 1):
+            remaining = self.rows - row
+            steps.append(PaneSplit(pane=row, vertical=True, percent=(remaining - 1) * 100 // remaining))
+        for row in reversed(range(self.rows)):
+            for column in range(self.columns - 1):
+                remaining = self.columns - column
+                steps.append(PaneSplit(pane=row + column, vertical=False,
+                                       percent=(remaining - 1) * 100 // remaining))
+        return steps
+
+    def min_size(self) -> Tuple[int, int]:
+        """Smallest window size that fits the grid"""
+        return self.columns * MIN_PANE_WIDTH - 1, self.rows * MIN_PANE_HEIGHT - 1
+
+    def window_size(self, width: Optional[int] = None, height: Optional[int] = None) -> Tuple[int, int]:
+        """Window size for the grid: the terminal size, grown if the grid would not fit"""
+        if width is None or height is None:
+            terminal = shutil.get_terminal_size((200, 50))
+            width = width or terminal.columns
+            height = height or terminal.lines
+        min_width, min_height = self.min_size()
+        return max(width, min_width), max(height, min_height)
+
+    def layout_string(self, width: int, height: int) -> str:
+        """tmux custom layout for the grid, prefixed with its checksum"""
+        min_width, min_height = self.min_size()
+        if width < min_width or height < min_height:
+            raise LayoutError(f"Window {width}x{height} is too small for a {self} grid")
+
+        row_heights = _distribute(height, self.rows)
+        column_widths = _distribute(width, self.columns)
+
+        rows = []
+        y = 0
+        for row, row_height in enumerate(row_heights):
+            cells = []
+            x = 0
+            for column, column_width in enumerate(column_widths):
+                cells.append(f"{column_width}x{row_height},{x},{y},{row * self.columns + column}")
+                x += column_width + 1
+            rows.append(cells[0] if len(cells) == 1 else f"{width}x{row_height},0,{y}{{{','.join(cells)}}}")
+            y += row_height + 1
+
+        body = rows[0] if len(rows) == 1 else f"{width}x{height},0,0[{','.join(rows)}]"
+        return f"{layout_checksum(body):04x},{body}"
+
+
+def _distribute(total: int, parts: int) -> List[int]:
+    """Split ``total`` cells into ``parts`` sizes separated by 1-cell borders"""
+    usable = total - (parts - 1)
+    base, extra = divmod(usable, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def layout_checksum(layout: str) -> int:
+    """Checksum tmux expects in front of a custom layout string"""
+    checksum = 0
+    for char in layout:
+        checksum = (checksum >> 1) + ((checksum & 1) << 15)
+        checksum = (checksum + ord(char)) & 0xffff
+    return checksum
@@ -2,12 +2,18 @@
 Space Manager for Haconiwa v1.0 - 32 Pane Support
 """
 
+import math
+import os
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import logging
 
 from ..core.crd.models import SpaceCRD
+from ..task.assignments import AssignmentIndex
+from .batch import TmuxCommandBatch
+from .control import run_tmux
+from .layout import GridLayout, LayoutError
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +38,7 @@ class SpaceManager:
         if not self._initialized:
             self.active_sessions = {}
             self.task_assignments = {}  # Direct task assignment storage: {assignee: task_info}
+            self._assignment_indexes = {}  # Loaded assignment indexes: {absolute base path: AssignmentIndex}
             SpaceManager._initialized = True
     
     def set_task_assignments(self, task_assignments: Dict[str, Dict[str, Any]]):
@@ -54,6 +61,9 @@ class SpaceManager:
             
             logger.info(f"Creating multiroom session: {session_name} with {len(rooms)} rooms")
             
+            # Assignment indexes are loaded once per apply
+            self._reset_assignment_index(base_path)
+            
             # Create base directory structure
             base_path.mkdir(parents=True, exist_ok=True)
             
@@ -76,8 +86,13 @@ class SpaceManager:
             # Generate desk mappings with organization info
             desk_mappings = self.generate_desk_mappings(organizations)
             
+            # Calculate panes per window and size windows so the grid fits
+            layout_info = self._calculate_panes_per_window(grid, len(rooms))
+            panes_per_window = layout_info["panes_per_window"]
+            window_size = GridLayout.parse(layout_info["layout_per_window"]).window_size()
+            
             # Create tmux session (initial window 0)
-            self._create_tmux_session(session_name)
+            self._create_tmux_session(session_name, window_size)
             
             # Configure pane borders and titles (same as company build)
             self._configure_pane_borders(session_name)
@@ -90,35 +105,31 @@ class SpaceManager:
             # Distribute desks to windows
             desk_distribution = self._distribute_desks_to_windows(desk_mappings)
             
-            # Calculate panes per window
-            layout_info = self._calculate_panes_per_window(grid, len(rooms))
-            panes_per_window = layout_info["panes_per_window"]
-            
             # Create panes in each window and set up desks
             for room_id, desks_in_room in desk_distribution.items():
                 window_id = self._get_window_id_for_room(room_id)
                 
                 # Create panes in this window
-                if not self._create_panes_in_window(session_name, window_id, panes_per_window):
+                batch = TmuxCommandBatch()
+                pane_count = max(panes_per_window, len(desks_in_room))
+                if not self._create_panes_in_window(session_name, window_id, pane_count, batch,
+                                                    layout_info["layout_per_window"], window_size):
                     logger.warning(f"Failed to create panes in window {window_id}")
                     continue
                 
                 # Set up each desk in the window
                 for pane_index, desk_mapping in enumerate(desks_in_room):
                     desk_dir = self._create_desk_directory(base_path, desk_mapping)
-                    self._update_pane_in_window(session_name, window_id, pane_index, desk_mapping, desk_dir)
+                    self._update_pane_in_window(session_name, window_id, pane_index, desk_mapping, desk_dir, batch)
+                
+                # Splits, layout and pane setup for the whole window run as one tmux invocation
+                result = batch.flush()
+                if not result.ok:
+                    logger.warning(f"{len(result.failures)} of {result.total} tmux commands failed in window {window_id}")
+                self._flush_assignment_indexes(base_path)
             
             # Store session info
-            self.active_sessions[session_name] = {
-                "config": config,
-                "desk_mappings": desk_mappings,
-                "desk_distribution": desk_distribution,
-                "pane_count": len(desk_mappings),
-                "window_count": len(rooms),
-                "layout_info": layout_info,
-                "tasks_path": str(tasks_path),
-                "main_repo_path": str(main_repo_path)
-            }
+            self._store_session_info(config, desk_mappings, desk_distribution, layout_info)
             
             logger.info(f"Multiroom session created successfully: {session_name}")
             logger.info(f"  Windows: {len(rooms)}, Total panes: {len(desk_mappings)}")
@@ -130,6 +141,21 @@ class SpaceManager:
             logger.error(f"Failed to create multiroom session {config.get('name', 'unknown')}: {e}")
             return False
     
+    def _store_session_info(self, config: Dict[str, Any], desk_mappings: List[Dict[str, Any]],
+                            desk_distribution: Dict[str, List[Dict[str, Any]]], layout_info: Dict[str, Any]):
+        """Remember the structure of a session for later pane updates"""
+        tasks_path = Path(config.get("base_path", f"./{config['name']}")) / "tasks"
+        self.active_sessions[config["name"]] = {
+            "config": config,
+            "desk_mappings": desk_mappings,
+            "desk_distribution": desk_distribution,
+            "pane_count": len(desk_mappings),
+            "window_count": len(config.get("rooms", [])),
+            "layout_info": layout_info,
+            "tasks_path": str(tasks_path),
+            "main_repo_path": str(tasks_path / "main")
+        }
+    
     def generate_desk_mappings(self, organizations: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Generate 32-desk mappings (4 orgs × 4 roles × 2 rooms) with organization names"""
         if not organizations:
@@ -243,10 +269,16 @@ class SpaceManager:
         
         return config
     
-    def _create_tmux_session(self, session_name: str):
+    def session_exists(self, session_name: str) -> bool:
+        """Check whether a tmux session is running"""
+        return run_tmux(["has-session", "-t", session_name]).returncode == 0
+    
+    def _create_tmux_session(self, session_name: str, window_size: Optional[Tuple[int, int]] = None):
         """Create tmux session"""
-        cmd = ["tmux", "new-session", "-d", "-s", session_name]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        cmd = ["new-session", "-d", "-s", session_name]
+        if window_size:
+            cmd.extend(["-x", str(window_size[0]), "-y", str(window_size[1])])
+        result = run_tmux(cmd)
         if result.returncode != 0:
             raise SpaceManagerError(f"Failed to create tmux session: {result.stderr}")
     
@@ -259,12 +291,12 @@ class SpaceManager:
                 
                 if i == 0:
                     # Rename the initial window (window 0)
-                    cmd = ["tmux", "rename-window", "-t", f"{session_name}:0", window_name]
+                    cmd = ["rename-window", "-t", f"{session_name}:0", window_name]
                 else:
                     # Create new window
-                    cmd = ["tmux", "new-window", "-t", session_name, "-n", window_name]
+                    cmd = ["new-window", "-t", session_name, "-n", window_name]
                 
-                result = subprocess.run(cmd, capture_output=True, text=True)
+                result = run_tmux(cmd)
                 if result.returncode != 0:
                     logger.error(f"Failed to create window {i} ({window_name}): {result.stderr}")
                     return False
@@ -277,106 +309,57 @@ class SpaceManager:
             logger.error(f"Error creating windows for rooms: {e}")
             return False
     
-    def _create_panes_in_window(self, session_name: str, window_id: str, pane_count: int) -> bool:
-        """Create panes in specific tmux window (4x4 layout for 16 panes) - using proven logic from tmux.py"""
+    def _create_panes_in_window(self, session_name: str, window_id: str, pane_count: int,
+                                batch: Optional[TmuxCommandBatch] = None, layout: Optional[str] = None,
+                                window_size: Optional[Tuple[int, int]] = None) -> bool:
+        """Create panes in specific tmux window as a COLUMNSxROWS grid (4x4 for 16 panes)
+
+        The grid is built with the minimal number of splits and sized with one
+        select-layout call. Commands are queued on ``batch`` when given, otherwise
+        they run as one tmux invocation.
+        """
         try:
-            # Use the same proven logic from company build (tmux.py)
-            # Create 4x4 pane layout (16 panes total)
-            
-            # Split vertically 3 times to create 4 rows
-            cmd = ["tmux", "split-window", "-v", "-t", f"{session_name}:{window_id}.0"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create vertical split 1 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-v", "-t", f"{session_name}:{window_id}.0"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create vertical split 2 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-v", "-t", f"{session_name}:{window_id}.1"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create vertical split 3 in window {window_id}: {result.stderr}")
-            
-            # Split each row horizontally 3 times to create 4 columns
-            # Row 1 (panes 0-3)
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.0"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row1-1 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.0"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row1-2 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.1"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row1-3 in window {window_id}: {result.stderr}")
-            
-            # Row 2 (panes 4-7)
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.4"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row2-1 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.4"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row2-2 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.5"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row2-3 in window {window_id}: {result.stderr}")
-            
-            # Row 3 (panes 8-11)
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.8"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row3-1 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.8"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row3-2 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.9"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row3-3 in window {window_id}: {result.stderr}")
-            
-            # Row 4 (panes 12-15)
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.12"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row4-1 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.12"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row4-2 in window {window_id}: {result.stderr}")
-            
-            cmd = ["tmux", "split-window", "-h", "-t", f"{session_name}:{window_id}.13"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to create horizontal split row4-3 in window {window_id}: {result.stderr}")
-            
-            # Apply tiled layout for even distribution
-            cmd = ["tmux", "select-layout", "-t", f"{session_name}:{window_id}", "tiled"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                logger.warning(f"Failed to apply tiled layout to window {window_id}: {result.stderr}")
-            
-            logger.info(f"Created {pane_count} panes in window {window_id} (4x4 layout)")
+            grid = GridLayout.parse(layout) if layout else GridLayout.for_pane_count(pane_count)
+            if grid.pane_count < pane_count:
+                grid = GridLayout.for_pane_count(pane_count)
+            width, height = grid.window_size(*(window_size or self._get_window_size(session_name, window_id)))
+            
+            own_batch = batch is None
+            if own_batch:
+                batch = TmuxCommandBatch()
+            target = f"{session_name}:{window_id}"
+            
+            # Split rows first, then each row into columns; panes end up numbered row-major
+            for step, split in enumerate(grid.splits(), start=1):
+                batch.split_window(f"{target}.{split.pane}", vertical=split.vertical, size=f"{split.percent}%",
+                                   step=f"split {step} in window {window_id}")
+            
+            # Apply the precomputed grid layout in one call instead of re-tiling
+            batch.select_layout(target, grid.layout_string(width, height),
+                                step=f"{grid} layout for window {window_id}")
+            
+            if own_batch:
+                result = batch.flush()
+                if not result.ok:
+                    logger.warning(f"{len(result.failures)} of {result.total} pane commands failed in window {window_id}")
+            
+            logger.info(f"Created {grid.pane_count} panes in window {window_id} ({grid} layout)")
             return True
             
         except Exception as e:
             logger.error(f"Failed to create panes in window {window_id}: {e}")
             return False
     
+    def _get_window_size(self, session_name: str, window_id: str) -> Tuple[Optional[int], Optional[int]]:
+        """Get current size of a tmux window"""
+        result = run_tmux(["display-message", "-p", "-t", f"{session_name}:{window_id}",
+                           "#{window_width} #{window_height}"])
+        try:
+            width, height = (int(value) for value in result.stdout.split())
+            return width, height
+        except (AttributeError, TypeError, ValueError):
+            return None, None
+    
     def _distribute_desks_to_windows(self, desk_mappings: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Distribute desk mappings to windows based on room_id"""
         distribution = {}
@@ -446,15 +429,19 @@ class SpaceManager:
         return None
     
     def _update_pane_in_window(self, session_name: str, window_id: str, pane_index: int, 
-                              mapping: Dict[str, Any], desk_dir: Path) -> bool:
-        """Update pane directory and title in specific window with task assignment or standby location"""
+                              mapping: Dict[str, Any], desk_dir: Path,
+                              batch: Optional[TmuxCommandBatch] = None) -> bool:
+        """Update pane directory and title in specific window with task assignment or standby location
+
+        When ``batch`` is given the tmux commands are only queued and run on the caller's flush.
+        """
         try:
             # Check for task assignment first using log files
             agent_id = self._get_agent_id_from_pane_mapping(mapping)
             base_path = desk_dir  # desk_dir is now the base_path directly
             
             # Try to update from task logs (for agents with task assignments)
-            task_updated = self._update_pane_from_task_logs(session_name, window_id, pane_index, mapping, base_path)
+            task_updated = self._update_pane_from_task_logs(session_name, window_id, pane_index, mapping, base_path, batch)
             
             if task_updated:
                 # Agent was moved to task directory via task logs
@@ -462,95 +449,83 @@ class SpaceManager:
                 return True
             
             # No task assignment - move to standby location
-            standby_dir = base_path / "standby"
-            standby_dir.mkdir(exist_ok=True)
-            
-            # Create standby README if it doesn't exist
-            readme_file = standby_dir / "README.md"
-            if not readme_file.exists():
-                with open(readme_file, 'w', encoding='utf-8') as f:
-                    f.write("# 待機中エージェント\n\n")
-                    f.write("このディレクトリには、現在タスクが割り当てられていないエージェントが配置されています。\n\n")
-                    f.write("## エージェント状況\n")
-                    f.write("- タスク割り当てありエージェント → `../tasks/` ディレクトリ\n")
-                    f.write("- タスク待機中エージェント → このディレクトリ\n\n")
-                    f.write("新しいタスクが作成されると、自動的にタスクディレクトリに移動します。\n")
-            
-            # Move pane to standby directory
-            absolute_standby_dir = standby_dir.absolute()
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_id}.{pane_index}", f"cd {absolute_standby_dir}", "Enter"]
-            result1 = subprocess.run(cmd, capture_output=True, text=True)
+            standby_dir = self._ensure_standby_dir(base_path)
             
-            # Set standby pane title
-            org_name = mapping.get("title", f"Agent {agent_id}").split(" - ")[0]  # Extract org name
-            room_name = mapping.get("title", "").split(" - ")[-1] if " - " in mapping.get("title", "") else "Unknown Room"
-            standby_title = f"{org_name} - 待機中 - {room_name}"
-            cmd = ["tmux", "select-pane", "-t", f"{session_name}:{window_id}.{pane_index}", "-T", standby_title]
-            result2 = subprocess.run(cmd, capture_output=True, text=True)
+            # Move pane to standby directory and set standby pane title
+            absolute_standby_dir = standby_dir.absolute()
+            standby_title = self._standby_title(mapping, agent_id)
             
-            if result1.returncode == 0 and result2.returncode == 0:
+            def on_placed():
                 logger.info(f"📍 Agent {agent_id} placed in standby location: {absolute_standby_dir}")
-                return True
-            else:
+            
+            own_batch = batch is None
+            if own_batch:
+                batch = TmuxCommandBatch()
+            target = f"{session_name}:{window_id}.{pane_index}"
+            batch.send_keys(target, f"cd {absolute_standby_dir}", step=f"cd standby for {agent_id}")
+            batch.set_pane_title(target, standby_title, step=f"standby title for {agent_id}", on_success=on_placed)
+            
+            if own_batch and not batch.flush().ok:
                 logger.error(f"Failed to place agent {agent_id} in standby location")
                 return False
+            return True
             
         except Exception as e:
             logger.error(f"Failed to update pane {pane_index} in window {window_id}: {e}")
             return False
     
+    def _ensure_standby_dir(self, base_path: Path) -> Path:
+        """Create the standby directory (with its README) for agents without a task"""
+        standby_dir = base_path / "standby"
+        standby_dir.mkdir(exist_ok=True)
+        
+        # Create standby README if it doesn't exist
+        readme_file = standby_dir / "README.md"
+        if not readme_file.exists():
+            with open(readme_file, 'w', encoding='utf-8') as f:
+                f.write("# 待機中エージェント\n\n")
+                f.write("このディレクトリには、現在タスクが割り当てられていないエージェントが配置されています。\n\n")
+                f.write("## エージェント状況\n")
+                f.write("- タスク割り当てありエージェント → `../tasks/` ディレクトリ\n")
+                f.write("- タスク待機中エージェント → このディレクトリ\n\n")
+                f.write("新しいタスクが作成されると、自動的にタスクディレクトリに移動します。\n")
+        return standby_dir
+    
+    def _standby_title(self, mapping: Dict[str, Any], agent_id: str) -> str:
+        """Pane title of an agent waiting in standby"""
+        org_name = mapping.get("title", f"Agent {agent_id}").split(" - ")[0]  # Extract org name
+        room_name = mapping.get("title", "").split(" - ")[-1] if " - " in mapping.get("title", "") else "Unknown Room"
+        return f"{org_name} - 待機中 - {room_name}"
+    
+    def _task_title(self, mapping: Dict[str, Any], task_name: str) -> str:
+        """Pane title of an agent working on a task"""
+        original_title = mapping.get("title", f"Desk {mapping['desk_id']}")
+        return f"{original_title} [Task: {task_name}]"
+    
     def _update_pane_from_task_logs(self, session_name: str, window_id: str, pane_index: int,
-                                   mapping: Dict[str, Any], base_path: Path) -> bool:
+                                   mapping: Dict[str, Any], base_path: Path,
+                                   batch: Optional[TmuxCommandBatch] = None) -> bool:
         """Update pane directory based on task assignment logs"""
         try:
-            import json
-            from pathlib import Path
-            
             # Generate agent ID from pane mapping
             agent_id = self._get_agent_id_from_pane_mapping(mapping)
             logger.debug(f"Checking task logs for agent {agent_id} (pane {window_id}.{pane_index})")
             
-            # Look for task assignment logs in tasks directory
-            tasks_path = base_path / "tasks"
-            if not tasks_path.exists():
-                logger.debug(f"No tasks directory found: {tasks_path}")
-                return False
-            
-            # Search through all task directories for agent assignment logs
+            # Look up the agent in the space's assignment index (loaded once per apply)
+            task_info = self._get_assignment_index(base_path).get(agent_id, session_name)
             assigned_task_dir = None
-            task_info = None
-            
-            for task_dir in tasks_path.iterdir():
-                if task_dir.is_dir() and task_dir.name != "main":
-                    log_file = task_dir / ".haconiwa" / "agent_assignment.json"
-                    if log_file.exists():
-                        try:
-                            with open(log_file, 'r', encoding='utf-8') as f:
-                                assignments = json.load(f)
-                                if not isinstance(assignments, list):
-                                    assignments = [assignments]
-                                
-                                # Check if this agent is assigned to this task
-                                for assignment in assignments:
-                                    if (assignment.get("agent_id") == agent_id and 
-                                        assignment.get("space_session") == session_name and
-                                        assignment.get("status") == "active"):
-                                        
-                                        assigned_task_dir = task_dir
-                                        task_info = assignment
-                                        logger.info(f"Found task assignment: {agent_id} → {task_dir.name}")
-                                        break
-                                
-                                if assigned_task_dir:
-                                    break
-                                    
-                        except Exception as e:
-                            logger.warning(f"Could not read assignment log {log_file}: {e}")
+            if task_info:
+                assigned_task_dir = Path(task_info["task_dir"])
+                if assigned_task_dir.is_dir():
+                    logger.info(f"Found task assignment: {agent_id} → {assigned_task_dir.name}")
+                else:
+                    logger.warning(f"Indexed task directory no longer exists: {assigned_task_dir}")
+                    assigned_task_dir = None
             
             # If agent has task assignment, move to task directory
             if assigned_task_dir and task_info:
                 return self._move_pane_to_task_directory(session_name, window_id, pane_index, 
-                                                       assigned_task_dir, task_info, mapping)
+                                                       assigned_task_dir, task_info, mapping, batch)
             else:
                 logger.debug(f"No active task assignment found for agent {agent_id}")
                 return False  # No task assigned - proceed to standby placement
@@ -559,8 +534,35 @@ class SpaceManager:
             logger.error(f"Error updating pane from task logs: {e}")
             return False
     
+    def _get_assignment_index(self, base_path: Path) -> AssignmentIndex:
+        """Get the assignment index of a space, loading it on first use"""
+        indexes = getattr(self, '_assignment_indexes', None)
+        if indexes is None:
+            indexes = self._assignment_indexes = {}
+        key = str(Path(base_path).absolute())
+        if key not in indexes:
+            indexes[key] = AssignmentIndex(base_path).load()
+        return indexes[key]
+    
+    def _reset_assignment_index(self, base_path: Path):
+        """Drop the loaded index of one space so it is re-read on next use"""
+        getattr(self, '_assignment_indexes', {}).pop(str(Path(base_path).absolute()), None)
+    
+    def _flush_assignment_indexes(self, base_path: Optional[Path] = None):
+        """Write pane updates deferred on the loaded assignment indexes (of one space if given)"""
+        indexes = getattr(self, '_assignment_indexes', {})
+        if base_path is not None:
+            key = str(Path(base_path).absolute())
+            indexes = {key: indexes[key]} if key in indexes else {}
+        for index in list(indexes.values()):
+            try:
+                index.flush()
+            except Exception as e:
+                logger.warning(f"Failed to update assignment index {index.index_file}: {e}")
+    
     def _move_pane_to_task_directory(self, session_name: str, window_id: str, pane_index: int,
-                                   task_dir: Path, task_info: Dict[str, Any], mapping: Dict[str, Any]) -> bool:
+                                   task_dir: Path, task_info: Dict[str, Any], mapping: Dict[str, Any],
+                                   batch: Optional[TmuxCommandBatch] = None) -> bool:
         """Move pane to assigned task directory"""
         try:
             agent_id = task_info["agent_id"]
@@ -569,30 +571,33 @@ class SpaceManager:
             # IMPORTANT: Use absolute path for cd command
             absolute_task_dir = task_dir.absolute()
             
-            # Update pane working directory to task directory
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_id}.{pane_index}", 
-                   f"cd {absolute_task_dir}", "Enter"]
-            result1 = subprocess.run(cmd, capture_output=True, text=True)
-            
             # Update pane title to include task info
-            original_title = mapping.get("title", f"Desk {mapping['desk_id']}")
-            new_title = f"{original_title} [Task: {task_name}]"
-            cmd = ["tmux", "select-pane", "-t", f"{session_name}:{window_id}.{pane_index}", "-T", new_title]
-            result2 = subprocess.run(cmd, capture_output=True, text=True)
+            new_title = self._task_title(mapping, task_name)
             
-            if result1.returncode == 0 and result2.returncode == 0:
+            def on_moved():
                 logger.info(f"✅ Moved agent {agent_id} to task directory: {absolute_task_dir}")
                 logger.info(f"   📍 Pane: {window_id}.{pane_index}")
                 logger.info(f"   📝 Task: {task_name}")
                 
                 # Update agent assignment log with actual pane information
                 self._update_agent_assignment_log_with_pane_info(task_dir, agent_id, session_name, window_id, pane_index)
-                
-                return True
-            else:
-                logger.error(f"Failed to move pane {window_id}.{pane_index} to task directory")
-                logger.error(f"   send-keys result: {result1.returncode}, select-pane result: {result2.returncode}")
-                return False
+            
+            own_batch = batch is None
+            if own_batch:
+                batch = TmuxCommandBatch()
+            target = f"{session_name}:{window_id}.{pane_index}"
+            batch.send_keys(target, f"cd {absolute_task_dir}", step=f"cd task {task_name} for {agent_id}")
+            batch.set_pane_title(target, new_title, step=f"task title for {agent_id}", on_success=on_moved)
+            
+            if own_batch:
+                result = batch.flush()
+                if not result.ok:
+                    logger.error(f"Failed to move pane {window_id}.{pane_index} to task directory")
+                    for failure in result.failures:
+                        logger.error(f"   {failure.step}: {failure.error}")
+                    return False
+                self._flush_assignment_indexes(task_dir.parent.parent)
+            return True
                 
         except Exception as e:
             logger.error(f"Error moving pane to task directory: {e}")
@@ -636,6 +641,9 @@ class SpaceManager:
                 # Save updated log
                 with open(log_file, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=2, ensure_ascii=False)
+                # Index is written once per window, see _flush_assignment_indexes
+                self._get_assignment_index(task_dir.parent.parent).update_pane(
+                    agent_id, session_name, window_id, pane_index, defer=True)
                 logger.info(f"✅ Updated agent assignment log with pane info: {log_file}")
                 return True
             else:
@@ -674,20 +682,23 @@ class SpaceManager:
                 return "0"
     
     def _calculate_panes_per_window(self, grid: str, room_count: int) -> Dict[str, Any]:
-        """Calculate panes per window based on grid and room count"""
-        if grid == "8x4" and room_count == 2:
-            return {
-                "total_panes": 32,
-                "panes_per_window": 16,
-                "layout_per_window": "4x4"
-            }
-        else:
+        """Calculate panes per window based on grid and room count
+
+        The COLUMNSxROWS grid spans all rooms, so its columns are shared out between windows.
+        """
+        try:
+            layout = GridLayout.parse(grid)
+        except LayoutError as e:
             # Default fallback
-            return {
-                "total_panes": 16,
-                "panes_per_window": 16,
-                "layout_per_window": "4x4"
-            }
+            logger.warning(f"{e}, using 4x4")
+            layout = GridLayout(4, 4)
+        
+        window_layout = GridLayout(math.ceil(layout.columns / max(room_count, 1)), layout.rows)
+        return {
+            "total_panes": layout.pane_count,
+            "panes_per_window": window_layout.pane_count,
+            "layout_per_window": str(window_layout)
+        }
     
     def create_room_layout(self, session_name: str, room_config: Dict[str, Any]) -> bool:
         """Create layout for specific room"""
@@ -719,8 +730,8 @@ class SpaceManager:
     def update_pane_title(self, session_name: str, pane_index: int, config: Dict[str, Any]) -> bool:
         """Update tmux pane title"""
         title = config.get("title", f"Pane {pane_index}")
-        cmd = ["tmux", "select-pane", "-t", f"{session_name}:0.{pane_index}", "-T", title]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        cmd = ["select-pane", "-t", f"{session_name}:0.{pane_index}", "-T", title]
+        result = run_tmux(cmd)
         return result.returncode == 0
     
     def create_task_worktree(self, task_config: Dict[str, Any]) -> bool:
@@ -750,8 +761,8 @@ class SpaceManager:
         """Switch to specific room (tmux window)"""
         try:
             window_id = self._get_window_id_for_room(room_id)
-            cmd = ["tmux", "select-window", "-t", f"{session_name}:{window_id}"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = ["select-window", "-t", f"{session_name}:{window_id}"]
+            result = run_tmux(cmd)
             
             if result.returncode == 0:
                 logger.info(f"Switched to {room_id} (window {window_id})")
@@ -764,23 +775,20 @@ class SpaceManager:
             logger.error(f"Failed to switch to room {room_id}: {e}")
             return False
     
-    def calculate_layout(self, grid: str) -> Dict[str, Any]:
+    def calculate_layout(self, grid: str, room_count: int = 2) -> Dict[str, Any]:
         """Calculate layout parameters"""
-        if grid == "8x4":
-            return {
-                "columns": 8,
-                "rows": 4,
-                "total_panes": 32,
-                "panes_per_room": 16
-            }
-        else:
+        try:
+            layout = GridLayout.parse(grid)
+        except LayoutError:
             # Default fallback
-            return {
-                "columns": 4,
-                "rows": 4,
-                "total_panes": 16,
-                "panes_per_room": 16
-            }
+            layout = GridLayout(4, 4)
+        
+        return {
+            "columns": layout.columns,
+            "rows": layout.rows,
+            "total_panes": layout.pane_count,
+            "panes_per_room": self._calculate_panes_per_window(str(layout), room_count)["panes_per_window"]
+        }
     
     def distribute_organizations(self, organizations: List[Dict[str, Any]], room_count: int) -> List[Dict[str, Any]]:
         """Distribute organizations across rooms"""
@@ -801,8 +809,8 @@ class SpaceManager:
         """Clean up tmux session and optionally data"""
         try:
             # Kill tmux session
-            cmd = ["tmux", "kill-session", "-t", session_name]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            cmd = ["kill-session", "-t", session_name]
+            result = run_tmux(cmd)
             
             # Remove from active sessions
             if session_name in self.active_sessions:
@@ -837,8 +845,7 @@ class SpaceManager:
         
         try:
             # Get actual tmux sessions
-            result = subprocess.run(['tmux', 'list-sessions', '-F', '#{session_name}:#{session_windows}'], 
-                                   capture_output=True, text=True)
+            result = run_tmux(['list-sessions', '-F', '#{session_name}:#{session_windows}'])
             
             if result.returncode != 0:
                 logger.warning("No tmux sessions found or tmux not available")
@@ -854,8 +861,7 @@ class SpaceManager:
                     # Check if this looks like a haconiwa session
                     if self._is_haconiwa_session(session_name):
                         # Get pane count for this specific session only
-                        pane_result = subprocess.run(['tmux', 'list-panes', '-t', session_name, '-a', '-F', '#{session_name}:#{window_index}.#{pane_index}'], 
-                                                   capture_output=True, text=True)
+                        pane_result = run_tmux(['list-panes', '-t', session_name, '-a', '-F', '#{session_name}:#{window_index}.#{pane_index}'])
                         
                         if pane_result.returncode == 0:
                             # Count panes that belong to this session only
@@ -902,11 +908,11 @@ class SpaceManager:
         """Configure pane borders and titles (same as company build)"""
         try:
             # Configure pane borders and titles
-            cmd1 = ["tmux", "set-option", "-t", session_name, "pane-border-status", "top"]
-            result1 = subprocess.run(cmd1, capture_output=True, text=True)
+            cmd1 = ["set-option", "-t", session_name, "pane-border-status", "top"]
+            result1 = run_tmux(cmd1)
             
-            cmd2 = ["tmux", "set-option", "-t", session_name, "pane-border-format", "#{pane_title}"]
-            result2 = subprocess.run(cmd2, capture_output=True, text=True)
+            cmd2 = ["set-option", "-t", session_name, "pane-border-format", "#{pane_title}"]
+            result2 = run_tmux(cmd2)
             
             if result1.returncode == 0 and result2.returncode == 0:
                 logger.info(f"Configured pane borders for session: {session_name}")
@@ -1015,23 +1021,41 @@ class SpaceManager:
             
             logger.info(f"🔄 Re-checking task logs for all panes in session: {session_name}")
             
+            # Get base path from session info
+            base_path = Path(session_info.get("config", {}).get("base_path", "./"))
+            
+            # Tasks applied since the session was created may have updated the index
+            self._reset_assignment_index(base_path)
+            
             # Process each room
             for room_id, desks_in_room in desk_distribution.items():
                 window_id = self._get_window_id_for_room(room_id)
+                batch = TmuxCommandBatch()
+                queued = {}
+                current_paths = self._get_pane_paths(session_name, window_id)
                 
-                # Process each pane in the room
+                # Queue moves for each pane in the room
                 for pane_index, mapping in enumerate(desks_in_room):
-                    # Get base path from session info
-                    base_path = Path(session_info.get("config", {}).get("base_path", "./"))
-                    
+                    # Panes already in their task directory are left alone
+                    if self._pane_in_task_directory(session_name, window_id, pane_index, mapping, base_path,
+                                                    current_paths.get(pane_index)):
+                        continue
                     # Check for task assignment and update if found
-                    success = self._update_pane_from_task_logs(session_name, window_id, pane_index, mapping, base_path)
-                    if success:
-                        # Check if agent was actually moved to task directory
-                        agent_id = self._get_agent_id_from_pane_mapping(mapping)
-                        if self._check_if_pane_moved_to_task(session_name, window_id, pane_index):
-                            updated_count += 1
-                            logger.debug(f"Agent {agent_id} successfully updated to task directory")
+                    if self._update_pane_from_task_logs(session_name, window_id, pane_index, mapping, base_path, batch):
+                        queued[pane_index] = self._get_agent_id_from_pane_mapping(mapping)
+                
+                if not queued:
+                    self._flush_assignment_indexes(base_path)
+                    continue
+                batch.flush()
+                self._flush_assignment_indexes(base_path)
+                
+                # Check if agents were actually moved to task directories (one list-panes per window)
+                pane_paths = self._get_pane_paths(session_name, window_id)
+                for pane_index, agent_id in queued.items():
+                    if "/tasks/" in pane_paths.get(pane_index, ""):
+                        updated_count += 1
+                        logger.debug(f"Agent {agent_id} successfully updated to task directory")
             
             logger.info(f"🎯 Updated {updated_count} agent panes based on task logs")
             return updated_count
@@ -1040,24 +1064,42 @@ class SpaceManager:
             logger.error(f"Failed to update panes from task logs: {e}")
             return 0
     
+    def _pane_in_task_directory(self, session_name: str, window_id: str, pane_index: int,
+                                mapping: Dict[str, Any], base_path: Path, current_path: Optional[str]) -> bool:
+        """Check whether a pane already sits in its assigned task directory, recording its position if so"""
+        if not current_path:
+            return False
+        agent_id = self._get_agent_id_from_pane_mapping(mapping)
+        task_info = self._get_assignment_index(base_path).get(agent_id, session_name)
+        if not task_info or os.path.realpath(task_info["task_dir"]) != os.path.realpath(current_path):
+            return False
+        
+        if task_info.get("tmux_window") != window_id or task_info.get("tmux_pane") != pane_index:
+            self._update_agent_assignment_log_with_pane_info(Path(task_info["task_dir"]), agent_id,
+                                                             session_name, window_id, pane_index)
+        logger.debug(f"Agent {agent_id} already in task directory: {current_path}")
+        return True
+    
     def _check_if_pane_moved_to_task(self, session_name: str, window_id: str, pane_index: int) -> bool:
         """Check if pane was successfully moved to task directory"""
+        # Check if path contains 'tasks/' indicating it's in a task directory
+        return "/tasks/" in self._get_pane_paths(session_name, window_id).get(pane_index, "")
+    
+    def _get_pane_paths(self, session_name: str, window_id: str) -> Dict[int, str]:
+        """Get current path of every pane in a window"""
         try:
-            # Get current path of the pane
-            cmd = ["tmux", "list-panes", "-t", f"{session_name}:{window_id}", 
+            cmd = ["list-panes", "-t", f"{session_name}:{window_id}", 
                    "-F", "#{pane_index}:#{pane_current_path}"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_tmux(cmd)
             
+            paths = {}
             if result.returncode == 0:
                 for line in result.stdout.strip().split('\n'):
-                    if line.startswith(f"{pane_index}:"):
-                        current_path = line.split(':', 1)[1]
-                        # Check if path contains 'tasks/' indicating it's in a task directory
-                        return "/tasks/" in current_path
-            
-            return False
+                    index, sep, current_path = line.partition(':')
+                    if sep and index.isdigit():
+                        paths[int(index)] = current_path
+            return paths
             
         except Exception as e:
             logger.error(f"Error checking pane path: {e}")
-            return False
- 
\ No newline at end of file
+            return {}
@@ -0,0 +1,240 @@
+"""
+Space reconciliation for Haconiwa v1.0
+
+Re-applying a Space whose session is already running compares the desired
+state (windows, panes, pane titles and directories derived from the config
+and the assignment index) with the live tmux session, and only runs the
+operations needed to converge.
+"""
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from .batch import TmuxCommandBatch
+from .control import run_tmux
+from .layout import GridLayout
+
+logger = logging.getLogger(__name__)
+
+# Fields of one list-panes line; tab separated since titles and paths may contain spaces
+PANE_FORMAT = "\t".join(["#{window_index}", "#{window_name}", "#{pane_index}", "#{pane_current_path}", "#{pane_title}"])
+
+
+class ReconcileError(Exception):
+    """Space reconciliation error"""
+    pass
+
+
+@dataclass
+class PaneState:
+    """Directory and title of one pane"""
+    cwd: str
+    title: str
+    agent_id: Optional[str] = None
+    assignment: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class WindowState:
+    """Name and panes of one window"""
+    name: str
+    panes: Dict[int, PaneState] = field(default_factory=dict)
+    layout: Optional[str] = None
+
+
+@dataclass
+class SpaceState:
+    """Windows of a space session, keyed by window index"""
+    session: str
+    windows: Dict[str, WindowState] = field(default_factory=dict)
+    window_size: Optional[Tuple[int, int]] = None
+
+
+@dataclass
+class ReconcileOp:
+    """Single operation of a reconcile plan"""
+    action: str
+    target: str
+    detail: str = ""
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        return f"{self.action} {self.target}" + (f": {self.detail}" if self.detail else "")
+
+
+class SpaceReconciler:
+    """Converges a running space session to its Space configuration"""
+
+    def __init__(self, space_manager):
+        self.space_manager = space_manager
+
+    def plan(self, config: Dict[str, Any]) -> List[ReconcileOp]:
+        """Operations needed to bring the live session in line with ``config``"""
+        return self.diff(self.desired_state(config), self.current_state(config["name"]))
+
+    def reconcile(self, config: Dict[str, Any]) -> bool:
+        """Apply only the operations that differ; builds the session when it is not running"""
+        try:
+            base_path = Path(config.get("base_path", f"./{config['name']}"))
+            main_repo_path = base_path / "tasks" / "main"
+            if config.get("git_repo") and not main_repo_path.exists():
+                (base_path / "tasks").mkdir(parents=True, exist_ok=True)
+                self.space_manager._clone_repository_to_tasks(
+                    config["git_repo"], main_repo_path, getattr(self.space_manager, '_force_clone', False))
+
+            desired = self.desired_state(config)
+            ops = self.diff(desired, self.current_state(config["name"]))
+            if any(op.action == "create_session" for op in ops):
+                return self.space_manager.create_multiroom_session(config)
+
+            logger.info(f"🔁 Reconciling {config['name']}: {len(ops)} operations")
+            for op in ops:
+                logger.info(f"   {op}")
+            if ops and not self.apply(desired, ops, base_path):
+                return False
+
+            self.space_manager._store_session_info(config, *self._structure(config))
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to reconcile space {config.get('name', 'unknown')}: {e}")
+            return False
+
+    def desired_state(self, config: Dict[str, Any]) -> SpaceState:
+        """Windows, titles and directories the session should have"""
+        sm = self.space_manager
+        session = config["name"]
+        base_path = Path(config.get("base_path", f"./{session}"))
+        desk_mappings, desk_distribution, layout_info = self._structure(config)
+        grid = GridLayout.parse(layout_info["layout_per_window"])
+
+        # Assignments may have changed since the index was last loaded
+        sm._reset_assignment_index(base_path)
+        index = sm._get_assignment_index(base_path)
+
+        state = SpaceState(session, window_size=grid.window_size())
+        for room_id, window in sm._get_room_window_mapping(config.get("rooms", [])).items():
+            state.windows[window["window_id"]] = WindowState(window["name"].replace(" Room", ""))
+
+        standby_dir = str((base_path / "standby").absolute())
+        for room_id, desks_in_room in desk_distribution.items():
+            window_id = sm._get_window_id_for_room(room_id)
+            window = state.windows.setdefault(window_id, WindowState(room_id))
+            pane_grid = grid if grid.pane_count >= len(desks_in_room) else GridLayout.for_pane_count(len(desks_in_room))
+            window.layout = str(pane_grid)
+
+            for pane_index, mapping in enumerate(desks_in_room):
+                agent_id = sm._get_agent_id_from_pane_mapping(mapping)
+                assignment = index.get(agent_id, session)
+                if assignment and Path(assignment["task_dir"]).is_dir():
+                    window.panes[pane_index] = PaneState(assignment["task_dir"], sm._task_title(mapping, assignment["task_name"]),
+                                                         agent_id, assignment)
+                else:
+                    window.panes[pane_index] = PaneState(standby_dir, sm._standby_title(mapping, agent_id), agent_id)
+        return state
+
+    def current_state(self, session: str) -> Optional[SpaceState]:
+        """Windows and panes of the live session, read with one list-panes call"""
+        result = run_tmux(["list-panes", "-s", "-t", session, "-F", PANE_FORMAT])
+        if result.returncode != 0:
+            return None
+
+        state = SpaceState(session)
+        for line in result.stdout.splitlines():
+            fields = line.split("\t", 4)
+            if len(fields) != 5 or not fields[2].isdigit():
+                continue
+            window_id, window_name, pane_index, cwd, title = fields
+            window = state.windows.setdefault(window_id, WindowState(window_name))
+            window.panes[int(pane_index)] = PaneState(cwd, title)
+        return state
+
+    def diff(self, desired: SpaceState, current: Optional[SpaceState]) -> List[ReconcileOp]:
+        """Minimal operations turning ``current`` into ``desired``"""
+        if current is None:
+            return [ReconcileOp("create_session", desired.session, "session is not running")]
+
+        ops = []
+        for window_id, window in desired.windows.items():
+            target = f"{desired.session}:{window_id}"
+            live = current.windows.get(window_id)
+            pane_count = GridLayout.parse(window.layout).pane_count if window.layout else 1
+
+            if live is None:
+                ops.append(ReconcileOp("create_window", target, window.name))
+                live = WindowState(window.name, {0: PaneState("", "")})
+            elif live.name != window.name:
+                ops.append(ReconcileOp("rename_window", target, window.name))
+            if window.layout and len(live.panes) < pane_count:
+                ops.append(ReconcileOp("add_panes", target, f"{len(live.panes)} → {pane_count} ({window.layout})",
+                                       {"current": len(live.panes), "layout": window.layout}))
+
+            for pane_index, pane in window.panes.items():
+                pane_target = f"{target}.{pane_index}"
+                live_pane = live.panes.get(pane_index)
+                if live_pane is None or not self._same_path(live_pane.cwd, pane.cwd):
+                    ops.append(ReconcileOp("move_pane", pane_target, pane.cwd, {"cwd": pane.cwd}))
+                if live_pane is None or live_pane.title != pane.title:
+                    ops.append(ReconcileOp("set_title", pane_target, pane.title, {"title": pane.title}))
+                assignment = pane.assignment
+                if assignment and (assignment.get("tmux_window") != window_id or assignment.get("tmux_pane") != pane_index):
+                    ops.append(ReconcileOp("record_pane", pane_target, pane.agent_id,
+                                           {"agent_id": pane.agent_id, "task_dir": assignment["task_dir"],
+                                            "window_id": window_id, "pane_index": pane_index}))
+        return ops
+
+    def apply(self, desired: SpaceState, ops: List[ReconcileOp], base_path: Path) -> bool:
+        """Run a plan; tmux operations go through one batch"""
+        sm = self.space_manager
+        batch = TmuxCommandBatch()
+        records = []
+
+        for op in ops:
+            if op.action == "create_window":
+                batch.add(["new-window", "-d", "-t", op.target, "-n", op.detail], step=str(op))
+            elif op.action == "rename_window":
+                batch.add(["rename-window", "-t", op.target, op.detail], step=str(op))
+            elif op.action == "add_panes":
+                self._queue_add_panes(batch, op, desired.window_size)
+            elif op.action == "move_pane":
+                if op.data["cwd"].endswith(os.sep + "standby"):
+                    sm._ensure_standby_dir(base_path)
+                batch.send_keys(op.target, f"cd {op.data['cwd']}", step=str(op))
+            elif op.action == "set_title":
+                batch.set_pane_title(op.target, op.data["title"], step=str(op))
+            elif op.action == "record_pane":
+                records.append(op.data)
+
+        result = batch.flush()
+        for failure in result.failures:
+            logger.error(f"   {failure.step}: {failure.error}")
+
+        for record in records:
+            sm._update_agent_assignment_log_with_pane_info(Path(record["task_dir"]), record["agent_id"],
+                                                           desired.session, record["window_id"], record["pane_index"])
+        sm._flush_assignment_indexes(base_path)
+        return result.ok
+
+    def _queue_add_panes(self, batch: TmuxCommandBatch, op: ReconcileOp,
+                         window_size: Optional[Tuple[int, int]]) -> None:
+        """Split the last pane until the window has the grid's pane count, then lay the grid out"""
+        grid = GridLayout.parse(op.data["layout"])
+        for pane in range(op.data["current"], grid.pane_count):
+            batch.split_window(f"{op.target}.{pane - 1}", step=f"{op} split {pane}")
+        live_size = self.space_manager._get_window_size(*op.target.rsplit(":", 1))
+        width, height = grid.window_size(*(live_size if live_size[0] else window_size or (None, None)))
+        batch.select_layout(op.target, grid.layout_string(width, height), step=f"{op} layout")
+
+    def _structure(self, config: Dict[str, Any]):
+        sm = self.space_manager
+        desk_mappings = sm.generate_desk_mappings(config.get("organizations", []))
+        desk_distribution = sm._distribute_desks_to_windows(desk_mappings)
+        layout_info = sm._calculate_panes_per_window(config.get("grid", "8x4"), len(config.get("rooms", [])))
+        return desk_mappings, desk_distribution, layout_info
+
+    @staticmethod
+    def _same_path(current: str, desired: str) -> bool:
+        return bool(current) and os.path.realpath(current) == os.path.realpath(desired)
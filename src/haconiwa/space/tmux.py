@@ -6,6 +6,9 @@ from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
 from haconiwa.core.config import Config
+from haconiwa.space.batch import TmuxBatchError, TmuxCommandBatch
+from haconiwa.space.control import run_tmux
+from haconiwa.space.layout import GridLayout
 
 class TmuxSessionError(Exception):
     pass
@@ -169,7 +172,7 @@ class TmuxSession:
         base_path: str,
         organizations: Optional[List[Dict[str, str]]] = None
     ) -> libtmux.Session:
-        """Create 4x4 multiagent tmux company with 4 organizations x 4 roles"""
+        """Create multiagent tmux company with one row of 4 roles per organization (4x4 by default)"""
         
         # Default organizations if not provided
         if organizations is None:
@@ -189,53 +192,40 @@ class TmuxSession:
         # Create directory structure
         self._create_directory_structure(base_path, organizations, company_name=name)
         
+        roles = ['boss', 'worker-a', 'worker-b', 'worker-c']
+
         try:
+            # One grid row per organization, one column per role
+            grid = GridLayout(columns=len(roles), rows=max(len(organizations), 1))
+            width, height = grid.window_size()
+
             # Create new session
-            self._run_tmux_command(['new-session', '-d', '-s', name])
-            
+            self._run_tmux_command(['new-session', '-d', '-s', name, '-x', str(width), '-y', str(height)])
+
+            # Window structure is queued and run as one tmux invocation
+            batch = TmuxCommandBatch()
+
             # Load tmux config
-            self._run_tmux_command(['source-file', '~/.tmux.conf'], check=False)
-            
+            batch.add(['source-file', '-q', '~/.tmux.conf'])
+
             # Rename first window
-            self._run_tmux_command(['rename-window', '-t', f'{name}:0', 'multiagent'])
-            
-            # Create 4x4 pane layout (16 panes total)
-            # Split vertically 3 times to create 4 rows
-            self._run_tmux_command(['split-window', '-v', '-t', f'{name}:0.0'])
-            self._run_tmux_command(['split-window', '-v', '-t', f'{name}:0.0'])  
-            self._run_tmux_command(['split-window', '-v', '-t', f'{name}:0.1'])
-            
-            # Split each row horizontally 3 times to create 4 columns
-            # Row 1 (panes 0-3)
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.0'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.0'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.1'])
-            
-            # Row 2 (panes 4-7)
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.4'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.4'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.5'])
-            
-            # Row 3 (panes 8-11)
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.8'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.8'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.9'])
-            
-            # Row 4 (panes 12-15)
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.12'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.12'])
-            self._run_tmux_command(['split-window', '-h', '-t', f'{name}:0.13'])
-            
-            # Apply tiled layout for even distribution
-            self._run_tmux_command(['select-layout', '-t', f'{name}:0', 'tiled'])
-            
+            batch.add(['rename-window', '-t', f'{name}:0', 'multiagent'])
+
+            # Create the pane grid with minimal splits, then size it with one select-layout
+            for split in grid.splits():
+                batch.split_window(f'{name}:0.{split.pane}', vertical=split.vertical, size=f'{split.percent}%')
+            batch.select_layout(f'{name}:0', grid.layout_string(width, height))
+
             # Configure pane borders and titles
-            self._run_tmux_command(['set-option', '-t', name, 'pane-border-status', 'top'])
-            self._run_tmux_command(['set-option', '-t', name, 'pane-border-format', '#{pane_title}'])
+            batch.add(['set-option', '-t', name, 'pane-border-status', 'top'])
+            batch.add(['set-option', '-t', name, 'pane-border-format', '#{pane_title}'])
             
-            # Setup each pane with organization and role
-            roles = ['boss', 'worker-a', 'worker-b', 'worker-c']
+            result = batch.flush(stop_on_error=True)
+            if not result.ok:
+                failure = result.failures[0]
+                raise TmuxBatchError(f"{failure.step}: {failure.error}")
             
+            # Setup each pane with organization and role
             for org_idx, org in enumerate(organizations):
                 for role_idx, role in enumerate(roles):
                     pane_idx = org_idx * 4 + role_idx
@@ -264,18 +254,20 @@ class TmuxSession:
                     
                     # Configure pane
                     self._setup_multiagent_pane_subprocess(
-                        name, pane_idx, title, desk_path, org, role
+                        name, pane_idx, title, desk_path, org, role, batch
                     )
+            self._flush_pane_setup(batch)
             
             # Wait a bit then clear all panes
             time.sleep(2)
-            for i in range(16):
-                self._run_tmux_command(['send-keys', '-t', f'{name}:0.{i}', 'clear', 'C-m'])
+            for i in range(grid.pane_count):
+                batch.add(['send-keys', '-t', f'{name}:0.{i}', 'clear', 'C-m'])
+            batch.flush()
             
             # Return session via libtmux
             return self.get_session(name)
             
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, TmuxBatchError) as e:
             raise TmuxSessionError(f"Failed to create multiagent company: {str(e)}")
     
     def _update_existing_session(
@@ -291,6 +283,7 @@ class TmuxSession:
             
             # Update pane titles only
             roles = ['boss', 'worker-a', 'worker-b', 'worker-c']
+            batch = TmuxCommandBatch()
             
             for org_idx, org in enumerate(organizations):
                 for role_idx, role in enumerate(roles):
@@ -316,12 +309,17 @@ class TmuxSession:
                     
                     # Update pane title only
                     pane_target = f"{name}:0.{pane_idx}"
-                    self._run_tmux_command(['select-pane', '-t', pane_target, '-T', title])
+                    batch.set_pane_title(pane_target, title)
+            
+            result = batch.flush(stop_on_error=True)
+            if not result.ok:
+                failure = result.failures[0]
+                raise TmuxBatchError(f"{failure.step}: {failure.error}")
             
             print(f"✅ Updated pane titles for company '{name}'")
             return self.get_session(name)
             
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, TmuxBatchError) as e:
             raise TmuxSessionError(f"Failed to update company: {str(e)}")
     
     def _create_directory_structure(self, base_path: str, organizations: List[Dict[str, str]], update_mode: bool = False, company_name: str = "default") -> None:
@@ -400,9 +398,8 @@ class TmuxSession:
             print(f"Warning: Failed to create metadata file: {e}")
 
     def _run_tmux_command(self, cmd: List[str], check: bool = True) -> subprocess.CompletedProcess:
-        """Run tmux command via subprocess"""
-        full_cmd = ['tmux'] + cmd
-        return subprocess.run(full_cmd, check=check, capture_output=True, text=True)
+        """Run tmux command via the shared control client or a subprocess"""
+        return run_tmux(cmd, check=check)
     
     def _setup_multiagent_pane_subprocess(
         self, 
@@ -411,34 +408,42 @@ class TmuxSession:
         title: str, 
         desk_path: str, 
         org: Dict[str, str], 
-        role: str
+        role: str,
+        batch: Optional[TmuxCommandBatch] = None
     ) -> None:
         """Setup individual pane for multiagent environment using subprocess"""
-        try:
-            pane_target = f"{session_name}:0.{pane_idx}"
-            
-            # Set pane title
-            self._run_tmux_command(['select-pane', '-t', pane_target, '-T', title])
-            
-            # Change to desk directory and show info
-            display_parts = [f"{org['id'].upper()} {role.upper()}"]
-            if org['org_name']:
-                display_parts.append(f"組織: {org['org_name']}")
-            if org['task_name']:
-                display_parts.append(f"タスク: {org['task_name']}")
-            display_text = " - ".join(display_parts)
-            
-            self._run_tmux_command(['send-keys', '-t', pane_target, 
-                                   f"cd {desk_path} && echo '=== {display_text} ===' && pwd", 'Enter'])
-            
-            # Set custom prompt
-            prompt_prefix = f"({org['id'].upper()}-{role.upper()})"
-            self._run_tmux_command(['send-keys', '-t', pane_target, 
-                                   f"export PS1='{prompt_prefix} \\$ '", 'C-m'])
-            
-        except subprocess.CalledProcessError as e:
-            # Don't fail the entire session creation for individual pane setup issues
-            print(f"Warning: Failed to setup pane {pane_idx}: {e}")
+        own_batch = batch is None
+        if own_batch:
+            batch = TmuxCommandBatch()
+        
+        pane_target = f"{session_name}:0.{pane_idx}"
+        step = f"setup pane {pane_idx}"
+        
+        # Set pane title
+        batch.set_pane_title(pane_target, title, step=step)
+        
+        # Change to desk directory and show info
+        display_parts = [f"{org['id'].upper()} {role.upper()}"]
+        if org['org_name']:
+            display_parts.append(f"組織: {org['org_name']}")
+        if org['task_name']:
+            display_parts.append(f"タスク: {org['task_name']}")
+        display_text = " - ".join(display_parts)
+        
+        batch.send_keys(pane_target, f"cd {desk_path} && echo '=== {display_text} ===' && pwd", step=step)
+        
+        # Set custom prompt
+        prompt_prefix = f"({org['id'].upper()}-{role.upper()})"
+        batch.add(['send-keys', '-t', pane_target, f"export PS1='{prompt_prefix} \\$ '", 'C-m'], step=step)
+        
+        if own_batch:
+            self._flush_pane_setup(batch)
+    
+    def _flush_pane_setup(self, batch: TmuxCommandBatch) -> None:
+        """Run queued pane setup commands, warning about failed panes"""
+        # Don't fail the entire session creation for individual pane setup issues
+        for failure in batch.flush().failures:
+            print(f"Warning: Failed to {failure.step}: {failure.error}")
 
     def attach_session(self, session_name: str) -> None:
         """Attach to an existing tmux company"""
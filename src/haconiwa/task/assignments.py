@@ -0,0 +1,211 @@
+"""
+Agent assignment index for Haconiwa v1.0
+
+Keeps one ``.haconiwa/agent_assignments.json`` per space that maps
+``space_session -> agent_id -> active assignment``, so panes can be placed
+without opening every ``tasks/*/.haconiwa/agent_assignment.json``.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+class AssignmentIndexError(Exception):
+    """Agent assignment index error"""
+    pass
+
+
+class AssignmentIndex:
+    """Per-space index of active agent assignments, maintained on write"""
+
+    INDEX_FILE = Path(".haconiwa") / "agent_assignments.json"
+    TASK_LOG_FILE = Path(".haconiwa") / "agent_assignment.json"
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, base_path: Union[str, Path]):
+        self.base_path = Path(base_path)
+        self.tasks_path = self.base_path / "tasks"
+        self.index_file = self.base_path / self.INDEX_FILE
+        self.sessions: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.task_names: List[str] = []
+        self._pending_panes: List[tuple] = []
+
+    @classmethod
+    def for_task_dir(cls, task_dir: Union[str, Path]) -> "AssignmentIndex":
+        """Index of the space that owns ``<base_path>/tasks/<task>``"""
+        return cls(Path(task_dir).parent.parent)
+
+    @property
+    def _lock(self) -> threading.Lock:
+        key = str(self.index_file.absolute())
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def load(self) -> "AssignmentIndex":
+        """Load the index, rebuilding it when missing and refreshing task directories added or removed since"""
+        if not self.tasks_path.exists():
+            self.sessions = {}
+            return self
+        with self._lock:
+            if not self._read():
+                self._rebuild_locked()
+            elif self._refresh():
+                self._write()
+        return self
+
+    def get(self, agent_id: str, session: str) -> Optional[Dict[str, Any]]:
+        """Active assignment of ``agent_id`` in ``session``"""
+        return self.sessions.get(session, {}).get(agent_id)
+
+    def record(self, assignment: Dict[str, Any], task_dir: Union[str, Path], overwrite: bool = False) -> None:
+        """Add or replace an assignment written to a task log
+
+        ``overwrite`` drops other assignments of the task, for logs that were rewritten rather than appended to.
+        """
+        task_path = Path(task_dir)
+
+        def apply(sessions):
+            if overwrite:
+                self._drop_tasks(sessions, {task_path.name})
+            if assignment.get("status") == "active":
+                self._add(sessions, assignment, task_path, replace=True)
+        self._update(apply)
+
+    def update_pane(self, agent_id: str, session: str, window_id: str, pane_index: int,
+                    defer: bool = False) -> None:
+        """Record the pane an assigned agent was placed in; ``defer`` holds the write until flush()"""
+        self._pending_panes.append((session, agent_id, window_id, int(pane_index)))
+        if not defer:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write deferred pane updates in one index update"""
+        if not self._pending_panes:
+            return
+        pending, self._pending_panes = self._pending_panes, []
+
+        def apply(sessions):
+            for session, agent_id, window_id, pane_index in pending:
+                entry = sessions.get(session, {}).get(agent_id)
+                if entry:
+                    entry["tmux_window"] = window_id
+                    entry["tmux_pane"] = pane_index
+        self._update(apply)
+
+    def rebuild(self) -> int:
+        """Reconstruct the index from per-task assignment logs; returns the number of assignments"""
+        with self._lock:
+            self._rebuild_locked()
+        logger.info(f"🗂️ Rebuilt agent assignment index with {len(self)} assignments: {self.index_file}")
+        return len(self)
+
+    def __len__(self) -> int:
+        return sum(len(agents) for agents in self.sessions.values())
+
+    def _rebuild_locked(self) -> None:
+        self.sessions = {}
+        self.task_names = []
+        if not self.tasks_path.exists():
+            return
+        for task_dir in self._task_dirs():
+            self._index_task(task_dir)
+        self._write()
+
+    def _update(self, apply) -> None:
+        with self._lock:
+            # Re-read so concurrent writers of other tasks are not lost
+            if not self._read():
+                self._rebuild_locked()
+            else:
+                self._refresh()
+            apply(self.sessions)
+            self._write()
+
+    def _refresh(self) -> bool:
+        """Index task directories added or removed since the last write; True if anything changed"""
+        current = {task_dir.name: task_dir for task_dir in self._task_dirs()}
+        known = set(self.task_names)
+        removed = known - set(current)
+        added = [current[name] for name in sorted(set(current) - known)]
+        if not removed and not added:
+            return False
+
+        self._drop_tasks(self.sessions, removed)
+        self.task_names = [name for name in self.task_names if name not in removed]
+        for task_dir in added:
+            self._index_task(task_dir)
+        return True
+
+    def _index_task(self, task_dir: Path) -> None:
+        self.task_names.append(task_dir.name)
+        log_file = task_dir / self.TASK_LOG_FILE
+        if not log_file.exists():
+            return
+        try:
+            with open(log_file, 'r', encoding='utf-8') as f:
+                assignments = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read assignment log {log_file}: {e}")
+            return
+        if not isinstance(assignments, list):
+            assignments = [assignments]
+        # Latest entry of a log wins; across tasks the first task in name order wins
+        for assignment in reversed(assignments):
+            if isinstance(assignment, dict) and assignment.get("status") == "active":
+                self._add(self.sessions, assignment, task_dir, replace=False)
+
+    @staticmethod
+    def _drop_tasks(sessions, task_names) -> None:
+        for agents in sessions.values():
+            for agent_id in [a for a, e in agents.items() if Path(e.get("task_dir", "")).name in task_names]:
+                del agents[agent_id]
+
+    @staticmethod
+    def _add(sessions, assignment: Dict[str, Any], task_dir: Path, replace: bool) -> None:
+        entry = dict(assignment)
+        entry["task_dir"] = str(task_dir.absolute())
+        agents = sessions.setdefault(entry.get("space_session"), {})
+        if replace or entry.get("agent_id") not in agents:
+            agents[entry.get("agent_id")] = entry
+
+    def _task_dirs(self) -> List[Path]:
+        return sorted(entry for entry in self.tasks_path.iterdir() if entry.is_dir() and entry.name != "main")
+
+    def _read(self) -> bool:
+        self.sessions = {}
+        self.task_names = []
+        if not self.index_file.exists():
+            return False
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read assignment index {self.index_file}: {e}")
+            return False
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return False
+        self.sessions = data.get("sessions", {})
+        self.task_names = data.get("tasks", [])
+        return True
+
+    def _write(self) -> None:
+        data = {"version": INDEX_VERSION, "tasks": sorted(self.task_names), "sessions": self.sessions}
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.index_file.parent, prefix=".agent_assignments.")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            raise AssignmentIndexError(f"Failed to write assignment index {self.index_file}: {e}")
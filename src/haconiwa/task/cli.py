@@ -6,7 +6,7 @@ from rich.table import Table
 from rich.progress import Progress
 
 from ..task.worktree import WorktreeManager
-from ..core.config import Config
+from ..core.config import get_config
 from ..core.logging import get_logger
 
 task_app = typer.Typer(help="タスク管理コマンド (開発中)")
@@ -21,7 +21,7 @@ def new(
 ):
     """Create a new task with git worktree"""
     try:
-        config = Config("config.yaml")
+        config = get_config("config.yaml")
         worktree = WorktreeManager(config)
         worktree_path = worktree.create_worktree(name, f"task-{name}")
         console.print(f"✨ Created task: [bold green]{name}[/]")
@@ -50,7 +50,7 @@ def show(
 ):
     """Show task details and progress"""
     try:
-        config = Config("config.yaml")
+        config = get_config("config.yaml")
         worktree = WorktreeManager(config)
         
         if task_id:
@@ -87,7 +87,7 @@ def done(
 ):
     """Mark task as completed and cleanup worktree"""
     try:
-        config = Config("config.yaml")
+        config = get_config("config.yaml")
         worktree = WorktreeManager(config)
         
         with Progress() as progress:
@@ -105,7 +105,7 @@ def prune(
 ):
     """Cleanup orphaned worktrees"""
     try:
-        config = Config("config.yaml")
+        config = get_config("config.yaml")
         worktree = WorktreeManager(config)
         cleaned = worktree.cleanup_stale_worktrees()
         
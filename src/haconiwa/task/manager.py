@@ -4,9 +4,14 @@ Task Manager for Haconiwa v1.0
 
 import logging
 import subprocess
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from ..space.control import run_tmux
+from .assignments import AssignmentIndex
+from .provisioner import WorktreeProvisioner, WorktreeRequest
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +25,7 @@ class TaskManager:
         if cls._instance is None:
             cls._instance = super(TaskManager, cls).__new__(cls)
             cls._instance.tasks = {}
+            cls._instance._tasks_lock = threading.Lock()  # Tasks are registered from apply worker threads
             cls._initialized = True
         return cls._instance
     
@@ -35,7 +41,6 @@ class TaskManager:
             worktree = config.get("worktree", True)
             assignee = config.get("assignee")
             space_ref = config.get("space_ref")
-            description = config.get("description", "")
             
             logger.info(f"Creating task: {name} (branch: {branch}, assignee: {assignee})")
             
@@ -45,7 +50,46 @@ class TaskManager:
                 if not success:
                     logger.warning(f"Failed to create worktree for task {name}, but continuing")
             
-            # Store task info
+            return self._register_task(config)
+            
+        except Exception as e:
+            logger.error(f"Failed to create task: {e}")
+            return False
+    
+    def create_tasks(self, configs: List[Dict[str, Any]], max_workers: Optional[int] = None) -> List[bool]:
+        """Create several tasks, provisioning their worktrees concurrently per space"""
+        by_space: Dict[str, List[Dict[str, Any]]] = {}
+        for config in configs:
+            if config.get("worktree", True) and config.get("space_ref"):
+                by_space.setdefault(config["space_ref"], []).append(config)
+        
+        for space_ref, space_configs in by_space.items():
+            logger.info(f"Creating {len(space_configs)} worktrees for space: {space_ref}")
+            results = self._provision_worktrees(space_ref, space_configs, max_workers)
+            for config in space_configs:
+                if not results.get(config.get("name")):
+                    logger.warning(f"Failed to create worktree for task {config.get('name')}, but continuing")
+        
+        results = []
+        for config in configs:
+            try:
+                results.append(self._register_task(config))
+            except Exception as e:
+                logger.error(f"Failed to create task: {e}")
+                results.append(False)
+        return results
+    
+    def _register_task(self, config: Dict[str, Any]) -> bool:
+        """Store task info and write its agent assignment log"""
+        name = config.get("name")
+        branch = config.get("branch")
+        worktree = config.get("worktree", True)
+        assignee = config.get("assignee")
+        space_ref = config.get("space_ref")
+        description = config.get("description", "")
+        
+        # Store task info
+        with self._tasks_lock:
             self.tasks[name] = {
                 "config": config,
                 "status": "created",
@@ -53,80 +97,49 @@ class TaskManager:
                 "assignee": assignee,
                 "description": description
             }
-            
-            # IMPORTANT: Create agent assignment log immediately after task creation
-            if assignee and worktree and space_ref:
-                self._create_immediate_agent_assignment_log(name, assignee, space_ref, description)
-            
-            logger.info(f"✅ Created task: {name}")
-            if worktree and space_ref:
-                logger.info(f"   📁 Worktree created for branch: {branch}")
-            logger.info(f"   👤 Assigned to: {assignee}")
-            logger.info(f"   📝 Description: {description}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to create task: {e}")
-            return False
+        
+        # IMPORTANT: Create agent assignment log immediately after task creation
+        if assignee and worktree and space_ref:
+            self._create_immediate_agent_assignment_log(name, assignee, space_ref, description)
+        
+        logger.info(f"✅ Created task: {name}")
+        if worktree and space_ref:
+            logger.info(f"   📁 Worktree created for branch: {branch}")
+        logger.info(f"   👤 Assigned to: {assignee}")
+        logger.info(f"   📝 Description: {description}")
+        
+        return True
     
     def _create_worktree(self, task_name: str, branch: str, space_ref: str) -> bool:
         """Create Git worktree in tasks directory"""
+        results = self._provision_worktrees(space_ref, [{"name": task_name, "branch": branch}])
+        return results.get(task_name, False)
+    
+    def _provision_worktrees(self, space_ref: str, configs: List[Dict[str, Any]],
+                             max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """Create worktrees under <space>/tasks without changing the main checkout's HEAD"""
         try:
-            # Find space base path (assuming task_name follows naming convention)
-            # e.g., "2025-01-09-frontend-ui-design-agent001" -> space should be in "./test-multiroom-desks"
-            # For now, we'll use a heuristic to find the space
             base_path = self._find_space_base_path(space_ref)
             if not base_path:
                 logger.error(f"Could not find base path for space: {space_ref}")
-                return False
+                return {}
             
             tasks_path = base_path / "tasks"
             main_repo_path = tasks_path / "main"
-            worktree_path = tasks_path / task_name
             
             # Check if main repository exists
             if not main_repo_path.exists():
                 logger.error(f"Main repository not found at: {main_repo_path}")
-                return False
+                return {}
             
-            # Check if worktree already exists
-            if worktree_path.exists():
-                logger.info(f"Worktree already exists: {worktree_path}")
-                return True
-            
-            # Create new branch and worktree
-            logger.info(f"Creating worktree: {worktree_path} for branch: {branch}")
-            
-            # Create and checkout new branch (without changing directory)
-            result1 = subprocess.run(['git', '-C', str(main_repo_path), 'checkout', '-b', branch], 
-                                   capture_output=True, text=True)
-            if result1.returncode != 0:
-                # Branch might already exist, try to checkout
-                result1 = subprocess.run(['git', '-C', str(main_repo_path), 'checkout', branch], 
-                                       capture_output=True, text=True)
-                if result1.returncode != 0:
-                    logger.warning(f"Failed to create/checkout branch {branch}: {result1.stderr}")
-            
-            # Switch back to main branch
-            subprocess.run(['git', '-C', str(main_repo_path), 'checkout', 'main'], 
-                         capture_output=True, text=True)
-            
-            # Create worktree (using absolute paths)
-            result2 = subprocess.run(['git', '-C', str(main_repo_path), 'worktree', 'add', 
-                                   str(worktree_path.absolute()), branch], 
-                                   capture_output=True, text=True)
-            
-            if result2.returncode == 0:
-                logger.info(f"✅ Successfully created worktree: {worktree_path}")
-                return True
-            else:
-                logger.error(f"Failed to create worktree: {result2.stderr}")
-                return False
+            requests = [WorktreeRequest(config["name"], config["branch"], tasks_path / config["name"])
+                        for config in configs]
+            results = WorktreeProvisioner(main_repo_path, max_workers=max_workers).provision(requests)
+            return {name: result.success for name, result in results.items()}
             
         except Exception as e:
             logger.error(f"Error creating worktree: {e}")
-            return False
+            return {}
     
     def _find_space_base_path(self, space_ref: str) -> Path:
         """Find base path for space reference"""
@@ -157,8 +170,9 @@ class TaskManager:
         return None
     
     def list_tasks(self) -> Dict[str, Any]:
-        """List all tasks"""
-        return self.tasks.copy()
+        """List all tasks (a snapshot, safe to iterate while tasks are being created)"""
+        with self._tasks_lock:
+            return self.tasks.copy()
     
     def get_task(self, name: str) -> Dict[str, Any]:
         """Get specific task"""
@@ -192,7 +206,8 @@ class TaskManager:
                                     logger.warning(f"Failed to remove worktree: {result.stderr}")
             
             # Remove from tasks
-            del self.tasks[name]
+            with self._tasks_lock:
+                del self.tasks[name]
             logger.info(f"✅ Deleted task: {name}")
             return True
             
@@ -202,7 +217,7 @@ class TaskManager:
     
     def get_task_by_assignee(self, assignee: str) -> Dict[str, Any]:
         """Get task assigned to specific agent"""
-        for task_name, task_data in self.tasks.items():
+        for task_name, task_data in self.list_tasks().items():
             if task_data["config"].get("assignee") == assignee:
                 return {
                     "name": task_name,
@@ -214,7 +229,7 @@ class TaskManager:
     def get_agent_assignments(self, space_ref: str) -> Dict[str, str]:
         """Get mapping of agent IDs to task worktree paths"""
         assignments = {}
-        for task_name, task_data in self.tasks.items():
+        for task_name, task_data in self.list_tasks().items():
             config = task_data["config"]
             if config.get("space_ref") == space_ref and config.get("assignee"):
                 assignee = config["assignee"]
@@ -226,7 +241,7 @@ class TaskManager:
         try:
             updated_count = 0
             
-            for task_name, task_data in self.tasks.items():
+            for task_name, task_data in self.list_tasks().items():
                 config = task_data["config"]
                 if config.get("space_ref") != space_ref or not config.get("assignee"):
                     continue
@@ -330,9 +345,9 @@ class TaskManager:
             logger.debug(f"Assignee: {assignee} → org_index: {org_index}, role_offset: {role_offset}, expected_pane: {expected_pane_index}")
             
             # Get all panes in the window
-            cmd = ["tmux", "list-panes", "-t", f"{session_name}:{window_id}", 
+            cmd = ["list-panes", "-t", f"{session_name}:{window_id}", 
                    "-F", "#{pane_index}:#{pane_current_path}:#{pane_title}"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_tmux(cmd)
             
             if result.returncode != 0:
                 logger.error(f"Failed to list panes: {result.stderr}")
@@ -422,16 +437,16 @@ class TaskManager:
             self._create_agent_assignment_log(task_dir, assignee, task_name, session_name, window_id, pane_index)
             
             # Update pane working directory
-            cmd = ["tmux", "send-keys", "-t", f"{session_name}:{window_id}.{pane_index}", 
+            cmd = ["send-keys", "-t", f"{session_name}:{window_id}.{pane_index}", 
                    f"cd {task_dir}", "Enter"]
-            result1 = subprocess.run(cmd, capture_output=True, text=True)
+            result1 = run_tmux(cmd)
             
             # Update pane title to include task info
             old_title = pane_info["title"]
             new_title = f"{old_title} [Task: {task_name}]"
-            cmd = ["tmux", "select-pane", "-t", f"{session_name}:{window_id}.{pane_index}", 
+            cmd = ["select-pane", "-t", f"{session_name}:{window_id}.{pane_index}", 
                    "-T", new_title]
-            result2 = subprocess.run(cmd, capture_output=True, text=True)
+            result2 = run_tmux(cmd)
             
             if result1.returncode == 0 and result2.returncode == 0:
                 logger.debug(f"Updated pane {window_id}.{pane_index}: {task_dir}")
@@ -463,6 +478,12 @@ class TaskManager:
             # Agent assignment log file
             log_file = haconiwa_dir / "agent_assignment.json"
             
+            # A pane fix-up that finds the agent in the pane already recorded keeps the log as is
+            if self._has_active_assignment(log_file, agent_id=assignee, space_session=session_name,
+                                           tmux_window=window_id, tmux_pane=pane_index):
+                logger.info(f"Agent assignment log unchanged: {log_file}")
+                return True
+            
             # Prepare assignment information
             assignment_info = {
                 "agent_id": assignee,
@@ -496,6 +517,9 @@ class TaskManager:
             with open(log_file, 'w', encoding='utf-8') as f:
                 json.dump(assignments, f, indent=2, ensure_ascii=False)
             
+            # Keep the space-wide assignment index in sync
+            AssignmentIndex.for_task_dir(task_path).record(assignment_info, task_path)
+            
             # Also create a human-readable log
             readme_file = haconiwa_dir / "README.md"
             self._create_agent_readme(readme_file, assignee, task_name, assignment_info)
@@ -600,6 +624,12 @@ class TaskManager:
             # Agent assignment log file
             log_file = haconiwa_dir / "agent_assignment.json"
             
+            # Re-applying an unchanged task keeps its log (and recorded pane) as is
+            if self._has_active_assignment(log_file, agent_id=assignee, space_session=space_ref,
+                                           description=description):
+                logger.info(f"Agent assignment log unchanged: {log_file}")
+                return True
+            
             # Prepare assignment information (without tmux pane info for now)
             assignment_info = {
                 "agent_id": assignee,
@@ -618,6 +648,9 @@ class TaskManager:
             with open(log_file, 'w', encoding='utf-8') as f:
                 json.dump([assignment_info], f, indent=2, ensure_ascii=False)
             
+            # Keep the space-wide assignment index in sync
+            AssignmentIndex(base_path).record(assignment_info, task_dir, overwrite=True)
+            
             # Also create a human-readable log
             readme_file = haconiwa_dir / "README.md"
             self._create_agent_readme(readme_file, assignee, task_name, assignment_info)
@@ -627,4 +660,22 @@ class TaskManager:
             
         except Exception as e:
             logger.error(f"Failed to create immediate agent assignment log: {e}")
-            return False 
\ No newline at end of file
+            return False 
+    
+    def _has_active_assignment(self, log_file: Path, **fields: Any) -> bool:
+        """Check whether an assignment log already holds an active assignment with these field values"""
+        import json
+        
+        if not log_file.exists():
+            return False
+        try:
+            with open(log_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return False
+        
+        for assignment in data if isinstance(data, list) else [data]:
+            if (isinstance(assignment, dict) and assignment.get("status") == "active" and
+                    all(assignment.get(key, "") == value for key, value in fields.items())):
+                return True
+        return False
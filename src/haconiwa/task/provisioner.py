@@ -0,0 +1,137 @@
+"""
+Worktree Provisioner for Haconiwa v1.0
+
+Creates task worktrees without touching the main checkout: branches are
+created from a ref in one ``git update-ref --stdin`` transaction, worktrees
+are registered with ``--no-checkout`` one at a time (these steps take the
+repository's locks), and the file checkouts then run in a worker pool.
+"""
+
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class WorktreeProvisionerError(Exception):
+    """Worktree provisioner error"""
+    pass
+
+
+@dataclass
+class WorktreeRequest:
+    """A worktree to create at ``path`` for ``branch``"""
+    task_name: str
+    branch: str
+    path: Path
+
+
+@dataclass
+class WorktreeResult:
+    """Outcome of a single worktree request"""
+    task_name: str
+    success: bool
+    created: bool = False
+    error: Optional[str] = None
+
+
+class WorktreeProvisioner:
+    """Creates many worktrees of one repository concurrently"""
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, repo_path: Union[str, Path], max_workers: Optional[int] = None,
+                 base_ref: str = "HEAD"):
+        self.repo_path = Path(repo_path)
+        self.max_workers = max(1, max_workers or DEFAULT_WORKERS)
+        self.base_ref = base_ref
+
+    @property
+    def _lock(self) -> threading.Lock:
+        """Per-repository lock for steps that write refs or worktree metadata"""
+        key = str(self.repo_path.absolute())
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def provision(self, requests: List[WorktreeRequest]) -> Dict[str, WorktreeResult]:
+        """Create worktrees for ``requests``; returns results keyed by task name"""
+        results: Dict[str, WorktreeResult] = {}
+        pending = []
+        for request in requests:
+            if request.path.exists():
+                logger.info(f"Worktree already exists: {request.path}")
+                results[request.task_name] = WorktreeResult(request.task_name, True)
+            else:
+                pending.append(request)
+        if not pending:
+            return results
+
+        with self._lock:
+            try:
+                self._create_branches({request.branch for request in pending})
+            except WorktreeProvisionerError as e:
+                logger.error(f"Failed to create branches: {e}")
+                for request in pending:
+                    results[request.task_name] = WorktreeResult(request.task_name, False, error=str(e))
+                return results
+
+            registered = []
+            for request in pending:
+                result = self._git('worktree', 'add', '--no-checkout',
+                                   str(request.path.absolute()), request.branch)
+                if result.returncode == 0:
+                    registered.append(request)
+                else:
+                    logger.error(f"Failed to create worktree: {result.stderr}")
+                    results[request.task_name] = WorktreeResult(request.task_name, False, error=result.stderr.strip())
+
+        # Populating the working trees only touches each worktree's own index
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(registered) or 1)) as executor:
+            for result in executor.map(self._checkout, registered):
+                results[result.task_name] = result
+
+        created = sum(1 for result in results.values() if result.created)
+        logger.info(f"🌳 Provisioned {created}/{len(pending)} worktrees in {self.repo_path} ({self.max_workers} workers)")
+        return results
+
+    def _create_branches(self, branches) -> None:
+        """Create missing branches from ``base_ref`` in a single ref transaction"""
+        existing = self._git('for-each-ref', '--format=%(refname:short)', 'refs/heads/')
+        if existing.returncode != 0:
+            raise WorktreeProvisionerError(existing.stderr.strip())
+        missing = sorted(set(branches) - set(existing.stdout.split()))
+        if not missing:
+            return
+
+        base = self._git('rev-parse', '--verify', f'{self.base_ref}^{{commit}}')
+        if base.returncode != 0:
+            raise WorktreeProvisionerError(f"Cannot resolve {self.base_ref}: {base.stderr.strip()}")
+        commit = base.stdout.strip()
+
+        transaction = "".join(f"create refs/heads/{branch} {commit}\n" for branch in missing)
+        result = self._git('update-ref', '--stdin', input=transaction)
+        if result.returncode != 0:
+            raise WorktreeProvisionerError(result.stderr.strip())
+        logger.info(f"Created {len(missing)} branches from {self.base_ref}")
+
+    def _checkout(self, request: WorktreeRequest) -> WorktreeResult:
+        result = subprocess.run(['git', '-C', str(request.path.absolute()), 'reset', '--hard', '--quiet'],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.error(f"Failed to check out worktree {request.path}: {result.stderr}")
+            return WorktreeResult(request.task_name, False, error=result.stderr.strip())
+        logger.info(f"✅ Successfully created worktree: {request.path}")
+        return WorktreeResult(request.task_name, True, created=True)
+
+    def _git(self, *args, input: Optional[str] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(['git', '-C', str(self.repo_path), *args],
+                              capture_output=True, text=True, input=input)
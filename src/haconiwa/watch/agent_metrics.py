@@ -0,0 +1,268 @@
+"""
+Agent Metrics for Haconiwa v1.0
+
+Per-agent resource usage for the watch Monitor. Every tmux pane of the
+watched sessions is mapped through ``#{pane_pid}`` to its process tree, and
+CPU, RSS, IO rates and open file descriptors are summed over the tree. CPU is
+accounted from ``cpu_times`` deltas between samples, so sampling never
+blocks, and the latest sample is exported as Prometheus gauges labelled by
+session, room, org, role and task.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import PurePath
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import logging
+
+import psutil
+from prometheus_client.core import GaugeMetricFamily
+
+from haconiwa.space.control import CONTROL_SESSION, run_tmux
+
+logger = logging.getLogger(__name__)
+
+# Fields of one list-panes line; tab separated since titles and paths may contain spaces
+PANE_FORMAT = "\t".join([
+    "#{session_name}", "#{window_index}", "#{window_name}", "#{pane_index}",
+    "#{pane_pid}", "#{pane_title}", "#{pane_current_path}",
+])
+
+LABELS = ("session", "room", "org", "role", "task", "pane")
+
+# (metric name, help, AgentSample attribute)
+METRICS = [
+    ("haconiwa_agent_cpu_percent", "CPU usage of the agent's process tree since the previous sample", "cpu_percent"),
+    ("haconiwa_agent_rss_bytes", "Resident memory of the agent's process tree", "rss_bytes"),
+    ("haconiwa_agent_read_bytes_per_second", "Bytes read by the agent's process tree", "read_bytes_per_second"),
+    ("haconiwa_agent_write_bytes_per_second", "Bytes written by the agent's process tree", "write_bytes_per_second"),
+    ("haconiwa_agent_open_files", "Open file descriptors of the agent's process tree", "open_files"),
+    ("haconiwa_agent_processes", "Processes in the agent's process tree", "processes"),
+]
+
+_TASK_TITLE = re.compile(r"\s*\[Task: (?P<task>[^\]]+)\]")
+
+
+@dataclass
+class AgentPane:
+    """A tmux pane and the pid of the process it runs"""
+    session: str
+    window: str
+    room: str
+    pane: int
+    pid: int
+    title: str = ""
+    cwd: str = ""
+
+    @property
+    def target(self) -> str:
+        return f"{self.session}:{self.window}.{self.pane}"
+
+
+def _task_from_path(cwd: str) -> str:
+    """Task of a pane working in ``<space>/tasks/<task>``"""
+    parts = PurePath(cwd).parts
+    for index in range(len(parts) - 2, -1, -1):
+        if parts[index] == "tasks":
+            return "" if parts[index + 1] == "main" else parts[index + 1]
+    return ""
+
+
+def pane_labels(pane: AgentPane) -> Dict[str, str]:
+    """Prometheus labels of a pane, read from the titles SpaceManager sets
+
+    Titles look like ``<org> - <role> - <room>``, ``<org> - 待機中 - <room>``
+    for agents in standby, and carry ``[Task: <name>]`` once a task is assigned.
+    """
+    match = _TASK_TITLE.search(pane.title)
+    parts = [part.strip() for part in _TASK_TITLE.sub("", pane.title).split(" - ")]
+    org, role = (parts[0], parts[1]) if len(parts) >= 3 else ("", "")
+    return {
+        "session": pane.session,
+        "room": pane.room,
+        "org": org,
+        "role": "standby" if role == "待機中" else role.lower(),
+        "task": match.group("task") if match else _task_from_path(pane.cwd),
+        "pane": f"{pane.window}.{pane.pane}",
+    }
+
+
+@dataclass
+class AgentSample:
+    """Resource usage of one agent's process tree"""
+    pane: AgentPane
+    labels: Dict[str, str]
+    processes: int = 0
+    cpu_percent: float = 0.0
+    rss_bytes: int = 0
+    read_bytes_per_second: float = 0.0
+    write_bytes_per_second: float = 0.0
+    open_files: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.labels, target=self.pane.target, pid=self.pane.pid)
+        data.update({attribute: getattr(self, attribute) for _, _, attribute in METRICS})
+        return data
+
+
+@dataclass
+class _ProcessState:
+    """Counters of a process at the previous sample"""
+    process: psutil.Process
+    create_time: float
+    cpu_seconds: float = 0.0
+    read_bytes: int = 0
+    write_bytes: int = 0
+
+
+@dataclass
+class _Usage:
+    cpu_seconds: float = 0.0
+    rss_bytes: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+    open_files: int = 0
+    processes: int = 0
+
+
+class AgentMetricsCollector:
+    """Samples the process trees of agent panes; also a Prometheus collector of the latest sample"""
+
+    def __init__(self, sessions: Optional[Iterable[str]] = None, registry=None):
+        self.sessions = set(sessions) if sessions else None
+        self.samples: List[AgentSample] = []
+        self.sampled_at: Optional[float] = None
+        self._processes: Dict[int, _ProcessState] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def list_panes(self) -> List[AgentPane]:
+        """Panes of the watched sessions, read with one list-panes call"""
+        result = run_tmux(["list-panes", "-a", "-F", PANE_FORMAT])
+        if result.returncode != 0:
+            logger.debug(f"list-panes failed: {result.stderr.strip()}")
+            return []
+
+        panes = []
+        for line in result.stdout.splitlines():
+            fields = line.split("\t", 6)
+            if len(fields) != 7 or not fields[3].isdigit() or not fields[4].isdigit():
+                continue
+            session, window, window_name, pane_index, pid, title, cwd = fields
+            if session == CONTROL_SESSION:
+                # Pane of the shared control-mode client, not an agent
+                continue
+            if self.sessions is None or session in self.sessions:
+                panes.append(AgentPane(session, window, window_name.replace(" Room", ""), int(pane_index),
+                                       int(pid), title, cwd))
+        return panes
+
+    def sample(self, panes: Optional[List[AgentPane]] = None) -> List[AgentSample]:
+        """Usage of every agent since the previous sample; the first sample reports CPU and IO rates as 0"""
+        panes = self.list_panes() if panes is None else panes
+        with self._lock:
+            now = time.time()
+            elapsed = now - self.sampled_at if self.sampled_at is not None else None
+            children = self._children()
+            processes: Dict[int, _ProcessState] = {}
+            samples = []
+            for pane in panes:
+                usage = _Usage()
+                for pid in self._tree(pane.pid, children):
+                    self._add_usage(pid, usage, processes)
+                sample = AgentSample(pane, pane_labels(pane), processes=usage.processes,
+                                     rss_bytes=usage.rss_bytes, open_files=usage.open_files)
+                if elapsed:
+                    sample.cpu_percent = round(usage.cpu_seconds / elapsed * 100, 1)
+                    sample.read_bytes_per_second = usage.read_bytes / elapsed
+                    sample.write_bytes_per_second = usage.write_bytes / elapsed
+                samples.append(sample)
+
+            # Processes that exited are forgotten; their pids may be reused
+            self._processes = processes
+            self.samples, self.sampled_at = samples, now
+        return samples
+
+    @staticmethod
+    def _children() -> Dict[int, List[int]]:
+        """Child pids of every process, from one pass over the process table"""
+        children: Dict[int, List[int]] = {}
+        for process in psutil.process_iter(["ppid"]):
+            ppid = process.info.get("ppid")
+            if ppid is not None:
+                children.setdefault(ppid, []).append(process.pid)
+        return children
+
+    @staticmethod
+    def _tree(pid: int, children: Dict[int, List[int]]) -> Iterator[int]:
+        stack, seen = [pid], set()
+        while stack:
+            pid = stack.pop()
+            if pid not in seen:
+                seen.add(pid)
+                yield pid
+                stack.extend(children.get(pid, ()))
+
+    def _add_usage(self, pid: int, usage: _Usage, processes: Dict[int, _ProcessState]) -> None:
+        if pid in processes:
+            return
+        state = self._processes.get(pid)
+        try:
+            # is_running() also detects a pid reused by another process
+            if state is None or not state.process.is_running():
+                process = psutil.Process(pid)
+                state, previous = _ProcessState(process, process.create_time()), None
+            else:
+                previous = (state.cpu_seconds, state.read_bytes, state.write_bytes)
+            with state.process.oneshot():
+                cpu_times = state.process.cpu_times()
+                rss_bytes = state.process.memory_info().rss
+                try:
+                    io = state.process.io_counters()
+                    read_bytes, write_bytes = io.read_bytes, io.write_bytes
+                except (psutil.AccessDenied, AttributeError, NotImplementedError):
+                    read_bytes = write_bytes = 0
+                try:
+                    open_files = state.process.num_fds()
+                except (psutil.AccessDenied, AttributeError):
+                    open_files = 0
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return
+        except psutil.AccessDenied:
+            usage.processes += 1
+            return
+
+        cpu_seconds = cpu_times.user + cpu_times.system
+        usage.processes += 1
+        usage.rss_bytes += rss_bytes
+        usage.open_files += open_files
+        if previous is not None:
+            usage.cpu_seconds += max(0.0, cpu_seconds - previous[0])
+            usage.read_bytes += max(0, read_bytes - previous[1])
+            usage.write_bytes += max(0, write_bytes - previous[2])
+        elif self.sampled_at is not None and state.create_time >= self.sampled_at:
+            # Started since the previous sample: all of its usage falls in this interval
+            usage.cpu_seconds += cpu_seconds
+            usage.read_bytes += read_bytes
+            usage.write_bytes += write_bytes
+        state.cpu_seconds, state.read_bytes, state.write_bytes = cpu_seconds, read_bytes, write_bytes
+        processes[pid] = state
+
+    def top(self, count: int = 10, key: str = "cpu_percent") -> List[AgentSample]:
+        """Agents of the latest sample using the most of ``key``"""
+        return sorted(self.samples, key=lambda sample: getattr(sample, key), reverse=True)[:count]
+
+    def describe(self) -> List[GaugeMetricFamily]:
+        return [GaugeMetricFamily(name, documentation, labels=LABELS) for name, documentation, _ in METRICS]
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """Gauges of the latest sample; agents that went away have no series"""
+        samples = self.samples
+        for name, documentation, attribute in METRICS:
+            family = GaugeMetricFamily(name, documentation, labels=LABELS)
+            for sample in samples:
+                family.add_metric([sample.labels[label] for label in LABELS], getattr(sample, attribute))
+            yield family
@@ -0,0 +1,472 @@
+"""
+Pane Capture for Haconiwa v1.0
+
+Complete transcripts of agent panes for ``haconiwa watch capture``. One
+control-mode client receives ``%output`` for every pane of a space; output is
+buffered per pane and written every ``flush_interval`` seconds as one gzip
+member appended to the pane's current segment under
+``<task>/.haconiwa/capture/<window>.<pane>/``. Segments rotate at
+``max_segment_bytes`` and only the newest ``max_segments`` are kept. Every
+segment has an index of its members (time range, compressed and uncompressed
+offsets), so the tail or a time range is read by decompressing only the
+members that cover it.
+"""
+
+import bisect
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path, PurePath
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import logging
+
+from haconiwa.space.control import TmuxControlNotification
+from haconiwa.watch.tail import _ANSI, PaneActivity, PaneActivityWatcher, decode_output
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_DIR_ENV = "HACONIWA_CAPTURE_DIR"
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_SEGMENT_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 8
+# A pane buffering this much is written before the next flush interval
+BLOCK_SIZE = 256 * 1024
+
+AGENT_FILE = "agent.json"
+SEGMENT_SUFFIX = ".log.gz"
+INDEX_SUFFIX = ".idx"
+# start, end, offset and length in the segment file, position and size in the pane's transcript
+INDEX_RECORD = struct.Struct("<ddQIQI")
+
+_SEGMENT_NAME = re.compile(r"^(\d{8})\.log\.gz$")
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+_ANSI_BYTES = re.compile(_ANSI.pattern.encode("ascii"))
+
+
+class CaptureError(Exception):
+    """Pane capture error"""
+    pass
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """One gzip member of a segment"""
+    segment: int
+    start: float
+    end: float
+    offset: int
+    length: int
+    position: int
+    size: int
+
+
+def default_capture_dir() -> Path:
+    """Directory of panes that do not work in a task directory"""
+    return Path(os.environ.get(CAPTURE_DIR_ENV) or Path.home() / ".haconiwa" / "cache" / "capture")
+
+
+def task_directory(cwd: str) -> Optional[Path]:
+    """``<space>/tasks/<task>`` containing ``cwd``"""
+    parts = PurePath(cwd).parts
+    for index in range(len(parts) - 2, -1, -1):
+        if parts[index] == "tasks":
+            return Path(*parts[:index + 2])
+    return None
+
+
+def agent_directory(session: str, pane: PaneActivity, root: Optional[Path] = None) -> Path:
+    """Transcript directory of a pane; under its task directory unless ``root`` is given"""
+    name = _UNSAFE.sub("_", f"{pane.window}.{pane.pane_index}")
+    task = task_directory(pane.cwd) if root is None else None
+    if task is not None:
+        return task / ".haconiwa" / "capture" / name
+    return Path(root or default_capture_dir()) / _UNSAFE.sub("_", session) / name
+
+
+def strip_escapes(data: bytes) -> bytes:
+    """Terminal output without escape sequences"""
+    return _ANSI_BYTES.sub(b"", data)
+
+
+def _read_index(path: Path, segment: int) -> List[IndexEntry]:
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return []
+    # A record cut short by a crash is ignored
+    usable = len(data) - len(data) % INDEX_RECORD.size
+    return [IndexEntry(segment, *fields) for fields in INDEX_RECORD.iter_unpack(data[:usable])]
+
+
+def _segment_numbers(directory: Path) -> List[int]:
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(_SEGMENT_NAME.match, names) if match)
+
+
+class SegmentWriter:
+    """Appends gzip members to the rotating segments of one pane"""
+
+    def __init__(self, directory: Union[str, Path], max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS, compresslevel: int = 6):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max(1, max_segments)
+        self.compresslevel = compresslevel
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.on_rotate: List[Callable[[Path, int], None]] = []
+
+        segments = _segment_numbers(self.directory)
+        self.segment = segments[-1] if segments else 1
+        entries = _read_index(self._index_path(self.segment), self.segment)
+        # Continue the transcript of a previous capture, dropping anything written after its last index record
+        self.position = entries[-1].position + entries[-1].size if entries else 0
+        self._open(entries[-1].offset + entries[-1].length if entries else 0, len(entries) * INDEX_RECORD.size)
+        if self._size >= self.max_segment_bytes:
+            self.rotate()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"{segment:08d}{SEGMENT_SUFFIX}"
+
+    def _index_path(self, segment: int) -> Path:
+        return self.directory / f"{segment:08d}{INDEX_SUFFIX}"
+
+    def _open(self, size: int = 0, index_size: int = 0) -> None:
+        self._data = open(self._segment_path(self.segment), "a+b")
+        self._index = open(self._index_path(self.segment), "a+b")
+        self._data.truncate(size)
+        self._index.truncate(index_size)
+        self._size = size
+        self._index_size = index_size
+
+    def write(self, data: bytes, start: float, end: float) -> IndexEntry:
+        """Append ``data``, output received between ``start`` and ``end``, as one member"""
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)
+        member = compressor.compress(data) + compressor.flush()
+        entry = IndexEntry(self.segment, start, end, self._size, len(member), self.position, len(data))
+        try:
+            self._data.write(member)
+            self._data.flush()
+            # The index is written last, so readers never see a record of a partial member
+            self._index.write(INDEX_RECORD.pack(start, end, entry.offset, entry.length, entry.position, entry.size))
+            self._index.flush()
+        except OSError:
+            # Bytes of a partial write (e.g. a full disk) would shift the offset of every later member
+            self._reopen()
+            raise
+        self._size += len(member)
+        self._index_size += INDEX_RECORD.size
+        self.position += len(data)
+        if self._size >= self.max_segment_bytes:
+            self.rotate()
+        return entry
+
+    def _reopen(self) -> None:
+        """Cut the segment and its index back to the last complete member"""
+        for f in (self._data, self._index):
+            try:
+                f.close()
+            except OSError:
+                pass  # Unflushed bytes are cut off below
+        self._open(self._size, self._index_size)
+
+    def rotate(self) -> None:
+        """Start a new segment and delete the oldest beyond ``max_segments``"""
+        self._close_files()
+        sealed = self.segment
+        self.segment += 1
+        self._open()
+        for segment in _segment_numbers(self.directory)[:-self.max_segments]:
+            self._segment_path(segment).unlink(missing_ok=True)
+            self._index_path(segment).unlink(missing_ok=True)
+        for callback in list(self.on_rotate):
+            try:
+                callback(self.directory, sealed)
+            except Exception as e:
+                logger.warning(f"Capture rotate callback failed: {e}")
+
+    def _close_files(self) -> None:
+        self._data.close()
+        self._index.close()
+
+    def close(self) -> None:
+        if not self._data.closed:
+            self._close_files()
+
+
+class TranscriptReader:
+    """Reads the captured transcript of one pane"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    @property
+    def labels(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.directory / AGENT_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def segments(self) -> List[int]:
+        return _segment_numbers(self.directory)
+
+    def entries(self, segment: int) -> List[IndexEntry]:
+        return _read_index(self.directory / f"{segment:08d}{INDEX_SUFFIX}", segment)
+
+    def members(self, entries: List[IndexEntry]) -> Iterator[Tuple[IndexEntry, bytes]]:
+        """Decompressed members of consecutive index entries of one segment"""
+        if not entries:
+            return
+        try:
+            with open(self.directory / f"{entries[0].segment:08d}{SEGMENT_SUFFIX}", "rb") as f:
+                # Members of one read are contiguous, so they are fetched with a single read
+                f.seek(entries[0].offset)
+                chunk = f.read(entries[-1].offset + entries[-1].length - entries[0].offset)
+        except FileNotFoundError:
+            return  # Rotated away while reading
+        for entry in entries:
+            start = entry.offset - entries[0].offset
+            try:
+                yield entry, zlib.decompress(chunk[start:start + entry.length], 31)
+            except zlib.error as e:
+                raise CaptureError(f"Corrupt member at {entry.offset} of segment {entry.segment}: {e}")
+
+    def read(self, start: Optional[float] = None, end: Optional[float] = None) -> bytes:
+        """Output received between ``start`` and ``end``, to the granularity of one flush"""
+        chunks = []
+        for segment in self.segments():
+            entries = self.entries(segment)
+            if start is not None:
+                # Members are in time order; skip those that ended before start
+                entries = entries[bisect.bisect_left([entry.end for entry in entries], start):]
+            if end is not None:
+                entries = entries[:bisect.bisect_right([entry.start for entry in entries], end)]
+            chunks.extend(data for _, data in self.members(entries))
+        return b"".join(chunks)
+
+    def tail(self, size: int) -> bytes:
+        """Last ``size`` bytes of the transcript"""
+        chunks: List[bytes] = []
+        remaining = size
+        for segment in reversed(self.segments()):
+            entries = self.entries(segment)
+            first = len(entries)
+            while first > 0 and remaining > 0:
+                first -= 1
+                remaining -= entries[first].size
+            chunks[:0] = [data for _, data in self.members(entries[first:])]
+            if remaining <= 0:
+                break
+        return b"".join(chunks)[-size:] if size > 0 else b""
+
+    def tail_lines(self, count: int) -> List[str]:
+        """Last ``count`` lines of the transcript, decoded and without carriage returns"""
+        size = 64 * 1024
+        while True:
+            data = self.tail(size)
+            lines = data.decode("utf-8", errors="replace").replace("\r\n", "\n").split("\n")
+            if data.endswith(b"\n"):
+                lines.pop()
+            if len(lines) > count or len(data) < size:
+                return [line.rsplit("\r", 1)[-1] for line in lines[-count:]] if count > 0 else []
+            size *= 4
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self.segments()
+        indexes = [entries for entries in map(self.entries, segments) if entries]
+        first, last = (indexes[0][0], indexes[-1][-1]) if indexes else (None, None)
+        return {
+            "directory": str(self.directory),
+            "segments": len(segments),
+            "compressed_bytes": sum((self.directory / f"{segment:08d}{SEGMENT_SUFFIX}").stat().st_size
+                                    for segment in segments),
+            "bytes": last.position + last.size - first.position if indexes else 0,
+            "start": first.start if indexes else None,
+            "end": last.end if indexes else None,
+        }
+
+
+def list_transcripts(root: Union[str, Path]) -> List[Path]:
+    """Transcript directories of a transcript, task, space or capture directory"""
+    root = Path(root)
+    if (root / AGENT_FILE).exists():
+        return [root]
+    # Fixed depths, so worktrees are not walked
+    patterns = ["*/" + AGENT_FILE, "*/*/" + AGENT_FILE, ".haconiwa/capture/*/" + AGENT_FILE,
+                "tasks/*/.haconiwa/capture/*/" + AGENT_FILE]
+    return sorted({path.parent for pattern in patterns for path in root.glob(pattern)})
+
+
+@dataclass
+class _Pending:
+    data: bytearray
+    start: float
+    end: float
+
+
+class PaneCapture:
+    """Streams the output of every pane of a session into per-pane transcripts"""
+
+    def __init__(self, session: str, root: Optional[Union[str, Path]] = None,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS, tmux_bin: str = "tmux"):
+        self.session = session
+        self.root = Path(root) if root is not None else None
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.watcher = PaneActivityWatcher(session, tmux_bin)
+        self.writers: Dict[str, SegmentWriter] = {}
+        # Transcript directory of every pane written to, kept after stop()
+        self.directories: Dict[str, Path] = {}
+        self.bytes_written = 0
+        self.on_rotate: List[Callable[[Path, int], None]] = []
+        self._labels: Dict[str, Dict[str, str]] = {}
+        self._pending: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._unsubscribe: Optional[Callable[[], None]] = None
+
+    def start(self) -> "PaneCapture":
+        # Subscribed before attaching so that no output is missed
+        self._unsubscribe = self.watcher.client.subscribe(self._handle)
+        try:
+            self.watcher.start()
+        except Exception:
+            self._unsubscribe()
+            raise
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="haconiwa-capture", daemon=True)
+        self._thread.start()
+        logger.info(f"📼 Capturing panes of {self.session}")
+        return self
+
+    def _handle(self, notification: TmuxControlNotification) -> None:
+        if notification.name != "output":
+            return
+        pane_id, _, data = notification.args.partition(" ")
+        raw = decode_output(data)
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(pane_id)
+            if pending is None:
+                pending = self._pending[pane_id] = _Pending(bytearray(), now, now)
+            pending.data += raw
+            pending.end = now
+            if len(pending.data) >= BLOCK_SIZE:
+                self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered output; returns the number of bytes written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            written = 0
+            for pane_id, chunk in pending.items():
+                writer = self._writer(pane_id)
+                if writer is None:
+                    # Output of a pane whose window is not known yet; written with the next flush
+                    with self._lock:
+                        later = self._pending.get(pane_id)
+                        if later is not None:
+                            chunk.data += later.data
+                            chunk.end = later.end
+                        self._pending[pane_id] = chunk
+                    continue
+                try:
+                    writer.write(bytes(chunk.data), chunk.start, chunk.end)
+                    written += len(chunk.data)
+                except OSError as e:
+                    logger.warning(f"Cannot write capture of {pane_id} to {writer.directory}: {e}")
+            self.bytes_written += written
+            return written
+
+    def _writer(self, pane_id: str) -> Optional[SegmentWriter]:
+        pane = self.watcher.tracker.panes.get(pane_id)
+        if pane is None or not pane.window:
+            return None
+        writer = self.writers.get(pane_id)
+        if writer is None:
+            directory = agent_directory(self.session, pane, self.root)
+            try:
+                writer = SegmentWriter(directory, self.max_segment_bytes, self.max_segments)
+                _write_gitignore(directory.parent)
+            except OSError as e:
+                logger.warning(f"Cannot capture {pane_id} into {directory}: {e}")
+                return None
+            writer.on_rotate.append(self._rotated)
+            self.writers[pane_id] = writer
+            self.directories[pane_id] = directory
+            logger.info(f"📼 {self.session}:{pane.window}.{pane.pane_index} -> {directory}")
+
+        # Titles change when tasks are assigned; the labels follow them
+        labels = dict(pane.labels(self.session), pane_id=pane_id, cwd=pane.cwd, title=pane.title)
+        if self._labels.get(pane_id) != labels:
+            self._labels[pane_id] = labels
+            _write_json(writer.directory / AGENT_FILE, labels)
+        return writer
+
+    def _rotated(self, directory: Path, segment: int) -> None:
+        for callback in list(self.on_rotate):
+            callback(directory, segment)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self.watcher.stop()
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+
+    def __enter__(self) -> "PaneCapture":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _write_gitignore(directory: Path) -> None:
+    """Keep transcripts out of the task's worktree"""
+    path = directory / ".gitignore"
+    if not path.exists():
+        path.write_text("*\n", encoding="utf-8")
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".agent.")
+    except OSError as e:
+        logger.warning(f"Cannot write {path}: {e}")
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        Path(tmp_path).unlink(missing_ok=True)
+        logger.warning(f"Cannot write {path}: {e}")
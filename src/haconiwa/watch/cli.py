@@ -1,4 +1,6 @@
 import typer
+from pathlib import Path
+from typing import List, Optional
 from haconiwa.watch.monitor import Monitor
 
 watch_app = typer.Typer(help="監視・モニタリング (開発中)")
@@ -16,10 +18,51 @@ def stop():
     typer.echo("監視デーモンを停止しました。")
 
 @watch_app.command()
-def tail():
-    """リアルタイムメトリクス表示"""
-    monitor = Monitor()
-    typer.echo("メトリクス表示機能（実装予定）")
+def tail(
+    session: str = typer.Argument(..., help="監視するスペース (tmuxセッション名)"),
+    idle_after: float = typer.Option(30.0, "--idle", help="出力がこの秒数なければidleと判定"),
+    refresh: float = typer.Option(0.5, "--refresh", help="画面の更新間隔 (秒)"),
+    once: bool = typer.Option(False, "--once", help="--refresh 秒間の集計を一度だけ表示して終了"),
+):
+    """ペインごとの出力レート・最終出力・idle/blocked状態をライブ表示 (tmux control mode)"""
+    import time
+    from rich.console import Console
+    from rich.live import Live
+    from haconiwa.watch.tail import PaneActivityWatcher, TailError, render
+    from haconiwa.watch.timeseries import TimeSeriesError, TimeSeriesStore, default_metrics_dir
+
+    store = None
+    try:
+        store = TimeSeriesStore(default_metrics_dir() / "monitor.tsdb", readonly=True)
+    except TimeSeriesError:
+        pass  # The Monitor is not recording; the view works without host metrics
+
+    def header() -> str:
+        if store is None:
+            return ""
+        cpu = store.aggregate("cpu_percent", 60)
+        memory = store.aggregate("memory_percent", 60)
+        if cpu is None:
+            return ""
+        return f"Host (1m avg): CPU {cpu:.1f}%, Memory {memory or 0:.1f}%"
+
+    console = Console()
+    try:
+        with PaneActivityWatcher(session) as watcher:
+            if once:
+                time.sleep(refresh)
+                console.print(render(watcher.tracker, idle_after, header()))
+                return
+            with Live(render(watcher.tracker, idle_after, header()), console=console,
+                      refresh_per_second=max(1, int(1 / refresh)), screen=False) as live:
+                while watcher.client.is_alive:
+                    time.sleep(refresh)
+                    live.update(render(watcher.tracker, idle_after, header()))
+    except TailError as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
+    except KeyboardInterrupt:
+        pass
 
 @watch_app.command()
 def health():
@@ -27,5 +70,209 @@ def health():
     monitor = Monitor()
     typer.echo("システムのヘルスステータス: OK（デモ）")
 
+@watch_app.command()
+def agents(
+    session: Optional[List[str]] = typer.Option(None, "--session", "-s", help="対象セッション (複数指定可、省略時は全セッション)"),
+    interval: float = typer.Option(1.0, "--interval", "-i", help="CPU/IO計測の間隔 (秒)"),
+    top: int = typer.Option(10, "--top", "-n", help="表示するエージェント数"),
+    sort: str = typer.Option("cpu_percent", "--sort", help="並び順 (cpu_percent, rss_bytes, write_bytes_per_second, ...)"),
+    json_output: bool = typer.Option(False, "--json", help="JSONで出力"),
+):
+    """エージェント (tmuxペイン) ごとのCPU・メモリ・IO使用量"""
+    import json
+    import time
+    from rich.console import Console
+    from rich.table import Table
+    from haconiwa.watch.agent_metrics import AgentMetricsCollector, AgentSample
+
+    if sort not in AgentSample.__dataclass_fields__ or sort in ("pane", "labels"):
+        typer.echo(f"❌ Unknown sort key: {sort}", err=True)
+        raise typer.Exit(1)
+
+    collector = AgentMetricsCollector(session)
+    panes = collector.list_panes()
+    if not panes:
+        typer.echo("❌ No tmux panes found", err=True)
+        raise typer.Exit(1)
+    collector.sample(panes)
+    time.sleep(interval)
+    collector.sample(panes)
+    busiest = collector.top(top, sort)
+
+    if json_output:
+        typer.echo(json.dumps([sample.to_dict() for sample in busiest], ensure_ascii=False, indent=2))
+        return
+
+    table = Table(title=f"Agents ({len(collector.samples)} panes)")
+    for column in ("Pane", "Org", "Role", "Task"):
+        table.add_column(column)
+    for column in ("CPU %", "RSS MB", "Read KB/s", "Write KB/s", "FDs", "Procs"):
+        table.add_column(column, justify="right")
+    for sample in busiest:
+        labels = sample.labels
+        table.add_row(
+            sample.pane.target, labels["org"], labels["role"], labels["task"],
+            f"{sample.cpu_percent:.1f}", f"{sample.rss_bytes / 1_048_576:.1f}",
+            f"{sample.read_bytes_per_second / 1024:.1f}", f"{sample.write_bytes_per_second / 1024:.1f}",
+            str(sample.open_files), str(sample.processes),
+        )
+    Console().print(table)
+
+@watch_app.command()
+def history(
+    metric: Optional[str] = typer.Argument(None, help="メトリクス名 (省略時は一覧表示)"),
+    since: str = typer.Option("10m", "--since", help="期間 (例: 90s, 10m, 6h, 1d)"),
+    resolution: Optional[str] = typer.Option(None, "--resolution", "-r", help="集計粒度 (例: 1s, 1m)"),
+    agg: str = typer.Option("avg", "--agg", help="集計方法 (avg, min, max, sum, count)"),
+    file: Optional[Path] = typer.Option(None, "--file", "-f", help="メトリクスファイル (既定: ~/.haconiwa/cache/metrics/monitor.tsdb)"),
+    json_output: bool = typer.Option(False, "--json", help="JSONで出力"),
+):
+    """監視メトリクスの履歴を表示"""
+    import json
+    import time
+    from datetime import datetime
+    from haconiwa.watch.timeseries import TimeSeriesError, TimeSeriesStore, default_metrics_dir, parse_duration
+
+    path = file or default_metrics_dir() / "monitor.tsdb"
+    try:
+        store = TimeSeriesStore(path, readonly=True)
+        if metric is None:
+            for name in store.series():
+                typer.echo(name)
+            return
+        now = time.time()
+        points = store.query(metric, now - parse_duration(since), now,
+                             parse_duration(resolution) if resolution else None, agg)
+    except TimeSeriesError as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
+
+    if json_output:
+        typer.echo(json.dumps([{"timestamp": ts, "value": value} for ts, value in points]))
+        return
+    if not points:
+        typer.echo(f"No data for {metric} in the last {since}")
+        return
+    for ts, value in points:
+        typer.echo(f"{datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')}  {value:.2f}")
+
+@watch_app.command()
+def capture(
+    session: str = typer.Argument(..., help="記録するスペース (tmuxセッション名)"),
+    directory: Optional[Path] = typer.Option(None, "--dir", "-d", help="保存先 (既定: 各タスクの .haconiwa/capture)"),
+    flush_interval: float = typer.Option(1.0, "--flush", help="書き込み間隔 (秒)"),
+    segment_mb: float = typer.Option(4.0, "--segment-mb", help="セグメントのローテーションサイズ (MB, 圧縮後)"),
+    max_segments: int = typer.Option(8, "--max-segments", help="ペインごとに保持するセグメント数"),
+    duration: Optional[float] = typer.Option(None, "--duration", help="この秒数で記録を終了 (省略時は Ctrl-C まで)"),
+    index: bool = typer.Option(False, "--index", help="記録しながら検索インデックス (watch grep) を更新"),
+    index_interval: float = typer.Option(30.0, "--index-interval", help="検索インデックスの更新間隔 (秒、ローテーション時は即時)"),
+):
+    """全ペインの出力を圧縮ログに記録 (tmux control mode)"""
+    import time
+    from haconiwa.watch.capture import PaneCapture
+    from haconiwa.watch.search import CaptureIndexer, SearchError, TranscriptIndex
+    from haconiwa.watch.tail import TailError
+
+    recorder = PaneCapture(session, directory, flush_interval, int(segment_mb * 1024 * 1024), max_segments)
+    indexer = None
+    try:
+        if index:
+            indexer = CaptureIndexer(TranscriptIndex(), recorder, index_interval)
+        with recorder:
+            if indexer is not None:
+                indexer.start()
+            typer.echo(f"📼 Capturing {session} (Ctrl-C to stop)")
+            deadline = time.monotonic() + duration if duration is not None else None
+            while recorder.watcher.client.is_alive and (deadline is None or time.monotonic() < deadline):
+                time.sleep(min(0.5, flush_interval))
+    except (TailError, SearchError) as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if indexer is not None:
+            indexer.stop()
+    typer.echo(f"✅ Captured {recorder.bytes_written} bytes")
+
+@watch_app.command()
+def transcript(
+    path: Path = typer.Argument(..., help="ペインの記録ディレクトリ、またはタスク/スペースのディレクトリ"),
+    lines: int = typer.Option(50, "--lines", "-n", help="末尾から表示する行数"),
+    since: Optional[str] = typer.Option(None, "--since", help="期間を指定して表示 (例: 90s, 10m)"),
+    raw: bool = typer.Option(False, "--raw", help="エスケープシーケンスを含む出力をそのまま書き出す"),
+):
+    """記録したペイン出力を表示"""
+    import sys
+    import time
+    from haconiwa.watch.capture import AGENT_FILE, CaptureError, TranscriptReader, list_transcripts, strip_escapes
+    from haconiwa.watch.timeseries import TimeSeriesError, parse_duration
+
+    if not (path / AGENT_FILE).exists():
+        found = list_transcripts(path) if path.is_dir() else []
+        if not found:
+            typer.echo(f"❌ No transcripts under {path}", err=True)
+            raise typer.Exit(1)
+        for directory in found:
+            stats = TranscriptReader(directory).stats()
+            typer.echo(f"{directory}  {stats['bytes']} bytes in {stats['segments']} segments")
+        return
+
+    reader = TranscriptReader(path)
+    try:
+        if since is not None:
+            data = reader.read(time.time() - parse_duration(since))
+        else:
+            data = "\n".join(reader.tail_lines(lines)).encode("utf-8") + b"\n"
+    except (CaptureError, TimeSeriesError) as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
+    if not raw:
+        data = strip_escapes(data)
+    sys.stdout.buffer.write(data)
+
+@watch_app.command()
+def grep(
+    pattern: str = typer.Argument(..., help="検索文字列 (--fts でFTS5クエリ)"),
+    root: Optional[List[Path]] = typer.Option(None, "--root", "-r", help="記録を探すディレクトリ (既定: カレントと ~/.haconiwa/cache/capture)"),
+    session: Optional[str] = typer.Option(None, "--session", "-s", help="セッションで絞り込み"),
+    room: Optional[str] = typer.Option(None, "--room", help="ルームで絞り込み"),
+    task: Optional[str] = typer.Option(None, "--task", "-t", help="タスクで絞り込み"),
+    pane: Optional[str] = typer.Option(None, "--pane", help="ペイン (window.pane) で絞り込み"),
+    since: Optional[str] = typer.Option(None, "--since", help="期間 (例: 10m, 6h, 1d)"),
+    limit: int = typer.Option(50, "--limit", "-n", help="最大表示件数"),
+    fts: bool = typer.Option(False, "--fts", help="パターンをFTS5クエリとして解釈 (AND/OR/NEAR など)"),
+    no_update: bool = typer.Option(False, "--no-update", help="検索前にインデックスを更新しない"),
+    json_output: bool = typer.Option(False, "--json", help="JSONで出力"),
+):
+    """記録したエージェントのペイン出力を全文検索"""
+    import json
+    import time
+    from datetime import datetime
+    from haconiwa.watch.capture import default_capture_dir
+    from haconiwa.watch.search import SearchError, TranscriptIndex
+    from haconiwa.watch.timeseries import TimeSeriesError, parse_duration
+
+    try:
+        index = TranscriptIndex()
+        if not no_update:
+            index.update(root or [Path.cwd(), default_capture_dir()])
+        hits = index.search(pattern, session=session, room=room, task=task, pane=pane,
+                            since=time.time() - parse_duration(since) if since else None, limit=limit, fts=fts)
+    except (SearchError, TimeSeriesError) as e:
+        typer.echo(f"❌ {e}", err=True)
+        raise typer.Exit(1)
+
+    if json_output:
+        typer.echo(json.dumps([hit.to_dict() for hit in hits], ensure_ascii=False, indent=2))
+        return
+    if not hits:
+        typer.echo(f"No matches for {pattern}")
+        raise typer.Exit(1)
+    for hit in hits:
+        agent = " / ".join(part for part in (hit.org, hit.role, hit.task) if part)
+        stamp = datetime.fromtimestamp(hit.start).strftime("%Y-%m-%d %H:%M:%S")
+        typer.echo(f"{stamp}  {hit.session}:{hit.pane}  [{agent}]  {hit.line}")
+
 if __name__ == "__main__":
     watch_app()
\ No newline at end of file
@@ -1,61 +1,134 @@
+import time
 import psutil
-from prometheus_client import Gauge, start_http_server
+from prometheus_client import CollectorRegistry, Gauge, start_http_server
 import matplotlib.pyplot as plt
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from haconiwa.core.config import Config
+from haconiwa.core.config import get_config
 from haconiwa.core.logging import get_logger
+from haconiwa.watch.agent_metrics import AgentMetricsCollector
+from haconiwa.watch.timeseries import TimeSeriesError, TimeSeriesStore, default_metrics_dir, series_key
+
+# Agent sample attributes kept as history, per pane
+AGENT_SERIES = ("cpu_percent", "rss_bytes", "write_bytes_per_second")
 
 class Monitor:
-    def __init__(self):
-        self.config = Config()
+    def __init__(self, port: int = 8000, sessions=None, interval: float = 5.0,
+                 store: TimeSeriesStore = None, dashboard_interval: float = 60.0):
+        self.config = get_config()
         self.logger = get_logger(__name__)
-        self.cpu_usage_gauge = Gauge('cpu_usage', 'CPU Usage')
-        self.memory_usage_gauge = Gauge('memory_usage', 'Memory Usage')
-        start_http_server(8000)
+        self.port = port
+        self.interval = interval
+        # Each monitor exports its own registry, so several can coexist in one process
+        self.registry = CollectorRegistry()
+        self.cpu_usage_gauge = Gauge('cpu_usage', 'CPU Usage', registry=self.registry)
+        self.memory_usage_gauge = Gauge('memory_usage', 'Memory Usage', registry=self.registry)
+        self.agent_metrics = AgentMetricsCollector(sessions, registry=self.registry)
+        self._server_started = False
+        self._store = store
+        self.dashboard_interval = dashboard_interval
+        self._last_dashboard = 0.0
+        self.last_metrics = {}
+        # cpu_percent(None) reports usage since the previous call; prime it
+        psutil.cpu_percent(interval=None)
+
+    @property
+    def store(self) -> TimeSeriesStore:
+        """Metric history, persisted so `watch history` can read it from another process
+
+        With three series per pane, the store holds the history of about 85 panes written to
+        within the last 24 hours; series of panes gone for longer give their slots to new ones.
+        """
+        if self._store is None:
+            self._store = TimeSeriesStore(default_metrics_dir() / "monitor.tsdb")
+        return self._store
+
+    def start_server(self):
+        if not self._server_started:
+            start_http_server(self.port, registry=self.registry)
+            self._server_started = True
 
     def collect_metrics(self):
-        cpu_usage = psutil.cpu_percent(interval=1)
+        cpu_usage = psutil.cpu_percent(interval=None)
         memory_info = psutil.virtual_memory()
         self.cpu_usage_gauge.set(cpu_usage)
         self.memory_usage_gauge.set(memory_info.percent)
-        self.logger.info(f"CPU Usage: {cpu_usage}%, Memory Usage: {memory_info.percent}%")
+        agents = self.agent_metrics.sample()
+        self.logger.info(f"CPU Usage: {cpu_usage}%, Memory Usage: {memory_info.percent}%, Agents: {len(agents)}")
+        busiest = self.agent_metrics.top(1)
+        if busiest and busiest[0].cpu_percent:
+            self.logger.info(f"Busiest agent: {busiest[0].pane.target} ({busiest[0].cpu_percent}% CPU)")
+        self.last_metrics = {"cpu": cpu_usage, "memory": memory_info.percent,
+                             "agents": [agent.to_dict() for agent in agents]}
+        self.record_metrics(self.last_metrics)
+        return self.last_metrics
+
+    def record_metrics(self, metrics, timestamp=None):
+        samples = {"cpu_percent": metrics["cpu"], "memory_percent": metrics["memory"]}
+        for agent in metrics.get("agents", []):
+            for attribute in AGENT_SERIES:
+                samples[series_key(f"agent_{attribute}", {"pane": agent["target"]})] = agent[attribute]
+        try:
+            self.store.add_many(samples, timestamp)
+        except TimeSeriesError as e:
+            self.logger.warning(f"Metric history not recorded: {e}")
 
-    def generate_dashboard(self):
-        cpu_usage = psutil.cpu_percent(interval=1, percpu=True)
+    def generate_dashboard(self, since: float = 600.0, path: str = 'cpu_usage_dashboard.png'):
+        now = time.time()
         plt.figure(figsize=(10, 5))
-        plt.plot(cpu_usage, label='CPU Usage')
+        for name, label in (("cpu_percent", "CPU Usage"), ("memory_percent", "Memory Usage")):
+            points = self.store.query(name, now - since, now)
+            plt.plot([(ts - now) / 60 for ts, _ in points], [value for _, value in points], label=label)
         plt.title('CPU Usage Over Time')
-        plt.xlabel('Time')
-        plt.ylabel('CPU Usage (%)')
+        plt.xlabel('Minutes ago')
+        plt.ylabel('Usage (%)')
         plt.legend()
-        plt.savefig('cpu_usage_dashboard.png')
+        plt.savefig(path)
         plt.close()
 
     def send_alert(self, message):
-        email_config = self.config.get_email_config()
-        msg = MIMEMultipart()
-        msg['From'] = email_config['from']
-        msg['To'] = email_config['to']
-        msg['Subject'] = 'Alert: System Metrics'
-        msg.attach(MIMEText(message, 'plain'))
-        server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-        server.starttls()
-        server.login(email_config['from'], email_config['password'])
-        server.send_message(msg)
-        server.quit()
+        # watch.alerts.email: smtp_server, smtp_port, from, to and password
+        email_config = self.config.get("watch.alerts.email")
+        if not email_config:
+            self.logger.warning(f"Alert not sent, watch.alerts.email is not configured: {message}")
+            return False
+        try:
+            msg = MIMEMultipart()
+            msg['From'] = email_config['from']
+            msg['To'] = email_config['to']
+            msg['Subject'] = 'Alert: System Metrics'
+            msg.attach(MIMEText(message, 'plain'))
+            with smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'], timeout=30) as server:
+                server.starttls()
+                server.login(email_config['from'], email_config['password'])
+                server.send_message(msg)
+        except (KeyError, OSError) as e:
+            # smtplib errors are OSErrors; a failed email must not stop the monitor loop
+            self.logger.error(f"Failed to send alert email: {e!r}")
+            return False
+        return True
 
     def check_alert_conditions(self):
-        cpu_usage = psutil.cpu_percent(interval=1)
-        if cpu_usage > self.config.get_alert_threshold('cpu'):
-            self.send_alert(f"High CPU usage detected: {cpu_usage}%")
+        # watch.alerts.cpu_percent: threshold on the average over watch.alerts.window seconds
+        threshold = self.config.get("watch.alerts.cpu_percent")
+        if threshold is None:
+            return
+        cpu_usage = self.store.aggregate("cpu_percent", self.config.get("watch.alerts.window", 60))
+        if cpu_usage is not None and cpu_usage > threshold:
+            self.send_alert(f"High CPU usage detected: {cpu_usage:.1f}%")
 
     def run(self):
+        self.start_server()
         while True:
+            started = time.monotonic()
             self.collect_metrics()
             self.check_alert_conditions()
-            self.generate_dashboard()
+            if time.monotonic() - self._last_dashboard >= self.dashboard_interval:
+                self.generate_dashboard()
+                self._last_dashboard = time.monotonic()
+            self.store.flush()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
 
 if __name__ == "__main__":
     monitor = Monitor()
@@ -0,0 +1,346 @@
+"""
+Transcript Search for Haconiwa v1.0
+
+Full-text index of the pane transcripts recorded by ``watch capture``, for
+``haconiwa watch grep``. Transcript output is stored as chunks of complete
+lines in SQLite with an FTS5 index (trigram tokenizer, so any substring of
+three or more characters is found in any script), labelled with the session,
+room, org, role, pane and task of the agent and the time it was printed.
+Updates are incremental: the number of members indexed per segment is
+recorded, so only members appended since the last update are read, and the
+chunks of segments deleted by rotation are dropped with them.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import logging
+
+from haconiwa.watch.capture import CaptureError, PaneCapture, TranscriptReader, list_transcripts, strip_escapes
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DIR_ENV = "HACONIWA_SEARCH_DIR"
+DEFAULT_INDEX_INTERVAL = 30.0
+# Output without a newline (full-screen redraws) is indexed once this much has accumulated
+MAX_CARRY = 64 * 1024
+LABELS = ("session", "room", "org", "role", "task", "pane")
+
+# trigram needs SQLite 3.34; older versions index words, which still serves phrase queries
+TOKENIZER = "trigram" if sqlite3.sqlite_version_info >= (3, 34, 0) else "unicode61"
+
+SCHEMA = f"""
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    directory TEXT NOT NULL UNIQUE,
+    session TEXT NOT NULL DEFAULT '',
+    room TEXT NOT NULL DEFAULT '',
+    org TEXT NOT NULL DEFAULT '',
+    role TEXT NOT NULL DEFAULT '',
+    task TEXT NOT NULL DEFAULT '',
+    pane TEXT NOT NULL DEFAULT '',
+    carry BLOB NOT NULL DEFAULT x'',
+    carry_start REAL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    transcript INTEGER NOT NULL,
+    segment INTEGER NOT NULL,
+    first_start REAL NOT NULL,
+    entries INTEGER NOT NULL,
+    PRIMARY KEY (transcript, segment)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    transcript INTEGER NOT NULL,
+    segment INTEGER NOT NULL,
+    start_at REAL NOT NULL,
+    end_at REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_segment ON chunks (transcript, segment);
+CREATE INDEX IF NOT EXISTS chunks_time ON chunks (start_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='chunks', content_rowid='id', tokenize='{TOKENIZER}'
+);
+CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+COMMIT;
+"""
+
+_CONTROL = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+_FTS_TERM = re.compile(r'"([^"]+)"|([^\s"()*:^]+)')
+
+
+class SearchError(Exception):
+    """Transcript search error"""
+    pass
+
+
+@dataclass
+class SearchHit:
+    """A line of a transcript matching a query"""
+    directory: str
+    session: str
+    room: str
+    org: str
+    role: str
+    task: str
+    pane: str
+    start: float
+    end: float
+    line: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def default_index_path() -> Path:
+    return Path(os.environ.get(SEARCH_DIR_ENV) or Path.home() / ".haconiwa" / "cache" / "search") / "transcripts.db"
+
+
+def clean_text(data: bytes) -> str:
+    """Searchable text of terminal output: no escape sequences, and lines as last redrawn after ``\\r``"""
+    text = strip_escapes(data).decode("utf-8", errors="replace").replace("\r\n", "\n")
+    return "\n".join(_CONTROL.sub("", line.rsplit("\r", 1)[-1]) for line in text.split("\n"))
+
+
+class TranscriptIndex:
+    """Incrementally updated FTS5 index of captured transcripts"""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, busy_timeout: float = 30.0):
+        self.path = Path(path or default_index_path())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        try:
+            self._conn = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            raise SearchError(f"Cannot open search index {self.path}: {e}")
+
+    def update(self, roots: Iterable[Union[str, Path]] = ()) -> int:
+        """Index new output of known transcripts and of those found under ``roots``; returns chunks added"""
+        known = [Path(directory) for directory, in self._query("SELECT directory FROM transcripts")]
+        found = [directory for root in roots for directory in list_transcripts(root)]
+        return self.update_directories(dict.fromkeys(known + found))
+
+    def update_directories(self, directories: Iterable[Union[str, Path]]) -> int:
+        added = 0
+        for directory in directories:
+            directory = Path(directory).absolute()
+            if directory.is_dir():
+                added += self._update_transcript(directory)
+            else:
+                self._forget(directory)
+        return added
+
+    def _update_transcript(self, directory: Path) -> int:
+        reader = TranscriptReader(directory)
+        labels = reader.labels
+        values = [str(labels.get(label, "")) for label in LABELS]
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id, carry, carry_start FROM transcripts WHERE directory = ?",
+                               (str(directory),)).fetchone()
+            if row is None:
+                transcript = conn.execute(
+                    f"INSERT INTO transcripts (directory, {', '.join(LABELS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [str(directory)] + values).lastrowid
+                carry, carry_start = b"", None
+            else:
+                transcript, carry, carry_start = row
+                conn.execute(f"UPDATE transcripts SET {', '.join(f'{label} = ?' for label in LABELS)} WHERE id = ?",
+                             values + [transcript])
+
+            indexed = {segment: (first_start, entries) for segment, first_start, entries in conn.execute(
+                "SELECT segment, first_start, entries FROM segments WHERE transcript = ?", (transcript,))}
+            present = reader.segments()
+            for segment in set(indexed) - set(present):
+                # Deleted by rotation
+                self._drop_segment(conn, transcript, segment)
+
+            added = 0
+            for segment in present:
+                entries = reader.entries(segment)
+                if not entries:
+                    continue
+                done = indexed.get(segment)
+                if done is not None and (done[0] != entries[0].start or done[1] > len(entries)):
+                    # The transcript was deleted and captured again from scratch
+                    self._drop_segment(conn, transcript, segment)
+                    done, carry, carry_start = None, b"", None
+                new = entries[done[1] if done else 0:]
+                if not new:
+                    continue
+
+                rows = []
+                try:
+                    for entry, data in reader.members(new):
+                        data, start = carry + data, carry_start if carry else entry.start
+                        cut = data.rfind(b"\n") + 1
+                        if cut == 0 and len(data) >= MAX_CARRY:
+                            cut = len(data)
+                        carry, carry_start = data[cut:], start if cut == 0 else entry.start
+                        if cut:
+                            text = clean_text(data[:cut])
+                            if text.strip():
+                                rows.append((transcript, segment, start, entry.end, text))
+                except CaptureError as e:
+                    # Keep what was read before the damage; the rest of this segment is skipped for good
+                    logger.warning(f"Skipping the rest of segment {segment} of {directory}: {e}")
+                    carry, carry_start = b"", None
+                conn.executemany("INSERT INTO chunks (transcript, segment, start_at, end_at, text) "
+                                 "VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT INTO segments (transcript, segment, first_start, entries) VALUES (?, ?, ?, ?) "
+                             "ON CONFLICT(transcript, segment) DO UPDATE SET first_start = excluded.first_start, "
+                             "entries = excluded.entries", (transcript, segment, entries[0].start, len(entries)))
+                added += len(rows)
+            conn.execute("UPDATE transcripts SET carry = ?, carry_start = ? WHERE id = ?",
+                         (carry, carry_start, transcript))
+        if added:
+            logger.debug(f"Indexed {added} chunks of {directory}")
+        return added
+
+    @staticmethod
+    def _drop_segment(conn: sqlite3.Connection, transcript: int, segment: int) -> None:
+        conn.execute("DELETE FROM chunks WHERE transcript = ? AND segment = ?", (transcript, segment))
+        conn.execute("DELETE FROM segments WHERE transcript = ? AND segment = ?", (transcript, segment))
+
+    def _forget(self, directory: Path) -> None:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id FROM transcripts WHERE directory = ?", (str(directory),)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM chunks WHERE transcript = ?", row)
+                conn.execute("DELETE FROM segments WHERE transcript = ?", row)
+                conn.execute("DELETE FROM transcripts WHERE id = ?", row)
+                logger.info(f"🗑️ Removed transcript {directory} from the search index")
+
+    def search(self, query: str, session: Optional[str] = None, room: Optional[str] = None,
+               task: Optional[str] = None, pane: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, limit: int = 50, fts: bool = False) -> List[SearchHit]:
+        """Lines containing ``query`` (or matching an FTS5 query with ``fts``), newest first"""
+        if not query.strip():
+            raise SearchError("Empty search query")
+        if fts:
+            match, terms = query, [a or b for a, b in _FTS_TERM.findall(query)
+                                   if (a or b) not in ("AND", "OR", "NOT", "NEAR")]
+        else:
+            match, terms = '"' + query.replace('"', '""') + '"', [query]
+
+        if fts or TOKENIZER != "trigram" or len(query) >= 3:
+            conditions, params = ["c.id IN (SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ?)"], [match]
+        else:
+            # Too short for a trigram; scanned
+            conditions, params = ["c.text LIKE ? ESCAPE '\\'"], ["%" + re.sub(r"([%_\\])", r"\\\1", query) + "%"]
+        for column, value in (("session", session), ("room", room), ("task", task), ("pane", pane)):
+            if value is not None:
+                conditions.append(f"t.{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("c.end_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("c.start_at <= ?")
+            params.append(until)
+
+        try:
+            rows = self._query(
+                "SELECT t.directory, t.session, t.room, t.org, t.role, t.task, t.pane, c.start_at, c.end_at, c.text "
+                "FROM chunks c JOIN transcripts t ON t.id = c.transcript "
+                f"WHERE {' AND '.join(conditions)} ORDER BY c.start_at DESC, c.id DESC LIMIT ?",
+                tuple(params) + (limit,))
+        except sqlite3.OperationalError as e:
+            raise SearchError(f"Invalid search query {query!r}: {e}")
+
+        folded = [term.casefold() for term in terms]
+        hits: List[SearchHit] = []
+        for *fields, text in rows:
+            lines = [line for line in text.split("\n") if any(term in line.casefold() for term in folded)]
+            # An FTS5 query can match a chunk through terms spread over several lines
+            for line in reversed(lines or [text.strip().split("\n")[0]]):
+                hits.append(SearchHit(*fields, line=line.strip()))
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def stats(self) -> Dict[str, Any]:
+        (transcripts,), = self._query("SELECT COUNT(*) FROM transcripts")
+        (chunks, first, last), = self._query("SELECT COUNT(*), MIN(start_at), MAX(end_at) FROM chunks")
+        return {"path": str(self.path), "transcripts": transcripts, "chunks": chunks, "start": first, "end": last,
+                "tokenizer": TOKENIZER}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE serializes indexers across processes"""
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.Error as e:
+                raise SearchError(f"Cannot lock search index {self.path}: {e}")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+
+class CaptureIndexer:
+    """Keeps a TranscriptIndex current with a running PaneCapture, on rotation and every ``interval`` seconds"""
+
+    def __init__(self, index: TranscriptIndex, capture: PaneCapture, interval: float = DEFAULT_INDEX_INTERVAL):
+        self.index = index
+        self.capture = capture
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        capture.on_rotate.append(lambda directory, segment: self._wake.set())
+
+    def start(self) -> "CaptureIndexer":
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="haconiwa-capture-index", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.update()
+
+    def update(self) -> int:
+        try:
+            return self.index.update_directories(list(self.capture.directories.values()))
+        except (SearchError, sqlite3.Error, OSError) as e:
+            logger.warning(f"Cannot update transcript index: {e}")
+            return 0
+
+    def stop(self) -> None:
+        """Stop and index what the capture wrote last; call after the capture has stopped"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.update()
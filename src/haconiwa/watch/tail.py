@@ -0,0 +1,299 @@
+"""
+Pane Activity Tail for Haconiwa v1.0
+
+Live per-pane activity of a space for ``haconiwa watch tail``. A control-mode
+client attached to the space session receives ``%output`` for every pane and
+a format subscription (``refresh-client -B``) that tmux re-sends only when a
+pane's directory, title or mode changes, so after one initial ``list-panes``
+the view is updated from notifications alone instead of polling.
+"""
+
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import logging
+
+from haconiwa.space.control import TmuxControlClient, TmuxControlError, TmuxControlNotification
+from haconiwa.watch.agent_metrics import AgentPane, pane_labels
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION = "haconiwa-tail"
+# Pushed by tmux whenever the value changes; tab separated since titles and paths may contain spaces
+PANE_FIELDS = ["#{window_index}", "#{window_name}", "#{pane_index}", "#{pane_title}",
+               "#{pane_current_path}", "#{pane_in_mode}", "#{pane_dead}"]
+PANE_FORMAT = "\t".join(["#{window_id}", "#{pane_id}"] + PANE_FIELDS)
+
+DEFAULT_IDLE_AFTER = 30.0
+# Time constant of the output rate average, in seconds
+RATE_HALF_LIFE = 5.0
+LAST_LINE_LENGTH = 200
+
+# Prompts after which an agent waits for a human
+BLOCKED_PATTERN = re.compile(
+    r"(\(y/n\)|\[y/n\]|\(yes/no\)|do you want to|press enter|continue\?|approve|allow this|❯\s*1\.\s*yes)\s*\S{0,3}\s*$",
+    re.IGNORECASE,
+)
+
+_OCTAL = re.compile(r"\\([0-7]{3})")
+_ANSI = re.compile(r"\x1b(\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(\x07|\x1b\\)|[@-Z\\-_])")
+_LAYOUT_PANE = re.compile(r"\d+x\d+,\d+,\d+,(\d+)")
+
+
+class TailError(Exception):
+    """Pane activity tail error"""
+    pass
+
+
+def decode_output(data: str) -> bytes:
+    """Bytes of a ``%output`` payload, in which tmux escapes control characters and ``\\`` as octal
+
+    TmuxControlClient decodes lines with ``surrogateescape``, so bytes of a
+    character split across two notifications are restored as they were sent.
+    """
+    out, position = bytearray(), 0
+    for match in _OCTAL.finditer(data):
+        out += data[position:match.start()].encode("utf-8", errors="surrogateescape")
+        out.append(int(match.group(1), 8))
+        position = match.end()
+    out += data[position:].encode("utf-8", errors="surrogateescape")
+    return bytes(out)
+
+
+def last_line(data: bytes) -> str:
+    """Last non-empty line of terminal output, without escape sequences"""
+    text = _ANSI.sub("", data.decode("utf-8", errors="replace"))
+    for line in reversed(re.split(r"[\r\n]", text)):
+        line = "".join(char for char in line if char.isprintable()).strip()
+        if line:
+            return line[-LAST_LINE_LENGTH:]
+    return ""
+
+
+@dataclass
+class PaneActivity:
+    """Activity of one pane, updated from notifications"""
+    pane_id: str
+    window_id: str
+    window: str = ""
+    window_name: str = ""
+    pane_index: int = 0
+    title: str = ""
+    cwd: str = ""
+    in_mode: bool = False
+    dead: bool = False
+    bytes_total: int = 0
+    last_output: Optional[float] = None
+    _rate: float = 0.0
+    _tail: bytes = b""
+
+    def record(self, size: int, data: bytes, now: float) -> None:
+        self._rate = self.rate(now) + size * math.log(2) / RATE_HALF_LIFE
+        self.bytes_total += size
+        self.last_output = now
+        # Keep only the end of the output; the last line is extracted when rendering
+        self._tail = (self._tail + data)[-4 * LAST_LINE_LENGTH:]
+
+    def rate(self, now: float) -> float:
+        """Exponentially decayed output rate in bytes per second"""
+        if self.last_output is None:
+            return 0.0
+        return self._rate * 0.5 ** ((now - self.last_output) / RATE_HALF_LIFE)
+
+    @property
+    def last_line(self) -> str:
+        return last_line(self._tail)
+
+    def status(self, now: float, idle_after: float = DEFAULT_IDLE_AFTER) -> str:
+        if self.dead:
+            return "dead"
+        if self.in_mode:
+            return "copy-mode"
+        quiet = now - self.last_output if self.last_output is not None else None
+        if quiet is not None and quiet >= 1.0 and BLOCKED_PATTERN.search(self.last_line):
+            return "blocked"
+        if quiet is None or quiet >= idle_after:
+            return "idle"
+        return "active"
+
+    def labels(self, session: str) -> Dict[str, str]:
+        return pane_labels(AgentPane(session, self.window, self.window_name.replace(" Room", ""),
+                                     self.pane_index, 0, self.title, self.cwd))
+
+
+class ActivityTracker:
+    """Pane activity of one session, maintained from control-mode notifications"""
+
+    def __init__(self, session: str, clock: Callable[[], float] = time.monotonic):
+        self.session = session
+        self.clock = clock
+        self.panes: Dict[str, PaneActivity] = {}
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def load(self, list_panes_output: str) -> None:
+        """Initial state from ``list-panes -s -F PANE_FORMAT``"""
+        with self._lock:
+            for line in list_panes_output.splitlines():
+                fields = line.split("\t")
+                if len(fields) == len(PANE_FIELDS) + 2:
+                    self._update(fields[1], fields[0], fields[2:])
+
+    def handle(self, notification: TmuxControlNotification) -> None:
+        name, args = notification.name, notification.args
+        with self._lock:
+            self.events += 1
+            if name == "output":
+                pane_id, _, data = args.partition(" ")
+                pane = self.panes.get(pane_id)
+                if pane is None:
+                    # A pane created since load(); the subscription fills in where it is
+                    pane = self.panes[pane_id] = PaneActivity(pane_id, "")
+                raw = decode_output(data)
+                pane.record(len(raw), raw, self.clock())
+            elif name == "subscription-changed":
+                head, _, value = args.partition(" : ")
+                fields = head.split(" ")
+                if len(fields) >= 5 and fields[0] == SUBSCRIPTION and fields[4].startswith("%"):
+                    self._update(fields[4], fields[2], value.split("\t"))
+            elif name == "window-renamed":
+                window_id, _, window_name = args.partition(" ")
+                for pane in self.panes.values():
+                    if pane.window_id == window_id:
+                        pane.window_name = window_name
+            elif name in ("window-close", "unlinked-window-close"):
+                window_id = args.split(" ", 1)[0]
+                self.panes = {pane_id: pane for pane_id, pane in self.panes.items() if pane.window_id != window_id}
+            elif name == "layout-change":
+                window_id, _, layout = args.partition(" ")
+                live = {f"%{pane}" for pane in _LAYOUT_PANE.findall(layout.split(" ", 1)[0])}
+                self.panes = {pane_id: pane for pane_id, pane in self.panes.items()
+                              if pane.window_id != window_id or pane_id in live}
+            elif name == "pane-mode-changed":
+                pane = self.panes.get(args.strip())
+                if pane is not None:
+                    pane.in_mode = not pane.in_mode
+
+    def _update(self, pane_id: str, window_id: str, fields: List[str]) -> None:
+        if len(fields) != len(PANE_FIELDS):
+            return
+        window, window_name, pane_index, title, cwd, in_mode, dead = fields
+        pane = self.panes.get(pane_id)
+        if pane is None:
+            pane = self.panes[pane_id] = PaneActivity(pane_id, window_id)
+        pane.window_id, pane.window, pane.window_name = window_id, window, window_name
+        pane.pane_index = int(pane_index) if pane_index.isdigit() else 0
+        pane.title, pane.cwd = title, cwd
+        pane.in_mode, pane.dead = in_mode == "1", dead == "1"
+
+    def rows(self, idle_after: float = DEFAULT_IDLE_AFTER) -> List[Dict[str, object]]:
+        """One row per pane, ordered by window and pane"""
+        now = self.clock()
+        with self._lock:
+            panes = sorted(self.panes.values(), key=lambda pane: (int(pane.window or 0), pane.pane_index))
+            return [dict(
+                pane.labels(self.session),
+                target=f"{self.session}:{pane.window}.{pane.pane_index}",
+                status=pane.status(now, idle_after),
+                rate=pane.rate(now),
+                idle_seconds=None if pane.last_output is None else now - pane.last_output,
+                cwd=pane.cwd,
+                title=pane.title,
+                last_line=pane.last_line,
+            ) for pane in panes]
+
+
+class PaneActivityWatcher:
+    """Control-mode connection feeding an ActivityTracker"""
+
+    def __init__(self, session: str, tmux_bin: str = "tmux"):
+        self.session = session
+        self.tracker = ActivityTracker(session)
+        self.client = TmuxControlClient(session_name=session, tmux_bin=tmux_bin, receive_output=True)
+        self._unsubscribe: Optional[Callable[[], None]] = None
+
+    def start(self) -> "PaneActivityWatcher":
+        import subprocess
+        try:
+            exists = subprocess.run([self.client.tmux_bin, "has-session", "-t", f"={self.session}"],
+                                    capture_output=True).returncode == 0
+        except OSError as e:
+            raise TailError(f"tmux is not available: {e}")
+        if not exists:
+            # new-session -A would create it
+            raise TailError(f"Session not found: {self.session}")
+
+        self._unsubscribe = self.client.subscribe(self.tracker.handle)
+        try:
+            self.client.start()
+            result = self.client.command("list-panes", "-s", "-t", f"={self.session}", "-F", PANE_FORMAT)
+            if result.returncode != 0:
+                raise TailError(f"Cannot list panes of {self.session}: {result.stderr.strip()}")
+            self.tracker.load(result.stdout)
+            self.client.command("refresh-client", "-B", f"{SUBSCRIPTION}:%*:" + "\t".join(PANE_FIELDS))
+        except TmuxControlError as e:
+            self.stop()
+            raise TailError(f"Cannot attach to {self.session}: {e}")
+        return self
+
+    def stop(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self.client.close()
+
+    def __enter__(self) -> "PaneActivityWatcher":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _format_rate(rate: float) -> str:
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if rate < 1024 or unit == "MB/s":
+            return f"{rate:.0f} {unit}" if unit == "B/s" else f"{rate:.1f} {unit}"
+        rate /= 1024
+    return ""
+
+
+def _format_ago(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+_STATUS_STYLES = {"active": "green", "idle": "dim", "blocked": "bold red", "copy-mode": "yellow", "dead": "red"}
+
+
+def render(tracker: ActivityTracker, idle_after: float = DEFAULT_IDLE_AFTER, header: str = ""):
+    """Rich table of the tracker's panes"""
+    from rich.table import Table
+
+    rows = tracker.rows(idle_after)
+    counts = {status: sum(1 for row in rows if row["status"] == status) for status in _STATUS_STYLES}
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items() if count)
+    table = Table(title=f"{tracker.session} - {summary or 'no panes'}", caption=header or None, expand=True)
+    table.add_column("Pane", no_wrap=True)
+    table.add_column("Org / Role", no_wrap=True)
+    table.add_column("Task", no_wrap=True)
+    table.add_column("Status", no_wrap=True)
+    table.add_column("Output", justify="right", no_wrap=True)
+    table.add_column("Last", justify="right", no_wrap=True)
+    table.add_column("Directory", overflow="ellipsis", no_wrap=True, max_width=40)
+    table.add_column("Last line", overflow="ellipsis", no_wrap=True, ratio=1)
+    for row in rows:
+        agent = " / ".join(part for part in (row["org"], row["role"]) if part) or row["title"]
+        style = _STATUS_STYLES.get(row["status"], "")
+        table.add_row(
+            row["target"], agent, row["task"], f"[{style}]{row['status']}[/]",
+            _format_rate(row["rate"]), _format_ago(row["idle_seconds"]), row["cwd"], row["last_line"],
+        )
+    return table
@@ -0,0 +1,346 @@
+"""
+Time Series Store for Haconiwa v1.0
+
+Fixed-memory history for watch metrics. Every series keeps one ring buffer
+per tier (1s buckets for 10 minutes and 1 minute buckets for 24 hours by
+default), stored as columns of float64 (bucket start, count, sum, min, max).
+Writes update every tier in place, so downsampling costs nothing at query
+time and memory does not grow with uptime. Buffers live in an anonymous
+mapping or a memory-mapped file that other processes can open read-only.
+Once all ``max_series`` slots are taken, a new series reuses the slot of one
+that has not been written within the longest retention.
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR_ENV = "HACONIWA_METRICS_DIR"
+DEFAULT_TIERS: Tuple[Tuple[float, float], ...] = ((1.0, 600.0), (60.0, 86400.0))
+DEFAULT_MAX_SERIES = 256
+
+AGGREGATES = ("avg", "min", "max", "sum", "count")
+
+_MAGIC = b"HCTS"
+_VERSION = 1
+_HEADER_SIZE = 4096
+_NAME_SIZE = 128
+# Columns of each tier ring: bucket start, count, sum, min, max
+_TS, _COUNT, _SUM, _MIN, _MAX = range(5)
+_COLUMNS = 5
+_HEADER = struct.Struct("<4sIII")
+_TIER = struct.Struct("<dd")
+
+
+class TimeSeriesError(Exception):
+    """Time series store error"""
+    pass
+
+
+@dataclass(frozen=True)
+class Tier:
+    """Buckets of ``resolution`` seconds kept for ``retention`` seconds"""
+    resolution: float
+    retention: float
+
+    @property
+    def slots(self) -> int:
+        return int(math.ceil(self.retention / self.resolution))
+
+
+def default_metrics_dir() -> Path:
+    return Path(os.environ.get(METRICS_DIR_ENV) or Path.home() / ".haconiwa" / "cache" / "metrics")
+
+
+def series_key(name: str, labels: Optional[Mapping[str, str]] = None) -> str:
+    """Series name with labels, e.g. ``agent_cpu_percent{pane=dev:1.0}``"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{key}={labels[key]}" for key in sorted(labels)) + "}"
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in ``90``, ``30s``, ``10m``, ``6h`` or ``1d``"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip()
+    try:
+        if text and text[-1] in units:
+            return float(text[:-1]) * units[text[-1]]
+        return float(text)
+    except ValueError:
+        raise TimeSeriesError(f"Invalid duration: {text}")
+
+
+class TimeSeriesStore:
+    """Ring-buffer series with write-time downsampling over a fixed mapping
+
+    Only one process should write a persisted store; any number may read it.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None,
+                 tiers: Sequence[Tuple[float, float]] = DEFAULT_TIERS,
+                 max_series: int = DEFAULT_MAX_SERIES, readonly: bool = False):
+        self.path = Path(path) if path else None
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path is not None and (readonly or self.path.exists()):
+            self._open_file()
+        else:
+            self._create(tiers, max_series)
+
+    # -- layout
+
+    def _layout(self, tiers: Sequence[Tuple[float, float]], max_series: int) -> None:
+        self.tiers = [Tier(float(resolution), float(retention)) for resolution, retention in tiers]
+        self.max_series = max_series
+        if not self.tiers or self._count_offset(len(self.tiers)) + 8 > _HEADER_SIZE:
+            raise TimeSeriesError(f"Unsupported number of tiers: {len(self.tiers)}")
+        # Offsets in float64 units, relative to the data region
+        self._tier_offsets, offset = [], 0
+        for tier in self.tiers:
+            self._tier_offsets.append(offset)
+            offset += tier.slots * _COLUMNS
+        self._series_size = offset
+        self._data_offset = _HEADER_SIZE + max_series * _NAME_SIZE
+        self.size = self._data_offset + max_series * self._series_size * 8
+
+    def _create(self, tiers: Sequence[Tuple[float, float]], max_series: int) -> None:
+        self._layout(tiers, max_series)
+        if self.path is None:
+            self._map = mmap.mmap(-1, self.size)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "w+b")
+            # Sparse on most filesystems: untouched series take no disk space
+            self._file.truncate(self.size)
+            self._map = mmap.mmap(self._file.fileno(), self.size)
+        header = _HEADER.pack(_MAGIC, _VERSION, len(self.tiers), max_series)
+        header += b"".join(_TIER.pack(tier.resolution, tier.retention) for tier in self.tiers)
+        self._map[:len(header)] = header
+        self._bind()
+
+    def _open_file(self) -> None:
+        try:
+            self._file = open(self.path, "rb" if self.readonly else "r+b")
+        except OSError as e:
+            raise TimeSeriesError(f"Cannot open time series file {self.path}: {e}")
+        head = self._file.read(_HEADER_SIZE)
+        if len(head) < _HEADER.size:
+            raise TimeSeriesError(f"Not a time series file: {self.path}")
+        magic, version, tier_count, max_series = _HEADER.unpack_from(head)
+        if magic != _MAGIC or version != _VERSION:
+            raise TimeSeriesError(f"Not a time series file: {self.path}")
+        tiers = [_TIER.unpack_from(head, _HEADER.size + index * _TIER.size) for index in range(tier_count)]
+        self._layout(tiers, max_series)
+        if os.fstat(self._file.fileno()).st_size < self.size:
+            raise TimeSeriesError(f"Truncated time series file: {self.path}")
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self._map = mmap.mmap(self._file.fileno(), self.size, access=access)
+        self._bind()
+
+    @staticmethod
+    def _count_offset(tier_count: int) -> int:
+        """Header offset of the series count, followed by the count of reused slots"""
+        return _HEADER.size + tier_count * _TIER.size
+
+    def _bind(self) -> None:
+        self._values = memoryview(self._map)[self._data_offset:].cast("d")
+        self._series: Dict[str, int] = {}
+        self._reused = 0
+        self._load_names()
+
+    def _load_names(self) -> None:
+        count, reused = struct.unpack_from("<II", self._map, self._count_offset(len(self.tiers)))
+        if reused != self._reused:
+            # The writer renamed slots since the names were read
+            self._series, self._reused = {}, reused
+        for index in range(len(self._series), count):
+            start = _HEADER_SIZE + index * _NAME_SIZE
+            name = bytes(self._map[start:start + _NAME_SIZE]).rstrip(b"\0").decode("utf-8")
+            self._series[name] = index
+
+    def _index(self, name: str, create: bool, timestamp: Optional[float] = None) -> Optional[int]:
+        index = self._series.get(name)
+        if index is not None or not create:
+            return index
+        encoded = name.encode("utf-8")
+        if len(encoded) > _NAME_SIZE:
+            raise TimeSeriesError(f"Series name too long ({len(encoded)} > {_NAME_SIZE} bytes): {name}")
+        index = len(self._series)
+        if index >= self.max_series:
+            return self._reuse(name, encoded, time.time() if timestamp is None else timestamp)
+        start = _HEADER_SIZE + index * _NAME_SIZE
+        self._map[start:start + len(encoded)] = encoded
+        # The name is written before the count, so readers never see a half-written name
+        struct.pack_into("<I", self._map, self._count_offset(len(self.tiers)), index + 1)
+        self._series[name] = index
+        return index
+
+    def _last_write(self, index: int) -> float:
+        """Start of the newest finest-tier bucket of a series"""
+        slots = self.tiers[0].slots
+        base = index * self._series_size + self._tier_offsets[0]
+        stamps = self._values[base + _TS * slots:base + (_TS + 1) * slots].tolist()
+        counts = self._values[base + _COUNT * slots:base + (_COUNT + 1) * slots].tolist()
+        return max((stamp for stamp, count in zip(stamps, counts) if count), default=-math.inf)
+
+    def _reuse(self, name: str, encoded: bytes, timestamp: float) -> int:
+        """Give the slot of the stalest series to ``name``, if none of its buckets can still be queried"""
+        retention = max(tier.retention for tier in self.tiers)
+        last_write, stale = min((self._last_write(index), old_name) for old_name, index in self._series.items())
+        if last_write > timestamp - retention:
+            raise TimeSeriesError(f"Time series store is full "
+                                  f"({self.max_series} series written within the last {retention:.0f}s)")
+        index = self._series.pop(stale)
+        start = _HEADER_SIZE + index * _NAME_SIZE
+        self._map[start:start + _NAME_SIZE] = encoded.ljust(_NAME_SIZE, b"\0")
+        data = self._data_offset + index * self._series_size * 8
+        self._map[data:data + self._series_size * 8] = bytes(self._series_size * 8)
+        self._reused += 1
+        struct.pack_into("<I", self._map, self._count_offset(len(self.tiers)) + 4, self._reused)
+        self._series[name] = index
+        logger.debug(f"Series {name} reuses the slot of {stale}")
+        return index
+
+    # -- writes
+
+    def add(self, name: str, value: float, timestamp: Optional[float] = None) -> None:
+        """Record one observation in every tier"""
+        if self.readonly:
+            raise TimeSeriesError("Time series store is read-only")
+        timestamp = time.time() if timestamp is None else timestamp
+        value = float(value)
+        values = self._values
+        with self._lock:
+            base = self._index(name, create=True, timestamp=timestamp) * self._series_size
+            for tier, tier_offset in zip(self.tiers, self._tier_offsets):
+                slots = tier.slots
+                bucket = math.floor(timestamp / tier.resolution) * tier.resolution
+                row = base + tier_offset + int(bucket / tier.resolution) % slots
+                stored = values[row + _TS * slots]
+                if values[row + _COUNT * slots] and stored > bucket:
+                    # Older than what the slot holds now
+                    continue
+                if stored != bucket or not values[row + _COUNT * slots]:
+                    values[row + _TS * slots] = bucket
+                    values[row + _COUNT * slots] = 1.0
+                    values[row + _SUM * slots] = value
+                    values[row + _MIN * slots] = value
+                    values[row + _MAX * slots] = value
+                else:
+                    values[row + _COUNT * slots] += 1.0
+                    values[row + _SUM * slots] += value
+                    if value < values[row + _MIN * slots]:
+                        values[row + _MIN * slots] = value
+                    if value > values[row + _MAX * slots]:
+                        values[row + _MAX * slots] = value
+
+    def add_many(self, samples: Mapping[str, float], timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        for name, value in samples.items():
+            self.add(name, value, timestamp)
+
+    # -- reads
+
+    def series(self, prefix: str = "") -> List[str]:
+        if self.readonly:
+            self._load_names()
+        return sorted(name for name in self._series if name.startswith(prefix))
+
+    def _tier_for(self, span: float, resolution: Optional[float]) -> int:
+        """Finest tier that covers ``span`` seconds (and is at least ``resolution`` coarse)"""
+        for index, tier in enumerate(self.tiers):
+            if tier.retention >= span and (resolution is None or tier.resolution >= resolution):
+                return index
+        return len(self.tiers) - 1
+
+    def query(self, name: str, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: Optional[float] = None, agg: str = "avg") -> List[Tuple[float, float]]:
+        """(bucket start, value) pairs of a series between ``start`` and ``end``, oldest first"""
+        if agg not in AGGREGATES:
+            raise TimeSeriesError(f"Unknown aggregate {agg!r}; use one of {', '.join(AGGREGATES)}")
+        end = time.time() if end is None else end
+        start = end - self.tiers[0].retention if start is None else start
+        if self.readonly:
+            self._load_names()
+        index = self._index(name, create=False)
+        if index is None:
+            return []
+
+        tier_index = self._tier_for(end - start, resolution)
+        tier, slots = self.tiers[tier_index], self.tiers[tier_index].slots
+        base = index * self._series_size + self._tier_offsets[tier_index]
+        with self._lock:
+            column = {key: self._values[base + key * slots:base + (key + 1) * slots].tolist()
+                      for key in (_TS, _COUNT, _SUM, _MIN, _MAX)}
+        oldest = end - tier.retention
+        points = []
+        for slot in range(slots):
+            count = column[_COUNT][slot]
+            bucket = column[_TS][slot]
+            if not count or bucket + tier.resolution <= start or bucket > end or bucket < oldest:
+                continue
+            if agg == "avg":
+                value = column[_SUM][slot] / count
+            elif agg == "min":
+                value = column[_MIN][slot]
+            elif agg == "max":
+                value = column[_MAX][slot]
+            elif agg == "sum":
+                value = column[_SUM][slot]
+            else:
+                value = count
+            points.append((bucket, value))
+        points.sort()
+        return points
+
+    def aggregate(self, name: str, window: float, agg: str = "avg", end: Optional[float] = None) -> Optional[float]:
+        """One value over the last ``window`` seconds, e.g. for alert rules; None without data"""
+        end = time.time() if end is None else end
+        if agg not in AGGREGATES:
+            raise TimeSeriesError(f"Unknown aggregate {agg!r}; use one of {', '.join(AGGREGATES)}")
+        # Sums and counts combine exactly across buckets; averages are weighted by count
+        buckets = {key: self.query(name, end - window, end, agg=key)
+                   for key in (("sum", "count") if agg == "avg" else (agg,))}
+        if not any(buckets.values()):
+            return None
+        if agg == "avg":
+            return sum(value for _, value in buckets["sum"]) / sum(value for _, value in buckets["count"])
+        values = [value for _, value in buckets[agg]]
+        return {"min": min, "max": max, "sum": sum, "count": sum}[agg](values)
+
+    def latest(self, name: str) -> Optional[Tuple[float, float]]:
+        """Last finest-tier bucket of a series and its average"""
+        points = self.query(name, resolution=self.tiers[0].resolution)
+        return points[-1] if points else None
+
+    def flush(self) -> None:
+        if self._file is not None and not self.readonly:
+            self._map.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._values.release()
+        self._map.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "TimeSeriesStore":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._series)
@@ -1,6 +1,14 @@
 # haconiwa/world/__init__.py
 
-from .provider import local, docker
+from importlib import import_module
+
+def __getattr__(name):
+    # Providers are imported on first use; docker pulls in the Docker SDK
+    if name in ("local", "docker"):
+        module = import_module(f".provider.{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = ["local", "docker"]
 
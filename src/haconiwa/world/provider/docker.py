@@ -6,14 +6,14 @@ except ImportError:
     DOCKER_AVAILABLE = False
     Container = None
 
-from haconiwa.core.config import Config
+from haconiwa.core.config import get_config
 
 class DockerProvider:
     def __init__(self):
         if not DOCKER_AVAILABLE:
             raise ImportError("Docker is not available. Install docker with: pip install docker")
         self.client = docker.from_env()
-        self.config = Config()
+        self.config = get_config()
 
     def create_container(self, image: str, name: str, **kwargs) -> Container:
         return self.client.containers.run(image, name=name, detach=True, **kwargs)
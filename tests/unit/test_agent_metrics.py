@@ -0,0 +1,100 @@
+"""
+Tests for per-agent resource metrics
+"""
+
+import subprocess
+import sys
+import time
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from haconiwa.watch import agent_metrics
+from haconiwa.watch.agent_metrics import AgentMetricsCollector, AgentPane, pane_labels
+
+BUSY_TREE = """
+import subprocess, sys, time
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+print("ready", flush=True)
+end = time.time() + 30
+while time.time() < end:
+    pass
+"""
+
+
+@pytest.fixture
+def busy_agent():
+    process = subprocess.Popen([sys.executable, "-c", BUSY_TREE], stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    yield process
+    for child in agent_metrics.psutil.Process(process.pid).children(recursive=True):
+        child.kill()
+    process.kill()
+    process.wait()
+
+
+def _pane(pid, title="Org A - WORKER-A - Alpha Room [Task: feature-x]", cwd="/work/tasks/feature-x"):
+    return AgentPane("dev", "1", "Alpha", 2, pid, title, cwd)
+
+
+class TestPaneLabels:
+    """Test pane_labels"""
+
+    def test_task_title(self):
+        assert pane_labels(_pane(1)) == {
+            "session": "dev", "room": "Alpha", "org": "Org A", "role": "worker-a", "task": "feature-x", "pane": "1.2",
+        }
+
+    def test_standby_and_task_from_directory(self):
+        labels = pane_labels(_pane(1, "Org B - 待機中 - Beta Room", "/space/tasks/bugfix/src"))
+
+        assert (labels["org"], labels["role"], labels["task"]) == ("Org B", "standby", "bugfix")
+        assert pane_labels(_pane(1, "zsh", "/space/tasks/main"))["task"] == ""
+
+    def test_list_panes(self, monkeypatch):
+        output = "dev\t1\tAlpha Room\t0\t100\tOrg A - PM - Alpha Room\t/w\nother\t0\tmain\t0\t200\tzsh\t/tmp\n"
+        monkeypatch.setattr(agent_metrics, "run_tmux",
+                            lambda args: subprocess.CompletedProcess(args, 0, output, ""))
+
+        panes = AgentMetricsCollector(["dev"]).list_panes()
+
+        assert [(pane.target, pane.room, pane.pid) for pane in panes] == [("dev:1.0", "Alpha", 100)]
+        # The control-mode client's own session is never an agent
+        monkeypatch.setattr(agent_metrics, "run_tmux", lambda args: subprocess.CompletedProcess(
+            args, 0, output + "haconiwa-control\t0\tbash\t0\t300\thost\t/\n", ""))
+        assert [pane.session for pane in AgentMetricsCollector().list_panes()] == ["dev", "other"]
+
+
+class TestAgentMetricsCollector:
+    """Test AgentMetricsCollector"""
+
+    def test_samples_process_tree_with_cpu_deltas(self, busy_agent):
+        collector = AgentMetricsCollector()
+        first, = collector.sample([_pane(busy_agent.pid)])
+        time.sleep(0.5)
+        started = time.monotonic()
+        second, = collector.sample([_pane(busy_agent.pid)])
+
+        assert first.cpu_percent == 0.0
+        assert time.monotonic() - started < 0.5
+        assert second.processes == 2
+        assert second.cpu_percent > 30
+        assert second.rss_bytes > 0 and second.open_files > 0
+
+    def test_prometheus_gauges_follow_latest_sample(self, busy_agent):
+        registry = CollectorRegistry()
+        collector = AgentMetricsCollector(registry=registry)
+        collector.sample([_pane(busy_agent.pid)])
+
+        labels = {"session": "dev", "room": "Alpha", "org": "Org A", "role": "worker-a",
+                  "task": "feature-x", "pane": "1.2"}
+        assert registry.get_sample_value("haconiwa_agent_processes", labels) == 2
+        assert registry.get_sample_value("haconiwa_agent_rss_bytes", labels) > 0
+
+        collector.sample([])
+        assert registry.get_sample_value("haconiwa_agent_processes", labels) is None
+
+    def test_missing_pane_process(self):
+        sample, = AgentMetricsCollector().sample([_pane(2 ** 22 + 7)])
+
+        assert sample.processes == 0 and sample.rss_bytes == 0
@@ -0,0 +1,64 @@
+"""
+Tests for lazy CLI startup
+"""
+
+import json
+import subprocess
+import sys
+
+from typer.testing import CliRunner
+
+HEAVY_MODULES = [
+    "matplotlib", "pandas", "sqlalchemy", "psutil", "git", "docker", "watchdog",
+    "haconiwa.watch.monitor", "haconiwa.core.crd.parser", "haconiwa.space.manager",
+]
+
+# Seconds; importing the CLI takes about 0.1s, the modules above together about 1s
+IMPORT_BUDGET = 0.5
+
+
+def _loaded_after(statement: str):
+    code = f"import sys, json; {statement}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return set(json.loads(result.stdout))
+
+
+def _import_seconds(module: str) -> float:
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+
+class TestCLIStartup:
+    """Test that importing the CLI does not load sub-command dependencies"""
+
+    def test_cli_import_is_lightweight(self):
+        loaded = _loaded_after("import haconiwa.cli")
+
+        assert [name for name in HEAVY_MODULES if name in loaded] == []
+
+    def test_cli_import_time_budget(self):
+        # Best of three, so a busy machine does not fail the run
+        seconds = min(_import_seconds("haconiwa.cli") for _ in range(3))
+
+        assert seconds < IMPORT_BUDGET
+
+    def test_package_exports_resolve_on_access(self):
+        loaded = _loaded_after("import haconiwa")
+        assert "haconiwa.core.config" not in loaded
+
+        loaded = _loaded_after("from haconiwa import WorktreeManager")
+        assert "haconiwa.task.worktree" in loaded
+        assert "haconiwa.watch.monitor" not in loaded
+
+    def test_lazy_sub_apps_are_listed_and_loaded(self):
+        from haconiwa.cli import app
+
+        result = CliRunner().invoke(app, ["--help"])
+        assert result.exit_code == 0
+        for name in ("core", "world", "agent", "task", "watch", "company", "resource"):
+            assert name in result.stdout
+
+        result = CliRunner().invoke(app, ["task", "--help"])
+        assert result.exit_code == 0
+        assert "Usage" in result.stdout
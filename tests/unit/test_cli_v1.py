@@ -288,14 +288,32 @@ metadata:
         assert result.exit_code == 0
         assert "🔍 Scanning files" in result.stdout
     
-    def test_tool_command_scan_db(self):
-        """tool --scan-db コマンドをテスト（モック実装）"""
-        # 現在の実装はモック実装なので、基本的な動作確認のみ  
-        result = self.runner.invoke(app, ["tool", "scan-db", "--scan-db", "local-postgres"])
-        
-        # コマンドが存在し、実行できることを確認
+    def test_tool_command_scan_db(self, tmp_path, monkeypatch):
+        """tool --scan-db コマンドをテスト（スキーマキャッシュ経由）"""
+        import sqlite3
+        monkeypatch.setenv("HACONIWA_SCHEMA_CACHE_DIR", str(tmp_path / "schema"))
+        with sqlite3.connect(tmp_path / "app.db") as conn:
+            conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        manifest = tmp_path / "db.yaml"
+        manifest.write_text(f"""apiVersion: haconiwa.dev/v1
+kind: Database
+metadata:
+  name: local-db
+spec:
+  dsn: sqlite:///{tmp_path / 'app.db'}
+""")
+
+        result = self.runner.invoke(app, ["tool", "scan-db", "--scan-db", "local-db", "-f", str(manifest), "--json"])
+
         assert result.exit_code == 0
         assert "🔍 Scanning database" in result.stdout
+        assert '"users"' in result.stdout
+
+    def test_tool_command_scan_db_unknown(self):
+        """未登録の Database CRD はエラー"""
+        result = self.runner.invoke(app, ["tool", "scan-db", "--scan-db", "missing-db"])
+
+        assert result.exit_code == 1
     
     def test_tool_command_scan_yaml_output(self):
         """tool --scan-filepath --yaml コマンドをテスト（モック実装）"""
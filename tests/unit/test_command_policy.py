@@ -281,4 +281,37 @@ class TestCommandPolicy:
         # 明示的に許可されていないコマンドは拒否される
         result = self.policy_engine.validator.validate_command("unknown_command arg1 arg2", role="worker")
         assert result.allowed is False
-        assert "not in global whitelist" in result.reason 
\ No newline at end of file
+        assert "not in global whitelist" in result.reason
+
+    def test_compiled_policy_tables(self):
+        """ポリシーが(role, base, subcommand)の判定テーブルにコンパイルされることをテスト"""
+        policy = dict(self.test_policy, roles={
+            "pm": {"allow": {"docker": ["push"]}, "deny": {"docker": ["push"]}},
+        })
+        self.policy_engine.set_active_policy(policy)
+        
+        compiled = self.policy_engine.validator.compiled_policy
+        assert compiled.rules[("pm", "docker", "push")] == (False, "role-specific deny")
+        assert compiled.global_rules[("docker", "build")] == (True, "global allow")
+        assert compiled.decide("pm", "git", "") == (True, "global allow")
+        assert compiled.decide("pm", "ls", "-la") == (False, "not in global whitelist")
+        
+    def test_quoted_commands_use_shell_parsing(self):
+        """引用符付きコマンドがshlexで解析されることをテスト"""
+        self.policy_engine.set_active_policy(self.test_policy)
+        
+        result = self.policy_engine.validator.validate_command('"docker" build .', role="worker")
+        assert result.allowed is True
+        
+        result = self.policy_engine.validator.validate_command("'docker build' .", role="worker")
+        assert result.allowed is False
+        
+    def test_malicious_pattern_matcher(self):
+        """結合済みの危険パターン検出をテスト"""
+        validator = self.policy_engine.validator
+        
+        assert validator.is_malicious_command("SUDO RM -RF /") is True
+        assert validator.is_malicious_command("cat script | sh") is True
+        assert validator.is_malicious_command("docker run --privileged alpine chroot /host") is True
+        assert validator.is_malicious_command("rm -rf ./build") is False
+        assert validator.is_malicious_command("docker build .") is False
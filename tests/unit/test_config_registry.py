@@ -0,0 +1,159 @@
+"""
+Tests for shared, hot-reloaded configs
+"""
+
+import threading
+import time
+
+import pytest
+import yaml
+
+from haconiwa.core import config as config_module
+from haconiwa.core.config import Config, diff_config, get_config
+
+
+def _write(path, data):
+    path.write_text(yaml.dump(data))
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, {"global": {"debug": False}, "git": {"repo_path": "/srv/repo", "branch": "main"}})
+    return path
+
+
+@pytest.fixture
+def config(config_file):
+    config = get_config(str(config_file))
+    yield config
+    config.close()
+
+
+class TestConfigRegistry:
+    """Test get_config and the shared watcher"""
+
+    def test_one_instance_per_file(self, config, config_file, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+
+        assert get_config("config.yaml") is config
+        assert get_config(str(tmp_path / "." / "config.yaml")) is config
+        assert config.get("git.repo_path") == "/srv/repo"
+        assert config.get("git.missing", "default") == "default"
+
+    def test_directories_share_one_observer(self, config, tmp_path):
+        other_dir = tmp_path / "other"
+        other_dir.mkdir()
+        _write(other_dir / "config.yaml", {})
+        _write(tmp_path / "second.yaml", {})
+        others = [get_config(str(other_dir / "config.yaml")), get_config(str(tmp_path / "second.yaml"))]
+
+        watcher = config_module._watcher
+        assert watcher.watched_directories.count(str(tmp_path.resolve())) == 1
+        assert str(other_dir.resolve()) in watcher.watched_directories
+
+        for other in others:
+            other.close()
+        assert str(other_dir.resolve()) not in watcher.watched_directories
+        assert str(tmp_path.resolve()) in watcher.watched_directories
+
+    def test_event_bursts_reload_once(self, config, config_file, monkeypatch):
+        monkeypatch.setattr(config_module._watcher, "debounce", 0.05)
+        reloads = []
+        monkeypatch.setattr(config, "reload", lambda: reloads.append(time.monotonic()))
+
+        for _ in range(5):
+            config_module._watcher.notify(str(config_file.resolve()))
+        time.sleep(0.3)
+
+        assert len(reloads) == 1
+
+    def test_unschedule_does_not_block_notify(self, config, tmp_path, monkeypatch):
+        watcher = config_module._watcher
+        other_dir = tmp_path / "other"
+        other_dir.mkdir()
+        _write(other_dir / "config.yaml", {})
+        other = get_config(str(other_dir / "config.yaml"))
+        unschedule = watcher._observer.unschedule
+        finished = []
+
+        def dispatching_unschedule(watch):
+            # The observer's dispatch thread calls notify() while unschedule() waits for its lock
+            thread = threading.Thread(target=watcher.notify, args=(str(config.config_path.resolve()),))
+            thread.start()
+            thread.join(timeout=2)
+            finished.append(not thread.is_alive())
+            unschedule(watch)
+
+        monkeypatch.setattr(watcher._observer, "unschedule", dispatching_unschedule)
+        other.close()
+
+        assert finished == [True]
+
+
+class TestConfigReload:
+    """Test Config.reload and subscribers"""
+
+    def test_subscribers_receive_changed_keys(self, config, config_file):
+        seen, git_only = [], []
+        config.subscribe(lambda cfg, changes: seen.append(changes))
+        unsubscribe = config.subscribe(lambda cfg, changes: git_only.append(changes), prefix="git")
+
+        _write(config_file, {"global": {"debug": True}, "git": {"repo_path": "/srv/repo"}})
+        config.reload()
+
+        assert sorted((c.key, c.kind) for c in seen[0]) == [("git.branch", "removed"), ("global.debug", "modified")]
+        assert [c.key for c in git_only[0]] == ["git.branch"]
+        assert config.global_config.debug is True
+
+        unsubscribe()
+        _write(config_file, {"global": {"debug": True}, "git": {"repo_path": "/srv/other"}})
+        config.reload()
+        assert len(seen) == 2 and len(git_only) == 1
+
+    def test_unchanged_content_is_not_parsed(self, config, config_file, monkeypatch):
+        parsed = []
+        real_load = config_module.yaml.safe_load
+        monkeypatch.setattr(config_module.yaml, "safe_load", lambda data: parsed.append(1) or real_load(data))
+
+        config_file.write_text(config_file.read_text())
+
+        assert config.reload() == []
+        assert parsed == []
+
+    def test_own_saves_do_not_reload(self, config, config_file):
+        seen = []
+        config.subscribe(lambda cfg, changes: seen.append(changes))
+
+        config.update_org_config("acme", boss_model="claude")
+
+        assert config.reload() == []
+        assert seen == []
+        assert Config(str(config_file), watch=False).get_org_config("acme").boss_model == "claude"
+
+    def test_saves_keep_other_sections(self, config, config_file):
+        _write(config_file, {"global": {"debug": False}, "watch": {"alerts": {"cpu_percent": 80}},
+                             "logging": {"level": "DEBUG"}})
+        config.reload()
+
+        config.update_org_config("acme", boss_model="claude")
+
+        assert config.get("watch.alerts.cpu_percent") == 80
+        assert config.get("logging.level") == "DEBUG"
+        reloaded = Config(str(config_file), watch=False)
+        assert reloaded.get("watch.alerts.cpu_percent") == 80 and reloaded.get("logging.level") == "DEBUG"
+
+    def test_failing_subscriber_does_not_block_others(self, config, config_file):
+        seen = []
+        config.subscribe(lambda cfg, changes: 1 / 0)
+        config.subscribe(lambda cfg, changes: seen.append(changes))
+
+        _write(config_file, {"global": {"debug": True}})
+        config.reload()
+
+        assert len(seen) == 1
+
+    def test_diff_config(self):
+        changes = diff_config({"a": {"b": 1, "c": 2}, "d": 1}, {"a": {"b": 1, "c": 3}, "e": 1})
+
+        assert [(c.key, c.kind) for c in changes] == [("a.c", "modified"), ("d", "removed"), ("e", "added")]
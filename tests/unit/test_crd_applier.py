@@ -0,0 +1,162 @@
+"""
+Tests for dependency-aware CRD apply
+"""
+
+import threading
+from unittest.mock import patch
+
+from haconiwa.core.applier import CRDApplier
+from haconiwa.core.crd.parser import CRDParser
+
+SPACE_YAML = """
+apiVersion: haconiwa.dev/v1
+kind: Space
+metadata:
+  name: {company}-world
+spec:
+  nations:
+  - id: jp
+    name: Japan
+    cities:
+    - id: tokyo
+      name: Tokyo
+      villages:
+      - id: chiyoda
+        name: Chiyoda
+        companies:
+        - name: {company}
+          grid: 8x4
+          basePath: ./{company}
+          organizations:
+          - {{id: "01", name: Frontend}}
+          buildings:
+          - id: hq
+            name: HQ
+            floors:
+            - level: 1
+              rooms:
+              - {{id: room-01, name: Alpha}}
+"""
+
+TASK_YAML = """
+apiVersion: haconiwa.dev/v1
+kind: Task
+metadata:
+  name: {name}
+spec:
+  branch: feature/{name}
+  worktree: true
+  assignee: org01-wk-a-r1
+  spaceRef: {company}
+"""
+
+POLICY_YAML = """
+apiVersion: haconiwa.dev/v1
+kind: CommandPolicy
+metadata:
+  name: default-policy
+spec:
+  global:
+    git: [status]
+"""
+
+
+def _manifest():
+    docs = [
+        SPACE_YAML.format(company="alpha"),
+        TASK_YAML.format(name="beta-task", company="beta"),
+        SPACE_YAML.format(company="beta"),
+        POLICY_YAML,
+        TASK_YAML.format(name="alpha-task", company="alpha"),
+    ]
+    return CRDParser().parse_multi_yaml("---".join(docs))
+
+
+class TestApplyMultiple:
+    """Test CRDApplier.apply_multiple"""
+
+    def test_groups_by_space_and_keeps_result_order(self):
+        crds = _manifest()
+        applier = CRDApplier()
+        events = []
+        lock = threading.Lock()
+
+        def apply(crd):
+            with lock:
+                events.append(("apply", crd.metadata.name))
+            return crd.kind != "CommandPolicy"
+
+        def apply_tasks(task_crds):
+            with lock:
+                events.append(("tasks", [crd.metadata.name for crd in task_crds]))
+            return [True] * len(task_crds)
+
+        with patch.object(applier, "apply", side_effect=apply), \
+             patch.object(applier, "_apply_task_crds", side_effect=apply_tasks), \
+             patch.object(applier, "_update_all_space_task_assignments") as mock_assignments, \
+             patch.object(applier, "_update_all_agent_pane_directories") as mock_panes:
+            results = applier.apply_multiple(crds)
+
+        assert results == [True, True, True, False, True]
+        for company in ("alpha", "beta"):
+            assert events.index(("apply", f"{company}-world")) < events.index(("tasks", [f"{company}-task"]))
+
+        # Fix-ups run once per space, only for that space
+        sessions = sorted(call.args[0][0]["session_name"] for call in mock_panes.call_args_list)
+        assert sessions == ["alpha", "beta"]
+        assert all(len(call.args[0]) == 1 for call in mock_assignments.call_args_list)
+        assert mock_assignments.call_count == 2
+
+    def test_independent_spaces_apply_tasks_concurrently(self):
+        crds = _manifest()
+        applier = CRDApplier()
+        barrier = threading.Barrier(2, timeout=5)
+
+        def apply_tasks(task_crds):
+            # Fails with BrokenBarrierError if the spaces' tasks are applied one after the other
+            barrier.wait()
+            return [True] * len(task_crds)
+
+        with patch.object(applier, "apply", return_value=True), \
+             patch.object(applier, "_apply_task_crds", side_effect=apply_tasks), \
+             patch.object(applier, "_update_all_space_task_assignments"), \
+             patch.object(applier, "_update_all_agent_pane_directories"):
+            results = applier.apply_multiple(crds)
+
+        assert results == [True] * 5
+
+    def test_spaces_and_fix_ups_stay_on_calling_thread(self):
+        crds = _manifest()
+        applier = CRDApplier()
+        threads = []
+
+        def apply(crd):
+            if crd.kind == "Space":
+                threads.append(threading.current_thread())
+            return True
+
+        def record(space_sessions):
+            threads.append(threading.current_thread())
+
+        with patch.object(applier, "apply", side_effect=apply), \
+             patch.object(applier, "_apply_task_crds", side_effect=lambda task_crds: [True] * len(task_crds)), \
+             patch.object(applier, "_update_all_space_task_assignments", side_effect=record), \
+             patch.object(applier, "_update_all_agent_pane_directories", side_effect=record):
+            applier.apply_multiple(crds)
+
+        # SpaceManager state and typer.confirm prompts are not safe on worker threads
+        assert len(threads) == 6
+        assert set(threads) == {threading.current_thread()}
+
+    def test_failed_space_skips_fix_ups(self):
+        crds = _manifest()[:2]
+        applier = CRDApplier()
+
+        with patch.object(applier, "apply", side_effect=Exception("tmux failed")), \
+             patch.object(applier, "_apply_task_crds", return_value=[True]) as mock_tasks, \
+             patch.object(applier, "_update_all_agent_pane_directories") as mock_panes:
+            results = applier.apply_multiple(crds)
+
+        assert results == [False, True]
+        mock_tasks.assert_called_once()
+        mock_panes.assert_not_called()
@@ -0,0 +1,112 @@
+"""
+Tests for the CRD parse cache
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from haconiwa.core.crd import cache as cache_module
+from haconiwa.core.crd.cache import CRDCache
+from haconiwa.core.crd.models import AgentCRD, TaskCRD
+from haconiwa.core.crd.parser import CRDParser, CRDValidationError
+
+MANIFEST = """
+apiVersion: haconiwa.dev/v1
+kind: Agent
+metadata:
+  name: org01-pm
+spec:
+  role: pm
+  model: o3
+  spaceRef: test-company
+---
+apiVersion: haconiwa.dev/v1
+kind: Task
+metadata:
+  name: feature-login
+spec:
+  branch: feature/login
+  worktree: true
+  assignee: org01-wk-a-r1
+  spaceRef: test-company
+"""
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CRDCache(tmp_path / "cache")
+
+
+class TestCRDCache:
+    """Test CRDCache"""
+
+    def test_second_parse_is_served_from_cache(self, cache):
+        parser = CRDParser(cache=cache)
+
+        first = parser.parse_multi_yaml(MANIFEST)
+        with patch.object(parser, "_parse_crd_data", side_effect=AssertionError("re-validated")):
+            second = parser.parse_multi_yaml(MANIFEST)
+
+        assert cache.misses == 1 and cache.hits == 1
+        assert [type(crd) for crd in second] == [AgentCRD, TaskCRD]
+        assert second[1].spec.branch == "feature/login"
+        assert [crd.model_dump() for crd in second] == [crd.model_dump() for crd in first]
+
+    def test_changed_content_is_parsed_again(self, cache):
+        parser = CRDParser(cache=cache)
+        parser.parse_multi_yaml(MANIFEST)
+
+        crds = parser.parse_multi_yaml(MANIFEST.replace("feature/login", "feature/logout"))
+
+        assert cache.misses == 2
+        assert crds[1].spec.branch == "feature/logout"
+
+    def test_version_mismatch_is_a_miss(self, cache, tmp_path):
+        CRDParser(cache=cache).parse_multi_yaml(MANIFEST)
+
+        upgraded = CRDCache(tmp_path / "cache")
+        upgraded.version = "1:99.0.0:2.0"
+        CRDParser(cache=upgraded).parse_multi_yaml(MANIFEST)
+
+        assert upgraded.misses == 1 and upgraded.hits == 0
+
+    def test_edited_models_are_a_miss(self, cache, tmp_path):
+        CRDParser(cache=cache).parse_multi_yaml(MANIFEST)
+
+        with patch.object(cache_module, "_models_digest", return_value="edited"):
+            edited = CRDCache(tmp_path / "cache")
+        CRDParser(cache=edited).parse_multi_yaml(MANIFEST)
+
+        assert edited.version != cache.version
+        assert edited.misses == 1 and edited.hits == 0
+
+    def test_corrupt_entry_falls_back_to_parse(self, cache):
+        parser = CRDParser(cache=cache)
+        parser.parse_multi_yaml(MANIFEST)
+        for entry in cache.cache_dir.glob("*.pickle"):
+            entry.write_bytes(b"not a pickle")
+
+        crds = parser.parse_multi_yaml(MANIFEST)
+
+        assert len(crds) == 2
+        assert cache.misses == 2
+
+    def test_invalid_manifest_is_not_cached(self, cache):
+        parser = CRDParser(cache=cache)
+
+        for _ in range(2):
+            with pytest.raises(CRDValidationError):
+                parser.parse_multi_yaml(MANIFEST.replace("kind: Task", "kind: Unknown"))
+
+        assert cache.misses == 2
+        assert list(cache.cache_dir.glob("*.pickle")) == []
+
+    def test_eviction(self, tmp_path):
+        cache = CRDCache(tmp_path / "cache", max_entries=2)
+        parser = CRDParser(cache=cache)
+
+        for name in ("a", "b", "c"):
+            parser.parse_multi_yaml(MANIFEST.replace("org01-pm", f"org01-pm-{name}"))
+
+        assert len(list(cache.cache_dir.glob("*.pickle"))) == 2
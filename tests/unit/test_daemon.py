@@ -0,0 +1,99 @@
+"""
+Tests for the haconiwa daemon and CLI forwarding
+"""
+
+import threading
+
+import pytest
+from typer.testing import CliRunner
+
+from haconiwa.cli import app
+from haconiwa.core.policy import engine
+from haconiwa.daemon.client import DaemonClient, DaemonError, command_path, forwardable
+from haconiwa.daemon.server import HaconiwaDaemon
+
+POLICY = """
+apiVersion: haconiwa.dev/v1
+kind: CommandPolicy
+metadata:
+  name: default-command-whitelist
+spec:
+  global:
+    git: [status, log]
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_policy_engine(monkeypatch):
+    monkeypatch.setattr(engine, "_shared_engine", None)
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    socket_path = tmp_path / "d.sock"
+    monkeypatch.setenv("HACONIWA_DAEMON_SOCKET", str(socket_path))
+    server = HaconiwaDaemon(socket_path, control_mode=False).start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+class TestForwarding:
+    """Test which invocations are sent to the daemon"""
+
+    def test_command_path(self):
+        assert command_path(["-v", "-c", "conf.yaml", "space", "ls"]) == ("space", "ls")
+        assert command_path(["apply", "-f", "space.yaml"]) == ("apply",)
+
+    def test_forwardable(self):
+        assert forwardable(["policy", "ls"])
+        assert forwardable(["apply", "-f", "space.yaml"])
+        assert forwardable(["space", "run", "-c", "acme", "--cmd", "ls", "--no-confirm"])
+        assert not forwardable(["space", "run", "-c", "acme", "--cmd", "ls"])
+        assert not forwardable(["apply", "-f", "space.yaml", "--attach"])
+        assert not forwardable(["space", "attach", "-c", "acme"])
+        assert not forwardable(["daemon", "status"])
+
+
+class TestHaconiwaDaemon:
+    """Test HaconiwaDaemon"""
+
+    def test_state_persists_between_calls(self, daemon, tmp_path):
+        (tmp_path / "policy.yaml").write_text(POLICY)
+        client = DaemonClient(daemon.socket_path)
+
+        applied = client.run(["apply", "-f", "policy.yaml"], cwd=str(tmp_path))
+        listed = client.run(["policy", "ls"])
+
+        assert applied.exit_code == 0
+        assert "default-command-whitelist" in listed.stdout
+        assert client.status()["active_policy"] == "default-command-whitelist"
+        assert client.status()["requests"] == 2
+
+    def test_failures_are_returned(self, daemon, tmp_path):
+        response = DaemonClient(daemon.socket_path).run(["policy", "delete", "missing"])
+
+        assert response.exit_code == 1
+        assert "Policy not found" in response.stderr
+
+    def test_local_only_commands_are_rejected(self, daemon):
+        with pytest.raises(DaemonError, match="must run locally"):
+            DaemonClient(daemon.socket_path).run(["space", "attach", "-c", "acme"])
+
+    def test_cli_forwards_to_daemon(self, daemon):
+        result = CliRunner().invoke(app, ["--use-daemon", "policy", "ls"])
+
+        assert result.exit_code == 0
+        assert "No policies found" in result.stdout
+        assert daemon.requests_served == 1
+
+    def test_cli_runs_locally_without_daemon(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HACONIWA_DAEMON_SOCKET", str(tmp_path / "missing.sock"))
+        monkeypatch.setenv("HACONIWA_USE_DAEMON", "1")
+
+        result = CliRunner().invoke(app, ["policy", "ls"])
+
+        assert result.exit_code == 0
+        assert "No policies found" in result.stdout
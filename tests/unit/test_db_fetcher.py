@@ -0,0 +1,91 @@
+"""
+Tests for streaming DBFetcher exports
+"""
+
+import csv
+import io
+import json
+
+import pytest
+import yaml
+from sqlalchemy import create_engine, text
+
+from haconiwa.resource.db_fetcher import DBFetcher, DBFetcherError
+
+ROWS = 2500
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, price NUMERIC)"))
+        conn.execute(text("INSERT INTO items (id, name, price) VALUES (:id, :name, :price)"),
+                     [{"id": i, "name": f"item-{i}", "price": i * 1.5} for i in range(ROWS)])
+    yield DBFetcher(engine=engine)
+    engine.dispose()
+
+
+QUERY = "SELECT id, name, price FROM items ORDER BY id"
+
+
+class TestDBFetcher:
+    """Test DBFetcher streaming"""
+
+    def test_batches_are_bounded(self, fetcher):
+        sizes = [len(batch) for batch in fetcher.iter_batches(QUERY, batch_size=1000)]
+
+        assert sizes == [1000, 1000, 500]
+
+    def test_params(self, fetcher):
+        rows = list(fetcher.iter_rows("SELECT name FROM items WHERE id = :id", {"id": 7}))
+
+        assert rows == [{"name": "item-7"}]
+
+    @pytest.mark.parametrize("fmt", ["csv", "json", "jsonl", "yaml"])
+    def test_formats(self, fetcher, fmt):
+        out = io.StringIO()
+        assert fetcher.write(QUERY, out, fmt, batch_size=300) == ROWS
+
+        content = out.getvalue()
+        if fmt == "csv":
+            records = list(csv.DictReader(io.StringIO(content)))
+            records = [{"id": int(r["id"]), "name": r["name"], "price": float(r["price"])} for r in records]
+        elif fmt == "json":
+            records = json.loads(content)
+        elif fmt == "jsonl":
+            records = [json.loads(line) for line in content.splitlines()]
+        else:
+            records = yaml.safe_load(content)
+
+        assert len(records) == ROWS
+        assert records[3] == {"id": 3, "name": "item-3", "price": 4.5}
+
+    @pytest.mark.parametrize("fmt, empty", [("csv", "id,name,price\n"), ("json", "[]\n"), ("jsonl", ""), ("yaml", "[]\n")])
+    def test_empty_result(self, fetcher, fmt, empty):
+        out = io.StringIO()
+
+        assert fetcher.write(QUERY.replace("ORDER BY", "WHERE id < 0 ORDER BY"), out, fmt) == 0
+        assert out.getvalue() == empty
+
+    def test_export_file(self, fetcher, tmp_path):
+        path = tmp_path / "snapshots" / "items.jsonl"
+
+        assert fetcher.export(QUERY, path) == ROWS
+        assert len(path.read_text().splitlines()) == ROWS
+        assert [p.name for p in path.parent.iterdir()] == ["items.jsonl"]
+
+    def test_failed_export_keeps_previous_snapshot(self, fetcher, tmp_path):
+        path = tmp_path / "items.csv"
+        path.write_text("previous")
+
+        with pytest.raises(Exception):
+            fetcher.export("SELECT * FROM missing_table", path)
+        with pytest.raises(DBFetcherError):
+            fetcher.export(QUERY, tmp_path / "items.txt")
+        assert path.read_text() == "previous"
+        assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+    def test_fetch_as_json(self, fetcher):
+        assert json.loads(fetcher.fetch_as_json(QUERY))[0] == {"id": 0, "name": "item-0", "price": 0}
+        assert fetcher.fetch_as_csv("SELECT * FROM missing_table") is None
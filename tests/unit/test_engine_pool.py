@@ -0,0 +1,93 @@
+"""
+Tests for the engine pool and DatabaseManager
+"""
+
+import pytest
+from sqlalchemy import text
+
+from haconiwa.resource.db_fetcher import DatabaseManager, DBFetcher, DBFetcherError
+from haconiwa.resource.engine_pool import EnginePool, EnginePoolError
+
+
+@pytest.fixture
+def dsn(tmp_path):
+    return f"sqlite:///{tmp_path / 'app.db'}"
+
+
+@pytest.fixture
+def pool():
+    pool = EnginePool(max_idle=60)
+    yield pool
+    pool.dispose_all()
+
+
+@pytest.fixture
+def manager(pool, dsn, tmp_path, monkeypatch):
+    monkeypatch.setenv("HACONIWA_SCHEMA_CACHE_DIR", str(tmp_path / "schema"))
+    engine = pool.get(dsn)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)"))
+        conn.execute(text("CREATE INDEX idx_users_email ON users (email)"))
+        conn.execute(text("CREATE TABLE posts (id INTEGER PRIMARY KEY, user_id INTEGER)"))
+        conn.execute(text("CREATE VIEW user_posts AS SELECT users.id FROM users JOIN posts ON posts.user_id = users.id"))
+    DatabaseManager.register_config("app-db", {"name": "app-db", "dsn": dsn, "use_ssl": False})
+    yield DatabaseManager(pool)
+    DatabaseManager._configs.pop("app-db", None)
+
+
+class TestEnginePool:
+    """Test EnginePool"""
+
+    def test_engines_are_shared(self, pool, dsn):
+        assert pool.get(dsn) is pool.get(dsn)
+        assert len(pool) == 1
+        assert pool.stats()[0]["checkouts"] == 2
+
+    def test_idle_eviction(self, pool, dsn):
+        engine = pool.get(dsn)
+
+        assert pool.evict_idle(max_idle=3600) == 0
+        assert pool.evict_idle(max_idle=0) == 1
+        assert len(pool) == 0
+        assert pool.get(dsn) is not engine
+
+    def test_health_check(self, pool, dsn, tmp_path):
+        assert pool.check(dsn)
+        assert not pool.check(f"sqlite:///{tmp_path / 'missing' / 'x.db'}")
+
+    def test_invalid_dsn(self, pool):
+        with pytest.raises(EnginePoolError):
+            pool.get("nosuchdialect://localhost/db")
+
+
+class TestDatabaseManager:
+    """Test DatabaseManager"""
+
+    def test_scan(self, manager):
+        assert manager.scan("app-db") == {
+            "tables": ["posts", "users"],
+            "views": ["user_posts"],
+            "indexes": ["idx_users_email"],
+        }
+
+    def test_scans_reuse_the_pooled_engine(self, manager, pool):
+        manager.scan("app-db")
+        DatabaseManager(pool).scan("app-db")
+
+        assert len(pool) == 1
+        assert manager.fetcher("app-db").engine is manager.engine("app-db")
+
+    def test_unknown_config(self, manager):
+        assert manager.scan("missing") == {}
+        assert not manager.check("missing")
+        with pytest.raises(DBFetcherError):
+            manager.engine("missing")
+
+    def test_fetcher_by_database_name(self, manager, monkeypatch):
+        import haconiwa.resource.db_fetcher as db_fetcher
+        monkeypatch.setattr(db_fetcher, "get_engine_pool", lambda: manager.pool)
+
+        fetcher = DBFetcher(database="app-db")
+
+        assert fetcher.engine is manager.engine("app-db")
+        assert list(fetcher.iter_rows("SELECT COUNT(*) AS n FROM users")) == [{"n": 0}]
@@ -0,0 +1,102 @@
+"""
+Tests for the persistent file index
+"""
+
+import os
+import time
+
+import pytest
+
+from haconiwa.resource import file_index
+from haconiwa.resource.file_index import FileIndex
+
+
+def _age(root):
+    """Push every mtime out of the racy window so directory listings are trusted"""
+    past = time.time() - 60
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames + [""]:
+            os.utime(os.path.join(dirpath, name), (past, past))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "work"
+    for rel_path in ["src/a.py", "src/b.py", "docs/readme.md", "build/out.py"]:
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel_path)
+    _age(root)
+    return root
+
+
+def _index(tree, tmp_path, **kwargs):
+    return FileIndex(tree, "test", ["**/*.py"], ["build/"], index_dir=tmp_path / "index", **kwargs)
+
+
+def _changes(index):
+    return sorted((change.kind, change.path) for change in index.changes())
+
+
+class TestFileIndex:
+    """Test FileIndex"""
+
+    def test_first_refresh_adds_everything(self, tree, tmp_path):
+        index = _index(tree, tmp_path)
+
+        assert _changes(index) == [("added", "src/a.py"), ("added", "src/b.py")]
+        assert index.path.exists()
+        assert len(_index(tree, tmp_path)) == 2
+
+    def test_changes_since_last_refresh(self, tree, tmp_path):
+        _index(tree, tmp_path).refresh()
+        (tree / "src" / "a.py").write_text("changed content")
+        (tree / "src" / "b.py").unlink()
+        (tree / "src" / "c.py").write_text("new")
+
+        assert _changes(_index(tree, tmp_path)) == [
+            ("added", "src/c.py"), ("modified", "src/a.py"), ("removed", "src/b.py"),
+        ]
+        assert _changes(_index(tree, tmp_path)) == []
+
+    def test_unchanged_directories_are_not_listed(self, tree, tmp_path, monkeypatch):
+        _index(tree, tmp_path).refresh()
+        listed = []
+        real_scandir = file_index.os.scandir
+        monkeypatch.setattr(file_index.os, "scandir", lambda path: listed.append(path) or real_scandir(path))
+
+        (tree / "src" / "a.py").write_text("changed content")
+        changes = _changes(_index(tree, tmp_path))
+
+        assert changes == [("modified", "src/a.py")]
+        assert listed == []
+
+    def test_trusting_listings_skips_file_stats(self, tree, tmp_path):
+        _index(tree, tmp_path).refresh()
+        (tree / "src" / "a.py").write_text("changed content")
+
+        assert _changes(_index(tree, tmp_path, check_files=False)) == []
+        assert _changes(_index(tree, tmp_path)) == [("modified", "src/a.py")]
+
+    def test_removed_directory(self, tree, tmp_path):
+        _index(tree, tmp_path).refresh()
+        for name in ("a.py", "b.py"):
+            (tree / "src" / name).unlink()
+        (tree / "src").rmdir()
+
+        assert _changes(_index(tree, tmp_path)) == [("removed", "src/a.py"), ("removed", "src/b.py")]
+
+    def test_pattern_change_rebuilds(self, tree, tmp_path):
+        _index(tree, tmp_path).refresh()
+
+        index = FileIndex(tree, "test", ["**/*.md"], [], index_dir=tmp_path / "index")
+
+        assert not index.loaded
+        assert _changes(index) == [("added", "docs/readme.md")]
+
+    def test_clear(self, tree, tmp_path):
+        _index(tree, tmp_path).refresh()
+        FileIndex(tree, "test-other", index_dir=tmp_path / "index").refresh()
+
+        assert FileIndex.clear("test", tmp_path / "index") == 1
+        assert not _index(tree, tmp_path).loaded
@@ -0,0 +1,146 @@
+"""
+Tests for the gitignore matcher
+"""
+
+import os
+import time
+
+import pytest
+
+from haconiwa.resource.file_index import FileIndex
+from haconiwa.resource.gitignore import GitIgnore, IgnoreStack, parse_rules
+from haconiwa.resource.path_scanner import PathScanner
+
+
+def _write(root, files):
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+class TestGitIgnore:
+    """Test GitIgnore"""
+
+    def test_parse_rules(self):
+        rules = parse_rules(["# comment", "", "*.log  ", "!keep.log", "build/", "\\#notes", "/dist"])
+
+        assert [(rule.pattern, rule.negate, rule.dir_only) for rule in rules] == [
+            ("*.log", False, False), ("keep.log", True, False), ("build", False, True),
+            ("#notes", False, False), ("/dist", False, False),
+        ]
+
+    def test_negation_last_rule_wins(self):
+        ignore = GitIgnore.from_lines(["*.log", "!keep.log", "keep.log.*", "!*.md", "private.md"])
+
+        assert ignore.match("debug.log") is True
+        assert ignore.match("logs/keep.log") is False
+        assert ignore.match("keep.log.1") is True
+        assert ignore.match("README.md") is False
+        assert ignore.match("private.md") is True
+        assert ignore.match("main.py") is None
+
+    def test_anchoring_and_directories(self):
+        ignore = GitIgnore.from_lines(["/dist", "build/", "docs/*.html", "**/tmp/**"])
+
+        assert ignore.match("dist", is_dir=True) is True
+        assert ignore.match("src/dist", is_dir=True) is None
+        assert ignore.match("build", is_dir=True) is True
+        assert ignore.match("pkg/build", is_dir=True) is True
+        assert ignore.match("build") is None  # directory-only rule
+        assert ignore.match("docs/index.html") is True
+        assert ignore.match("docs/api/index.html") is None
+        assert ignore.match("a/tmp/b/c.txt") is True
+
+    def test_nested_files_take_precedence(self):
+        stack = IgnoreStack("", GitIgnore.from_lines(["*.log"]))
+        stack = IgnoreStack("logs", GitIgnore.from_lines(["!*.log", "old.log"]), stack)
+
+        assert stack.ignored("debug.log")
+        assert not stack.ignored("logs/debug.log")
+        assert stack.ignored("logs/old.log")
+        assert stack.ignored("src/.git", is_dir=True)
+
+    def test_many_patterns(self):
+        ignore = GitIgnore.from_lines([f"generated_{index}_*.py" for index in range(2000)] + ["!generated_7_keep.py"])
+
+        assert ignore.match("pkg/generated_1999_x.py") is True
+        assert ignore.match("generated_7_keep.py") is False
+        assert ignore.match("main.py") is None
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    _write(root, {
+        ".gitignore": "*.log\n/build/\n",
+        "main.py": "",
+        "debug.log": "",
+        "build/out.py": "",
+        "src/build/keep.py": "",
+        "src/.gitignore": "!important.log\ngenerated/\n",
+        "src/important.log": "",
+        "src/other.log": "",
+        "src/generated/code.py": "",
+        ".git/info/exclude": "secret.py\n",
+        "secret.py": "",
+    })
+    return root
+
+
+class TestGitIgnoreScan:
+    """Test gitignore handling in PathScanner and FileIndex"""
+
+    @pytest.fixture(autouse=True)
+    def configs(self):
+        PathScanner.register_config("ignore-test", {"include": ["**"], "gitignore": True})
+        yield
+        PathScanner._configs.pop("ignore-test", None)
+        PathScanner._matchers.pop("ignore-test", None)
+
+    @staticmethod
+    def _index(repo, tmp_path):
+        return FileIndex(repo, "ignore-test", ["**"], [], index_dir=tmp_path / "index", gitignore=True)
+
+    @pytest.mark.parametrize("parallel", [True, False])
+    def test_scan(self, repo, parallel):
+        scanner = PathScanner(max_workers=4)
+        root = os.path.join(str(repo), "")
+        paths = sorted(m.path[len(root):] for m in scanner.iter_scan(str(repo), "ignore-test", parallel=parallel))
+
+        assert paths == [".gitignore", "main.py", "src/.gitignore", "src/build/keep.py", "src/important.log"]
+
+    def test_ignored_directories_are_not_read(self, repo, monkeypatch):
+        import haconiwa.resource.path_scanner as path_scanner
+        scanned = []
+        real_scandir = path_scanner.os.scandir
+        monkeypatch.setattr(path_scanner.os, "scandir", lambda path: scanned.append(path) or real_scandir(path))
+
+        list(PathScanner(max_workers=1).scan("ignore-test", str(repo)))
+
+        ignored = {str(repo / "build"), str(repo / "src" / "generated"), str(repo / ".git")}
+        assert ignored.isdisjoint(scanned)
+        assert str(repo / "src" / "build") in scanned
+
+    def test_index_follows_gitignore_edits(self, repo, tmp_path):
+        past = time.time() - 60
+        for dirpath, _, _ in os.walk(repo):
+            os.utime(dirpath, (past, past))
+        assert self._index(repo, tmp_path).refresh()["added"] == 5
+
+        (repo / "src" / ".gitignore").write_text("generated/\n")
+        changes = sorted((change.kind, change.path) for change in self._index(repo, tmp_path).changes())
+
+        assert changes == [("modified", "src/.gitignore"), ("removed", "src/important.log")]
+
+    def test_reused_listing_without_dir_fd_keeps_ignoring(self, repo, tmp_path, monkeypatch):
+        import haconiwa.resource.file_index as file_index
+        past = time.time() - 60
+        for dirpath, _, _ in os.walk(repo):
+            os.utime(dirpath, (past, past))
+        self._index(repo, tmp_path).refresh()
+
+        # Platforms without stat(dir_fd=...) list unchanged directories again
+        monkeypatch.setattr(file_index, "_STAT_DIR_FD", False)
+
+        assert list(self._index(repo, tmp_path).changes()) == []
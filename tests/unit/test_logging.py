@@ -0,0 +1,122 @@
+"""
+Tests for the structured logging pipeline
+"""
+
+import json
+import logging
+import threading
+
+import pytest
+import yaml
+
+from haconiwa.core import logging as haconiwa_logging
+from haconiwa.core.config import Config
+from haconiwa.core.logging import JsonFormatter, QueueLogging, RateLimitFilter, haconiwaLogger
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.get_ident())
+
+
+def _record(msg="message", level=logging.DEBUG, lineno=10, **extra):
+    record = logging.LogRecord("test", level, "/src/module.py", lineno, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump({"logging": {"directory": str(tmp_path / "logs"), "console_output": False,
+                                           "level": "DEBUG", "debug_burst": 3, "debug_rate": 0.001}}))
+    return Config(str(path), watch=False)
+
+
+class TestFormattingAndFilters:
+    """Test JsonFormatter and RateLimitFilter"""
+
+    def test_json_lines(self):
+        line = JsonFormatter().format(_record("hello", logging.INFO, space="dev", performance={"cpu_percent": 1.0}))
+        data = json.loads(line)
+
+        assert "\n" not in line and ", " not in line
+        assert data["message"] == "hello" and data["level"] == "INFO"
+        assert data["extra"] == {"space": "dev", "performance": {"cpu_percent": 1.0}}
+        assert "exception" not in data
+
+    def test_rate_limit_per_call_site(self):
+        limit = RateLimitFilter(rate=0.001, burst=2)
+
+        assert [limit.filter(_record()) for _ in range(4)] == [True, True, False, False]
+        assert limit.filter(_record(lineno=11))
+        assert limit.filter(_record(level=logging.INFO))
+        assert limit.suppressed == 2
+
+    def test_sampling_reports_suppressed(self):
+        limit = RateLimitFilter(rate=1000, burst=1000, sample_every=3)
+        kept = [record for record in (_record(str(i)) for i in range(7)) if limit.filter(record)]
+
+        assert [record.msg for record in kept] == ["0", "3", "6"]
+        assert [getattr(record, "suppressed", 0) for record in kept] == [0, 2, 2]
+
+
+class TestQueueLogging:
+    """Test QueueLogging"""
+
+    def test_records_are_written_by_listener(self):
+        target = _ListHandler()
+        pipeline = QueueLogging([target]).start()
+        logger = logging.getLogger("haconiwa.test.queue")
+        logger.addHandler(pipeline.handler)
+        try:
+            args = {"n": 1}
+            logger.warning("value %s", args)
+            args["n"] = 2
+            pipeline.flush()
+        finally:
+            logger.removeHandler(pipeline.handler)
+            pipeline.stop()
+
+        assert [record.getMessage() for record in target.records] == ["value {'n': 1}"]
+        assert threading.get_ident() not in target.threads
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        pipeline = QueueLogging([_ListHandler()], queue_size=2)
+        for _ in range(5):
+            pipeline.handler.handle(_record(level=logging.INFO))
+
+        assert pipeline.dropped == 3
+
+
+class TestHaconiwaLoggerPipeline:
+    """Test haconiwaLogger in queued mode"""
+
+    def test_metrics_are_sampled_not_measured_per_record(self, config, monkeypatch):
+        sampler = haconiwa_logging.get_metrics_sampler()
+        calls = []
+        monkeypatch.setattr(sampler, "sample", lambda: calls.append(1))
+
+        with haconiwaLogger("pipeline-test", config) as logger:
+            for index in range(100):
+                logger.info(f"pane {index}")
+
+        assert calls == []
+
+    def test_writes_rate_limited_json_lines(self, config, tmp_path):
+        logger = haconiwaLogger("pipeline-json", config)
+        for index in range(10):
+            logger.debug(f"debug {index}")
+        logger.info("done", {"space": "dev"})
+        logger.close()
+
+        lines = [json.loads(line) for line in (tmp_path / "logs" / "pipeline-json.log").read_text().splitlines()]
+        assert [line["message"] for line in lines] == ["debug 0", "debug 1", "debug 2", "done"]
+        assert lines[-1]["extra"]["space"] == "dev"
+        assert set(lines[-1]["extra"]["performance"]) == {"cpu_percent", "memory_usage"}
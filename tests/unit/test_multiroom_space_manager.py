@@ -11,6 +11,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..', 'src'))
 
+from haconiwa.space.layout import GridLayout
 from haconiwa.space.manager import SpaceManager
 from haconiwa.core.crd.models import SpaceCRD
 
@@ -54,7 +55,8 @@ class TestMultiroomSpaceManager:
             result = self.space_manager.create_multiroom_session(self.test_config)
             
             assert result is True
-            mock_session.assert_called_once_with("test-company")
+            # Session is sized so the 4x4 grid of each window fits the terminal
+            mock_session.assert_called_once_with("test-company", GridLayout(4, 4).window_size())
             mock_windows.assert_called_once()
     
     def test_create_windows_for_rooms(self):
@@ -93,8 +95,13 @@ class TestMultiroomSpaceManager:
             result = self.space_manager._create_panes_in_window(session_name, window_id, pane_count)
             
             assert result is True
+            # All splits and the layout run in a single tmux invocation
+            batched = [c.args[0] for c in mock_run.call_args_list if "split-window" in c.args[0]]
+            assert len(batched) == 1
+            tmux_args = batched[0]
             # Should create 15 additional panes (first pane already exists)
-            assert mock_run.call_count >= 15
+            assert tmux_args.count("split-window") == 15
+            assert tmux_args.count("select-layout") == 1
     
     def test_distribute_desks_to_windows(self):
         """Test desk distribution across windows"""
@@ -134,8 +141,8 @@ class TestMultiroomSpaceManager:
             result = self.space_manager._update_pane_in_window(session_name, window_id, pane_index, mapping, "/tmp/test")
             
             assert result is True
-            # Should call tmux commands for directory and title
-            assert mock_run.call_count == 2
+            # Should batch tmux commands for directory and title into one call
+            assert mock_run.call_count == 1
     
     def test_switch_to_room_with_windows(self):
         """Test switching between rooms (windows)"""
@@ -0,0 +1,114 @@
+"""
+Tests for the scandir-based PathScanner
+"""
+
+import pytest
+
+from haconiwa.resource.path_scanner import DEFAULT_CONFIG_NAME, PathMatcher, PathScanner
+
+TREE = [
+    "README.md",
+    "setup.py",
+    "src/app/__init__.py",
+    "src/app/main.py",
+    "src/app/tests/test_main.py",
+    "src/app/data.json",
+    "docs/index.md",
+    "node_modules/pkg/index.js",
+    "build/lib/app.py",
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel_path in TREE:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def py_config():
+    PathScanner.register_config("py", {"include": ["src/**/*.py", "*.md"], "exclude": ["**/tests/**", "build/"]})
+    yield
+    PathScanner._configs.pop("py", None)
+    PathScanner._matchers.pop("py", None)
+
+
+class TestPathMatcher:
+    """Test PathMatcher"""
+
+    def test_globs(self):
+        matcher = PathMatcher(["src/**/*.py", "*.md"], ["**/tests/**", "*.pyc"])
+
+        assert matcher.matches("src/main.py")
+        assert matcher.matches("src/app/main.py")
+        assert matcher.matches("docs/index.md")
+        assert not matcher.matches("main.py")
+        assert not matcher.matches("src/app/tests/test_main.py")
+        assert not matcher.matches("src/app/main.pyc")
+
+    def test_directory_pruning(self):
+        matcher = PathMatcher(["src/app/**/*.py"], ["build/", "**/tests/**"])
+
+        assert matcher.descend("src")
+        assert matcher.descend("src/app/models")
+        assert not matcher.descend("docs")
+        assert not matcher.descend("src/other")
+        assert not matcher.descend("src/app/tests")
+        assert not PathMatcher(["**"], ["build/"]).descend("pkg/build")
+
+
+class TestPathScanner:
+    """Test PathScanner"""
+
+    def test_scan(self, tree):
+        assert sorted(PathScanner().scan("py", str(tree))) == [
+            "README.md", "docs/index.md", "src/app/__init__.py", "src/app/main.py",
+        ]
+
+    def test_parallel_matches_sequential(self, tree):
+        scanner = PathScanner(max_workers=4)
+
+        parallel = sorted(m.path for m in scanner.iter_scan(str(tree), DEFAULT_CONFIG_NAME))
+        sequential = sorted(m.path for m in scanner.iter_scan(str(tree), DEFAULT_CONFIG_NAME, parallel=False))
+
+        assert parallel == sequential
+        assert len(parallel) == len(TREE) - 1  # node_modules is excluded by default
+
+    def test_pruned_directories_are_not_read(self, tree, monkeypatch):
+        import haconiwa.resource.path_scanner as path_scanner
+        scanned = []
+        real_scandir = path_scanner.os.scandir
+
+        def scandir(path):
+            scanned.append(path)
+            return real_scandir(path)
+
+        monkeypatch.setattr(path_scanner.os, "scandir", scandir)
+        list(PathScanner(max_workers=1).scan("py", str(tree)))
+
+        assert not any("build" in path or "tests" in path for path in scanned)
+
+    def test_results_stream(self, tree):
+        results = PathScanner(max_workers=2).iter_scan(str(tree), DEFAULT_CONFIG_NAME)
+
+        first = next(results)
+        results.close()
+
+        assert first.size > 0 and not first.is_dir
+
+    def test_unknown_config(self, tree):
+        assert list(PathScanner().scan("missing", str(tree))) == []
+
+    def test_get_changes(self, tree, tmp_path, monkeypatch):
+        monkeypatch.setenv("HACONIWA_INDEX_DIR", str(tmp_path / "index"))
+        scanner = PathScanner()
+
+        assert len(scanner.get_changes(str(tree), "py")["added"]) == 4
+        (tree / "docs" / "index.md").unlink()
+
+        changes = scanner.get_changes(str(tree), "py")
+        assert changes["added"] == []
+        assert [m.path for m in changes["removed"]] == [str(tree / "docs" / "index.md")]
@@ -0,0 +1,104 @@
+"""
+Tests for the Database schema cache
+"""
+
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import text
+
+from haconiwa.resource.db_fetcher import DatabaseManager
+from haconiwa.resource.engine_pool import EnginePool
+from haconiwa.resource.schema_cache import FINGERPRINTERS, SchemaCache
+
+
+@pytest.fixture
+def engine_pool():
+    pool = EnginePool()
+    yield pool
+    pool.dispose_all()
+
+
+@pytest.fixture
+def cache(tmp_path, engine_pool):
+    dsn = f"sqlite:///{tmp_path / 'app.db'}"
+    with engine_pool.get(dsn).begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT NOT NULL)"))
+        conn.execute(text("CREATE UNIQUE INDEX idx_users_email ON users (email)"))
+        conn.execute(text("CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT)"))
+        conn.execute(text("CREATE VIEW titles AS SELECT title FROM posts"))
+    DatabaseManager.register_config("schema-db", {"name": "schema-db", "dsn": dsn})
+    yield SchemaCache(DatabaseManager(engine_pool), cache_dir=tmp_path / "schema", max_age=0)
+    DatabaseManager._configs.pop("schema-db", None)
+    SchemaCache._snapshots.clear()
+
+
+def _execute(cache, sql):
+    with cache.manager.engine("schema-db").begin() as conn:
+        conn.execute(text(sql))
+
+
+class TestSchemaCache:
+    """Test SchemaCache"""
+
+    def test_snapshot(self, cache):
+        snapshot = cache.get("schema-db")
+
+        assert snapshot.summary() == {"tables": ["posts", "users"], "views": ["titles"], "indexes": ["idx_users_email"]}
+        users = snapshot.objects["users"]
+        assert [(c["name"], c["nullable"], c["primary_key"]) for c in users["columns"]] == [
+            ("id", True, True), ("email", False, False),
+        ]
+        assert users["indexes"] == [{"name": "idx_users_email", "columns": ["email"], "unique": True}]
+        assert snapshot.refreshed == ["posts", "titles", "users"]
+
+    def test_only_changed_objects_are_introspected(self, cache):
+        cache.get("schema-db")
+        assert cache.get("schema-db").refreshed == []
+
+        _execute(cache, "ALTER TABLE posts ADD COLUMN body TEXT")
+        _execute(cache, "CREATE TABLE tags (name TEXT)")
+        _execute(cache, "DROP VIEW titles")
+        snapshot = cache.get("schema-db")
+
+        assert snapshot.refreshed == ["posts", "tags"]
+        assert snapshot.views() == []
+        assert [c["name"] for c in snapshot.objects["posts"]["columns"]] == ["id", "title", "body"]
+
+    def test_index_change_is_detected(self, cache):
+        cache.get("schema-db")
+        _execute(cache, "CREATE INDEX idx_posts_title ON posts (title)")
+
+        snapshot = cache.get("schema-db")
+
+        assert snapshot.refreshed == ["posts"]
+        assert "idx_posts_title" in snapshot.indexes()
+
+    def test_max_age_skips_catalog(self, cache):
+        cache.get("schema-db")
+        cache.max_age = 3600
+        _execute(cache, "CREATE TABLE tags (name TEXT)")
+
+        assert "tags" not in cache.get("schema-db").tables()
+        assert "tags" in cache.get("schema-db", refresh=True).tables()
+
+    def test_snapshot_persists_across_processes(self, cache):
+        cache.get("schema-db")
+        SchemaCache._snapshots.clear()
+
+        assert cache.get("schema-db").refreshed == []
+        assert len(list(cache.cache_dir.glob("schema-db-*.json"))) == 1
+
+    def test_scan_reads_the_cache(self, cache, monkeypatch):
+        monkeypatch.setenv("HACONIWA_SCHEMA_CACHE_DIR", str(cache.cache_dir))
+
+        assert cache.manager.scan("schema-db")["views"] == ["titles"]
+        assert cache.get("schema-db").refreshed == []
+
+    def test_mysql_lifts_group_concat_limit(self):
+        conn = Mock()
+        conn.execute.side_effect = [None, [("users", "table", "abc")]]
+
+        assert FINGERPRINTERS["mysql"](conn) == {"users": ("table", "abc")}
+        # Without it GROUP_CONCAT cuts the column list of wide tables at 1024 bytes
+        assert "group_concat_max_len" in str(conn.execute.call_args_list[0].args[0])
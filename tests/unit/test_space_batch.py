@@ -0,0 +1,102 @@
+"""
+Tests for tmux command batching
+"""
+
+import subprocess
+from unittest.mock import Mock, patch
+
+from haconiwa.space.batch import STEP_MARKER, TmuxCommandBatch
+
+
+def _completed(returncode=0, stdout="", stderr=""):
+    return subprocess.CompletedProcess(args=[], returncode=returncode, stdout=stdout, stderr=stderr)
+
+
+class TestTmuxCommandBatch:
+    """Test TmuxCommandBatch"""
+
+    def test_build_argv_chains_commands_with_markers(self):
+        batch = TmuxCommandBatch()
+        batch.split_window("s:0.0", vertical=True)
+        batch.set_pane_title("s:0.0", "Title")
+
+        argv = batch.build_argv(batch.commands)
+
+        assert argv == [
+            "tmux",
+            "split-window", "-v", "-t", "s:0.0", ";", "display-message", "-p", f"{STEP_MARKER} 0", ";",
+            "select-pane", "-t", "s:0.0", "-T", "Title", ";", "display-message", "-p", f"{STEP_MARKER} 1",
+        ]
+
+    def test_trailing_semicolon_is_escaped(self):
+        batch = TmuxCommandBatch()
+        batch.send_keys("s:0.0", "echo a;")
+
+        argv = batch.build_argv(batch.commands)
+
+        assert "echo a\\;" in argv
+
+    @patch("subprocess.run")
+    def test_flush_runs_single_invocation(self, mock_run):
+        mock_run.return_value = _completed()
+        callback = Mock()
+        batch = TmuxCommandBatch()
+        for i in range(15):
+            batch.split_window(f"s:0.{i}")
+        batch.set_pane_title("s:0.0", "Title", on_success=callback)
+
+        result = batch.flush()
+
+        assert result.ok
+        assert mock_run.call_count == 1
+        assert result.executed == 16
+        callback.assert_called_once()
+        assert len(batch) == 0
+
+    @patch("subprocess.run")
+    def test_flush_maps_failure_to_step_and_continues(self, mock_run):
+        mock_run.side_effect = [
+            _completed(returncode=1, stdout=f"{STEP_MARKER} 0\n", stderr="can't find pane: 9"),
+            _completed(),
+        ]
+        skipped = Mock()
+        batch = TmuxCommandBatch()
+        batch.split_window("s:0.0", step="first")
+        batch.split_window("s:0.9", step="second")
+        batch.set_pane_title("s:0.0", "Title", step="third", on_success=skipped)
+
+        result = batch.flush()
+
+        assert not result.ok
+        assert result.failures[0].step == "second"
+        assert result.failures[0].error == "can't find pane: 9"
+        assert result.executed == 2
+        assert mock_run.call_count == 2
+        # The retry starts after the failed command
+        assert mock_run.call_args.args[0][1:6] == ["select-pane", "-t", "s:0.0", "-T", "Title"]
+        skipped.assert_called_once()
+
+    @patch("subprocess.run")
+    def test_flush_stop_on_error(self, mock_run):
+        mock_run.return_value = _completed(returncode=1, stdout="", stderr="no server running")
+        batch = TmuxCommandBatch()
+        batch.split_window("s:0.0")
+        batch.split_window("s:0.1")
+
+        result = batch.flush(stop_on_error=True)
+
+        assert len(result.failures) == 1
+        assert mock_run.call_count == 1
+
+    @patch("subprocess.run")
+    def test_flush_chunks_large_batches(self, mock_run):
+        mock_run.return_value = _completed()
+        batch = TmuxCommandBatch(max_commands=10)
+        for i in range(25):
+            batch.send_keys(f"s:0.{i}", "clear")
+
+        result = batch.flush()
+
+        assert result.ok
+        assert result.invocations == 3
+        assert mock_run.call_count == 3
@@ -0,0 +1,130 @@
+"""
+Tests for the tmux control-mode client
+"""
+
+import io
+import os
+import shutil
+import subprocess
+from unittest.mock import Mock, patch
+
+import pytest
+
+from haconiwa.space import control
+from haconiwa.space.control import TmuxControlClient, TmuxControlError, run_tmux
+
+
+def _client_with_output(lines):
+    """Client wired to a fake control-mode process emitting ``lines``"""
+    client = TmuxControlClient()
+    client.process = Mock()
+    client.process.poll.return_value = None
+    client.process.stdin = io.BytesIO()
+    client.process.stdout = iter([(line + "\n").encode() for line in lines])
+    return client
+
+
+class TestTmuxControlClient:
+    """Test TmuxControlClient"""
+
+    def test_quote_command(self):
+        quoted = TmuxControlClient.quote_command(["send-keys", "-t", "s:0.1", 'echo "$HOME"; ls', "Enter"])
+
+        assert quoted == 'send-keys -t s:0.1 "echo \\"\\$HOME\\"; ls" Enter'
+
+    def test_replies_are_matched_in_order(self):
+        client = _client_with_output([
+            "%begin 1 10 0",
+            "%end 1 10 0",
+            "%window-add @1",
+            "%begin 1 11 1",
+            "0: 1 windows",
+            "%end 1 11 1",
+            "%begin 1 12 1",
+            "parse error: unknown command: bogus",
+            "%error 1 12 1",
+        ])
+        notifications = []
+        client.subscribe(notifications.append)
+        first = client.submit("list-sessions")
+        second = client.submit("bogus")
+
+        client._read_loop()
+
+        assert client.process.stdin.getvalue() == b"list-sessions\nbogus\n"
+        assert first.result().returncode == 0
+        assert first.result().stdout == "0: 1 windows\n"
+        assert second.result().returncode == 1
+        assert second.result().stderr == "parse error: unknown command: bogus"
+        assert [n.name for n in notifications] == ["window-add"]
+
+    def test_pending_commands_fail_when_client_exits(self):
+        client = _client_with_output(["%begin 1 10 0", "%end 1 10 0"])
+        pending = client.submit("list-sessions")
+
+        client._read_loop()
+
+        with pytest.raises(TmuxControlError):
+            pending.result()
+        assert client.is_alive is False
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux is not installed")
+class TestLiveControlClient:
+    """Test TmuxControlClient against a private tmux server"""
+
+    @pytest.fixture
+    def tmux(self, tmp_path):
+        wrapper = tmp_path / "tmux"
+        wrapper.write_text(f"#!/bin/sh\nexec tmux -L haconiwa-control-{os.getpid()} \"$@\"\n")
+        wrapper.chmod(0o755)
+        yield str(wrapper)
+        subprocess.run([str(wrapper), "kill-server"], capture_output=True)
+
+    def _has_session(self, tmux, name):
+        return subprocess.run([tmux, "has-session", "-t", f"={name}"], capture_output=True).returncode == 0
+
+    def test_close_kills_created_session(self, tmux):
+        subprocess.run([tmux, "new-session", "-d", "-s", "space"], check=True)
+
+        with TmuxControlClient(tmux_bin=tmux) as client:
+            assert client.command("display-message", "-p", "#{session_name}").stdout == "haconiwa-control\n"
+
+        assert not self._has_session(tmux, control.CONTROL_SESSION)
+        assert self._has_session(tmux, "space")
+
+    def test_close_keeps_existing_session(self, tmux):
+        subprocess.run([tmux, "new-session", "-d", "-s", "space"], check=True)
+
+        with TmuxControlClient(session_name="space", tmux_bin=tmux) as client:
+            client.command("list-panes")
+
+        assert self._has_session(tmux, "space")
+
+
+class TestRunTmux:
+    """Test run_tmux transport selection"""
+
+    def teardown_method(self):
+        control.enable_control_mode(False)
+
+    @patch("subprocess.run")
+    def test_subprocess_when_control_mode_disabled(self, mock_run):
+        control.enable_control_mode(False)
+
+        run_tmux(["has-session", "-t", "test"])
+
+        mock_run.assert_called_once_with(["tmux", "has-session", "-t", "test"], capture_output=True, text=True)
+
+    @patch("subprocess.run")
+    def test_control_client_when_enabled(self, mock_run):
+        client = Mock()
+        client.command.return_value = subprocess.CompletedProcess(["tmux"], 0, "", "")
+        control.enable_control_mode(True)
+
+        with patch.object(control, "get_control_client", return_value=client):
+            result = run_tmux(["new-window", "-t", "test"])
+
+        assert result.returncode == 0
+        assert client.command.call_args.args[:3] == ("new-window", "-c", control.os.getcwd())
+        mock_run.assert_not_called()
@@ -0,0 +1,65 @@
+"""
+Tests for the grid layout engine
+"""
+
+import pytest
+
+from haconiwa.space.layout import GridLayout, LayoutError, layout_checksum
+
+
+class TestGridLayout:
+    """Test GridLayout"""
+
+    def test_parse(self):
+        layout = GridLayout.parse("8x4")
+
+        assert layout.columns == 8
+        assert layout.rows == 4
+        assert layout.pane_count == 32
+        assert str(layout) == "8x4"
+
+    @pytest.mark.parametrize("grid", ["", "8", "axb", "0x4", "8x4x2"])
+    def test_parse_invalid(self, grid):
+        with pytest.raises(LayoutError):
+            GridLayout.parse(grid)
+
+    def test_for_pane_count(self):
+        assert GridLayout.for_pane_count(16) == GridLayout(4, 4)
+        assert GridLayout.for_pane_count(10) == GridLayout(4, 3)
+        assert GridLayout.for_pane_count(1) == GridLayout(1, 1)
+
+    @pytest.mark.parametrize("grid", ["4x4", "8x8", "6x5", "1x3", "3x1", "1x1"])
+    def test_minimal_splits(self, grid):
+        layout = GridLayout.parse(grid)
+
+        splits = layout.splits()
+
+        assert len(splits) == layout.pane_count - 1
+        assert sum(split.vertical for split in splits) == layout.rows - 1
+
+    def test_splits_for_2x2(self):
+        splits = [(s.pane, s.vertical, s.percent) for s in GridLayout(2, 2).splits()]
+
+        # Rows first, then the bottom row before the top row keeps panes row-major
+        assert splits == [(0, True, 50), (1, False, 50), (0, False, 50)]
+
+    def test_layout_string_2x2(self):
+        layout = GridLayout(2, 2).layout_string(81, 25)
+        body = "81x25,0,0[81x12,0,0{40x12,0,0,0,40x12,41,0,1},81x12,0,13{40x12,0,13,2,40x12,41,13,3}]"
+
+        assert layout == f"{layout_checksum(body):04x},{body}"
+
+    def test_layout_string_single_pane(self):
+        assert GridLayout(1, 1).layout_string(80, 24).endswith(",80x24,0,0,0")
+
+    def test_layout_string_too_small(self):
+        with pytest.raises(LayoutError):
+            GridLayout(10, 10).layout_string(10, 10)
+
+    def test_window_size_grows_to_fit_grid(self):
+        assert GridLayout(8, 8).window_size(10, 10) == (15, 15)
+        assert GridLayout(4, 4).window_size(200, 60) == (200, 60)
+
+    def test_layout_checksum(self):
+        # Checksum of a layout string reported by tmux itself
+        assert layout_checksum("80x24,0,0,0") == 0xb25d
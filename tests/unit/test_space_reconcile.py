@@ -0,0 +1,126 @@
+"""
+Tests for diff-based space reconciliation
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from haconiwa.space.manager import SpaceManager
+from haconiwa.space.reconcile import PaneState, SpaceReconciler, SpaceState, WindowState
+
+
+@pytest.fixture
+def config(tmp_path):
+    (tmp_path / "tasks" / "main").mkdir(parents=True)
+    return {
+        "name": "test-company",
+        "grid": "8x4",
+        "base_path": str(tmp_path),
+        "organizations": [{"id": "01", "name": "Org A"}],
+        "rooms": [{"id": "room-01", "name": "Alpha Room"}, {"id": "room-02", "name": "Beta Room"}],
+    }
+
+
+def _assign(base_path, task_name, agent_id):
+    task_dir = base_path / "tasks" / task_name
+    (task_dir / ".haconiwa").mkdir(parents=True)
+    (task_dir / ".haconiwa" / "agent_assignment.json").write_text(json.dumps([{
+        "agent_id": agent_id, "task_name": task_name, "space_session": "test-company", "status": "active",
+        "tmux_window": None, "tmux_pane": None,
+    }]))
+    return task_dir
+
+
+def _live(desired):
+    """Live session matching the desired state exactly"""
+    current = SpaceState(desired.session)
+    for window_id, window in desired.windows.items():
+        current.windows[window_id] = WindowState(window.name, {
+            index: PaneState(pane.cwd, pane.title) for index, pane in window.panes.items()
+        })
+    return current
+
+
+class TestSpaceReconciler:
+    """Test SpaceReconciler"""
+
+    def setup_method(self):
+        self.reconciler = SpaceReconciler(SpaceManager())
+
+    def test_desired_state(self, config, tmp_path):
+        task_dir = _assign(tmp_path, "task-a", "org01-wk-a-r1")
+
+        desired = self.reconciler.desired_state(config)
+
+        assert sorted(desired.windows) == ["0", "1"]
+        assert desired.windows["0"].name == "Alpha"
+        assert len(desired.windows["0"].panes) == 16
+        assert desired.windows["0"].layout == "4x4"
+        pane = desired.windows["0"].panes[1]
+        assert pane.cwd == str(task_dir.absolute())
+        assert pane.title.endswith("[Task: task-a]")
+        assert desired.windows["0"].panes[0].cwd == str((tmp_path / "standby").absolute())
+
+    def test_no_operations_when_converged(self, config, tmp_path):
+        task_dir = _assign(tmp_path, "task-a", "org01-wk-a-r1")
+        desired = self.reconciler.desired_state(config)
+        desired.windows["0"].panes[1].assignment.update(tmux_window="0", tmux_pane=1)
+
+        assert self.reconciler.diff(desired, _live(desired)) == []
+
+    def test_single_task_edit_costs_one_pane_update(self, config, tmp_path):
+        live = _live(self.reconciler.desired_state(config))
+        _assign(tmp_path, "task-a", "org01-wk-a-r1")
+
+        ops = self.reconciler.diff(self.reconciler.desired_state(config), live)
+
+        assert [(op.action, op.target) for op in ops] == [
+            ("move_pane", "test-company:0.1"),
+            ("set_title", "test-company:0.1"),
+            ("record_pane", "test-company:0.1"),
+        ]
+
+    def test_missing_window_and_panes(self, config):
+        desired = self.reconciler.desired_state(config)
+        live = _live(desired)
+        del live.windows["1"]
+        del live.windows["0"].panes[15]
+        live.windows["0"].name = "Old"
+
+        ops = self.reconciler.diff(desired, live)
+        actions = [(op.action, op.target) for op in ops]
+
+        assert ("rename_window", "test-company:0") in actions
+        assert ("add_panes", "test-company:0") in actions
+        assert ("create_window", "test-company:1") in actions
+        assert sum(action == "move_pane" for action, _ in actions) == 17
+
+    def test_session_not_running(self, config):
+        desired = self.reconciler.desired_state(config)
+
+        ops = self.reconciler.diff(desired, None)
+
+        assert [op.action for op in ops] == ["create_session"]
+
+    @patch("haconiwa.space.reconcile.run_tmux")
+    def test_current_state(self, mock_run):
+        mock_run.return_value = Mock(returncode=0, stdout=(
+            "0\tAlpha\t0\t/work/standby\tOrg A - 待機中 - Alpha Room\n"
+            "0\tAlpha\t1\t/work/tasks/a b\tOrg A - WORKER-A - Alpha Room [Task: a b]\n"
+            "1\tBeta\t0\t/work\t\n"
+        ))
+
+        state = self.reconciler.current_state("test-company")
+
+        mock_run.assert_called_once()
+        assert state.windows["0"].panes[1].cwd == "/work/tasks/a b"
+        assert state.windows["1"].name == "Beta"
+        assert state.windows["1"].panes[0].title == ""
+
+    @patch("haconiwa.space.reconcile.run_tmux")
+    def test_current_state_without_session(self, mock_run):
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="can't find session")
+
+        assert self.reconciler.current_state("test-company") is None
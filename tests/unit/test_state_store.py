@@ -0,0 +1,147 @@
+"""
+Tests for the SQLite state store and StateManager history
+"""
+
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from haconiwa.core.state import StateManager
+from haconiwa.core.state_store import SQLiteStateStore, StateStoreError
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStateStore(tmp_path / "state.db")
+    yield store
+    store.close()
+
+
+class TestSQLiteStateStore:
+    """Test SQLiteStateStore"""
+
+    def test_commit_is_visible_to_other_connections(self, store, tmp_path):
+        store.put("world", {"status": "active"})
+        store.commit({"a": 1, "b": [1, 2]}, ["world"])
+
+        other = SQLiteStateStore(tmp_path / "state.db")
+        assert other.items() == {"a": 1, "b": [1, 2]}
+        assert other.revision == 2
+        other.close()
+
+    def test_rollback_to_revision_and_time(self, store):
+        first = store.commit({"a": 1, "b": 2})
+        time.sleep(0.01)
+        checkpoint = time.time()
+        store.commit({"a": 10, "c": 3}, ["b"])
+
+        assert store.snapshot(first) == {"a": 1, "b": 2}
+        new_revision = store.rollback(store.revision_at(checkpoint))
+
+        assert new_revision == 3
+        assert store.items() == {"a": 1, "b": 2}
+        # The rollback is itself a commit and can be undone
+        store.rollback(2)
+        assert store.items() == {"a": 10, "c": 3}
+
+    def test_compaction_keeps_recent_snapshots(self, store):
+        for value in range(10):
+            store.commit({"counter": value, f"key{value}": value})
+        store.delete("key9")
+
+        removed = store.compact(keep_revisions=3)
+
+        assert removed > 0
+        assert store.compacted_through == 8
+        assert store.snapshot(8)["counter"] == 7
+        assert store.snapshot(10)["key9"] == 9
+        assert store.snapshot(11) == store.items()
+        with pytest.raises(StateStoreError):
+            store.rollback(2)
+
+    def test_history(self, store):
+        store.put("a", 1)
+        store.put("a", 2)
+        store.delete("a")
+
+        assert [(entry.revision, entry.value) for entry in store.history("a")] == [(3, None), (2, 2), (1, 1)]
+        assert store.history("a")[0].deleted
+
+    def test_values_must_be_json(self, store):
+        with pytest.raises(StateStoreError):
+            store.put("a", object())
+        assert store.items() == {}
+
+    def test_concurrent_processes(self, tmp_path):
+        script = textwrap.dedent(f"""
+            import sys
+            from haconiwa.core.state_store import SQLiteStateStore
+            store = SQLiteStateStore({str(tmp_path / "state.db")!r})
+            for i in range(50):
+                store.commit({{f"{{sys.argv[1]}}-{{i}}": i, "last": sys.argv[1]}})
+        """)
+        workers = [subprocess.Popen([sys.executable, "-c", script, name]) for name in ("p1", "p2", "p3")]
+        assert [worker.wait(timeout=60) for worker in workers] == [0, 0, 0]
+
+        store = SQLiteStateStore(tmp_path / "state.db")
+        assert len(store.items()) == 151
+        assert store.revision == 150
+        assert store.check()
+        store.close()
+
+
+class TestStateManagerStore:
+    """Test StateManager with a state store"""
+
+    def test_updates_are_committed_per_key(self, tmp_path):
+        manager = StateManager.open(str(tmp_path / "config.yaml"))
+        manager.update_state("world", {"status": "active"})
+
+        reopened = StateManager.open(str(tmp_path / "config.yaml"))
+        assert reopened.state == {"world": {"status": "active"}}
+        assert reopened.get_state("world") == {"status": "active"}
+
+    def test_transaction_is_atomic(self, tmp_path):
+        manager = StateManager.open(str(tmp_path / "config.yaml"))
+        manager.update_state("a", 1)
+
+        with pytest.raises(RuntimeError):
+            with manager.transaction():
+                manager.update_state("a", 2)
+                manager.update_state("b", 3)
+                raise RuntimeError("boom")
+        with manager.transaction():
+            manager.update_state("c", 4)
+            manager.delete_state("a")
+
+        assert manager.state == {"c": 4}
+        assert manager.store.items() == {"c": 4}
+        assert manager.store.revision == 2
+
+    def test_rollback_state(self, tmp_path):
+        manager = StateManager.open(str(tmp_path / "config.yaml"))
+        revision = manager.store.put("a", 1)
+        manager.update_state("a", 2)
+
+        manager.rollback_state(revision)
+
+        assert manager.get_state("a") == 1
+        assert manager.state == {"a": 1}
+
+    def test_legacy_snapshot_is_imported(self, tmp_path):
+        legacy = StateManager(str(tmp_path / "config.yaml"))
+        legacy.update_state("world", {"status": "active"})
+        legacy.save_state(str(tmp_path / "state.pkl"))
+
+        manager = StateManager.open(str(tmp_path / "config.yaml"))
+        manager.load_state(str(tmp_path / "state.pkl"))
+
+        assert manager.store.items() == {"world": {"status": "active"}}
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        subprocess.run([sys.executable, "-c", "import haconiwa.core.state"], cwd=tmp_path, check=True)
+
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,106 @@
+"""
+Tests for the agent assignment index
+"""
+
+import json
+
+import pytest
+
+from haconiwa.task.assignments import AssignmentIndex
+
+
+def _write_log(base_path, task_name, assignments):
+    log_dir = base_path / "tasks" / task_name / ".haconiwa"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    (log_dir / "agent_assignment.json").write_text(json.dumps(assignments))
+    return base_path / "tasks" / task_name
+
+
+def _assignment(agent_id, task_name, session="test-company", status="active"):
+    return {"agent_id": agent_id, "task_name": task_name, "space_session": session, "status": status}
+
+
+@pytest.fixture
+def space(tmp_path):
+    (tmp_path / "tasks" / "main").mkdir(parents=True)
+    return tmp_path
+
+
+class TestAssignmentIndex:
+    """Test AssignmentIndex"""
+
+    def test_load_builds_index_from_task_logs(self, space):
+        task_dir = _write_log(space, "20250101_feature", [_assignment("org01-pm-r1", "20250101_feature")])
+        _write_log(space, "20250102_done", [_assignment("org02-pm-r1", "20250102_done", status="completed")])
+
+        index = AssignmentIndex(space).load()
+
+        entry = index.get("org01-pm-r1", "test-company")
+        assert entry["task_name"] == "20250101_feature"
+        assert entry["task_dir"] == str(task_dir.absolute())
+        assert index.get("org02-pm-r1", "test-company") is None
+        assert index.get("org01-pm-r1", "other-company") is None
+        assert (space / ".haconiwa" / "agent_assignments.json").exists()
+
+    def test_load_uses_index_without_reading_task_logs(self, space):
+        _write_log(space, "task-a", [_assignment("org01-pm-r1", "task-a")])
+        AssignmentIndex(space).load()
+
+        # A log change without a new task directory is only seen through record()/rebuild()
+        _write_log(space, "task-a", [_assignment("org01-wk-a-r1", "task-a")])
+        index = AssignmentIndex(space).load()
+
+        assert index.get("org01-pm-r1", "test-company") is not None
+        assert index.get("org01-wk-a-r1", "test-company") is None
+
+    def test_load_picks_up_added_and_removed_task_directories(self, space):
+        _write_log(space, "task-a", [_assignment("org01-pm-r1", "task-a")])
+        AssignmentIndex(space).load()
+
+        _write_log(space, "task-b", [_assignment("org02-pm-r1", "task-b")])
+        for path in sorted((space / "tasks" / "task-a").rglob("*"), reverse=True):
+            path.unlink() if path.is_file() else path.rmdir()
+        (space / "tasks" / "task-a").rmdir()
+
+        index = AssignmentIndex(space).load()
+
+        assert index.get("org01-pm-r1", "test-company") is None
+        assert index.get("org02-pm-r1", "test-company")["task_name"] == "task-b"
+
+    def test_record_and_update_pane(self, space):
+        task_dir = _write_log(space, "task-a", [])
+        AssignmentIndex(space).load()
+
+        AssignmentIndex.for_task_dir(task_dir).record(_assignment("org01-pm-r1", "task-a"), task_dir)
+        index = AssignmentIndex(space)
+        index.update_pane("org01-pm-r1", "test-company", "0", 3, defer=True)
+        index.flush()
+
+        entry = AssignmentIndex(space).load().get("org01-pm-r1", "test-company")
+        assert entry["tmux_window"] == "0"
+        assert entry["tmux_pane"] == 3
+
+    def test_record_overwrite_drops_previous_agent_of_task(self, space):
+        task_dir = _write_log(space, "task-a", [_assignment("org01-pm-r1", "task-a")])
+        AssignmentIndex(space).load()
+
+        AssignmentIndex(space).record(_assignment("org02-pm-r1", "task-a"), task_dir, overwrite=True)
+
+        index = AssignmentIndex(space).load()
+        assert index.get("org01-pm-r1", "test-company") is None
+        assert index.get("org02-pm-r1", "test-company") is not None
+
+    def test_rebuild(self, space):
+        _write_log(space, "task-a", [_assignment("org01-pm-r1", "task-a")])
+        _write_log(space, "task-b", [_assignment("org02-pm-r1", "task-b")])
+        (space / ".haconiwa").mkdir()
+        (space / ".haconiwa" / "agent_assignments.json").write_text("{broken")
+
+        assert AssignmentIndex(space).rebuild() == 2
+        assert len(AssignmentIndex(space).load()) == 2
+
+    def test_missing_tasks_directory(self, tmp_path):
+        index = AssignmentIndex(tmp_path / "missing").load()
+
+        assert len(index) == 0
+        assert not (tmp_path / "missing").exists()
@@ -0,0 +1,117 @@
+"""
+Tests for concurrent worktree provisioning
+"""
+
+import json
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from haconiwa.task.manager import TaskManager
+from haconiwa.task.provisioner import WorktreeProvisioner, WorktreeRequest
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), *args], capture_output=True, text=True, check=True).stdout.strip()
+
+
+@pytest.fixture
+def space(tmp_path):
+    repo = tmp_path / "tasks" / "main"
+    repo.mkdir(parents=True)
+    _git(repo, "init", "-q", "-b", "main")
+    (repo / "README.md").write_text("hello\n")
+    _git(repo, "add", "README.md")
+    _git(repo, "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "init")
+    return tmp_path
+
+
+class TestWorktreeProvisioner:
+    """Test WorktreeProvisioner"""
+
+    def test_provision_many_worktrees(self, space):
+        repo = space / "tasks" / "main"
+        requests = [WorktreeRequest(f"task-{i}", f"feature/{i}", space / "tasks" / f"task-{i}") for i in range(6)]
+
+        results = WorktreeProvisioner(repo, max_workers=3).provision(requests)
+
+        assert all(result.success and result.created for result in results.values())
+        for i in range(6):
+            worktree = space / "tasks" / f"task-{i}"
+            assert (worktree / "README.md").read_text() == "hello\n"
+            assert _git(worktree, "rev-parse", "--abbrev-ref", "HEAD") == f"feature/{i}"
+            assert _git(worktree, "status", "--porcelain") == ""
+        # The main checkout is never switched to the task branches
+        assert _git(repo, "rev-parse", "--abbrev-ref", "HEAD") == "main"
+
+    def test_existing_branch_and_worktree(self, space):
+        repo = space / "tasks" / "main"
+        _git(repo, "branch", "feature/existing")
+        (space / "tasks" / "task-done").mkdir()
+        requests = [
+            WorktreeRequest("task-existing", "feature/existing", space / "tasks" / "task-existing"),
+            WorktreeRequest("task-done", "feature/done", space / "tasks" / "task-done"),
+        ]
+
+        results = WorktreeProvisioner(repo).provision(requests)
+
+        assert results["task-existing"].created
+        assert results["task-done"].success and not results["task-done"].created
+        assert "feature/done" not in _git(repo, "branch", "--list")
+
+    def test_branch_checked_out_twice_fails(self, space):
+        repo = space / "tasks" / "main"
+        requests = [
+            WorktreeRequest("task-a", "feature/shared", space / "tasks" / "task-a"),
+            WorktreeRequest("task-b", "feature/shared", space / "tasks" / "task-b"),
+        ]
+
+        results = WorktreeProvisioner(repo).provision(requests)
+
+        assert results["task-a"].success
+        assert not results["task-b"].success
+        assert results["task-b"].error
+
+
+class TestTaskManagerCreateTasks:
+    """Test TaskManager.create_tasks"""
+
+    def test_create_tasks(self, space):
+        manager = TaskManager()
+        configs = [
+            {"name": f"task-{i}", "branch": f"feature/{i}", "space_ref": "test-company",
+             "assignee": f"org01-wk-{i}-r1", "description": "test"}
+            for i in range(3)
+        ]
+
+        with patch.object(manager, "_find_space_base_path", return_value=space):
+            results = manager.create_tasks(configs, max_workers=2)
+
+        try:
+            assert results == [True, True, True]
+            for i in range(3):
+                assert (space / "tasks" / f"task-{i}" / "README.md").exists()
+                assert (space / "tasks" / f"task-{i}" / ".haconiwa" / "agent_assignment.json").exists()
+        finally:
+            for i in range(3):
+                manager.tasks.pop(f"task-{i}", None)
+
+
+class TestAgentAssignmentLog:
+    """Test the assignment log written when an agent's pane moves to its task"""
+
+    def test_log_written_once_per_pane(self, space):
+        task_dir = space / "tasks" / "task-a"
+        task_dir.mkdir()
+        manager = TaskManager()
+        log_file = task_dir / ".haconiwa" / "agent_assignment.json"
+
+        assert manager._create_agent_assignment_log(str(task_dir), "org01-wk-a-r1", "task-a", "test-company", "1", "2")
+        assert manager._create_agent_assignment_log(str(task_dir), "org01-wk-a-r1", "task-a", "test-company", "1", "2")
+        entries = json.loads(log_file.read_text())
+        assert [(entry["tmux_window"], entry["tmux_pane"]) for entry in entries] == [("1", "2")]
+
+        # The agent moved to another pane
+        assert manager._create_agent_assignment_log(str(task_dir), "org01-wk-a-r1", "task-a", "test-company", "1", "3")
+        assert len(json.loads(log_file.read_text())) == 2
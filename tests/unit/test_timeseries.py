@@ -0,0 +1,113 @@
+"""
+Tests for the ring-buffer time series store
+"""
+
+import pytest
+
+from haconiwa.watch.timeseries import TimeSeriesError, TimeSeriesStore, parse_duration, series_key
+
+T0 = 1_700_000_000.0
+
+
+@pytest.fixture
+def store():
+    with TimeSeriesStore(tiers=((1, 10), (5, 60))) as store:
+        yield store
+
+
+class TestTimeSeriesStore:
+    """Test TimeSeriesStore"""
+
+    def test_write_time_downsampling(self, store):
+        for second in range(20):
+            store.add("cpu", second, T0 + second)
+            store.add("cpu", second + 10, T0 + second + 0.5)
+
+        assert store.query("cpu", T0 + 15, T0 + 19.9) == [(T0 + s, s + 5.0) for s in range(15, 20)]
+        assert store.query("cpu", T0, T0 + 19.9) == [(T0, 7.0), (T0 + 5, 12.0), (T0 + 10, 17.0), (T0 + 15, 22.0)]
+        assert store.query("cpu", T0, T0 + 19.9, agg="max") == [(T0, 14.0), (T0 + 5, 19.0), (T0 + 10, 24.0),
+                                                                 (T0 + 15, 29.0)]
+
+    def test_memory_is_fixed_and_old_buckets_expire(self, store):
+        size = store.size
+        for second in range(200):
+            store.add("cpu", 1.0, T0 + second)
+
+        assert store.size == size
+        assert len(store.query("cpu", T0, T0 + 199, resolution=1)) == 12  # 60s tier, 5s buckets
+        assert store.query("cpu", T0, T0 + 5, resolution=1) == []
+        assert store.latest("cpu") is None  # T0 is long past
+
+    def test_late_samples_do_not_overwrite_newer_buckets(self, store):
+        store.add("cpu", 50, T0 + 10)
+        store.add("cpu", 99, T0)
+
+        assert store.query("cpu", T0, T0 + 10) == [(T0 + 10, 50.0)]
+
+    def test_aggregate_weights_buckets(self, store):
+        store.add("cpu", 10, T0)
+        for _ in range(3):
+            store.add("cpu", 50, T0 + 1)
+
+        assert store.aggregate("cpu", 5, end=T0 + 1.5) == 40.0
+        assert store.aggregate("cpu", 5, "max", end=T0 + 1.5) == 50.0
+        assert store.aggregate("missing", 5) is None
+        with pytest.raises(TimeSeriesError):
+            store.aggregate("cpu", 5, "median")
+
+    def test_capacity(self):
+        with TimeSeriesStore(tiers=((1, 10),), max_series=2) as store:
+            store.add("a", 1)
+            store.add(series_key("b", {"pane": "dev:1.0"}), 1)
+            with pytest.raises(TimeSeriesError):
+                store.add("c", 1)
+            assert store.series() == ["a", "b{pane=dev:1.0}"]
+
+    def test_stale_series_slots_are_reused(self):
+        with TimeSeriesStore(tiers=((1, 10), (5, 60)), max_series=2) as store:
+            store.add("a", 1, T0)
+            store.add("b", 2, T0 + 30)
+            with pytest.raises(TimeSeriesError):
+                store.add("c", 3, T0 + 59)
+
+            # "a" has nothing left in the 60s tier; "b" still has
+            store.add("c", 3, T0 + 61)
+
+            assert store.series() == ["b", "c"]
+            assert store.query("c", T0, T0 + 61, resolution=5) == [(T0 + 60, 3.0)]
+            assert store.query("a", T0, T0 + 61) == []
+
+
+class TestPersistence:
+    """Test memory-mapped persistence"""
+
+    def test_reopen_and_read_only_view(self, tmp_path):
+        path = tmp_path / "metrics.tsdb"
+        writer = TimeSeriesStore(path, tiers=((1, 10), (5, 60)), max_series=2)
+        writer.add("cpu", 42.0, T0)
+        reader = TimeSeriesStore(path, readonly=True)
+        writer.add("memory", 7.0, T0)
+
+        assert reader.query("cpu", T0, T0 + 1) == [(T0, 42.0)]
+        assert reader.series() == ["cpu", "memory"]
+        with pytest.raises(TimeSeriesError):
+            reader.add("cpu", 1.0)
+        writer.add("disk", 1.0, T0 + 120)
+        assert reader.series() == ["disk", "memory"]
+        assert reader.query("disk", T0 + 120, T0 + 121) == [(T0 + 120, 1.0)]
+        writer.close()
+        reader.close()
+
+        with TimeSeriesStore(path) as reopened:
+            assert [tier.resolution for tier in reopened.tiers] == [1.0, 5.0]
+            assert reopened.query("memory", T0, T0 + 1) == [(T0, 7.0)]
+
+    def test_rejects_foreign_files(self, tmp_path):
+        path = tmp_path / "other.tsdb"
+        path.write_bytes(b"not a store")
+
+        with pytest.raises(TimeSeriesError):
+            TimeSeriesStore(path)
+
+    def test_parse_duration(self):
+        assert [parse_duration(text) for text in ("90", "30s", "10m", "6h", "1d")] == [90, 30, 600, 21600, 86400]
@@ -38,4 +38,29 @@ def test_log_rotation_and_archiving(monitor):
 def test_integration_with_monitoring_library(monitor):
     monitor.integrate_with_library = MagicMock()
     monitor.integrate_with_library()
-    monitor.integrate_with_library.assert_called_once()
\ No newline at end of file
+    monitor.integrate_with_library.assert_called_once()
+
+
+def _alerting_monitor(settings):
+    from src.haconiwa.watch.timeseries import TimeSeriesStore
+    monitor = Monitor(store=TimeSeriesStore())
+    monitor.config = MagicMock()
+    monitor.config.get.side_effect = lambda key, default=None: settings.get(key, default)
+    monitor.record_metrics({"cpu": 95.0, "memory": 10.0})
+    return monitor
+
+@patch("src.haconiwa.watch.monitor.smtplib.SMTP")
+def test_cpu_alert_without_email_config(mock_smtp):
+    monitor = _alerting_monitor({"watch.alerts.cpu_percent": 80})
+    monitor.check_alert_conditions()
+    assert monitor.send_alert("High CPU usage detected") is False
+    mock_smtp.assert_not_called()
+
+@patch("src.haconiwa.watch.monitor.smtplib.SMTP", side_effect=OSError("connection refused"))
+def test_cpu_alert_smtp_failure_is_logged(mock_smtp):
+    email = {"smtp_server": "localhost", "smtp_port": 25, "from": "a@example.com", "to": "b@example.com",
+             "password": "secret"}
+    monitor = _alerting_monitor({"watch.alerts.cpu_percent": 80, "watch.alerts.email": email})
+    monitor.check_alert_conditions()
+    mock_smtp.assert_called_once_with("localhost", 25, timeout=30)
+    assert monitor.send_alert("High CPU usage detected") is False
@@ -0,0 +1,175 @@
+"""
+Tests for the pane output capture pipeline
+"""
+
+import errno
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from haconiwa.space.control import TmuxControlNotification
+from haconiwa.watch.capture import (
+    INDEX_RECORD, PaneCapture, SegmentWriter, TranscriptReader, list_transcripts, strip_escapes, task_directory,
+)
+
+
+class TestSegments:
+    """Test SegmentWriter and TranscriptReader"""
+
+    def test_tail_and_time_range(self, tmp_path):
+        writer = SegmentWriter(tmp_path / "0.1")
+        for second in range(10):
+            writer.write(f"line {second}\n".encode(), 1000.0 + second, 1000.5 + second)
+        writer.close()
+
+        reader = TranscriptReader(tmp_path / "0.1")
+        assert reader.tail_lines(2) == ["line 8", "line 9"]
+        assert reader.tail(7) == b"line 9\n"
+        assert reader.read(1003.0, 1004.9) == b"line 3\nline 4\n"
+        assert reader.read() == b"".join(f"line {second}\n".encode() for second in range(10))
+        # Segments are plain concatenated gzip members
+        assert gzip.decompress((tmp_path / "0.1" / "00000001.log.gz").read_bytes()).startswith(b"line 0\n")
+
+    def test_rotation_keeps_newest_segments(self, tmp_path):
+        rotated = []
+        writer = SegmentWriter(tmp_path, max_segment_bytes=2048, max_segments=3)
+        writer.on_rotate.append(lambda directory, segment: rotated.append(segment))
+        for index in range(200):
+            writer.write(os.urandom(256), float(index), float(index))
+        writer.close()
+
+        reader = TranscriptReader(tmp_path)
+        assert len(reader.segments()) == 3
+        assert rotated[:2] == [1, 2]
+        stats = reader.stats()
+        assert stats["compressed_bytes"] <= 3 * (2048 + 512)
+        assert stats["end"] == 199.0
+        # Older output was deleted with its segments; the tail spans the ones left
+        assert stats["bytes"] < 200 * 256
+        assert reader.tail(stats["bytes"] + 1000) == reader.tail(stats["bytes"]) == reader.read()
+        assert reader.read(199.0) == reader.tail(256)
+
+    def test_resume_after_partial_write(self, tmp_path):
+        writer = SegmentWriter(tmp_path)
+        writer.write(b"first\n", 1.0, 1.0)
+        writer.close()
+        # A member and index record cut short by a crash
+        with open(tmp_path / "00000001.log.gz", "ab") as f:
+            f.write(b"\x1f\x8b\x08garbage")
+        with open(tmp_path / "00000001.idx", "ab") as f:
+            f.write(b"\x00" * (INDEX_RECORD.size // 2))
+
+        writer = SegmentWriter(tmp_path)
+        writer.write(b"second\n", 2.0, 2.0)
+        writer.close()
+
+        assert TranscriptReader(tmp_path).read() == b"first\nsecond\n"
+        assert TranscriptReader(tmp_path).entries(1)[-1].position == 6
+
+    def test_failed_write_leaves_segment_readable(self, tmp_path):
+        class FullDisk:
+            def __init__(self, f):
+                self.f = f
+
+            def write(self, data):
+                self.f.write(data[:len(data) // 2])
+                self.f.flush()
+                raise OSError(errno.ENOSPC, "No space left on device")
+
+            def __getattr__(self, name):
+                return getattr(self.f, name)
+
+        writer = SegmentWriter(tmp_path)
+        writer.write(b"first\n", 1.0, 1.0)
+        writer._data = FullDisk(writer._data)
+        with pytest.raises(OSError):
+            writer.write(b"lost\n", 2.0, 2.0)
+        writer.write(b"second\n", 3.0, 3.0)
+        writer.close()
+
+        assert TranscriptReader(tmp_path).read() == b"first\nsecond\n"
+
+
+class TestPaneCapture:
+    """Test routing of %output into per-pane transcripts"""
+
+    def test_output_is_written_per_pane(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HACONIWA_CAPTURE_DIR", str(tmp_path / "cache"))
+        space = tmp_path / "space"
+        (space / "tasks" / "api").mkdir(parents=True)
+        recorder = PaneCapture("dev")
+        recorder.watcher.tracker.load(
+            f"@0\t%0\t0\tAlpha Room\t0\tOrg A - PM - Alpha Room\t{tmp_path}\t0\t0\n"
+            f"@0\t%1\t0\tAlpha Room\t1\tOrg A - WORKER-A - Alpha Room [Task: api]\t{space}/tasks/api/src\t0\t0\n"
+        )
+        recorder._handle(TmuxControlNotification("output", "%1 \\033[32mok\\033[0m\\015\\012"))
+        recorder._handle(TmuxControlNotification("output", "%0 pm\\012"))
+        recorder._handle(TmuxControlNotification("output", "%7 unknown pane\\012"))
+        assert recorder.flush() == len(b"\x1b[32mok\x1b[0m\r\n") + 3
+
+        task_capture = space / "tasks" / "api" / ".haconiwa" / "capture"
+        assert (task_capture / ".gitignore").read_text() == "*\n"
+        reader = TranscriptReader(task_capture / "0.1")
+        assert strip_escapes(reader.read()) == b"ok\r\n"
+        assert reader.labels["task"] == "api" and reader.labels["role"] == "worker-a"
+        assert list_transcripts(tmp_path / "cache") == [tmp_path / "cache" / "dev" / "0.0"]
+        # Output of a pane not known yet waits for its metadata
+        assert "%7" in recorder._pending
+
+        recorder.watcher.tracker.panes["%1"].title = "Org A - WORKER-A - Alpha Room [Task: db]"
+        recorder._handle(TmuxControlNotification("output", "%1 next\\012"))
+        recorder.flush()
+        assert json.loads((task_capture / "0.1" / "agent.json").read_text())["task"] == "db"
+
+    def test_multibyte_character_split_across_notifications(self, tmp_path):
+        recorder = PaneCapture("dev", tmp_path)
+        recorder.watcher.tracker.load("@0\t%0\t0\tAlpha Room\t0\tOrg A - PM - Alpha Room\t/space\t0\t0\n")
+        text = "あいう\r\n".encode("utf-8")
+        client = recorder.watcher.client
+        client.process = Mock()
+        # tmux splits the output after the first byte of 'い'
+        client.process.stdout = iter([b"%output %0 " + text[:4] + b"\n", b"%output %0 " + text[4:-2] + b"\\015\\012\n"])
+        client.subscribe(recorder._handle)
+
+        client._read_loop()
+        recorder.flush()
+
+        assert TranscriptReader(tmp_path / "dev" / "0.0").read() == text
+
+    def test_task_directory(self):
+        assert str(task_directory("/space/tasks/api/src/module")) == "/space/tasks/api"
+        assert task_directory("/home/user") is None
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux is not installed")
+class TestLiveCapture:
+    """Test PaneCapture against a private tmux server"""
+
+    @pytest.fixture
+    def tmux(self, tmp_path):
+        wrapper = tmp_path / "tmux"
+        wrapper.write_text(f"#!/bin/sh\nexec tmux -L haconiwa-capture-{os.getpid()} \"$@\"\n")
+        wrapper.chmod(0o755)
+        yield str(wrapper)
+        subprocess.run([str(wrapper), "kill-server"], capture_output=True)
+
+    def test_capture_session(self, tmux, tmp_path):
+        subprocess.run([tmux, "new-session", "-d", "-s", "space", "-n", "Alpha Room", "sh"], check=True)
+
+        with PaneCapture("space", tmp_path / "capture", flush_interval=0.1, tmux_bin=tmux) as recorder:
+            subprocess.run([tmux, "send-keys", "-t", "space:0.0", "seq 1 2000", "Enter"], check=True)
+            reader = TranscriptReader(tmp_path / "capture" / "space" / "0.0")
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and b"\r\n2000\r\n" not in reader.read():
+                time.sleep(0.05)
+
+        lines = reader.read().decode().split("\r\n")
+        first = lines.index("1")
+        assert lines[first:first + 2000] == [str(number) for number in range(1, 2001)]
+        assert reader.labels["room"] == "Alpha" and recorder.bytes_written == reader.stats()["bytes"]
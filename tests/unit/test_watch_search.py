@@ -0,0 +1,108 @@
+"""
+Tests for the transcript search index
+"""
+
+import json
+import shutil
+
+import pytest
+
+from haconiwa.watch.capture import AGENT_FILE, SegmentWriter
+from haconiwa.watch.search import TranscriptIndex, SearchError, clean_text
+
+
+def _transcript(directory, labels, max_segment_bytes=4 * 1024 * 1024, max_segments=8):
+    writer = SegmentWriter(directory, max_segment_bytes, max_segments)
+    (directory / AGENT_FILE).write_text(json.dumps(labels))
+    return writer
+
+
+@pytest.fixture
+def space(tmp_path):
+    api = _transcript(tmp_path / "space" / "tasks" / "api" / ".haconiwa" / "capture" / "0.1",
+                      {"session": "dev", "room": "Alpha", "org": "Org A", "role": "worker-a", "task": "api", "pane": "0.1"})
+    db = _transcript(tmp_path / "space" / "tasks" / "db" / ".haconiwa" / "capture" / "0.2",
+                     {"session": "dev", "room": "Alpha", "org": "Org A", "role": "worker-b", "task": "db", "pane": "0.2"})
+    api.write(b"\x1b[32mrunning tests\x1b[0m\r\n", 100.0, 100.5)
+    db.write(b"Traceback (most recent call last):\r\n  File \"db.py\", line 3\r\nKeyError: 'users'\r\n", 101.0, 101.2)
+    api.write("ビルド完了\r\n".encode(), 102.0, 102.0)
+    return tmp_path / "space", api, db
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TranscriptIndex(tmp_path / "index" / "transcripts.db")
+    yield index
+    index.close()
+
+
+class TestTranscriptIndex:
+    """Test TranscriptIndex"""
+
+    def test_search_across_tasks(self, space, index):
+        root, _, _ = space
+        assert index.update([root]) == 3
+
+        hit, = index.search("most recent CALL")
+        assert (hit.task, hit.role, hit.pane) == ("db", "worker-b", "0.2")
+        assert hit.line == "Traceback (most recent call last):" and hit.start == 101.0
+        assert [hit.line for hit in index.search("ビルド")] == ["ビルド完了"]
+        assert index.search("tests", since=100.9) == []
+        assert index.search("running", task="db") == []
+        assert index.search("Ke", fts=False)[0].line == "KeyError: 'users'"
+        assert index.search("KeyError AND users", fts=True)[0].task == "db"
+
+    def test_incremental_update(self, space, index):
+        root, api, _ = space
+        index.update([root])
+
+        assert index.update() == 0
+        api.write(b"partial li", 103.0, 103.0)
+        assert index.update() == 0
+        api.write(b"ne done\r\n", 104.0, 104.0)
+        assert index.update() == 1
+
+        hit, = index.search("partial line done")
+        assert (hit.start, hit.end) == (103.0, 104.0)
+        assert index.stats()["transcripts"] == 2
+
+    def test_rotation_and_removal(self, tmp_path, index):
+        directory = tmp_path / "capture" / "dev" / "0.0"
+        writer = _transcript(directory, {"session": "dev", "pane": "0.0"}, max_segment_bytes=200, max_segments=2)
+        for number in range(20):
+            writer.write(f"event-{number:03d} {'x' * 200}\n".encode(), float(number), float(number))
+            index.update_directories([directory])
+
+        assert index.search("event-000") == []
+        assert [hit.start for hit in index.search("event-019")] == [19.0]
+
+        shutil.rmtree(directory)
+        index.update()
+        assert index.stats()["transcripts"] == 0
+
+    def test_corrupt_member_does_not_stop_indexing(self, space, index):
+        root, api, db = space
+        with open(db.directory / "00000001.log.gz", "ab") as f:
+            f.write(b"garbage")
+        db.write(b"after the damage\r\n", 103.0, 103.0)
+        api.write(b"api still indexed\r\n", 104.0, 104.0)
+
+        index.update([root])
+
+        assert index.search("KeyError")[0].task == "db"
+        assert index.search("after the damage") == []
+        assert [hit.task for hit in index.search("still indexed")] == ["api"]
+        assert index.update() == 0
+
+    def test_invalid_query(self, index):
+        with pytest.raises(SearchError):
+            index.search("AND (", fts=True)
+        with pytest.raises(SearchError):
+            index.search("  ")
+
+
+class TestCleanText:
+    """Test normalization of terminal output for indexing"""
+
+    def test_escapes_and_redrawn_lines(self):
+        assert clean_text(b"\x1b[1mok\x1b[0m\r\nloading 10%\rloading 100%\r\n\x07") == "ok\nloading 100%\n"
@@ -0,0 +1,133 @@
+"""
+Tests for the event-driven pane activity tail
+"""
+
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from haconiwa.space.control import TmuxControlNotification
+from haconiwa.watch.tail import ActivityTracker, PaneActivityWatcher, TailError, decode_output, last_line, render
+
+
+def _notification(line):
+    name, _, args = line[1:].partition(" ")
+    return TmuxControlNotification(name, args)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def tracker():
+    clock = _Clock()
+    tracker = ActivityTracker("dev", clock)
+    tracker.load("@0\t%0\t0\tAlpha Room\t0\tOrg A - PM - Alpha Room\t/space/tasks/main\t0\t0\n"
+                 "@0\t%1\t0\tAlpha Room\t1\tOrg A - WORKER-A - Alpha Room [Task: api]\t/space/tasks/api\t0\t0\n")
+    return tracker
+
+
+def _rows(tracker):
+    return {row["target"]: row for row in tracker.rows()}
+
+
+class TestOutputDecoding:
+    """Test %output payload decoding"""
+
+    def test_octal_escapes_and_utf8(self):
+        data = decode_output("\\033[1mビルド\\033[0m done\\015\\012\\134n")
+
+        assert data == "\x1b[1mビルド\x1b[0m done\r\n\\n".encode("utf-8")
+        assert last_line(data) == "\\n"
+        assert last_line(decode_output("step 1\\015\\012\\033[32mok\\033[0m\\015\\012\\033[?2004h")) == "ok"
+
+
+class TestActivityTracker:
+    """Test ActivityTracker"""
+
+    def test_output_rates_and_status(self, tracker):
+        for _ in range(10):
+            tracker.handle(_notification("%output %1 " + "x" * 99 + "\\012"))
+        tracker.clock.now += 2
+
+        rows = _rows(tracker)
+        assert rows["dev:0.1"]["status"] == "active"
+        assert rows["dev:0.1"]["rate"] > 100
+        assert rows["dev:0.1"]["idle_seconds"] == 2
+        assert (rows["dev:0.1"]["role"], rows["dev:0.1"]["task"]) == ("worker-a", "api")
+        assert rows["dev:0.0"]["status"] == "idle" and rows["dev:0.0"]["rate"] == 0
+
+        tracker.clock.now += 60
+        assert _rows(tracker)["dev:0.1"]["status"] == "idle"
+
+    def test_blocked_on_prompt(self, tracker):
+        tracker.handle(_notification("%output %0 Do you want to proceed? (y/n) "))
+        assert _rows(tracker)["dev:0.0"]["status"] == "active"
+
+        tracker.clock.now += 5
+        assert _rows(tracker)["dev:0.0"]["status"] == "blocked"
+
+    def test_subscription_and_window_events(self, tracker):
+        tracker.handle(_notification("%subscription-changed haconiwa-tail $0 @0 0 %0 : "
+                                     "0\tAlpha Room\t0\tOrg A - PM - Alpha Room [Task: db]\t/space/tasks/db\t1\t0"))
+        tracker.handle(_notification("%window-add @1"))
+        tracker.handle(_notification("%subscription-changed haconiwa-tail $0 @1 1 %2 : "
+                                     "1\tBeta Room\t0\tOrg B - PM - Beta Room\t/space\t0\t0"))
+        tracker.handle(_notification("%layout-change @0 b25d,80x24,0,0,0 b25d,80x24,0,0,0 *"))
+
+        rows = _rows(tracker)
+        assert sorted(rows) == ["dev:0.0", "dev:1.0"]
+        assert (rows["dev:0.0"]["task"], rows["dev:0.0"]["status"]) == ("db", "copy-mode")
+        assert rows["dev:1.0"]["room"] == "Beta"
+
+        tracker.handle(_notification("%window-close @1"))
+        assert sorted(_rows(tracker)) == ["dev:0.0"]
+
+    def test_render(self, tracker):
+        tracker.handle(_notification("%output %1 hello\\012"))
+
+        table = render(tracker, header="Host (1m avg): CPU 5.0%")
+
+        assert table.row_count == 2
+        assert "1 active" in table.title and "1 idle" in table.title
+
+
+@pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux is not installed")
+class TestPaneActivityWatcher:
+    """Test PaneActivityWatcher against a private tmux server"""
+
+    @pytest.fixture
+    def tmux(self, tmp_path):
+        wrapper = tmp_path / "tmux"
+        wrapper.write_text(f"#!/bin/sh\nexec tmux -L haconiwa-test-{os.getpid()} \"$@\"\n")
+        wrapper.chmod(0o755)
+        yield str(wrapper)
+        subprocess.run([str(wrapper), "kill-server"], capture_output=True)
+
+    def test_live_session(self, tmux):
+        subprocess.run([tmux, "new-session", "-d", "-s", "space", "-n", "Alpha Room", "sh"], check=True)
+
+        with PaneActivityWatcher("space", tmux_bin=tmux) as watcher:
+            subprocess.run([tmux, "send-keys", "-t", "space:0.0", "echo agent-output", "Enter"], check=True)
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and b"agent-output\r\n" not in watcher.tracker.panes["%0"]._tail:
+                time.sleep(0.05)
+            row, = watcher.tracker.rows()
+
+        assert row["target"] == "space:0.0" and row["room"] == "Alpha"
+        assert row["status"] == "active" and row["rate"] > 0
+
+    def test_missing_session(self, tmux):
+        subprocess.run([tmux, "new-session", "-d", "-s", "other"], check=True)
+
+        with pytest.raises(TailError):
+            PaneActivityWatcher("space", tmux_bin=tmux).start()
+        assert subprocess.run([tmux, "has-session", "-t", "=space"], capture_output=True).returncode != 0